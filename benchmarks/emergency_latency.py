@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+زمن إيقاف الطوارئ تحت الحمل الكامل
+Emergency Stop Latency Under Full Load
+
+يشغل الخادم في وضع المحاكاة بأسطول كبير وساعة افتراضية (speed 0: دورات المراقبة
+متتابعة بلا توقف فيبقى مالك الحالة مشغولاً طوال الوقت)، مع عملاء Socket.IO
+يستلمون تحديثات الأسطول ويؤكدون استلام إشعار الطوارئ، وحمل إضافي من أوامر التحكم
+وقراءة المضخات ودفعات قراءات الحساسات. ثم يرسل أوامر إيقاف طوارئ متتالية عبر HTTP
+وSocket.IO بالتناوب ويقيس لكل أمر: زمن الرد، وزمن وصول الإشعار لأول وآخر عميل،
+وأزمنة الخادم (التطبيق، الإرسال، آخر تأكيد). للمقارنة يقيس زمن أمر التحكم العادي
+تحت الحمل نفسه.
+
+الاستخدام:
+    python benchmarks/emergency_latency.py --pumps 2000 --clients 50 --commands 20 --bound-ms 500
+
+يرجع رمز خروج 1 إن تجاوز زمن وصول الإشعار لآخر عميل (النسبة 99) الحد --bound-ms.
+
+يتطلب: python-socketio[asyncio_client] (aiohttp)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import tempfile
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+import aiohttp
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """النسبة المئوية لقائمة قيم"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict:
+    """ملخص إحصائي بالمللي ثانية"""
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def wait_for_port(port: int, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as probe:
+            if probe.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"الخادم لم يبدأ على المنفذ {port}")
+
+
+def start_server(args) -> subprocess.Popen:
+    env = dict(os.environ,
+               OIL_PUMP_ASYNC_MODE=args.mode,
+               OIL_PUMP_PORT=str(args.port),
+               OIL_PUMP_HOST='127.0.0.1',
+               OIL_PUMP_DATA_DIR='',
+               OIL_PUMP_TICK=str(args.tick),
+               OIL_PUMP_SIM_PUMPS=str(args.pumps),
+               OIL_PUMP_SIM_SEED=str(args.seed),
+               OIL_PUMP_SIM_SPEED=str(args.speed))
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'src', 'main.py')],
+                              cwd=tempfile.mkdtemp(prefix='oil-pump-emergency-'), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(args.port)
+    return server
+
+
+async def background_load(session: aiohttp.ClientSession, url: str, args, rng: random.Random,
+                          stop: asyncio.Event, control_latencies: List[float]):
+    """حمل مستمر: أوامر تحكم عادية، قراءة الأسطول، ودفعات قراءات حساسات"""
+    action = 'stop'
+    while not stop.is_set():
+        pump_id = rng.randint(1, args.pumps)
+        started = time.perf_counter()
+        async with session.post(f'{url}/api/pumps/{pump_id}/control',
+                                json={'action': action, 'user_id': 'load'}) as response:
+            await response.read()
+        control_latencies.append(time.perf_counter() - started)
+        action = 'standby' if action == 'stop' else 'stop'
+
+        async with session.get(f'{url}/api/pumps') as response:
+            await response.read()
+
+        readings = [{'pump_id': rng.randint(1, args.pumps), 'metrics': {'temperature': round(rng.uniform(60, 90), 1)}}
+                    for _ in range(args.batch)]
+        async with session.post(f'{url}/api/telemetry/ingest', json={'readings': readings}) as response:
+            await response.read()
+
+
+async def run(url: str, args, rng: random.Random) -> Dict:
+    # أزمنة وصول إشعار كل أمر لكل عميل
+    arrivals: Dict[str, List[float]] = {}
+    sockets: List[socketio.AsyncClient] = []
+
+    async def connect_one():
+        client = socketio.AsyncClient(reconnection=False)
+
+        @client.on('emergency_stop')
+        async def on_emergency_stop(data):
+            arrivals.setdefault(data['command_id'], []).append(time.perf_counter())
+            await client.emit('emergency_ack', {'command_id': data['command_id']})
+
+        await client.connect(url, transports=['websocket'], wait_timeout=30)
+        sockets.append(client)
+        if not args.fleet_updates:
+            # إشعار الطوارئ يصل دون اشتراك: عملاء لا يستلمون إلا الطوارئ والتنبيهات
+            await client.emit('subscribe', {'events': ['alerts']})
+
+    for offset in range(0, args.clients, 25):
+        await asyncio.gather(*(connect_one() for _ in range(min(25, args.clients - offset))))
+
+    stop = asyncio.Event()
+    control_latencies: List[float] = []
+    commands = []
+    async with aiohttp.ClientSession() as session:
+        loaders = [asyncio.ensure_future(background_load(session, url, args, rng, stop, control_latencies))
+                   for _ in range(args.load)]
+        # الوصول للحمل الكامل قبل أول أمر
+        await asyncio.sleep(args.warmup)
+
+        for index in range(args.commands):
+            source = 'http' if index % 2 == 0 else 'socketio'
+            started = time.perf_counter()
+            if source == 'http':
+                async with session.post(f'{url}/api/emergency/all', json={'user_id': 'bench'}) as response:
+                    result = await response.json()
+            else:
+                result = await sockets[0].call('emergency_stop', {'user_id': 'bench'}, timeout=30)
+            replied = time.perf_counter() - started
+
+            # انتظار وصول الإشعار لجميع العملاء (أو انتهاء المهلة)
+            command_id = result['command_id']
+            deadline = time.perf_counter() + args.timeout
+            while len(arrivals.get(command_id, [])) < len(sockets) and time.perf_counter() < deadline:
+                await asyncio.sleep(0.005)
+            received = arrivals.get(command_id, [])
+            commands.append({
+                'source': source,
+                'stopped': len(result['stopped_pumps']),
+                'reply': replied,
+                'first_client': min(received) - started if received else None,
+                'last_client': max(received) - started if received else None,
+                'clients': len(received),
+            })
+
+            # إعادة المضخات للتشغيل للأمر التالي
+            async with session.post(f'{url}/api/pumps/control', json={
+                'selector': {'status': 'emergency_stop'}, 'action': 'reset_emergency', 'user_id': 'bench'
+            }) as response:
+                await response.read()
+            async with session.post(f'{url}/api/pumps/control', json={
+                'selector': {'status': ['stopped', 'standby']}, 'action': 'start', 'user_id': 'bench'
+            }) as response:
+                await response.read()
+            await asyncio.sleep(args.interval)
+
+        stop.set()
+        await asyncio.gather(*loaders, return_exceptions=True)
+
+        async with session.get(f'{url}/api/system/emergency') as response:
+            server = await response.json()
+        async with session.get(f'{url}/api/system/scheduler') as response:
+            scheduler = await response.json()
+
+    await asyncio.gather(*(client.disconnect() for client in sockets), return_exceptions=True)
+
+    delivered = [command for command in commands if command['last_client'] is not None]
+    return {
+        'connected': len(sockets),
+        'commands': len(commands),
+        'undelivered': len(commands) - len(delivered),
+        'stopped_per_command': round(sum(command['stopped'] for command in commands) / max(1, len(commands)), 1),
+        'emergency': {
+            'reply': summarize([command['reply'] for command in commands]),
+            'first_client': summarize([command['first_client'] for command in delivered]),
+            'last_client': summarize([command['last_client'] for command in delivered]),
+            'by_source': {
+                source: summarize([command['last_client'] for command in delivered if command['source'] == source])
+                for source in ('http', 'socketio')
+            },
+        },
+        # أمر التحكم العادي تحت الحمل نفسه (ينتظر دوره خلف دورة المراقبة الجارية)
+        'control_reply': summarize(control_latencies),
+        'server': {key: server[key] for key in ('commands', 'acks', 'latency')},
+        # زمن الدورات في الجدولة بثواني المحاكاة: التحويل للزمن الحقيقي بقسمته على التسارع
+        'cycle_duration_ms': {key: round(scheduler[key] / args.speed, 2) if args.speed else None
+                              for key in ('avg_duration_ms', 'max_duration_ms')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='زمن إيقاف الطوارئ تحت الحمل الكامل')
+    parser.add_argument('--pumps', type=int, default=2000, help='عدد المضخات المحاكاة')
+    parser.add_argument('--clients', type=int, default=50, help='عدد عملاء Socket.IO المؤكدين للاستلام')
+    parser.add_argument('--commands', type=int, default=20, help='عدد أوامر الطوارئ')
+    parser.add_argument('--interval', type=float, default=0.5, help='الفاصل بين الأوامر بالثواني')
+    parser.add_argument('--no-fleet-updates', dest='fleet_updates', action='store_false',
+                        help='العملاء لا يستلمون تحديثات الأسطول (قياس مسار الخادم وحده)')
+    parser.add_argument('--load', type=int, default=4, help='عدد مهام الحمل الإضافي المتزامنة')
+    parser.add_argument('--batch', type=int, default=100, help='عدد القراءات في كل دفعة حساسات')
+    parser.add_argument('--speed', type=float, default=0.0, help='تسارع ساعة المحاكاة (0 = دورات متتابعة بلا توقف)')
+    parser.add_argument('--tick', type=float, default=1.0, help='فترة دورة المراقبة بثواني المحاكاة')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--warmup', type=float, default=3.0, help='مدة الحمل قبل أول أمر بالثواني')
+    parser.add_argument('--timeout', type=float, default=10.0, help='مهلة انتظار وصول الإشعار لجميع العملاء')
+    parser.add_argument('--bound-ms', type=float, help='الحد المقبول لزمن وصول الإشعار لآخر عميل (النسبة 99)')
+    parser.add_argument('--mode', default='threading', help='وضع الخادم (threading / eventlet / gevent)')
+    parser.add_argument('--port', type=int, default=5800)
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    server = start_server(args)
+    try:
+        result = asyncio.run(run(f'http://127.0.0.1:{args.port}', args, rng))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    results = {
+        'benchmark': 'emergency_latency',
+        'timestamp': datetime.now().isoformat(),
+        'mode': args.mode,
+        'pumps': args.pumps,
+        'clients': args.clients,
+        'load': args.load,
+        'speed': args.speed,
+        'seed': args.seed,
+        **result,
+    }
+    exceeded = False
+    if args.bound_ms is not None:
+        worst = result['emergency']['last_client']['p99_ms']
+        exceeded = result['undelivered'] > 0 or worst > args.bound_ms
+        results['bound'] = {'bound_ms': args.bound_ms, 'p99_ms': worst, 'within': not exceeded}
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+    if exceeded:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+مولد حمل الأسطول
+Fleet-Scale Load Generator
+
+يشغل الخادم في وضع المحاكاة (عدد مضخات كبير، بذرة ثابتة، ساعة متسارعة، أعطال
+مجدولة في مضخات عشوائية) في عملية مستقلة، ثم يفتح عدداً كبيراً من عملاء Socket.IO
+بمزيج من أنماط الاستخدام:
+- fleet: الأسطول كاملاً بصيغة JSON (الاشتراك الافتراضي)
+- binary: الأسطول كاملاً بإطارات القياسات الثنائية
+- filtered: مجموعة صغيرة من المضخات بمعدل تحديث محدود (لوحات ميدانية)
+
+ويقيس لكل نمط عدد التحديثات وزمن وصولها والتنبيهات المستلمة، ومن الخادم زمن دورات
+المراقبة وتجاوزها لفترتها وسرعة المحاكاة الفعلية وذاكرة العملية. مع البذرة نفسها
+يتكرر الأسطول والقياسات والأعطال نفسها في كل تشغيل فتصلح النتائج للمقارنة.
+
+الاستخدام:
+    python benchmarks/fleet_load.py --pumps 5000 --clients 200 --speed 10 --duration 30 --faults 20
+
+يتطلب: python-socketio[asyncio_client] (aiohttp)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import tempfile
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+import aiohttp
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from simulation import FAULT_EFFECTS
+
+PROFILES = ('fleet', 'binary', 'filtered')
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """النسبة المئوية لقائمة قيم"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict:
+    """ملخص إحصائي بالمللي ثانية"""
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def process_stats(pid: int) -> Dict:
+    """ذاكرة وخيوط عملية الخادم (Linux)"""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    stats['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith('Threads:'):
+                    stats['threads'] = int(line.split()[1])
+    except OSError:
+        pass
+    return stats
+
+
+def wait_for_port(port: int, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as probe:
+            if probe.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"الخادم لم يبدأ على المنفذ {port}")
+
+
+def fault_script(args, rng: random.Random) -> List[Dict]:
+    """أعطال في مضخات عشوائية موزعة على أول نصف مدة المحاكاة"""
+    horizon = args.duration * (args.speed or 1.0) / 2
+    return [
+        {
+            'pump': rng.randint(1, args.pumps),
+            'fault': rng.choice(sorted(FAULT_EFFECTS)),
+            'at': round(rng.uniform(0, horizon), 1),
+            'severity': round(rng.uniform(0.5, 2.0), 2),
+        }
+        for _ in range(args.faults)
+    ]
+
+
+def start_server(args, port: int, faults: List[Dict]) -> subprocess.Popen:
+    env = dict(os.environ,
+               OIL_PUMP_ASYNC_MODE=args.mode,
+               OIL_PUMP_PORT=str(port),
+               OIL_PUMP_HOST='127.0.0.1',
+               OIL_PUMP_DATA_DIR='',
+               OIL_PUMP_TICK=str(args.tick),
+               OIL_PUMP_SIM_PUMPS=str(args.pumps),
+               OIL_PUMP_SIM_SEED=str(args.seed),
+               OIL_PUMP_SIM_SPEED=str(args.speed),
+               OIL_PUMP_SIM_FAULTS=json.dumps(faults))
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'src', 'main.py')],
+                              cwd=tempfile.mkdtemp(prefix='oil-pump-fleet-'), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return server
+
+
+class ClientStats:
+    """عدادات نمط من أنماط العملاء"""
+
+    def __init__(self):
+        self.clients = 0
+        self.connect_times: List[float] = []
+        self.latencies: List[float] = []
+        self.updates = 0
+        self.frames = 0
+        self.alerts = 0
+
+    def to_dict(self, duration: float) -> Dict:
+        return {
+            'clients': self.clients,
+            'connected': len(self.connect_times),
+            'connect': summarize(self.connect_times),
+            'updates': self.updates,
+            'frames': self.frames,
+            'updates_per_client_per_sec': round(self.updates / max(1, len(self.connect_times)) / duration, 2),
+            'alerts': self.alerts,
+            'latency': summarize(self.latencies),
+        }
+
+
+async def run_clients(url: str, args, rng: random.Random) -> Dict:
+    stats = {profile: ClientStats() for profile in PROFILES}
+    sockets: List[socketio.AsyncClient] = []
+    failures = 0
+    measuring = False
+
+    async def connect_one(profile: str):
+        nonlocal failures
+        client = socketio.AsyncClient(reconnection=False)
+        counters = stats[profile]
+        counters.clients += 1
+
+        @client.on('data_update')
+        async def on_data_update(data):
+            if not measuring:
+                return
+            counters.updates += 1
+            if data.get('type') == 'frame':
+                counters.frames += 1
+            sent = datetime.fromisoformat(data['timestamp']).timestamp()
+            counters.latencies.append(time.time() - sent)
+
+        @client.on('new_alert')
+        async def on_new_alert(data):
+            if measuring:
+                counters.alerts += 1
+
+        auth = {'encoding': 'binary'} if profile == 'binary' else None
+        started = time.perf_counter()
+        try:
+            await client.connect(url, transports=['websocket'], auth=auth, wait_timeout=30)
+            counters.connect_times.append(time.perf_counter() - started)
+            sockets.append(client)
+            if profile == 'filtered':
+                pumps = rng.sample(range(1, args.pumps + 1), min(args.filtered_pumps, args.pumps))
+                await client.emit('subscribe', {'pumps': pumps, 'interval': args.filtered_interval})
+        except Exception:
+            failures += 1
+
+    weights = (1.0 - args.binary - args.filtered, args.binary, args.filtered)
+    profiles = rng.choices(PROFILES, weights=weights, k=args.clients)
+    for offset in range(0, args.clients, args.connect_batch):
+        await asyncio.gather(*(connect_one(profile) for profile in profiles[offset:offset + args.connect_batch]))
+
+    # القياس بعد اتصال جميع العملاء (بدون اللقطات الكاملة الأولى)
+    measuring = True
+    samples: List[Dict] = []
+    control_latencies: List[float] = []
+    deadline = time.time() + args.duration
+    async with aiohttp.ClientSession() as session:
+        action = 'stop'
+        while time.time() < deadline:
+            started = time.perf_counter()
+            async with session.post(f'{url}/api/pumps/{rng.randint(1, args.pumps)}/control',
+                                    json={'action': action, 'user_id': 'fleet-load'}) as response:
+                await response.read()
+            control_latencies.append(time.perf_counter() - started)
+            action = 'start' if action == 'stop' else 'stop'
+            async with session.get(f'{url}/api/system/scheduler') as response:
+                samples.append(await response.json())
+            await asyncio.sleep(1.0)
+        measuring = False
+
+        async with session.get(f'{url}/api/system/simulation') as response:
+            simulation = await response.json()
+        async with session.get(f'{url}/api/system/scheduler') as response:
+            scheduler = await response.json()
+        async with session.get(f'{url}/api/system/connections') as response:
+            connections = await response.json()
+
+    await asyncio.gather(*(client.disconnect() for client in sockets), return_exceptions=True)
+
+    for payload in (simulation, scheduler, connections):
+        payload.pop('success', None)
+        payload.pop('timestamp', None)
+    return {
+        'connect_failures': failures,
+        'profiles': {profile: counters.to_dict(args.duration) for profile, counters in stats.items()},
+        'control_latency': summarize(control_latencies),
+        # زمن الدورات في الجدولة بثواني المحاكاة: التحويل للزمن الحقيقي بقسمته على التسارع
+        'cycle_duration_ms': summarize([sample['last_duration_ms'] / 1000 / (args.speed or 1.0) for sample in samples]),
+        'scheduler': scheduler,
+        'simulation': simulation,
+        'queue_depth': connections.get('queue_depth'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='مولد حمل الأسطول')
+    parser.add_argument('--pumps', type=int, default=1000, help='عدد المضخات المحاكاة')
+    parser.add_argument('--clients', type=int, default=100, help='عدد عملاء Socket.IO')
+    parser.add_argument('--binary', type=float, default=0.3, help='نسبة العملاء بالإطارات الثنائية')
+    parser.add_argument('--filtered', type=float, default=0.3, help='نسبة العملاء المشتركين بمضخات محددة')
+    parser.add_argument('--filtered-pumps', type=int, default=10)
+    parser.add_argument('--filtered-interval', type=float, default=2.0)
+    parser.add_argument('--speed', type=float, default=10.0, help='تسارع ساعة المحاكاة (0 = أقصى سرعة)')
+    parser.add_argument('--tick', type=float, default=1.0, help='فترة دورة المراقبة بثواني المحاكاة')
+    parser.add_argument('--faults', type=int, default=10, help='عدد الأعطال المجدولة')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=20.0, help='مدة القياس بعد اتصال العملاء بالثواني')
+    parser.add_argument('--connect-batch', type=int, default=50)
+    parser.add_argument('--mode', default='threading', help='وضع الخادم (threading / eventlet / gevent)')
+    parser.add_argument('--port', type=int, default=5700)
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    faults = fault_script(args, rng)
+    server = start_server(args, args.port, faults)
+    try:
+        result = asyncio.run(run_clients(f'http://127.0.0.1:{args.port}', args, rng))
+        result['server'] = process_stats(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    results = {
+        'benchmark': 'fleet_load',
+        'timestamp': datetime.now().isoformat(),
+        'mode': args.mode,
+        'pumps': args.pumps,
+        'clients': args.clients,
+        'speed': args.speed,
+        'tick': args.tick,
+        'seed': args.seed,
+        'faults': len(faults),
+        'duration': args.duration,
+        **result,
+    }
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+قياس معدل استقبال القراءات
+Telemetry Ingestion Throughput Benchmark
+
+يقيس عدد القراءات في الثانية على نواة واحدة لمسارات الاستقبال:
+- batch: تحليل دفعة JSON والتحقق منها وإضافتها للمخزن المؤقت ثم كتابتها في المخزن
+  العمودي (كما في دورة المراقبة)
+- http: دفعات عبر مسار POST /api/telemetry/ingest في الخادم الكامل (عميل اختبار Flask)
+- udp: حزم أسطر قراءات عبر مقبس UDP حقيقي إلى المستمع في خيط منفصل
+
+الاستخدام:
+    python benchmarks/ingest.py --pumps 1000 --batch 5000 --seconds 5 --udp-rate 50000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import logging
+import argparse
+import multiprocessing
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from ingestion import IngestSource, UdpListener, parse_batch, parse_lines
+from telemetry_store import METRIC_SPECS, TelemetryStore
+
+
+def build_store(count: int, rng: random.Random) -> TelemetryStore:
+    """مخزن عمودي بالحجم المطلوب"""
+    telemetry = TelemetryStore(rng)
+    for pump_id in range(1, count + 1):
+        telemetry.add_pump(pump_id, {name: low for name, low, _, _ in METRIC_SPECS})
+    return telemetry
+
+
+def make_readings(pump_ids: List[int], count: int, rng: random.Random) -> List[Dict]:
+    """قراءات عشوائية صالحة بجميع المقاييس"""
+    return [
+        {
+            'pump_id': rng.choice(pump_ids),
+            'metrics': {name: round(rng.uniform(low, high), digits) for name, low, high, digits in METRIC_SPECS},
+            'timestamp': time.time(),
+        }
+        for _ in range(count)
+    ]
+
+
+def make_lines(readings: List[Dict]) -> List[str]:
+    """القراءات نفسها بصيغة أسطر UDP"""
+    return [
+        f"{reading['pump_id']} " + ','.join(f'{name}={value}' for name, value in reading['metrics'].items())
+        for reading in readings
+    ]
+
+
+def bench_batch(args, rng: random.Random) -> Dict:
+    """التحليل والتحقق والإضافة والكتابة في المخزن العمودي داخل العملية"""
+    telemetry = build_store(args.pumps, rng)
+    source = IngestSource(telemetry)
+    body = json.dumps({'readings': make_readings(telemetry.pump_ids, args.batch, rng)})
+    statuses = ['running'] * len(telemetry)
+
+    readings = 0
+    parse_time = collect_time = 0.0
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        accepted, errors = parse_batch(json.loads(body), telemetry.slots)
+        source.submit(accepted, len(errors))
+        parsed = time.perf_counter()
+        source.collect(statuses, [], None, set())
+        collect_time += time.perf_counter() - parsed
+        parse_time += parsed - started
+        readings += args.batch
+
+    elapsed = parse_time + collect_time
+    return {
+        'readings': readings,
+        'readings_per_sec': round(readings / elapsed),
+        'parse_validate_us': round(parse_time / readings * 1e6, 2),
+        'apply_us': round(collect_time / readings * 1e6, 2),
+    }
+
+
+def bench_http(args, rng: random.Random) -> Dict:
+    """دفعات عبر مسار الاستقبال في الخادم الكامل"""
+    os.chdir(tempfile.mkdtemp(prefix='oil-pump-ingest-'))
+    os.environ['OIL_PUMP_DATA_DIR'] = ''
+    os.environ.pop('OIL_PUMP_MESSAGE_QUEUE', None)
+    import main
+    logging.getLogger('main').setLevel(logging.ERROR)
+    main.OilPumpSystem.start_background_monitoring = lambda self: None
+    system = main.OilPumpSystem()
+    client = system.app.test_client()
+    body = json.dumps({'readings': make_readings(list(system.pumps_data), args.batch, rng)})
+
+    readings = 0
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    while time.perf_counter() < deadline:
+        response = client.post('/api/telemetry/ingest', data=body, content_type='application/json')
+        assert response.status_code == 200, response.get_data(as_text=True)
+        readings += args.batch
+        system.actor.call(lambda: system.monitoring_cycle([]))
+    elapsed = time.perf_counter() - started
+    return {'readings': readings, 'readings_per_sec': round(readings / elapsed)}
+
+
+def send_datagrams(datagrams: List[bytes], address, rate: float, seconds: float):
+    """إرسال الحزم بمعدل ثابت (حزم في الثانية)"""
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    started = time.perf_counter()
+    for index in range(int(rate * seconds)):
+        delay = started + index / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sender.sendto(datagrams[index % len(datagrams)], address)
+
+
+def bench_udp(args, rng: random.Random) -> Dict:
+    """حزم أسطر عبر UDP إلى مستمع في خيط منفصل"""
+    telemetry = build_store(args.pumps, rng)
+    source = IngestSource(telemetry)
+    listener = UdpListener('127.0.0.1:0', lambda text: source.submit(*parse_lines(text, telemetry.slots)))
+    listener.bind()
+    threading.Thread(target=listener.serve, daemon=True).start()
+
+    # حزم بحجم أقل من 8 كيلوبايت (عدد من الأسطر في كل حزمة)
+    lines = make_lines(make_readings(telemetry.pump_ids, 2000, rng))
+    datagrams, current = [], []
+    for line in lines:
+        if current and sum(len(item) + 1 for item in current) + len(line) > 8000:
+            datagrams.append(('\n'.join(current)).encode())
+            current = []
+        current.append(line)
+    per_datagram = len(lines) // max(1, len(datagrams))
+    datagrams = [datagram for datagram in datagrams if datagram.count(b'\n') + 1 == per_datagram] or datagrams
+
+    # المرسل في عملية منفصلة بمعدل ثابت حتى لا ينافس المستمع على النواة نفسها
+    rate = args.udp_rate / per_datagram
+    sender = multiprocessing.Process(target=send_datagrams,
+                                     args=(datagrams, listener.address, rate, args.seconds))
+    started = time.perf_counter()
+    sender.start()
+    sender.join()
+    time.sleep(0.5)
+    elapsed = time.perf_counter() - started - 0.5
+    sent = int(rate * args.seconds) * per_datagram
+    stats = source.stats()
+    return {
+        'target_per_sec': args.udp_rate,
+        'sent': sent,
+        'accepted': stats['accepted'],
+        'dropped': max(0, sent - stats['accepted'] - stats['rejected']),
+        'readings_per_sec': round(stats['accepted'] / elapsed),
+        'lines_per_datagram': per_datagram,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='قياس معدل استقبال القراءات')
+    parser.add_argument('--pumps', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=5000, help='عدد القراءات في الدفعة')
+    parser.add_argument('--seconds', type=float, default=5.0, help='مدة كل اختبار بالثواني')
+    parser.add_argument('--udp-rate', type=int, default=50000, help='معدل إرسال قراءات UDP في الثانية')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {
+        'benchmark': 'ingest',
+        'timestamp': datetime.now().isoformat(),
+        'pumps': args.pumps,
+        'batch': args.batch,
+        'batch_pipeline': bench_batch(args, rng),
+        'udp': bench_udp(args, rng),
+        'http': bench_http(args, rng),
+    }
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+اختبار الحمل لأوضاع الخادم
+Server Mode Load Benchmark
+
+يشغل الخادم بكل وضع (threading / eventlet / gevent) في عملية مستقلة، ثم يفتح
+عدداً كبيراً من عملاء Socket.IO المتزامنين ويقيس:
+- زمن الاتصال لكل عميل ونسبة الاتصالات الناجحة
+- زمن وصول تحديثات data_update من الخادم إلى العملاء
+- زمن استجابة طلبات التحكم HTTP أثناء الحمل
+- استهلاك ذاكرة وخيوط عملية الخادم
+
+الاستخدام:
+    python benchmarks/load_modes.py --clients 1000 --duration 30 --modes threading eventlet gevent
+
+يتطلب: python-socketio[asyncio_client] (aiohttp)
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import tempfile
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+import aiohttp
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """النسبة المئوية لقائمة قيم"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict:
+    """ملخص إحصائي بالمللي ثانية"""
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def process_stats(pid: int) -> Dict:
+    """ذاكرة وخيوط عملية الخادم (Linux)"""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    stats['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith('Threads:'):
+                    stats['threads'] = int(line.split()[1])
+    except OSError:
+        pass
+    return stats
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as probe:
+            if probe.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"الخادم لم يبدأ على المنفذ {port}")
+
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ,
+               OIL_PUMP_ASYNC_MODE=mode,
+               OIL_PUMP_PORT=str(port),
+               OIL_PUMP_HOST='127.0.0.1',
+               OIL_PUMP_DATA_DIR='')
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'src', 'main.py')],
+                              cwd=tempfile.mkdtemp(prefix='oil-pump-bench-'), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return server
+
+
+async def run_clients(url: str, clients: int, duration: float, connect_batch: int) -> Dict:
+    connect_times: List[float] = []
+    update_latencies: List[float] = []
+    failures = 0
+    sockets: List[socketio.AsyncClient] = []
+
+    async def connect_one():
+        nonlocal failures
+        client = socketio.AsyncClient(reconnection=False)
+
+        @client.on('data_update')
+        async def on_data_update(data):
+            sent = datetime.fromisoformat(data['timestamp']).timestamp()
+            update_latencies.append(time.time() - sent)
+
+        started = time.perf_counter()
+        try:
+            await client.connect(url, transports=['websocket'], wait_timeout=30)
+            connect_times.append(time.perf_counter() - started)
+            sockets.append(client)
+        except Exception:
+            failures += 1
+
+    for offset in range(0, clients, connect_batch):
+        await asyncio.gather(*(connect_one() for _ in range(min(connect_batch, clients - offset))))
+
+    # طلبات تحكم أثناء الحمل
+    control_latencies: List[float] = []
+    deadline = time.time() + duration
+    async with aiohttp.ClientSession() as session:
+        action = 'stop'
+        while time.time() < deadline:
+            started = time.perf_counter()
+            async with session.post(f'{url}/api/pumps/1/control',
+                                    json={'action': action, 'user_id': 'benchmark'}) as response:
+                await response.read()
+            control_latencies.append(time.perf_counter() - started)
+            action = 'start' if action == 'stop' else 'stop'
+            await asyncio.sleep(0.5)
+
+    connected = len(sockets)
+    await asyncio.gather(*(client.disconnect() for client in sockets), return_exceptions=True)
+
+    return {
+        'clients_requested': clients,
+        'clients_connected': connected,
+        'connect_failures': failures,
+        'connect': summarize(connect_times),
+        'data_update_latency': summarize(update_latencies),
+        'control_latency': summarize(control_latencies),
+    }
+
+
+def benchmark_mode(mode: str, port: int, args) -> Dict:
+    server = start_server(mode, port)
+    try:
+        result = asyncio.run(run_clients(f'http://127.0.0.1:{port}', args.clients,
+                                         args.duration, args.connect_batch))
+        result['server'] = process_stats(server.pid)
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='اختبار الحمل لأوضاع الخادم')
+    parser.add_argument('--modes', nargs='+', default=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=20.0, help='مدة القياس بعد اتصال العملاء بالثواني')
+    parser.add_argument('--connect-batch', type=int, default=100)
+    parser.add_argument('--port', type=int, default=5600)
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    results = {
+        'benchmark': 'load_modes',
+        'timestamp': datetime.now().isoformat(),
+        'clients': args.clients,
+        'duration': args.duration,
+        'modes': {}
+    }
+    for index, mode in enumerate(args.modes):
+        print(f"== {mode}", file=sys.stderr)
+        results['modes'][mode] = benchmark_mode(mode, args.port + index, args)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
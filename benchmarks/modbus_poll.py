@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+محاكي وحدات تحكم Modbus/TCP وقياس زمن الاستطلاع
+Modbus/TCP PLC Simulator and Polling Latency Benchmark
+
+يشغل محاكي وحدة تحكم لكل مجموعة مضخات (منفذ TCP محلي لكل وحدة، مع تأخير اختياري
+يحاكي زمن دورة وحدة التحكم)، ثم يقيس زمن دورة الاستطلاع الكاملة مع ازدياد عدد
+المضخات بالتوازي (مجموعة العمال) وبالتتابع (عامل واحد) للمقارنة.
+
+لتشغيل المحاكي وحده مع الخادم (يكتب ملف إعداد OIL_PUMP_MODBUS):
+    python benchmarks/modbus_poll.py --serve --pumps 6 --config /tmp/modbus.json
+    OIL_PUMP_MODBUS=/tmp/modbus.json python src/main.py
+
+القياس:
+    python benchmarks/modbus_poll.py --pumps 10 100 1000 --pumps-per-plc 20 --latency 5
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import struct
+import argparse
+import threading
+import socketserver
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from modbus_adapter import DEFAULT_REGISTERS, ConnectionPool, ModbusDevice, ModbusPoller
+
+# المسافة بين سجلات مضختين متتاليتين في وحدة التحكم
+STRIDE = 10
+
+_MBAP = struct.Struct('>HHHB')
+
+
+class PlcHandler(socketserver.BaseRequestHandler):
+    """معالجة طلبات قراءة السجلات (الوظيفتان 3 و4) على اتصال دائم"""
+
+    def handle(self):
+        sock = self.request
+        while True:
+            header = self._recv_exact(sock, 7)
+            if header is None:
+                return
+            transaction, protocol, length, unit = _MBAP.unpack(header)
+            body = self._recv_exact(sock, length - 1)
+            if body is None:
+                return
+            function, address, count = struct.unpack('>BHH', body[:5])
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            if function not in (3, 4) or address + count > len(self.server.registers):
+                pdu = struct.pack('>BB', function | 0x80, 2)
+            else:
+                values = self.server.registers[address:address + count]
+                pdu = struct.pack(f'>BB{count}H', function, 2 * count, *values)
+            sock.sendall(_MBAP.pack(transaction, protocol, len(pdu) + 1, unit) + pdu)
+
+    @staticmethod
+    def _recv_exact(sock, size: int):
+        data = b''
+        while len(data) < size:
+            try:
+                chunk = sock.recv(size - len(data))
+            except OSError:
+                return None
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+
+class PlcSimulator(socketserver.ThreadingTCPServer):
+    """وحدة تحكم محاكاة: سجلات قياسات صالحة لعدد من المضخات تتغير مع الوقت"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, pumps: int, latency: float, rng: random.Random):
+        super().__init__(('127.0.0.1', 0), PlcHandler)
+        self.latency = latency
+        self.registers = [0] * (pumps * STRIDE)
+        self.rng = rng
+        self.pumps = pumps
+        self.refresh()
+
+    def refresh(self):
+        """قيم جديدة ضمن الحدود (بمعاملات خريطة السجلات الافتراضية)"""
+        rng = self.rng
+        for pump in range(self.pumps):
+            base = pump * STRIDE
+            self.registers[base:base + 6] = [
+                rng.randint(450, 850), rng.randint(650, 950), rng.randint(1500, 3000),
+                rng.randint(50, 250), rng.randint(750, 950), rng.randint(850, 980),
+            ]
+            production = rng.randint(10000, 50000)
+            self.registers[base + 6:base + 8] = [production >> 16, production & 0xFFFF]
+
+
+def start_plcs(pumps: int, per_plc: int, latency: float, rng: random.Random) -> List[PlcSimulator]:
+    """تشغيل وحدات تحكم محاكاة تغطي عدد المضخات المطلوب"""
+    plcs = []
+    for first in range(0, pumps, per_plc):
+        plc = PlcSimulator(min(per_plc, pumps - first), latency, rng)
+        threading.Thread(target=plc.serve_forever, daemon=True).start()
+        plcs.append(plc)
+    return plcs
+
+
+def device_config(plcs: List[PlcSimulator]) -> List[Dict]:
+    """إعداد الوحدات: المضخات مرقمة تباعاً وإزاحة كل مضخة STRIDE"""
+    devices = []
+    pump_id = 1
+    for plc in plcs:
+        pumps = {}
+        for index in range(plc.pumps):
+            pumps[str(pump_id)] = index * STRIDE
+            pump_id += 1
+        devices.append({'host': '127.0.0.1', 'port': plc.server_address[1], 'unit': 1, 'pumps': pumps})
+    return devices
+
+
+def measure(plcs: List[PlcSimulator], workers: int, cycles: int) -> Dict:
+    """زمن دورات الاستطلاع الكاملة"""
+    pool = ConnectionPool(timeout=2.0, size=2)
+    devices = [
+        ModbusDevice(entry['host'], entry['port'], entry['unit'],
+                     {int(pump_id): offset for pump_id, offset in entry['pumps'].items()}, DEFAULT_REGISTERS)
+        for entry in device_config(plcs)
+    ]
+    received: List[int] = []
+    poller = ModbusPoller(devices, pool, lambda readings: received.append(len(readings)), workers=workers)
+
+    poller.poll_once()  # فتح الاتصالات
+    durations = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        poller.poll_once()
+        durations.append(time.perf_counter() - started)
+    stats = poller.stats()
+    poller.close()
+
+    durations.sort()
+    return {
+        'workers': workers,
+        'pumps_read': received[-1] if received else 0,
+        'requests_per_cycle': stats['requests_per_cycle'],
+        'connections': stats['counters']['connections'],
+        'errors': stats['counters']['errors'],
+        'p50_ms': round(durations[len(durations) // 2] * 1000, 2),
+        'max_ms': round(durations[-1] * 1000, 2),
+    }
+
+
+def serve(args, rng: random.Random):
+    """تشغيل المحاكي وحده وكتابة ملف الإعداد للخادم"""
+    plcs = start_plcs(args.pumps[0], args.pumps_per_plc, args.latency / 1000, rng)
+    config = {'interval': 1.0, 'timeout': 0.5, 'retries': 1, 'devices': device_config(plcs)}
+    with open(args.config, 'w') as handle:
+        json.dump(config, handle, indent=2)
+    print(f'{len(plcs)} وحدة تحكم محاكاة، ملف الإعداد: {args.config}')
+    while True:
+        time.sleep(1.0)
+        for plc in plcs:
+            plc.refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='محاكي Modbus/TCP وقياس زمن الاستطلاع')
+    parser.add_argument('--pumps', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--pumps-per-plc', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=5.0, help='زمن رد وحدة التحكم بالمللي ثانية')
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--serve', action='store_true', help='تشغيل المحاكي فقط')
+    parser.add_argument('--config', default='modbus.json', help='مسار ملف الإعداد في وضع --serve')
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.serve:
+        serve(args, rng)
+        return
+
+    runs = []
+    for pumps in args.pumps:
+        plcs = start_plcs(pumps, args.pumps_per_plc, args.latency / 1000, rng)
+        runs.append({
+            'pumps': pumps,
+            'plcs': len(plcs),
+            'concurrent': measure(plcs, args.workers, args.cycles),
+            'sequential': measure(plcs, 1, max(1, args.cycles // 5)),
+        })
+        for plc in plcs:
+            plc.shutdown()
+            plc.server_close()
+
+    results = {
+        'benchmark': 'modbus_poll',
+        'timestamp': datetime.now().isoformat(),
+        'latency_ms': args.latency,
+        'pumps_per_plc': args.pumps_per_plc,
+        'runs': runs,
+    }
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+اختبار العملاء البطيئين
+Slow WebSocket Consumers Benchmark
+
+يشغل الخادم داخل العملية نفسها بدورة مراقبة سريعة، ويفتح عملاء Socket.IO عاديين
+وعملاء WebSocket متوقفين عن القراءة (يحاكون أجهزة ميدانية على شبكة ضعيفة)، ثم:
+- يقيس زمن وصول إشعارات التحكم (pump_updated) للعملاء العاديين
+- يراقب عمق طوابير الإرسال وعدادات الدمج من /api/system/connections
+- يستأنف قراءة نصف العملاء المتوقفين ويتحقق من وصول رسالة لحاق واحدة مدمجة لهم
+
+بتمرير --disable تُعطل حدود الطوابير للمقارنة (ينمو طابور العميل المتوقف بلا حد).
+
+الاستخدام:
+    python benchmarks/slow_consumers.py --clients 20 --stalled 4 --duration 15 --tick 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+import requests
+import socketio
+import websocket
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """النسبة المئوية لقائمة قيم"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict:
+    """ملخص إحصائي بالمللي ثانية"""
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def free_port() -> int:
+    """منفذ محلي متاح"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(args, port: int):
+    """تشغيل الخادم (وضع threading) مع دورة مراقبة بالسرعة المطلوبة"""
+    os.chdir(tempfile.mkdtemp(prefix='oil-pump-slow-'))
+    os.environ['OIL_PUMP_DATA_DIR'] = ''
+    os.environ.pop('OIL_PUMP_MESSAGE_QUEUE', None)
+    if args.disable:
+        os.environ['OIL_PUMP_QUEUE_HIGH'] = os.environ['OIL_PUMP_QUEUE_MAX'] = str(10 ** 9)
+
+    import main
+    logging.getLogger('main').setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    main.OilPumpSystem.start_background_monitoring = lambda self: None
+    system = main.OilPumpSystem()
+
+    threading.Thread(target=system.run, kwargs={'host': '127.0.0.1', 'port': port}, daemon=True).start()
+
+    def monitor():
+        while True:
+            system.actor.call(system.monitoring_cycle)
+            time.sleep(args.tick)
+
+    threading.Thread(target=monitor, daemon=True).start()
+    return system
+
+
+def open_stalled(url: str) -> websocket.WebSocket:
+    """عميل WebSocket يتصل بفضاء الأسماء ثم يتوقف عن القراءة (مخزن استقبال صغير)"""
+    ws = websocket.create_connection(
+        f"{url.replace('http', 'ws')}/socket.io/?EIO=4&transport=websocket",
+        sockopt=((socket.SOL_SOCKET, socket.SO_RCVBUF, 4096),)
+    )
+    ws.recv()  # حزمة الفتح
+    ws.send('40')
+    return ws
+
+
+def drain(ws: websocket.WebSocket, counts: Dict[str, int], stop: threading.Event):
+    """استئناف القراءة: عد رسائل data_update والرد على ping"""
+    ws.settimeout(0.5)
+    while not stop.is_set():
+        try:
+            message = ws.recv()
+        except websocket.WebSocketTimeoutException:
+            continue
+        except Exception:
+            return
+        if message == '2':
+            ws.send('3')
+        elif isinstance(message, str) and message.startswith('42["data_update"'):
+            counts['data_update'] += 1
+            counts['catch_up_type'] = json.loads(message[2:])[1].get('type')
+
+
+def run(args) -> Dict:
+    port = free_port()
+    url = f'http://127.0.0.1:{port}'
+    system = start_server(args, port)
+    time.sleep(1.0)
+
+    latencies: List[float] = []
+    sent: Dict[str, float] = {}
+    lock = threading.Lock()
+    clients = []
+    for index in range(args.clients):
+        client = socketio.Client(reconnection=False)
+
+        @client.on('pump_updated')
+        def on_pump_updated(data):
+            started = sent.get(data.get('user'))
+            if started is not None:
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        client.connect(url, transports=['websocket'])
+        clients.append(client)
+
+    stalled = [open_stalled(url) for _ in range(args.stalled)]
+
+    # إجراءات تحكم دورية: الإشعار يجب أن يصل للعملاء العاديين بسرعة رغم العملاء المتوقفين
+    samples = []
+    deadline = time.time() + args.duration
+    counter = 0
+    http = requests.Session()
+    while time.time() < deadline:
+        counter += 1
+        action = 'stop' if counter % 2 else 'start'
+        # اسم المستخدم فريد لكل طلب ويعود في الإشعار لربطه بوقت الإرسال
+        user_id = f'bench-{counter}'
+        sent[user_id] = time.perf_counter()
+        http.post(f'{url}/api/pumps/1/control', json={'action': action, 'user_id': user_id})
+        stats = http.get(f'{url}/api/system/connections').json()
+        samples.append(stats['queue_depth']['max'])
+        time.sleep(0.25)
+
+    # استئناف قراءة نصف العملاء المتوقفين ثم انتظار رسالة اللحاق
+    stop = threading.Event()
+    resumed = [{'data_update': 0, 'catch_up_type': None} for _ in stalled[:max(1, len(stalled) // 2)]]
+    for ws, counts in zip(stalled, resumed):
+        threading.Thread(target=drain, args=(ws, counts, stop), daemon=True).start()
+    time.sleep(args.catch_up)
+    final = http.get(f'{url}/api/system/connections').json()
+    stop.set()
+
+    for client in clients:
+        client.disconnect()
+
+    return {
+        'benchmark': 'slow_consumers',
+        'timestamp': datetime.now().isoformat(),
+        'flow_control': not args.disable,
+        'clients': args.clients,
+        'stalled': args.stalled,
+        'duration': args.duration,
+        'tick': args.tick,
+        'notify_latency': summarize(latencies),
+        'queue_depth_max': max(samples) if samples else 0,
+        'queue_depth_samples': samples[-10:],
+        'resumed_clients': resumed,
+        'connections': final,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='اختبار العملاء البطيئين')
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--stalled', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=15.0, help='مدة الاختبار بالثواني')
+    parser.add_argument('--tick', type=float, default=0.02, help='الفاصل بين دورات المراقبة بالثواني')
+    parser.add_argument('--catch-up', type=float, default=3.0, help='مهلة انتظار رسائل اللحاق بالثواني')
+    parser.add_argument('--disable', action='store_true', help='تعطيل حدود الطوابير للمقارنة')
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    results = run(args)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
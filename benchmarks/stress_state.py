@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+اختبار إجهاد مالك الحالة
+State Actor Stress Test
+
+يشغل النظام داخل العملية نفسها ويضرب نقاط التحكم (مضخة واحدة، إيقاف طوارئ
+للجميع، الوضع التلقائي، تأكيد التنبيهات) من عدة خيوط بالتوازي مع دورة مراقبة
+سريعة وقراء متزامنين، ثم يتحقق من:
+- عدم وجود أي استجابة 500 أو استثناء في المعالجين
+- تطابق اللقطة المنشورة مع الحالة الفعلية بعد تفريغ طابور الأوامر
+- تطابق آخر حالة مسجلة في متتبع الفروقات مع اللقطة
+- تطابق مجاميع الأسطول التراكمية مع إعادة حسابها من الصفر
+- اتساق حقول الطوارئ، وتفرد معرفات سجل النشاط وتصاعدها
+
+الاستخدام:
+    python benchmarks/stress_state.py --writers 16 --readers 8 --duration 20 --tick 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+ACTIONS = ('start', 'stop', 'emergency_stop', 'standby', 'auto', 'reset_emergency', 'maintenance')
+READ_PATHS = ('/api/pumps', '/api/pumps/{pump_id}', '/api/system/stats', '/api/system/alerts', '/api/activity')
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """النسبة المئوية لقائمة قيم"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict:
+    """ملخص إحصائي بالمللي ثانية"""
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def create_system():
+    """إنشاء النظام دون المراقبة الخلفية الدورية (يتحكم الاختبار في سرعة الدورات)"""
+    os.chdir(tempfile.mkdtemp(prefix='oil-pump-stress-'))
+    os.environ['OIL_PUMP_DATA_DIR'] = ''
+    os.environ.pop('OIL_PUMP_MESSAGE_QUEUE', None)
+
+    import main
+    logging.getLogger('main').setLevel(logging.WARNING)
+    main.OilPumpSystem.start_background_monitoring = lambda self: None
+    return main.OilPumpSystem()
+
+
+def run(args) -> Dict:
+    system = create_system()
+    pump_ids = list(system.snapshot.pumps)
+    deadline = time.time() + args.duration
+    lock = threading.Lock()
+    latencies: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    errors: List[str] = []
+    ticks = 0
+
+    def record(kind: str, started: float, status: int):
+        with lock:
+            latencies.setdefault(kind, []).append(time.perf_counter() - started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status >= 500:
+                errors.append(f"{kind}: {status}")
+
+    def monitor():
+        nonlocal ticks
+        while time.time() < deadline:
+            try:
+                system.actor.call(system.monitoring_cycle)
+                ticks += 1
+            except Exception as e:
+                with lock:
+                    errors.append(f"monitor: {e}")
+            time.sleep(args.tick)
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        client = system.app.test_client()
+        while time.time() < deadline:
+            roll = rng.random()
+            started = time.perf_counter()
+            if roll < 0.90:
+                response = client.post(f'/api/pumps/{rng.choice(pump_ids)}/control',
+                                       json={'action': rng.choice(ACTIONS), 'user_id': f'writer-{seed}'})
+                record('control', started, response.status_code)
+            elif roll < 0.94:
+                response = client.post('/api/emergency/all', json={'user_id': f'writer-{seed}'})
+                record('emergency_all', started, response.status_code)
+            elif roll < 0.97:
+                response = client.post('/api/auto/all', json={'user_id': f'writer-{seed}'})
+                record('auto_all', started, response.status_code)
+            else:
+                alerts = [alert['id'] for pump in system.snapshot.pumps.values() for alert in pump['alerts']]
+                if alerts:
+                    response = client.post(f'/api/alerts/{rng.choice(alerts)}/acknowledge',
+                                           json={'user_id': f'writer-{seed}'})
+                    record('acknowledge', started, response.status_code)
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        client = system.app.test_client()
+        while time.time() < deadline:
+            path = rng.choice(READ_PATHS).format(pump_id=rng.choice(pump_ids))
+            started = time.perf_counter()
+            response = client.get(path)
+            record('read', started, response.status_code)
+
+    threads = [threading.Thread(target=monitor)]
+    threads += [threading.Thread(target=writer, args=(seed,)) for seed in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(1000 + seed,)) for seed in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # دورة أخيرة بعد تفريغ الطابور ثم التحقق من الثوابت داخل مالك الحالة
+    system.actor.call(system.monitoring_cycle)
+
+    def check() -> List[str]:
+        violations = []
+        actual = system.pumps_view()
+        if json.dumps(actual, sort_keys=True) != json.dumps(system.snapshot.pumps, sort_keys=True):
+            violations.append('اللقطة المنشورة لا تطابق الحالة الفعلية')
+
+        committed = system.delta_tracker.changes_since(0)
+        for pump_id, pump in system.snapshot.pumps.items():
+            if json.dumps(committed.get(pump_id), sort_keys=True) != json.dumps(pump, sort_keys=True):
+                violations.append(f'متتبع الفروقات لا يطابق اللقطة للمضخة {pump_id}')
+            if pump['status'] == 'emergency_stop' and not pump['emergency_stop']:
+                violations.append(f'حالة طوارئ دون علم الطوارئ للمضخة {pump_id}')
+
+        # المجاميع التراكمية يجب أن تطابق إعادة حسابها من الصفر
+        from fleet_stats import FleetAggregates
+        fresh = FleetAggregates()
+        for pump in actual.values():
+            fresh.add_pump(pump['status'], pump['alerts'], pump['metrics']['efficiency'], pump['production_today'])
+        if fresh.summary() != system.aggregates.summary() or \
+                fresh.severity_counts != {k: v for k, v in system.aggregates.severity_counts.items() if v} or \
+                abs(fresh.running_efficiency_sum - system.aggregates.running_efficiency_sum) > 1e-6:
+            violations.append('مجاميع الأسطول لا تطابق إعادة الحساب الكامل')
+
+        ids = [activity['id'] for activity in system.activity_log]
+        if ids != sorted(set(ids)):
+            violations.append('معرفات سجل النشاط مكررة أو غير مرتبة')
+        return violations
+
+    violations = system.actor.call(check)
+
+    return {
+        'benchmark': 'stress_state',
+        'timestamp': datetime.now().isoformat(),
+        'writers': args.writers,
+        'readers': args.readers,
+        'duration': args.duration,
+        'monitor_ticks': ticks,
+        'commands_processed': system.actor.processed,
+        'snapshot_revision': system.snapshot.revision,
+        'status_codes': statuses,
+        'latency': {kind: summarize(values) for kind, values in sorted(latencies.items())},
+        'errors': errors[:20],
+        'error_count': len(errors),
+        'violations': violations,
+        'passed': not errors and not violations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='اختبار إجهاد مالك الحالة')
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='مدة الاختبار بالثواني')
+    parser.add_argument('--tick', type=float, default=0.05, help='الفاصل بين دورات المراقبة بالثواني')
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    results = run(args)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+    sys.exit(0 if results['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+مجموعة قياس المسارات الحرجة في الخادم
+Server Hot-Path Benchmark Suite
+
+قياس قابل للتكرار (أسطول محاكاة ببذرة ثابتة) للمسارات التي تحدد سعة الخادم:
+- داخل العملية لكل حجم أسطول: update_pump_metrics، check_pump_alerts،
+  update_system_health، دورة المراقبة كاملة، تحويل /api/pumps إلى JSON (بدون
+  ومع الذاكرة المؤقتة)، وزمن طلب التحكم POST /api/pumps/<id>/control
+- توزيع البث عبر Socket.IO: الخادم في عملية مستقلة وعدد من العملاء، ويُقاس زمن وصول
+  كل تحديث data_update لأول عميل ولآخر عميل
+
+تُحفظ النتائج بصيغة JSON باسم الإيداع الحالي في benchmarks/results/، ومقارنتها
+بنتائج إيداع سابق تعرض نسبة التغير لكل مقياس وتنتهي برمز خروج 1 عند وجود تراجع
+يتجاوز الحد المسموح.
+
+الاستخدام:
+    python benchmarks/suite.py
+    python benchmarks/suite.py --pumps 10 1000 --clients 1 100 --compare benchmarks/results/abc1234.json
+    python benchmarks/suite.py --skip-fanout --repeat-time 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import platform
+import tempfile
+import argparse
+import subprocess
+import multiprocessing
+from datetime import datetime
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """النسبة المئوية لقائمة قيم"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: List[float]) -> Dict:
+    """ملخص إحصائي بالمللي ثانية"""
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 4) if values else 0.0,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 4),
+        'max_ms': round(max(values) * 1000, 4) if values else 0.0,
+    }
+
+
+def repeat(work: Callable[[], None], budget: float, minimum: int = 5) -> List[float]:
+    """تكرار العمل حتى انتهاء الميزانية الزمنية (ومرات لا تقل عن الحد الأدنى)"""
+    durations = []
+    deadline = time.perf_counter() + budget
+    while len(durations) < minimum or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        work()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def git_revision() -> Dict:
+    """الإيداع الحالي وهل في الشجرة تعديلات غير مودعة"""
+    def git(*args) -> str:
+        try:
+            return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD') or 'unknown',
+        'dirty': bool(git('status', '--porcelain', '--', 'src', 'benchmarks')),
+    }
+
+
+def build_system(pumps: int, seed: int):
+    """نظام داخل العملية بأسطول محاكاة دون مراقبة خلفية أو تخزين دائم"""
+    os.environ.update(OIL_PUMP_DATA_DIR='', OIL_PUMP_SIM_PUMPS=str(pumps), OIL_PUMP_SIM_SEED=str(seed))
+    os.environ.pop('OIL_PUMP_MESSAGE_QUEUE', None)
+    os.environ.pop('OIL_PUMP_SIM_FAULTS', None)
+    import main
+    logging.getLogger('main').setLevel(logging.ERROR)
+    main.OilPumpSystem.start_background_monitoring = lambda self: None
+    return main.OilPumpSystem()
+
+
+def bench_hot_paths(pumps: int, args) -> Dict:
+    """المسارات الحرجة داخل العملية لأسطول بالحجم المطلوب"""
+    system = build_system(pumps, args.seed)
+    budget = args.repeat_time
+
+    def in_actor(work: Callable[[], None]) -> Dict:
+        # القياس كاملاً داخل مالك الحالة كما تُنفذ الدورة الحقيقية (دون زمن انتظار الطابور)
+        return summarize(system.actor.call(lambda: repeat(work, budget)))
+
+    def statuses() -> List[str]:
+        return [system.pumps_data[pump_id]['status'] for pump_id in system.telemetry.pump_ids]
+
+    results = {
+        'update_pump_metrics': in_actor(system.update_pump_metrics),
+        'check_pump_alerts': in_actor(lambda: system.check_pump_alerts(statuses())),
+        'update_system_health': in_actor(system.update_system_health),
+        'monitoring_cycle': in_actor(system.monitoring_cycle),
+    }
+
+    client = system.app.test_client()
+
+    def get_pumps():
+        response = client.get('/api/pumps')
+        assert response.status_code == 200, response.status_code
+
+    def get_pumps_cold():
+        # لقطة جديدة قبل كل طلب: التحويل إلى JSON دون الذاكرة المؤقتة
+        system.actor.call(system.publish_snapshot)
+        started = time.perf_counter()
+        get_pumps()
+        return time.perf_counter() - started
+
+    cold = []
+    deadline = time.perf_counter() + budget
+    while len(cold) < 5 or time.perf_counter() < deadline:
+        cold.append(get_pumps_cold())
+    results['api_pumps_json'] = summarize(cold)
+    results['api_pumps_cached'] = summarize(repeat(get_pumps, budget))
+    results['api_pumps_bytes'] = len(client.get('/api/pumps').get_data())
+
+    toggle = {'action': 'stop'}
+
+    def control():
+        response = client.post('/api/pumps/1/control', json={'action': toggle['action'], 'user_id': 'benchmark'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        toggle['action'] = 'start' if toggle['action'] == 'stop' else 'stop'
+
+    results['control_pump'] = summarize(repeat(control, budget))
+    return results
+
+
+def free_port() -> int:
+    """منفذ محلي متاح"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as probe:
+            if probe.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"الخادم لم يبدأ على المنفذ {port}")
+
+
+async def fanout_clients(url: str, clients: int, duration: float, go) -> Dict:
+    """عملاء الأسطول كاملاً في عملية واحدة: أوقات وصول كل إصدار من التحديثات"""
+    import socketio
+
+    arrivals: Dict[int, List[float]] = {}
+    sent: Dict[int, float] = {}
+    sizes: List[int] = []
+    sockets = []
+    failures = 0
+    measuring = False
+
+    async def connect_one():
+        nonlocal failures
+        client = socketio.AsyncClient(reconnection=False)
+
+        @client.on('data_update')
+        async def on_data_update(data):
+            if not measuring:
+                return
+            now = time.time()
+            version = data['version']
+            if version not in sent:
+                sent[version] = datetime.fromisoformat(data['timestamp']).timestamp()
+                sizes.append(len(json.dumps(data, ensure_ascii=False).encode()))
+            arrivals.setdefault(version, []).append(now)
+
+        try:
+            await client.connect(url, transports=['websocket'], wait_timeout=60)
+            sockets.append(client)
+        except Exception:
+            failures += 1
+
+    for offset in range(0, clients, 100):
+        await asyncio.gather(*(connect_one() for _ in range(min(100, clients - offset))))
+
+    # بدء القياس في جميع عمليات العملاء معاً بعد اتصالها كلها
+    go['ready'].put(len(sockets))
+    while not go['start'].is_set():
+        await asyncio.sleep(0.05)
+    measuring = True
+    await asyncio.sleep(duration)
+    measuring = False
+    await asyncio.gather(*(asyncio.wait_for(client.disconnect(), 10) for client in sockets), return_exceptions=True)
+
+    return {'connected': len(sockets), 'failures': failures, 'arrivals': arrivals, 'sent': sent, 'sizes': sizes}
+
+
+def fanout_worker(url: str, clients: int, duration: float, go, results):
+    """عملية عملاء (توزيع تحليل الرسائل على أكثر من نواة حتى لا يكون العميل هو عنق الزجاجة)"""
+    logging.disable(logging.CRITICAL)
+    results.put(asyncio.run(fanout_clients(url, clients, duration, go)))
+
+
+def run_fanout(url: str, clients: int, args) -> Dict:
+    """عملاء البث موزعين على عدة عمليات: زمن وصول كل تحديث لأول وآخر عميل"""
+    processes = max(1, min(args.client_processes, clients))
+    # spawn: عمليات نظيفة لا ترث خيوط الأنظمة المقاسة داخل العملية
+    context = multiprocessing.get_context('spawn')
+    go = {'ready': context.Queue(), 'start': context.Event()}
+    results = context.Queue()
+    workers = [
+        context.Process(target=fanout_worker, daemon=True,
+                                args=(url, clients // processes + (index < clients % processes),
+                                      args.fanout_time, go, results))
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        go['ready'].get(timeout=600)
+    go['start'].set()
+    parts = [results.get(timeout=args.fanout_time + 600) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=10)
+
+    connected = sum(part['connected'] for part in parts)
+    arrivals: Dict[int, List[float]] = {}
+    sent: Dict[int, float] = {}
+    sizes: List[int] = []
+    for part in parts:
+        for version, times in part['arrivals'].items():
+            arrivals.setdefault(version, []).extend(times)
+        sent.update(part['sent'])
+        sizes.extend(part['sizes'])
+
+    first, last, delivered = [], [], []
+    for version, times in arrivals.items():
+        first.append(min(times) - sent[version])
+        last.append(max(times) - sent[version])
+        delivered.append(len(times) / max(1, connected))
+    return {
+        'connected': connected,
+        'connect_failures': sum(part['failures'] for part in parts),
+        'client_processes': processes,
+        'updates': len(arrivals),
+        'delivered_ratio': round(sum(delivered) / len(delivered), 4) if delivered else 0.0,
+        'update_bytes_p50': int(percentile(sizes, 0.5)),
+        'first_client': summarize(first),
+        'last_client': summarize(last),
+    }
+
+
+def process_stats(pid: int) -> Dict:
+    """ذاكرة وخيوط عملية الخادم (Linux)"""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    stats['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith('Threads:'):
+                    stats['threads'] = int(line.split()[1])
+    except OSError:
+        pass
+    return stats
+
+
+def bench_fanout(pumps: int, clients: int, args) -> Dict:
+    """بث التحديثات من خادم في عملية مستقلة إلى عدد من العملاء"""
+    port = free_port()
+    env = dict(os.environ,
+               OIL_PUMP_ASYNC_MODE=args.mode,
+               OIL_PUMP_PORT=str(port),
+               OIL_PUMP_HOST='127.0.0.1',
+               OIL_PUMP_DATA_DIR='',
+               OIL_PUMP_TICK=str(args.tick),
+               OIL_PUMP_SIM_PUMPS=str(pumps),
+               OIL_PUMP_SIM_SEED=str(args.seed))
+    env.pop('OIL_PUMP_SIM_FAULTS', None)
+    env.pop('OIL_PUMP_MESSAGE_QUEUE', None)
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'src', 'main.py')],
+                              cwd=tempfile.mkdtemp(prefix='oil-pump-suite-'), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        result = run_fanout(f'http://127.0.0.1:{port}', clients, args)
+        result['server'] = process_stats(server.pid)
+        if server.poll() is not None:
+            # توقف الخادم أثناء القياس (مثل نفاد الذاكرة): النتيجة غير صالحة للمقارنة
+            result['server_exit'] = server.returncode
+        return result
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}', 'server_exit': server.poll()}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    """مقاييس الزمن (p50) في النتائج بمسارات مسطحة للمقارنة"""
+    flat = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            if 'p50_ms' in value:
+                flat[path] = value['p50_ms']
+            else:
+                flat.update(flatten(value, f'{path}.'))
+    return flat
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """نسبة التغير لكل مقياس مشترك بين النتيجتين (أكبر من 1 = أبطأ)"""
+    now = flatten(current['results'])
+    before = flatten(baseline['results'])
+    rows = []
+    for path in sorted(now.keys() & before.keys()):
+        if before[path] <= 0:
+            continue
+        ratio = now[path] / before[path]
+        rows.append({'metric': path, 'baseline_ms': before[path], 'current_ms': now[path],
+                     'ratio': round(ratio, 3), 'regression': ratio > 1 + threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='مجموعة قياس المسارات الحرجة في الخادم')
+    parser.add_argument('--pumps', type=int, nargs='+', default=[10, 1000, 10000], help='أحجام الأسطول')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 100, 1000], help='أعداد عملاء البث')
+    parser.add_argument('--repeat-time', type=float, default=1.0, help='ميزانية كل قياس داخل العملية بالثواني')
+    parser.add_argument('--fanout-time', type=float, default=10.0, help='مدة كل قياس بث بالثواني')
+    parser.add_argument('--tick', type=float, default=1.0, help='فترة دورة المراقبة في قياس البث')
+    parser.add_argument('--mode', default='threading', help='وضع خادم البث (threading / eventlet / gevent)')
+    parser.add_argument('--client-processes', type=int, default=os.cpu_count() or 1,
+                        help='عدد عمليات عملاء البث')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skip-fanout', action='store_true', help='القياس داخل العملية فقط')
+    parser.add_argument('--output', help='مسار ملف النتائج (الافتراضي: benchmarks/results/<الإيداع>.json)')
+    parser.add_argument('--compare', help='ملف نتائج سابق للمقارنة')
+    parser.add_argument('--threshold', type=float, default=0.2, help='نسبة التباطؤ المعتبرة تراجعاً')
+    args = parser.parse_args()
+
+    revision = git_revision()
+    output = os.path.abspath(args.output or os.path.join(
+        RESULTS_DIR, f"{revision['commit']}{'-dirty' if revision['dirty'] else ''}.json"))
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    os.chdir(tempfile.mkdtemp(prefix='oil-pump-suite-'))
+
+    results: Dict = {'hot_paths': {}, 'fanout': {}}
+    for pumps in args.pumps:
+        print(f"== {pumps} مضخة", file=sys.stderr)
+        results['hot_paths'][str(pumps)] = bench_hot_paths(pumps, args)
+    if not args.skip_fanout:
+        for pumps in args.pumps:
+            for clients in args.clients:
+                print(f"== بث {pumps} مضخة إلى {clients} عميل", file=sys.stderr)
+                results['fanout'][f'{pumps}x{clients}'] = bench_fanout(pumps, clients, args)
+
+    report = {
+        'benchmark': 'suite',
+        'timestamp': datetime.now().isoformat(),
+        **revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as handle:
+        json.dump(report, handle, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"تم حفظ النتائج في {output}", file=sys.stderr)
+
+    if baseline_path:
+        with open(baseline_path) as handle:
+            baseline = json.load(handle)
+        rows = compare(report, baseline, args.threshold)
+        print(f"\nالمقارنة مع {baseline.get('commit', baseline_path)} (p50):", file=sys.stderr)
+        for row in rows:
+            flag = '  تراجع' if row['regression'] else ''
+            print(f"{row['metric']:<50} {row['baseline_ms']:>12.4f} {row['current_ms']:>12.4f} "
+                  f"x{row['ratio']:<7}{flag}", file=sys.stderr)
+        if any(row['regression'] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+قياس صيغة النقل الثنائية مقابل JSON
+Binary Wire Format vs JSON Benchmark
+
+يبني أسطولاً افتراضياً بالحجم المطلوب في المخزن العمودي ومتتبع الفروقات، ويقيس
+لكل دورة حجم رسالة تحديث البيانات وزمن بنائها وتسلسلها بالصيغتين:
+- JSON: فروقات جميع الحقول المتغيرة (كما تُرسل لعملاء JSON)
+- ثنائية: إطار القياسات مع فروقات الحقول الأخرى بصيغة JSON
+
+الاستخدام:
+    python benchmarks/wire_format.py --pumps 1000 --ticks 50
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from delta_sync import DeltaTracker
+from telemetry_store import TelemetryStore
+from wire_format import encode_frame, frame_slots
+
+
+def build_fleet(count: int, rng: random.Random):
+    """أسطول افتراضي: سجلات المضخات ومخزن القياسات"""
+    telemetry = TelemetryStore(rng)
+    records = {}
+    for pump_id in range(1, count + 1):
+        records[pump_id] = {
+            'id': pump_id,
+            'name': f'مضخة النفط {pump_id}',
+            'location': f'المنطقة {pump_id % 6}',
+            'status': 'running' if rng.random() < 0.7 else 'stopped',
+            'auto_mode': True,
+            'emergency_stop': False,
+            'alerts': [],
+            'updated_at': datetime.now().isoformat(),
+        }
+        telemetry.add_pump(pump_id, {
+            'pressure': round(rng.uniform(45, 85), 1),
+            'temperature': round(rng.uniform(65, 95), 1),
+            'flow_rate': round(rng.uniform(150, 300), 1),
+            'vibration': round(rng.uniform(0.5, 2.5), 2),
+            'power': round(rng.uniform(75, 95), 1),
+            'efficiency': round(rng.uniform(85, 98), 1),
+        }, production=round(rng.uniform(1000, 5000), 1))
+    return telemetry, records
+
+
+def view(telemetry: TelemetryStore, records: Dict[int, Dict]) -> Dict[int, Dict]:
+    """بيانات المضخات بالشكل الكامل (كما يبنيها الخادم قبل تسجيل الفروقات)"""
+    pumps = {}
+    for pump_id, record in records.items():
+        pump = dict(record)
+        pump['metrics'] = telemetry.metrics_dict(pump_id)
+        pump['production_today'] = telemetry.production_of(pump_id)
+        pumps[pump_id] = pump
+    return pumps
+
+
+def encode_json(tracker: DeltaTracker, since: int) -> bytes:
+    """رسالة فروقات JSON"""
+    return json.dumps({'type': 'delta', 'version': tracker.version, 'base_version': since,
+                       'changes': tracker.changes_since(since)}).encode()
+
+
+def encode_binary(tracker: DeltaTracker, telemetry: TelemetryStore, since: int) -> int:
+    """رسالة إطار ثنائي (يرجع الحجم الكلي: جزء JSON + الإطار)"""
+    changes = tracker.changes_since(since, exclude=('metrics', 'production_today'))
+    updated = {}
+    for pump_id in list(changes):
+        fields = changes[pump_id]
+        stamp = fields.pop('updated_at', None)
+        if stamp is not None:
+            updated[pump_id] = stamp
+        if not fields:
+            del changes[pump_id]
+    frame, stamps, _ = encode_frame(telemetry, frame_slots(telemetry, None), updated)
+    header = json.dumps({'type': 'frame', 'version': tracker.version, 'base_version': since,
+                         'changes': changes, 'stamps': stamps}).encode()
+    return len(header) + len(frame)
+
+
+def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    telemetry, records = build_fleet(args.pumps, rng)
+    tracker = DeltaTracker()
+    tracker.commit(view(telemetry, records))
+
+    json_bytes: List[int] = []
+    binary_bytes: List[int] = []
+    json_times: List[float] = []
+    binary_times: List[float] = []
+    now = datetime.now()
+
+    for tick in range(args.ticks):
+        # خطوة دورة مراقبة: قياسات جديدة ووقت تحديث وتغير حالة نادر
+        statuses = [records[pump_id]['status'] for pump_id in telemetry.pump_ids]
+        telemetry.step(statuses)
+        stamp = (now + timedelta(seconds=5 * tick)).isoformat()
+        for record in records.values():
+            record['updated_at'] = stamp
+        if rng.random() < 0.5:
+            record = records[rng.choice(telemetry.pump_ids)]
+            record['status'] = 'stopped' if record['status'] == 'running' else 'running'
+        since = tracker.version
+        tracker.commit(view(telemetry, records))
+
+        started = time.perf_counter()
+        json_bytes.append(len(encode_json(tracker, since)))
+        json_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        binary_bytes.append(encode_binary(tracker, telemetry, since))
+        binary_times.append(time.perf_counter() - started)
+
+    def mean(values):
+        return sum(values) / len(values) if values else 0.0
+
+    return {
+        'benchmark': 'wire_format',
+        'timestamp': datetime.now().isoformat(),
+        'pumps': args.pumps,
+        'ticks': args.ticks,
+        'json': {'bytes_per_tick': round(mean(json_bytes)), 'encode_ms': round(mean(json_times) * 1000, 3)},
+        'binary': {'bytes_per_tick': round(mean(binary_bytes)), 'encode_ms': round(mean(binary_times) * 1000, 3)},
+        'bytes_ratio': round(mean(json_bytes) / mean(binary_bytes), 2),
+        'encode_ratio': round(mean(json_times) / mean(binary_times), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='قياس صيغة النقل الثنائية مقابل JSON')
+    parser.add_argument('--pumps', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    results = run(args)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
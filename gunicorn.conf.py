@@ -0,0 +1,47 @@
+"""
+إعدادات gunicorn لتشغيل نظام مراقبة مضخات النفط في الإنتاج
+Gunicorn configuration for production serving
+
+    OIL_PUMP_ASYNC_MODE=gevent gunicorn -c gunicorn.conf.py wsgi:app
+
+يدعم هذا الملف وضع gevent فقط: إصدارات gunicorn الحديثة أزالت عامل eventlet،
+فلوضع eventlet يُستخدم خادم eventlet.wsgi المدمج (python src/main.py).
+
+المتغيرات:
+    OIL_PUMP_ASYNC_MODE          gevent (الافتراضي)
+    OIL_PUMP_HOST / OIL_PUMP_PORT
+    OIL_PUMP_WORKERS             عدد العمليات (أكثر من 1 يتطلب OIL_PUMP_MESSAGE_QUEUE، وجلسات لاصقة
+                                 من موزع حمل أمام gunicorn لأن gunicorn لا يوفرها)
+    OIL_PUMP_WORKER_CONNECTIONS  الحد الأقصى للاتصالات المتزامنة لكل عامل
+    OIL_PUMP_KEEPALIVE           مهلة إبقاء اتصال HTTP مفتوحاً بالثواني
+"""
+
+import os
+
+_mode = os.environ.setdefault('OIL_PUMP_ASYNC_MODE', 'gevent')
+
+if _mode != 'gevent':
+    raise RuntimeError(
+        f"OIL_PUMP_ASYNC_MODE={_mode} غير مدعوم مع gunicorn (gevent فقط). "
+        f"لوضع eventlet أو threading شغّل الخادم المدمج: "
+        f"OIL_PUMP_ASYNC_MODE={_mode} python src/main.py"
+    )
+
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+bind = f"{os.environ.get('OIL_PUMP_HOST', '0.0.0.0')}:{os.environ.get('OIL_PUMP_PORT', '5000')}"
+
+worker_class = 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker'
+
+workers = int(os.environ.get('OIL_PUMP_WORKERS', 1))
+if workers > 1 and not os.environ.get('OIL_PUMP_MESSAGE_QUEUE'):
+    # بلا ناقل رسائل تعد كل عملية نفسها القائدة: مراقبة مكررة وكتابة متزامنة في مجلد التخزين نفسه
+    raise RuntimeError(
+        f"OIL_PUMP_WORKERS={workers} يتطلب OIL_PUMP_MESSAGE_QUEUE (مثل unix:///tmp/oil-pump.sock "
+        f"أو redis://...) لتنسيق العمليات، أو شغّل عاملاً واحداً"
+    )
+worker_connections = int(os.environ.get('OIL_PUMP_WORKER_CONNECTIONS', 5000))
+keepalive = int(os.environ.get('OIL_PUMP_KEEPALIVE', 5))
+
+# اتصالات WebSocket طويلة العمر: المهلة تخص نبض العامل وليس مدة الطلب
+timeout = 60
+graceful_timeout = 30
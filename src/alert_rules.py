@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+محرك قواعد التنبيهات
+Batched Alert Rule Engine
+
+يقيّم جميع حدود التنبيه لجميع المضخات في مرور واحد على أعمدة المخزن العمودي،
+مع قوالب تنبيه مجهزة مسبقاً ومشتركة، ولا ينشئ كائنات التنبيه إلا عند تغير
+الحالة (ظهور التنبيه أو زواله).
+
+دورة حياة التنبيه: raised → acknowledged → cleared، مع نطاق خامد (deadband) لكل
+حد يمنع التذبذب حول قيمة الحد، وحد أدنى لمدة بقاء التنبيه قبل زواله.
+"""
+
+import time
+import operator
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Callable
+
+
+class AlertRule:
+    """
+    قاعدة تنبيه واحدة مرتبطة بمقياس وحد من حدود المضخة
+    Single threshold rule with a precompiled alert template
+    """
+
+    def __init__(self, alert_type: str, severity: str, metric: str, threshold: str,
+                 compare: Callable[[float, float], bool], running_only: bool,
+                 message: str, description: str, cause: str, recommendations: Tuple[str, ...],
+                 deadband: float = 0.0, min_hold: float = 15.0):
+        self.type = alert_type
+        self.severity = severity
+        self.metric = metric
+        self.threshold = threshold
+        self.compare = compare
+        self.running_only = running_only
+        self.message = message
+        self.description = description
+        self.cause = cause
+        self.image = f'/static/images/{alert_type}.png'
+        self.recommendations = list(recommendations)
+        self.deadband = deadband
+        self.min_hold = min_hold
+
+    def clears(self, value: float, limit: float) -> bool:
+        """هل عادت القيمة إلى ما بعد النطاق الخامد للحد"""
+        if self.compare is operator.gt:
+            return value <= limit - self.deadband
+        return value >= limit + self.deadband
+
+    def materialize(self, pump_id: int, pump_name: str, value: float, limit: float) -> Dict:
+        """إنشاء كائن التنبيه عند ظهوره"""
+        return {
+            'id': f"{self.type}_{pump_id}",
+            'type': self.type,
+            'severity': self.severity,
+            'message': self.message.format(name=pump_name),
+            'description': self.description.format(value=value, limit=limit),
+            'cause': self.cause,
+            'image': self.image,
+            'recommendations': self.recommendations,
+            'state': 'raised',
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+# قواعد التنبيه بنفس ترتيب الفحص السابق
+ALERT_RULES = (
+    AlertRule(
+        'pressure_low', 'warning', 'pressure', 'pressure_min', operator.lt, False,
+        "انخفاض الضغط في {name}",
+        "الضغط الحالي {value} بار أقل من الحد الأدنى {limit} بار",
+        'نقص في السائل أو انسداد في الأنابيب',
+        ('فحص مستوى السائل في الخزان',
+         'التأكد من عدم وجود انسداد في الأنابيب',
+         'فحص صمامات النظام'),
+        deadband=2.0
+    ),
+    AlertRule(
+        'pressure_high', 'critical', 'pressure', 'pressure_max', operator.gt, False,
+        "ارتفاع الضغط في {name}",
+        "الضغط الحالي {value} بار أعلى من الحد الأقصى {limit} بار",
+        'انسداد في خط التصريف أو عطل في صمام الأمان',
+        ('إيقاف المضخة فوراً',
+         'فحص صمام الأمان',
+         'التأكد من عدم انسداد خط التصريف'),
+        deadband=2.0
+    ),
+    AlertRule(
+        'temperature_high', 'critical', 'temperature', 'temperature_max', operator.gt, False,
+        "ارتفاع درجة الحرارة في {name}",
+        "درجة الحرارة الحالية {value}°م أعلى من الحد الأقصى {limit}°م",
+        'نقص في سائل التبريد أو عطل في المروحة',
+        ('فحص نظام التبريد',
+         'التأكد من عمل المروحة',
+         'فحص مستوى سائل التبريد'),
+        deadband=2.0
+    ),
+    AlertRule(
+        'flow_low', 'warning', 'flow_rate', 'flow_rate_min', operator.lt, True,
+        "انخفاض معدل التدفق في {name}",
+        "معدل التدفق الحالي {value} ل/د أقل من الحد الأدنى {limit} ل/د",
+        'انسداد في المرشحات أو تآكل في الأجزاء الداخلية',
+        ('تنظيف أو استبدال المرشحات',
+         'فحص الأجزاء الداخلية للمضخة',
+         'التأكد من عدم وجود تسريبات'),
+        deadband=10.0
+    ),
+    AlertRule(
+        'vibration_high', 'warning', 'vibration', 'vibration_max', operator.gt, False,
+        "ارتفاع الاهتزاز في {name}",
+        "مستوى الاهتزاز الحالي {value} مم/ث أعلى من الحد الأقصى {limit} مم/ث",
+        'عدم توازن في الدوار أو تآكل في المحامل',
+        ('فحص توازن الدوار',
+         'فحص حالة المحامل',
+         'التأكد من ثبات قاعدة المضخة'),
+        deadband=0.1
+    ),
+    AlertRule(
+        'efficiency_low', 'info', 'efficiency', 'efficiency_min', operator.lt, True,
+        "انخفاض الكفاءة في {name}",
+        "الكفاءة الحالية {value}% أقل من الحد الأدنى {limit}%",
+        'تآكل في الأجزاء الداخلية أو الحاجة للصيانة',
+        ('جدولة صيانة دورية',
+         'فحص الأجزاء الداخلية',
+         'تحسين ظروف التشغيل'),
+        deadband=1.0
+    ),
+)
+
+# قالب تنبيه الشذوذ من كاشف القياسات المتزايد (anomaly.py): الوصف يأتي من الكاشف نفسه
+ANOMALY_RULE = AlertRule(
+    'anomaly', 'warning', '', '', operator.gt, True,
+    "سلوك غير طبيعي في {name}",
+    "{value}",
+    'تغير في القياسات غير معتاد مقارنة بسلوك المضخة نفسها قبل بلوغ حدود التنبيه',
+    ('مراجعة اتجاه القياسات في تاريخ المضخة',
+     'فحص المضخة ميدانياً قبل تفاقم المشكلة',
+     'جدولة صيانة وقائية إن استمر السلوك'),
+    min_hold=30.0
+)
+
+
+class AlertEngine:
+    """
+    محرك تقييم التنبيهات دفعة واحدة للأسطول
+    Evaluates every rule for every pump slot in one pass per rule
+    """
+
+    def __init__(self, rules: Tuple[AlertRule, ...] = ALERT_RULES, clock: Callable[[], float] = time.monotonic,
+                 anomaly_rule: AlertRule = ANOMALY_RULE):
+        """تهيئة المحرك"""
+        self.rules = rules
+        self.anomaly_rule = anomaly_rule
+        self.clock = clock
+        self.thresholds: Dict[str, array] = {rule.threshold: array('d') for rule in rules}
+        self.pump_names: List[str] = []
+        # القيم الأصلية للحدود لعرضها في نص التنبيه كما هي
+        self.limits: List[Dict[str, float]] = []
+        # التنبيهات النشطة لكل خانة: نوع التنبيه -> كائن التنبيه
+        self.active: List[Dict[str, Dict]] = []
+        # فهرس التنبيهات النشطة حسب المعرف: المعرف -> (الخانة، النوع، وقت الظهور)
+        self.index: Dict[str, Tuple[int, str, float]] = {}
+
+    def add_pump(self, slot: int, pump_name: str, thresholds: Dict[str, float]):
+        """تسجيل حدود مضخة جديدة في أعمدة الحدود"""
+        if slot != len(self.pump_names):
+            raise ValueError(f"خانة غير متوقعة للمضخة: {slot}")
+
+        for key, column in self.thresholds.items():
+            column.append(float(thresholds[key]))
+        self.pump_names.append(pump_name)
+        self.limits.append(dict(thresholds))
+        self.active.append({})
+
+    def set_threshold(self, slot: int, key: str, value: float):
+        """تعديل حد مضخة"""
+        self.thresholds[key][slot] = float(value)
+        self.limits[slot][key] = value
+
+    def evaluate(self, columns: Dict[str, array], pump_ids: List[int], statuses: List[str],
+                 slots: Optional[List[int]] = None) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, Dict]]]:
+        """
+        تقييم جميع القواعد وإرجاع التنبيهات التي ظهرت والتي زالت (الانتقالات فقط)
+
+        columns: أعمدة المقاييس من المخزن العمودي
+        pump_ids: معرف المضخة لكل خانة
+        statuses: حالة المضخة لكل خانة
+        slots: تقييم خانات محددة فقط (الافتراضي: جميع الخانات)
+        """
+        raised = []
+        cleared = []
+        now = self.clock()
+        scope = range(len(pump_ids)) if slots is None else slots
+
+        for rule in self.rules:
+            values = columns[rule.metric]
+            limits = self.thresholds[rule.threshold]
+            compare = rule.compare
+
+            if rule.running_only:
+                hits = {slot for slot in scope
+                        if statuses[slot] == 'running' and compare(values[slot], limits[slot])}
+            else:
+                hits = {slot for slot in scope if compare(values[slot], limits[slot])}
+
+            # مقارنة النتيجة بالتنبيهات النشطة لإيجاد التغيرات فقط
+            for slot in scope:
+                active = self.active[slot]
+                alert = active.get(rule.type)
+                if alert is None:
+                    if slot in hits:
+                        alert = rule.materialize(
+                            pump_ids[slot], self.pump_names[slot],
+                            values[slot], self.limits[slot][rule.threshold]
+                        )
+                        active[rule.type] = alert
+                        self.index[alert['id']] = (slot, rule.type, now)
+                        raised.append((pump_ids[slot], alert))
+                elif slot not in hits:
+                    # الزوال يتطلب تجاوز النطاق الخامد (أو توقف المضخة) وانقضاء مدة البقاء الدنيا
+                    recovered = (rule.running_only and statuses[slot] != 'running') or \
+                        rule.clears(values[slot], limits[slot])
+                    if recovered and now - self.index[alert['id']][2] >= rule.min_hold:
+                        cleared.append((pump_ids[slot], self._clear(slot, rule.type)))
+
+        return raised, cleared
+
+    def evaluate_anomalies(self, findings: Dict[int, Dict], pump_ids: List[int],
+                           slots: Optional[List[int]] = None) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, Dict]]]:
+        """
+        ظهور وزوال تنبيهات الشذوذ حسب نتائج الكاشف لخانات هذه الدورة (الانتقالات فقط)
+
+        findings: الشذوذ القائم لكل خانة من AnomalyDetector.update
+        """
+        raised = []
+        cleared = []
+        now = self.clock()
+        rule = self.anomaly_rule
+        scope = range(len(pump_ids)) if slots is None else slots
+
+        for slot in scope:
+            alert = self.active[slot].get(rule.type)
+            finding = findings.get(slot)
+            if alert is None:
+                if finding is not None:
+                    alert = rule.materialize(pump_ids[slot], self.pump_names[slot], finding['description'], 0.0)
+                    alert['anomaly'] = {key: finding[key] for key in ('kind', 'metric', 'score')}
+                    self.active[slot][rule.type] = alert
+                    self.index[alert['id']] = (slot, rule.type, now)
+                    raised.append((pump_ids[slot], alert))
+            elif finding is None and now - self.index[alert['id']][2] >= rule.min_hold:
+                cleared.append((pump_ids[slot], self._clear(slot, rule.type)))
+
+        return raised, cleared
+
+    def _clear(self, slot: int, alert_type: str) -> Dict:
+        """إزالة تنبيه من التنبيهات النشطة وإرجاع نسخة زائلة منه"""
+        alert = self.active[slot].pop(alert_type)
+        del self.index[alert['id']]
+        # كائنات التنبيه لا تُعدل بعد نشرها لأنها قد تكون في لقطة يقرؤها معالج آخر
+        return {**alert, 'state': 'cleared', 'cleared_at': datetime.now().isoformat()}
+
+    def acknowledge(self, alert_id: str, user: str) -> Optional[Tuple[int, Dict]]:
+        """تأكيد استلام تنبيه نشط وإرجاع (الخانة، التنبيه) أو None إن لم يوجد"""
+        entry = self.index.get(alert_id)
+        if entry is None:
+            return None
+
+        slot, alert_type, _ = entry
+        alert = self.active[slot][alert_type]
+        if alert['state'] != 'acknowledged':
+            # نسخة جديدة بدلاً من تعديل الكائن المنشور (على المستدعي إعادة بناء قائمة تنبيهات المضخة)
+            alert = self.active[slot][alert_type] = {
+                **alert,
+                'state': 'acknowledged',
+                'acknowledged_by': user,
+                'acknowledged_at': datetime.now().isoformat()
+            }
+        return slot, alert
+
+    def restore(self, slot: int, alerts: List[Dict]):
+        """إعادة تنبيهات نشطة منسوخة من عملية أخرى إلى المحرك (عند تولي القيادة)"""
+        now = self.clock()
+        self.active[slot] = {alert['type']: alert for alert in alerts}
+        for alert in alerts:
+            self.index[alert['id']] = (slot, alert['type'], now)
+
+    def alerts_for(self, slot: int) -> List[Dict]:
+        """التنبيهات النشطة لمضخة بترتيب القواعد"""
+        active = self.active[slot]
+        alerts = [active[rule.type] for rule in self.rules if rule.type in active]
+        if self.anomaly_rule.type in active:
+            alerts.append(active[self.anomaly_rule.type])
+        return alerts
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+كشف الشذوذ المتزايد في قياسات المضخات
+Streaming Anomaly Detection
+
+كاشف لكل مضخة ومقياس يُحدث مع كل عينة بعدد ثابت من العمليات وذاكرة ثابتة (أعمدة
+رقمية مفهرسة بخانة المضخة كالمخزن العمودي): متوسط متحرك أسي للقيمة، ومعدل التغير
+في الثانية مع متوسطين متحركين أسيين له (الاتجاه الحالي والاتجاه المعتاد طويل المدى)
+وتباينه المتحرك. من ذلك ثلاثة أنواع من الشذوذ تكمل حدود التنبيه الثابتة:
+- قفزة: تغير مفاجئ في عينة واحدة بعيد عن المعتاد لهذه المضخة
+- انحراف: ابتعاد الاتجاه الحالي عن المعتاد (ارتفاع أو انخفاض مستمر) قبل بلوغ الحد
+- قواعد مركبة بين المقاييس: ارتفاع الاهتزاز مع انخفاض الكفاءة (تآكل المحامل)، ارتفاع
+  الضغط مع انخفاض التدفق (انسداد)...
+"""
+
+import math
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telemetry_store import METRIC_NAMES, METRIC_SPECS
+
+# معامل التنعيم للمتوسطات المتحركة الأسية (وزن العينة الجديدة)
+EWMA_ALPHA = 0.1
+
+# معامل التنعيم للاتجاه المعتاد طويل المدى (الشذوذ هو ابتعاد الاتجاه الحالي عنه)
+BASELINE_ALPHA = 0.01
+
+# عدد العينات قبل بدء الكشف لكل مضخة (بعد التشغيل أو بعد توقف)
+WARMUP_SAMPLES = 10
+
+# حد القفزة: انحراف معدل التغير في العينة عن الاتجاه بمضاعفات انحرافه المعياري
+SPIKE_Z = 8.0
+
+# حد الانحراف: الاتجاه بمضاعفات خطئه المعياري
+TREND_Z = 7.0
+
+# العينات القريبة من حد المقياس بأقل من هذا العدد من الانحرافات المعيارية للخطوة لا تُحتسب
+# (التقييد عند الحد يقطع الخطوات نحوه فينحاز معدل التغير بعيداً عنه)
+BOUND_MARGIN = 4.0
+
+# زوال الشذوذ عند انخفاض الدرجة عن هذا الجزء من حد ظهوره
+CLEAR_RATIO = 0.5
+
+# القواعد المركبة: (الاسم، ((المقياس، اتجاه التغير، الحد الأدنى لدرجة الاتجاه)...)، الوصف)
+CROSS_RULES = (
+    ('bearing_wear', (('vibration', 1, 3.5), ('efficiency', -1, 2.5)),
+     'ارتفاع مستمر في الاهتزاز مع انخفاض الكفاءة (احتمال تآكل المحامل)'),
+    ('cavitation', (('flow_rate', -1, 3.5), ('vibration', 1, 3.5)),
+     'انخفاض مستمر في التدفق مع ارتفاع الاهتزاز (احتمال تكهف)'),
+    ('blockage', (('pressure', 1, 3.5), ('flow_rate', -1, 3.5)),
+     'ارتفاع مستمر في الضغط مع انخفاض التدفق (احتمال انسداد)'),
+    ('leak', (('pressure', -1, 3.5), ('flow_rate', -1, 3.5)),
+     'انخفاض مستمر في الضغط والتدفق معاً (احتمال تسرب)'),
+)
+
+METRIC_LABELS = {
+    'pressure': 'الضغط',
+    'temperature': 'درجة الحرارة',
+    'flow_rate': 'معدل التدفق',
+    'vibration': 'الاهتزاز',
+    'power': 'القدرة',
+    'efficiency': 'الكفاءة',
+}
+
+# حدود قيم كل مقياس: القيم المقيدة عند الحد لا تمثل تغيراً حقيقياً (حساس مشبع)
+_BOUNDS = {name: (low, high) for name, low, high, _ in METRIC_SPECS}
+
+# الخطأ المعياري للفرق بين متوسطين متحركين أسيين لعينات مستقلة (بمضاعفات انحرافها المعياري)
+_TREND_SCALE = math.sqrt(EWMA_ALPHA / (2 - EWMA_ALPHA) + BASELINE_ALPHA / (2 - BASELINE_ALPHA)
+                         - 2 * EWMA_ALPHA * BASELINE_ALPHA / (EWMA_ALPHA + BASELINE_ALPHA - EWMA_ALPHA * BASELINE_ALPHA))
+_EPSILON = 1e-12
+
+
+class AnomalyDetector:
+    """
+    كاشف الشذوذ المتزايد للأسطول
+    O(1)-per-sample EWMA level, rate trend, usual rate and rate variance per pump and metric
+    """
+
+    def __init__(self, metrics: Tuple[str, ...] = METRIC_NAMES, alpha: float = EWMA_ALPHA,
+                 baseline_alpha: float = BASELINE_ALPHA, warmup: int = WARMUP_SAMPLES,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        تهيئة الكاشف
+
+        clock: الساعة التي يُحسب بها معدل التغير في الثانية (ساعة المحاكاة في وضع المحاكاة)
+        """
+        self.metrics = metrics
+        self.alpha = alpha
+        self.baseline_alpha = baseline_alpha
+        self.warmup = warmup
+        self.clock = clock
+        # لكل مقياس: آخر قيمة، المتوسط الأسي للقيمة، اتجاه معدل التغير الحالي والمعتاد وتباينه
+        self.last: Dict[str, array] = {name: array('d') for name in metrics}
+        self.level: Dict[str, array] = {name: array('d') for name in metrics}
+        self.trend: Dict[str, array] = {name: array('d') for name in metrics}
+        self.baseline: Dict[str, array] = {name: array('d') for name in metrics}
+        self.variance: Dict[str, array] = {name: array('d') for name in metrics}
+        # لكل خانة: وقت آخر عينة، عدد العينات منذ التشغيل، والشذوذ المكتشف حالياً
+        self.stamps = array('d')
+        self.samples = array('l')
+        self.flagged: List[Optional[Dict]] = []
+        self.updates = 0
+        self.detected = 0
+        # أقل درجة اتجاه قد تُبقي شذوذاً قائماً (ما دونها لا يحتاج تصنيفاً)
+        self.candidate_z = CLEAR_RATIO * min([TREND_Z] + [limit for _, conditions, _ in CROSS_RULES
+                                                          for _, _, limit in conditions])
+
+    def add_pump(self, slot: int):
+        """إضافة خانة مضخة جديدة"""
+        if slot != len(self.stamps):
+            raise ValueError(f"خانة غير متوقعة للمضخة: {slot}")
+        for columns in (self.last, self.level, self.trend, self.baseline, self.variance):
+            for column in columns.values():
+                column.append(0.0)
+        self.stamps.append(0.0)
+        self.samples.append(0)
+        self.flagged.append(None)
+
+    def update(self, columns: Dict[str, array], statuses: List[str],
+               slots: Optional[List[int]] = None) -> Dict[int, Dict]:
+        """
+        تحديث الكاشف بعينات الدورة وإرجاع الشذوذ القائم لخانات هذه الدورة
+
+        columns: أعمدة المقاييس من المخزن العمودي بعد كتابة عينات الدورة
+        slots: الخانات التي أُخذت لها عينة (الافتراضي: جميع الخانات)
+        """
+        now = self.clock()
+        scope = range(len(self.stamps)) if slots is None else slots
+        alpha = self.alpha
+        baseline_alpha = self.baseline_alpha
+        warmup = self.warmup
+        stamps = self.stamps
+        samples = self.samples
+        flagged = self.flagged
+
+        # الخانات العاملة وزمن عينتها ووزن العينة الجديدة؛ غير العاملة تبدأ الإحماء من جديد
+        active = []
+        elapsed = []
+        weights = []
+        slow_weights = []
+        ready = []
+        for slot in scope:
+            if statuses[slot] != 'running':
+                samples[slot] = 0
+                flagged[slot] = None
+                continue
+            count = samples[slot]
+            if count == 0:
+                # أول عينة بعد التشغيل: قيم البداية فقط
+                samples[slot] = 1
+                stamps[slot] = now
+                for name in self.metrics:
+                    self.last[name][slot] = self.level[name][slot] = columns[name][slot]
+                    self.trend[name][slot] = self.baseline[name][slot] = self.variance[name][slot] = 0.0
+                continue
+            dt = now - stamps[slot]
+            if dt <= 0:
+                continue
+            samples[slot] = count + 1
+            stamps[slot] = now
+            active.append(slot)
+            elapsed.append(dt)
+            # أثناء الإحماء متوسط تراكمي (وزن 1/n) فلا تنحاز التقديرات الأولى نحو قيم البداية
+            weights.append(max(alpha, 1.0 / count))
+            slow_weights.append(max(baseline_alpha, 1.0 / count))
+            ready.append(count > warmup)
+        self.updates += len(active)
+
+        # درجات القفزة والاتجاه لكل مقياس عموداً بعمود (عدد ثابت من العمليات لكل عينة)،
+        # والمقارنات بالمربعات لتجنب الجذر إلا للدرجات القريبة من الحدود
+        spike_limit = (SPIKE_Z * CLEAR_RATIO) ** 2
+        margin_limit = BOUND_MARGIN ** 2
+        trend_limit = (self.candidate_z * _TREND_SCALE) ** 2
+        spikes: Dict[int, Tuple[float, str]] = {}
+        trends: Dict[str, Dict[int, float]] = {}
+        for name in self.metrics:
+            values = columns[name]
+            last = self.last[name]
+            level = self.level[name]
+            trend = self.trend[name]
+            baseline = self.baseline[name]
+            variance = self.variance[name]
+            scores = trends[name] = {}
+            low, high = _BOUNDS.get(name, (-math.inf, math.inf))
+            for slot, dt, weight, slow, scored in zip(active, elapsed, weights, slow_weights, ready):
+                value = values[slot]
+                previous = last[slot]
+                last[slot] = value
+                spread = variance[slot]
+                edge = min(previous - low, high - previous)
+                if value <= low or value >= high or edge * edge <= margin_limit * spread * dt * dt:
+                    continue
+                level[slot] += weight * (value - level[slot])
+                rate = (value - previous) / dt
+                deviation = rate - trend[slot]
+                squared = deviation * deviation
+                if scored and squared > spike_limit * spread > 0.0:
+                    score = math.sqrt(squared / spread)
+                    if score > spikes.get(slot, (0.0, ''))[0]:
+                        spikes[slot] = (score, name)
+                trend[slot] += weight * deviation
+                usual = baseline[slot] = baseline[slot] + slow * (rate - baseline[slot])
+                spread = variance[slot] = (1.0 - slow) * (spread + slow * squared)
+                change = trend[slot] - usual
+                if scored and change * change > trend_limit * spread > 0.0:
+                    scores[slot] = change / (math.sqrt(spread) * _TREND_SCALE)
+
+        # التصنيف للخانات المرشحة فقط (درجة قريبة من حد أو شذوذ قائم)
+        candidates = set(spikes)
+        for scores in trends.values():
+            candidates.update(scores)
+        findings = {}
+        for slot, scored in zip(active, ready):
+            if not scored or (slot not in candidates and flagged[slot] is None):
+                continue
+            previous = flagged[slot]
+            finding = self._classify(slot, spikes.get(slot), trends, previous)
+            if finding is not None and previous is None:
+                self.detected += 1
+            flagged[slot] = finding
+            if finding is not None:
+                findings[slot] = finding
+        return findings
+
+    def _classify(self, slot: int, spike: Optional[Tuple[float, str]], trends: Dict[str, Dict[int, float]],
+                  previous: Optional[Dict]) -> Optional[Dict]:
+        """
+        أقوى شذوذ قائم للخانة (القواعد المركبة ثم الانحراف ثم القفزة)
+
+        الشذوذ القائم يبقى حتى تنخفض درجته عن CLEAR_RATIO من حد ظهوره (نطاق خامد)
+        """
+        def ratio(kind: str, name: str) -> float:
+            # حد الظهور كاملاً لشذوذ جديد، وجزء منه لشذوذ قائم من النوع نفسه
+            held = previous is not None and previous['kind'] == kind and previous['metric'] == name
+            return CLEAR_RATIO if held else 1.0
+
+        for rule, conditions, description in CROSS_RULES:
+            factor = ratio('cross', rule)
+            scores = [trends[name].get(slot, 0.0) * direction for name, direction, _ in conditions]
+            if all(score >= limit * factor for score, (_, _, limit) in zip(scores, conditions)):
+                return {'kind': 'cross', 'metric': rule, 'score': round(min(scores), 2),
+                        'description': description}
+
+        strongest = None
+        for name in self.metrics:
+            score = trends[name].get(slot)
+            if score is not None and abs(score) >= TREND_Z * ratio('trend', name):
+                if strongest is None or abs(score) > abs(strongest[0]):
+                    strongest = (score, name)
+        if strongest is not None:
+            score, name = strongest
+            direction = 'ارتفاع' if score > 0 else 'انخفاض'
+            return {'kind': 'trend', 'metric': name, 'score': round(score, 2),
+                    'description': f"{direction} مستمر غير معتاد في {METRIC_LABELS.get(name, name)} "
+                                   f"(المتوسط المعتاد {self.level[name][slot]:.1f}، الحالي {self.last[name][slot]:.1f})"}
+
+        if spike is not None and spike[0] >= SPIKE_Z * ratio('spike', spike[1]):
+            score, name = spike
+            return {'kind': 'spike', 'metric': name, 'score': round(score, 2),
+                    'description': f"تغير مفاجئ في {METRIC_LABELS.get(name, name)} "
+                                   f"(المتوسط المعتاد {self.level[name][slot]:.1f}، الحالي {self.last[name][slot]:.1f})"}
+        return None
+
+    def stats(self) -> Dict:
+        """عدادات الكاشف"""
+        return {
+            'updates': self.updates,
+            'detected': self.detected,
+            'flagged': sum(1 for finding in self.flagged if finding is not None),
+        }
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+التحكم في تدفق الإرسال للعملاء البطيئين
+Per-Client Backpressure for Slow WebSocket Consumers
+
+لكل اتصال طابور إرسال في Engine.IO لا حد له، فالعميل البطيء (جهاز لوحي على شبكة
+ميدانية ضعيفة) تتراكم رسائله في ذاكرة الخادم. يراقب هذا الوحدة عمق طابور كل عميل
+في كل دورة:
+- عند تجاوز الحد الأعلى يُخرج العميل من غرفة تحديثات البيانات فلا تُضاف له إطارات
+  قديمة، بينما تستمر التنبيهات وإشعارات التحكم بالوصول إليه دون أن تنتظر خلف سيل
+  من تحديثات البيانات
+- عند انخفاض الطابور تحت الحد الأدنى يستلم رسالة واحدة تدمج كل ما فاته (فروقات منذ
+  آخر إصدار أكده أو لقطة كاملة) ثم يعود للغرفة
+- العميل الذي يتأخر مراراً يُخفض معدل تحديثه، والذي يتجاوز الحد الأقصى يُقطع اتصاله
+  ليعيد الاتصال ويستلم لقطة كاملة
+"""
+
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+# حدود عمق طابور الإرسال (بعدد حزم Engine.IO)
+HIGH_WATERMARK = 8
+LOW_WATERMARK = 2
+MAX_QUEUE = 256
+
+# عدد مرات التأخر خلال النافذة (بالثواني) قبل خفض معدل التحديث
+DOWNGRADE_EPISODES = 3
+DOWNGRADE_WINDOW = 300.0
+
+# أقل فاصل بين تحديثات البيانات (بالثواني) بعد خفض المعدل، ويتضاعف مع كل خفض تالٍ
+DOWNGRADE_INTERVAL = 10.0
+
+
+class ClientFlow:
+    """حالة تدفق الإرسال لعميل واحد"""
+
+    __slots__ = ('lagging', 'lagging_since', 'episodes', 'coalesced', 'depth')
+
+    def __init__(self):
+        self.lagging = False
+        self.lagging_since = 0.0
+        self.episodes: deque = deque()
+        self.coalesced = 0
+        self.depth = 0
+
+
+class FlowControl:
+    """
+    مراقب طوابير الإرسال لعملاء هذه العملية
+    Watermark-based lag detection with coalesced catch-up (mutated only by the state actor)
+    """
+
+    def __init__(self, queue_depth: Callable[[str], Optional[int]], high: int = HIGH_WATERMARK,
+                 low: int = LOW_WATERMARK, maximum: int = MAX_QUEUE):
+        """
+        queue_depth: دالة ترجع عمق طابور إرسال العميل (None إن لم يكن متصلاً)
+        """
+        self.queue_depth = queue_depth
+        self.high = high
+        self.low = min(low, high)
+        self.maximum = max(maximum, high)
+        self.clients: Dict[str, ClientFlow] = {}
+        # عدادات تراكمية
+        self.lag_episodes = 0
+        self.coalesced_updates = 0
+        self.catchups = 0
+        self.downgrades = 0
+        self.disconnects = 0
+
+    def remove(self, sid: str):
+        """حذف حالة عميل انقطع اتصاله"""
+        self.clients.pop(sid, None)
+
+    def resume(self, sid: str):
+        """إلغاء حالة التأخر (بعد إعادة الاشتراك أو إرسال رسالة اللحاق)"""
+        flow = self.clients.get(sid)
+        if flow is not None:
+            flow.lagging = False
+
+    def scan(self, sids: List[str], advanced: bool) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """
+        فحص طوابير العملاء قبل إرسال تحديثات الدورة
+
+        advanced: هل تغيرت البيانات في هذه الدورة (فتُحسب رسالة مدمجة لكل عميل متأخر)
+        يرجع: عملاء تأخروا الآن، عملاء لحقوا، عملاء يجب خفض معدلهم، عملاء يجب قطع اتصالهم
+        """
+        now = time.monotonic()
+        lagging, recovered, downgrade, overflow = [], [], [], []
+
+        for sid in sids:
+            depth = self.queue_depth(sid)
+            if depth is None:
+                continue
+            flow = self.clients.get(sid)
+            if flow is None:
+                flow = self.clients[sid] = ClientFlow()
+            flow.depth = depth
+
+            if depth >= self.maximum:
+                self.disconnects += 1
+                overflow.append(sid)
+            elif not flow.lagging:
+                if depth >= self.high:
+                    flow.lagging = True
+                    flow.lagging_since = now
+                    flow.episodes.append(now)
+                    self.lag_episodes += 1
+                    lagging.append(sid)
+            elif depth <= self.low:
+                while flow.episodes and now - flow.episodes[0] > DOWNGRADE_WINDOW:
+                    flow.episodes.popleft()
+                if len(flow.episodes) >= DOWNGRADE_EPISODES:
+                    flow.episodes.clear()
+                    self.downgrades += 1
+                    downgrade.append(sid)
+                else:
+                    self.catchups += 1
+                    recovered.append(sid)
+            elif advanced:
+                # تحديث لم يُرسل: سيُدمج في رسالة اللحاق
+                flow.coalesced += 1
+                self.coalesced_updates += 1
+
+        return lagging, recovered, downgrade, overflow
+
+    def stats(self, top: int = 10) -> Dict:
+        """عمق الطوابير والعدادات"""
+        now = time.monotonic()
+        flows = list(self.clients.items())
+        depths = [flow.depth for _, flow in flows]
+        deepest = sorted(flows, key=lambda item: item[1].depth, reverse=True)[:top]
+        return {
+            'connections': len(flows),
+            'lagging': sum(1 for _, flow in flows if flow.lagging),
+            'queue_depth': {
+                'max': max(depths) if depths else 0,
+                'total': sum(depths),
+                'high_watermark': self.high,
+                'low_watermark': self.low,
+                'limit': self.maximum,
+            },
+            'counters': {
+                'lag_episodes': self.lag_episodes,
+                'coalesced_updates': self.coalesced_updates,
+                'catchups': self.catchups,
+                'downgrades': self.downgrades,
+                'disconnects': self.disconnects,
+            },
+            'deepest': [
+                {'sid': sid, 'queue_depth': flow.depth, 'lagging': flow.lagging, 'coalesced': flow.coalesced,
+                 'lagging_seconds': round(now - flow.lagging_since, 1) if flow.lagging else 0}
+                for sid, flow in deepest if flow.depth > 0 or flow.lagging
+            ],
+        }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+أوامر التحكم الجماعية
+Bulk Control Commands
+
+اختيار مجموعة من المضخات بمحدد (معرفات، منطقة، نوع، حالة) وتحديد ما يمكن تنفيذ
+الإجراء عليه منها قبل التنفيذ، فيُطبق الأمر على المجموعة كاملة دفعة واحدة في مالك
+الحالة بدلاً من طلب وإشعار كامل لكل مضخة.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# إجراءات التحكم المتاحة (نفس إجراءات التحكم بمضخة واحدة)
+CONTROL_ACTIONS = ('start', 'stop', 'emergency_stop', 'standby', 'auto', 'reset_emergency', 'maintenance')
+
+# الحالة التي ينتهي إليها كل إجراء (auto يبدل الوضع فلا حالة له)
+ACTION_STATUS = {
+    'start': 'running',
+    'stop': 'stopped',
+    'emergency_stop': 'emergency_stop',
+    'standby': 'standby',
+    'reset_emergency': 'stopped',
+    'maintenance': 'maintenance',
+}
+
+# وصف كل إجراء في رسائل الأوامر الجماعية
+ACTION_LABELS = {
+    'start': 'تشغيل',
+    'stop': 'إيقاف',
+    'emergency_stop': 'إيقاف الطوارئ',
+    'standby': 'وضع الاستعداد',
+    'auto': 'تبديل الوضع التلقائي',
+    'reset_emergency': 'إعادة تعيين إيقاف الطوارئ',
+    'maintenance': 'وضع الصيانة',
+}
+
+# حقول المحدد النصية (قيمة واحدة أو قائمة قيم)
+SELECTOR_FIELDS = ('location', 'type', 'status')
+
+
+def select_pumps(selector: Any, pumps: Dict[int, Dict]) -> List[int]:
+    """
+    معرفات المضخات المطابقة للمحدد (تقاطع جميع الشروط)
+
+    مثال: {"location": "المنطقة الشمالية", "status": ["stopped", "standby"]}
+    أو {"pumps": [1, 2, 3]} أو {"all": true} للأسطول كاملاً (يجب التصريح به)
+
+    يرفع ValueError برسالة عربية عند وجود قيمة غير صالحة
+    """
+    if not isinstance(selector, dict):
+        raise ValueError('المحدد يجب أن يكون كائناً')
+
+    unknown = [key for key in selector if key not in ('pumps', 'all') + SELECTOR_FIELDS]
+    if unknown:
+        raise ValueError(f'حقل محدد غير معروف: {unknown[0]}')
+
+    criteria = {}
+    for field in SELECTOR_FIELDS:
+        if field not in selector:
+            continue
+        values = selector[field]
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not values or not all(isinstance(value, str) for value in values):
+            raise ValueError(f'قيمة غير صالحة للحقل {field}')
+        criteria[field] = frozenset(values)
+
+    requested: Optional[List[int]] = None
+    if 'pumps' in selector:
+        requested = selector['pumps']
+        if not isinstance(requested, list) or not requested:
+            raise ValueError('قائمة المضخات غير صالحة')
+        for pump_id in requested:
+            if isinstance(pump_id, bool) or not isinstance(pump_id, int) or pump_id not in pumps:
+                raise ValueError(f'المضخة غير موجودة: {pump_id}')
+
+    if requested is None and not criteria and selector.get('all') is not True:
+        # أمر للأسطول كاملاً لا يُنفذ إلا بطلب صريح
+        raise ValueError('المحدد فارغ: حدد المضخات أو المنطقة أو النوع أو الحالة، أو all للأسطول كاملاً')
+
+    candidates = sorted(set(requested)) if requested is not None else list(pumps)
+    return [
+        pump_id for pump_id in candidates
+        if all(pumps[pump_id].get(field) in values for field, values in criteria.items())
+    ]
+
+
+def plan_control(pump_ids: List[int], action: str,
+                 pumps: Dict[int, Dict]) -> Tuple[List[int], List[int], Dict[int, str]]:
+    """
+    تقسيم المضخات المختارة قبل التنفيذ إلى: ما سيُنفذ عليه الإجراء، وما هو أصلاً في
+    الحالة المطلوبة، وما يتعذر تنفيذ الإجراء عليه مع السبب (تشغيل مضخة في إيقاف الطوارئ)
+    """
+    if action not in CONTROL_ACTIONS:
+        raise ValueError('إجراء غير صحيح')
+
+    target = ACTION_STATUS.get(action)
+    apply, unchanged, blocked = [], [], {}
+    for pump_id in pump_ids:
+        pump = pumps[pump_id]
+        if action == 'start' and pump['emergency_stop']:
+            blocked[pump_id] = 'لا يمكن تشغيل المضخة في حالة إيقاف الطوارئ'
+        elif (target is not None and pump['status'] == target
+              and pump['emergency_stop'] == (action == 'emergency_stop')):
+            unchanged.append(pump_id)
+        else:
+            apply.append(pump_id)
+    return apply, unchanged, blocked
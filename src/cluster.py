@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+ناقل الرسائل بين عمليات الخادم
+Inter-Process Message Bus
+
+يسمح بتشغيل عدة عمليات للخادم تتشارك حالة المضخات وتبث أحداث Socket.IO
+لجميع العملاء أياً كانت العملية المتصلين بها. الناقل قابل للاستبدال:
+- local://<الاسم>   داخل العملية نفسها (للاختبار وتشغيل عدة نسخ في عملية واحدة)
+- unix://<المسار>   مقبس Unix محلي، أول عملية تفتحه تصبح الموزع للبقية
+- redis://...       خادم Redis (أو أي خادم متوافق) لعدة أجهزة
+
+تتولى عملية واحدة فقط (القائدة) المراقبة الخلفية والتخزين الدائم وإسناد معرفات
+النشاط والدردشة، وتنشر الحالة بعد كل دورة لبقية العمليات.
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import fcntl
+import socket
+import struct
+import logging
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import socketio
+
+logger = logging.getLogger(__name__)
+
+# طول الإطار على مقبس Unix (4 بايت) متبوعاً بنص JSON
+_FRAME = struct.Struct('>I')
+
+# مهلة إعادة الاتصال بالموزع بعد انقطاعه
+RECONNECT_INTERVAL = 1.0
+
+
+class MessageBus(ABC):
+    """
+    واجهة ناقل الرسائل: نشر رسالة JSON على قناة والاشتراك في القنوات
+    Pluggable publish/subscribe bus shared by all server processes
+    """
+
+    def __init__(self, lock_path: str):
+        """تهيئة الناقل"""
+        self.node_id = uuid.uuid4().hex
+        self.lock_path = lock_path
+        self._handlers: Dict[str, List[Callable[[Dict], None]]] = {}
+        self._lock_handle = None
+
+    def subscribe(self, channel: str, handler: Callable[[Dict], None]):
+        """تسجيل معالج لرسائل قناة (لا تصل العملية رسائلها هي)"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    @abstractmethod
+    def publish(self, channel: str, message: Dict):
+        """نشر رسالة لجميع العمليات الأخرى"""
+
+    def acquire_leadership(self) -> bool:
+        """محاولة تولي القيادة (أو تجديدها) وإرجاع هل هذه العملية هي القائدة"""
+        if self._lock_handle is not None:
+            return True
+
+        handle = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        # القفل يبقى ما دامت العملية حية ويتحرر تلقائياً عند توقفها
+        self._lock_handle = handle
+        return True
+
+    def close(self):
+        """إغلاق الناقل وتحرير القيادة"""
+        if self._lock_handle is not None:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+    def _deliver(self, channel: str, message: Dict, origin: str):
+        """تسليم رسالة واردة لمعالجي القناة"""
+        if origin == self.node_id:
+            return
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"خطأ في معالجة رسالة القناة {channel}: {str(e)}")
+
+
+class LocalBus(MessageBus):
+    """
+    ناقل داخل العملية نفسها لجميع النسخ التي تحمل الاسم نفسه
+    In-process bus; delivery is synchronous in the publisher's thread
+    """
+
+    _groups: Dict[str, List['LocalBus']] = {}
+    _groups_lock = threading.Lock()
+
+    def __init__(self, name: str):
+        super().__init__(os.path.join(tempfile.gettempdir(), f'oil-pump-{name}.leader'))
+        self.name = name
+        with self._groups_lock:
+            self._groups.setdefault(name, []).append(self)
+
+    def publish(self, channel: str, message: Dict):
+        # التمرير عبر JSON كالنواقل الحقيقية حتى لا تتشارك النسخ الكائنات نفسها
+        encoded = json.dumps(message, ensure_ascii=False)
+        with self._groups_lock:
+            members = list(self._groups.get(self.name, ()))
+        for member in members:
+            member._deliver(channel, json.loads(encoded), self.node_id)
+
+    def close(self):
+        with self._groups_lock:
+            members = self._groups.get(self.name, [])
+            if self in members:
+                members.remove(self)
+        super().close()
+
+
+class UnixSocketBus(MessageBus):
+    """
+    ناقل عبر مقبس Unix: أول عملية تربط المقبس تصبح الموزع وتعيد إرسال كل إطار
+    لبقية العمليات المتصلة، وتعيد العمليات الاتصال (أو تتولى التوزيع) عند توقفه
+    Unix domain socket bus with a hub elected by whoever binds the socket first
+    """
+
+    def __init__(self, path: str):
+        super().__init__(f'{path}.leader')
+        self.path = path
+        self._send_lock = threading.Lock()
+        self._connection: Optional[socket.socket] = None
+        self._peers: List[socket.socket] = []
+        self._server: Optional[socket.socket] = None
+        self._hub_lock = None
+        self._closed = False
+        self._connect()
+
+    def _connect(self):
+        """الاتصال بالموزع أو تولي التوزيع إن لم يوجد"""
+        while not self._closed:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                client.connect(self.path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                client.close()
+                if self._serve():
+                    return
+                continue
+            self._connection = client
+            threading.Thread(target=self._read_loop, args=(client, None), daemon=True).start()
+            return
+
+    def _serve(self) -> bool:
+        """ربط المقبس وبدء قبول اتصالات العمليات الأخرى"""
+        # قفل التوزيع يمنع عمليتين من حذف مقبس بعضهما عند البدء المتزامن
+        hub_lock = open(f'{self.path}.hub', 'a')
+        try:
+            fcntl.flock(hub_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # عملية أخرى تتولى التوزيع: نعيد محاولة الاتصال بها
+            hub_lock.close()
+            time.sleep(0.05)
+            return False
+
+        # مقبس قديم من عملية توقفت (لا أحد يستمع عليه)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(64)
+
+        self._hub_lock = hub_lock
+        self._server = server
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        logger.info(f"تم بدء موزع الرسائل على {self.path}")
+        return True
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                peer, _ = self._server.accept()
+            except OSError:
+                return
+            with self._send_lock:
+                self._peers.append(peer)
+            threading.Thread(target=self._read_loop, args=(peer, peer), daemon=True).start()
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+        chunks = []
+        while size:
+            chunk = sock.recv(size)
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _read_loop(self, sock: socket.socket, peer: Optional[socket.socket]):
+        """قراءة الإطارات من الموزع (أو من عملية متصلة إن كنا الموزع)"""
+        while True:
+            try:
+                header = self._recv_exact(sock, _FRAME.size)
+                frame = self._recv_exact(sock, _FRAME.unpack(header)[0]) if header else None
+            except OSError:
+                frame = None
+            if frame is None:
+                break
+
+            if peer is not None:
+                # الموزع يعيد إرسال الإطار لبقية العمليات
+                self._broadcast(header + frame, skip=peer)
+            envelope = json.loads(frame)
+            self._deliver(envelope['c'], envelope['m'], envelope['o'])
+
+        sock.close()
+        if peer is not None:
+            with self._send_lock:
+                if peer in self._peers:
+                    self._peers.remove(peer)
+        elif not self._closed:
+            logger.warning("انقطع الاتصال بموزع الرسائل، جاري إعادة الاتصال")
+            self._connection = None
+            time.sleep(RECONNECT_INTERVAL)
+            self._connect()
+
+    def _broadcast(self, data: bytes, skip: Optional[socket.socket] = None):
+        with self._send_lock:
+            targets = [peer for peer in self._peers if peer is not skip]
+            if self._connection is not None:
+                targets.append(self._connection)
+            for target in targets:
+                try:
+                    target.sendall(data)
+                except OSError:
+                    # القارئ الخاص بالاتصال يتولى إزالته
+                    pass
+
+    def publish(self, channel: str, message: Dict):
+        frame = json.dumps({'c': channel, 'o': self.node_id, 'm': message}, ensure_ascii=False).encode('utf-8')
+        self._broadcast(_FRAME.pack(len(frame)) + frame)
+
+    def close(self):
+        self._closed = True
+        with self._send_lock:
+            for sock in self._peers + ([self._connection] if self._connection else []):
+                sock.close()
+            self._peers = []
+            self._connection = None
+        if self._server is not None:
+            self._server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._hub_lock.close()
+        super().close()
+
+
+class RedisBus(MessageBus):
+    """
+    ناقل عبر Redis (أو خادم متوافق) للتشغيل على عدة أجهزة، والقيادة بمفتاح له مدة صلاحية
+    Redis pub/sub bus with a TTL key for leader election across hosts
+    """
+
+    LEADER_TTL = 15
+
+    def __init__(self, url: str, prefix: str = 'oil_pump'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("ناقل Redis يتطلب مكتبة redis (pip install redis)")
+
+        super().__init__(lock_path='')
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(f'{prefix}:*')
+        self._leader_key = f'{prefix}:leader'
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _read_loop(self):
+        for item in self._pubsub.listen():
+            try:
+                envelope = json.loads(item['data'])
+                channel = item['channel'].decode('utf-8').split(':', 1)[1]
+            except (ValueError, KeyError, AttributeError):
+                continue
+            self._deliver(channel, envelope['m'], envelope['o'])
+
+    def publish(self, channel: str, message: Dict):
+        self._redis.publish(f'{self.prefix}:{channel}',
+                            json.dumps({'o': self.node_id, 'm': message}, ensure_ascii=False))
+
+    def acquire_leadership(self) -> bool:
+        # المفتاح يُجدد في كل دورة مراقبة، ويسقط تلقائياً إن توقفت القائدة
+        if self._redis.set(self._leader_key, self.node_id, nx=True, ex=self.LEADER_TTL):
+            return True
+        if self._redis.get(self._leader_key) == self.node_id.encode('utf-8'):
+            self._redis.expire(self._leader_key, self.LEADER_TTL)
+            return True
+        return False
+
+    def close(self):
+        self._pubsub.close()
+        if self._redis.get(self._leader_key) == self.node_id.encode('utf-8'):
+            self._redis.delete(self._leader_key)
+
+
+class BusManager(socketio.PubSubManager):
+    """
+    مدير عملاء Socket.IO يوزع البث عبر ناقل الرسائل
+    Socket.IO client manager that fans emits out over a MessageBus
+    """
+
+    name = 'oil_pump_bus'
+
+    def __init__(self, bus: MessageBus, channel: str = 'socketio', write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus = bus
+        self._inbox = queue.Queue()
+        bus.subscribe(channel, self._inbox.put)
+
+    def _publish(self, data):
+        self.bus.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
+
+
+def create_bus(url: str) -> Optional[MessageBus]:
+    """إنشاء الناقل من عنوانه (فارغ = عملية واحدة بلا ناقل)"""
+    if not url:
+        return None
+
+    parsed = urlparse(url)
+    if parsed.scheme == 'local':
+        return LocalBus(parsed.netloc or parsed.path or 'default')
+    if parsed.scheme == 'unix':
+        return UnixSocketBus(parsed.path or os.path.join(tempfile.gettempdir(), 'oil-pump.sock'))
+    if parsed.scheme in ('redis', 'rediss'):
+        return RedisBus(url)
+    raise ValueError(f"نوع ناقل رسائل غير معروف: {url}")
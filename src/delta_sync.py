@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+مزامنة البيانات بالفروقات المرقمة
+Versioned Delta Synchronization
+
+يتتبع هذا الوحدة رقم إصدار لكل حقل من حقول كل مضخة، بحيث يستلم العميل
+فقط الحقول التي تغيرت منذ آخر إصدار أكده، وتُرسل اللقطة الكاملة فقط عند
+الاتصال أو عند إعادة المزامنة.
+"""
+
+import copy
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterable, Set
+
+# عدد الإصدارات الأخيرة المحفوظة في فهرس المضخات المتغيرة
+# (العميل المتأخر أكثر من ذلك يُخدم بالمرور على جميع المضخات)
+CHANGE_INDEX_SIZE = 1024
+
+
+class DeltaTracker:
+    """
+    متتبع الفروقات المرقمة لبيانات المضخات
+    Per-pump, per-field version tracker
+    """
+
+    def __init__(self, index_size: int = CHANGE_INDEX_SIZE):
+        """تهيئة المتتبع"""
+        self.version = 0
+        self._shadow: Dict[int, Dict[str, Any]] = {}
+        self._field_versions: Dict[int, Dict[str, Any]] = {}
+        # المضخات التي كُتبت منذ آخر تسجيل (تُقارن وحدها عند التسجيل التالي)
+        self._dirty: Set[int] = set()
+        # (الإصدار، المضخات المتغيرة فيه) لآخر الإصدارات، والفهرس كامل لما بعد _indexed_since
+        self._index = deque()
+        self._index_size = index_size
+        self._indexed_since = 0
+        self._lock = threading.Lock()
+
+    def touch(self, pump_ids: Iterable[int]):
+        """تعليم مضخات كُتبت حقولها لتُقارن في التسجيل التالي"""
+        with self._lock:
+            self._dirty.update(pump_ids)
+
+    def take_dirty(self) -> List[int]:
+        """المضخات المعلمة منذ آخر استدعاء (ويُفرغ التعليم)"""
+        with self._lock:
+            dirty = sorted(self._dirty)
+            self._dirty.clear()
+            return dirty
+
+    def commit(self, pumps: Dict[int, Dict[str, Any]], version: Optional[int] = None) -> int:
+        """
+        مقارنة الحالة الحالية بآخر حالة مسجلة وترقيم الحقول المتغيرة
+
+        pumps: المضخات المراد مقارنتها فقط (عادة المعلمة بـ touch)، وغير المذكورة تبقى كما هي
+        version: فرض رقم الإصدار بدلاً من زيادته (لمطابقة إصدارات العملية القائدة)
+        """
+        with self._lock:
+            if version is not None and version < self.version:
+                # العملية القائدة بدأت ترقيماً جديداً: إعادة التتبع من الصفر
+                self._shadow.clear()
+                self._field_versions.clear()
+                self._index.clear()
+                self._indexed_since = 0
+            next_version = self.version + 1 if version is None else version
+            changed_pumps = []
+
+            for pump_id, pump in pumps.items():
+                changed = False
+                shadow = self._shadow.setdefault(pump_id, {})
+                versions = self._field_versions.setdefault(pump_id, {})
+
+                for field, value in pump.items():
+                    if isinstance(value, dict):
+                        # الحقول المتداخلة (المقاييس والحدود) تُتتبع حقلاً حقلاً
+                        sub_shadow = shadow.setdefault(field, {})
+                        sub_versions = versions.get(field)
+                        if not isinstance(sub_versions, dict):
+                            sub_versions = versions[field] = {}
+                        for key, sub_value in value.items():
+                            if key not in sub_shadow or sub_shadow[key] != sub_value:
+                                sub_shadow[key] = copy.deepcopy(sub_value)
+                                sub_versions[key] = next_version
+                                changed = True
+                    elif field not in shadow or shadow[field] != value:
+                        shadow[field] = copy.deepcopy(value)
+                        versions[field] = next_version
+                        changed = True
+                if changed:
+                    changed_pumps.append(pump_id)
+
+            if changed_pumps:
+                if len(self._index) >= self._index_size:
+                    # الإصدار الأقدم يخرج من الفهرس فلا يغطي ما قبله
+                    self._indexed_since = self._index.popleft()[0]
+                self._index.append((next_version, changed_pumps))
+            if changed_pumps or version is not None:
+                self.version = next_version
+            return self.version
+
+    def _changed_pumps(self, since: int) -> Iterable[int]:
+        """المضخات التي قد تكون تغيرت بعد الإصدار المحدد (من الفهرس إن غطاه)"""
+        if since < self._indexed_since:
+            return list(self._field_versions)
+        pumps = set()
+        for entry_version, pump_ids in reversed(self._index):
+            if entry_version <= since:
+                break
+            pumps.update(pump_ids)
+        return sorted(pumps)
+
+    def changes_since(self, since: int, exclude: Iterable[str] = ()) -> Dict[int, Dict[str, Any]]:
+        """
+        الحصول على الحقول التي تغيرت بعد الإصدار المحدد
+
+        exclude: حقول تُنقل بطريقة أخرى (مثل إطارات القياسات الثنائية)
+        """
+        exclude = frozenset(exclude)
+        with self._lock:
+            changes = {}
+            for pump_id in self._changed_pumps(since):
+                versions = self._field_versions[pump_id]
+                shadow = self._shadow[pump_id]
+                pump_changes = {}
+                for field, field_version in versions.items():
+                    if field in exclude:
+                        continue
+                    if isinstance(field_version, dict):
+                        sub_changes = {
+                            key: shadow[field][key]
+                            for key, sub_version in field_version.items()
+                            if sub_version > since
+                        }
+                        if sub_changes:
+                            pump_changes[field] = sub_changes
+                    elif field_version > since:
+                        pump_changes[field] = shadow[field]
+                if pump_changes:
+                    changes[pump_id] = pump_changes
+            return changes
+
+    def pumps_changed_since(self, since: int, fields: Iterable[str]) -> Set[int]:
+        """المضخات التي تغير أحد الحقول المحددة فيها بعد الإصدار المحدد"""
+        with self._lock:
+            changed = set()
+            for pump_id in self._changed_pumps(since):
+                versions = self._field_versions[pump_id]
+                for field in fields:
+                    field_version = versions.get(field)
+                    if field_version is None:
+                        continue
+                    if isinstance(field_version, dict):
+                        field_version = max(field_version.values(), default=0)
+                    if field_version > since:
+                        changed.add(pump_id)
+                        break
+            return changed
+
+    def can_serve(self, since: Optional[int]) -> bool:
+        """هل يمكن خدمة العميل بفروقات بدلاً من لقطة كاملة"""
+        return since is not None and 0 < since <= self.version
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+قناة أوامر إيقاف الطوارئ
+Emergency Stop Command Channel
+
+أوامر الطوارئ (من HTTP أو Socket.IO) تُنفذ في مالك الحالة بأولوية تتقدم على دورة
+المراقبة وبقية الأوامر، ويُرسل إشعار مختصر بمعرفات المضخات المتوقفة قبل أي عمل
+آخر. لكل أمر يُسجل زمن كل مرحلة منذ استلامه: تطبيق الإيقاف، إرسال الإشعار، وآخر
+تأكيد استلام من العملاء، لإثبات أن زمن الإيقاف محدود تحت الحمل الكامل.
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# عدد الأوامر الأخيرة المحتفظ بأزمنتها
+HISTORY_SIZE = 200
+
+# عدد الأوامر الأخيرة المعروضة بالتفصيل في الإحصائيات
+RECENT_LIMIT = 10
+
+# مراحل الأمر المقيسة منذ استلامه
+STAGES = ('applied', 'emitted', 'last_ack')
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class EmergencyTracker:
+    """
+    أزمنة أوامر الطوارئ الأخيرة
+    Per-command receipt -> applied -> emitted -> last client ack latency
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE, clock: Callable[[], float] = time.time):
+        """
+        تهيئة السجل
+
+        clock: ساعة الزمن الحقيقي (تأكيدات العملاء قد تصل من عملية أخرى في العنقود)
+        """
+        self.size = size
+        self.clock = clock
+        self._commands: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.total = 0
+        self.acks = 0
+
+    def begin(self, source: str, user: str, received: Optional[float] = None) -> Dict:
+        """تسجيل استلام أمر جديد قبل إرساله لمالك الحالة (received: زمن الاستلام إن سبق التسجيل)"""
+        command = {
+            'id': uuid.uuid4().hex[:12],
+            'source': source,
+            'user': user,
+            'received': self.clock() if received is None else received,
+            'applied': None,
+            'emitted': None,
+            'last_ack': None,
+            'pumps': 0,
+            'clients': 0,
+            'acks': 0,
+        }
+        with self._lock:
+            self._commands[command['id']] = command
+            while len(self._commands) > self.size:
+                self._commands.popitem(last=False)
+            self.total += 1
+        return command
+
+    def mark(self, command: Dict, stage: str, **fields):
+        """تسجيل انتهاء مرحلة من الأمر مع حقول إضافية (عدد المضخات والعملاء)"""
+        command[stage] = self.clock()
+        command.update(fields)
+
+    def ack(self, command_id: str, at: Optional[float] = None) -> bool:
+        """تأكيد استلام عميل للإشعار (يرجع False إن لم يكن الأمر من هذه العملية)"""
+        at = self.clock() if at is None else at
+        with self._lock:
+            command = self._commands.get(command_id)
+            if command is None:
+                return False
+            command['acks'] += 1
+            if command['last_ack'] is None or at > command['last_ack']:
+                command['last_ack'] = at
+            self.acks += 1
+        return True
+
+    @staticmethod
+    def describe(command: Dict) -> Dict:
+        """الأمر بأزمنة مراحله بالمللي ثانية منذ الاستلام"""
+        result = {key: command[key] for key in ('id', 'source', 'user', 'pumps', 'clients', 'acks')}
+        for stage in STAGES:
+            stamp = command[stage]
+            result[f'{stage}_ms'] = round((stamp - command['received']) * 1000, 2) if stamp is not None else None
+        return result
+
+    def stats(self) -> Dict:
+        """ملخص الأزمنة للأوامر الأخيرة وتفاصيل آخرها"""
+        with self._lock:
+            commands = [self.describe(command) for command in self._commands.values()]
+            totals = {'commands': self.total, 'acks': self.acks}
+
+        latency = {}
+        for stage in STAGES:
+            values = [command[f'{stage}_ms'] for command in commands if command[f'{stage}_ms'] is not None]
+            latency[stage] = {
+                'count': len(values),
+                'p50_ms': _percentile(values, 0.50) if values else 0.0,
+                'p95_ms': _percentile(values, 0.95) if values else 0.0,
+                'max_ms': max(values) if values else 0.0,
+            }
+        return {
+            **totals,
+            'latency': latency,
+            'recent': commands[-RECENT_LIMIT:][::-1],
+        }
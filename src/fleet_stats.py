@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+مجاميع الأسطول التراكمية
+Incremental Fleet Aggregates
+
+يحفظ أعداد المضخات حسب الحالة وأعداد التنبيهات حسب الخطورة ومجاميع الإنتاج
+والكفاءة، ويحدّثها عند كل تغيير في الحالة بدلاً من المرور على جميع المضخات في
+كل طلب إحصائيات أو دورة حساب لصحة النظام، فتصبح قراءتها بزمن ثابت.
+"""
+
+from typing import Dict, List, Sequence
+
+
+class FleetAggregates:
+    """
+    مجاميع الأسطول المحدثة تدريجياً
+    Counts and sums kept up to date on every state change
+    """
+
+    def __init__(self):
+        """تهيئة المجاميع"""
+        self.total_pumps = 0
+        self.status_counts: Dict[str, int] = {}
+        self.severity_counts: Dict[str, int] = {}
+        self.active_alerts = 0
+        self.total_production = 0.0
+        self.efficiency_sum = 0.0
+        self.running_efficiency_sum = 0.0
+
+    def count(self, status: str) -> int:
+        """عدد المضخات في حالة معينة"""
+        return self.status_counts.get(status, 0)
+
+    def add_pump(self, status: str, alerts: List[Dict], efficiency: float, production: float):
+        """إضافة مضخة إلى المجاميع"""
+        self.total_pumps += 1
+        self.status_counts[status] = self.count(status) + 1
+        self.change_alerts([], alerts)
+        self.total_production += production
+        self.efficiency_sum += efficiency
+        if status == 'running':
+            self.running_efficiency_sum += efficiency
+
+    def change_status(self, old: str, new: str, efficiency: float):
+        """تغيير حالة مضخة (efficiency: كفاءتها الحالية لتحديث مجموع كفاءة المضخات العاملة)"""
+        if old == new:
+            return
+        self.status_counts[old] = self.count(old) - 1
+        self.status_counts[new] = self.count(new) + 1
+        if old == 'running':
+            self.running_efficiency_sum -= efficiency
+        elif new == 'running':
+            self.running_efficiency_sum += efficiency
+
+    def change_alerts(self, old: List[Dict], new: List[Dict]):
+        """استبدال قائمة تنبيهات مضخة"""
+        for alert in old:
+            self.severity_counts[alert['severity']] -= 1
+        for alert in new:
+            self.severity_counts[alert['severity']] = self.severity_counts.get(alert['severity'], 0) + 1
+        self.active_alerts += len(new) - len(old)
+
+    def refresh_metrics(self, efficiency: Sequence[float], production: Sequence[float], statuses: Sequence[str]):
+        """
+        إعادة حساب مجاميع القياسات بعد خطوة المخزن العمودي
+
+        تتغير جميع القياسات في كل دورة، فتُجمع مرة واحدة لكل دورة (مع تصحيح أي
+        انحراف متراكم من الإضافة والطرح) وتبقى القراءة بين الدورات بزمن ثابت.
+        """
+        self.efficiency_sum = sum(efficiency)
+        self.total_production = sum(production)
+        self.running_efficiency_sum = sum(
+            value for value, status in zip(efficiency, statuses) if status == 'running'
+        )
+
+    def summary(self) -> Dict:
+        """ملخص الإحصائيات بالشكل الذي تعرضه واجهة الإحصائيات"""
+        return {
+            'total_pumps': self.total_pumps,
+            'running_pumps': self.count('running'),
+            'stopped_pumps': self.count('stopped'),
+            'maintenance_pumps': self.count('maintenance'),
+            'total_production': round(self.total_production, 1),
+            'avg_efficiency': round(self.efficiency_sum / self.total_pumps, 1) if self.total_pumps else 0,
+            'active_alerts': self.active_alerts,
+        }
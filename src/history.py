@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+مخزن السلاسل الزمنية لقياسات المضخات
+Pump Metrics Time-Series History Store
+
+يحفظ تاريخ كل مقياس لكل مضخة في مخازن حلقية محدودة الحجم بعدة دقات:
+القراءات الخام (كل 5 ثوان) وتجميعات دقيقة و15 دقيقة وساعة (أدنى/أعلى/متوسط).
+الاستعلام يختار أرخص دقة تغطي النافذة المطلوبة دون المرور على القراءات الخام.
+"""
+
+import math
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from telemetry_store import METRIC_NAMES
+
+
+class Resolution:
+    """
+    دقة تخزين واحدة (مدة الخانة وعدد الخانات المحفوظة)
+    One storage resolution: bucket width and retained bucket count
+    """
+
+    def __init__(self, name: str, seconds: int, capacity: int):
+        self.name = name
+        self.seconds = seconds
+        self.capacity = capacity
+
+    @property
+    def retention(self) -> int:
+        """المدة الزمنية التي تغطيها هذه الدقة بالثواني"""
+        return self.seconds * self.capacity
+
+
+# الخام: ساعة، دقيقة: يوم، 15 دقيقة: أسبوع، ساعة: 31 يوماً
+DEFAULT_RESOLUTIONS = (
+    Resolution('raw', 5, 720),
+    Resolution('1m', 60, 1440),
+    Resolution('15m', 900, 672),
+    Resolution('1h', 3600, 744),
+)
+
+# الحد الأقصى لعدد النقاط المرجعة عند اختيار الدقة تلقائياً
+DEFAULT_MAX_POINTS = 1000
+
+
+class _Ring:
+    """مخزن حلقي بأعمدة ثابتة الحجم لطوابع الوقت وقيم كل مقياس"""
+
+    def __init__(self, capacity: int, aggregated: bool):
+        self.capacity = capacity
+        self.aggregated = aggregated
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.avg = {name: array('f', bytes(4 * capacity)) for name in METRIC_NAMES}
+        if aggregated:
+            self.min = {name: array('f', bytes(4 * capacity)) for name in METRIC_NAMES}
+            self.max = {name: array('f', bytes(4 * capacity)) for name in METRIC_NAMES}
+        self.head = 0
+        self.size = 0
+
+    def append(self, timestamp: float, avg: Sequence[float],
+               mins: Optional[Sequence[float]] = None, maxs: Optional[Sequence[float]] = None):
+        """إضافة خانة (تستبدل الأقدم عند الامتلاء)"""
+        index = self.head
+        self.timestamps[index] = timestamp
+        for position, name in enumerate(METRIC_NAMES):
+            self.avg[name][index] = avg[position]
+            if self.aggregated:
+                self.min[name][index] = mins[position]
+                self.max[name][index] = maxs[position]
+        self.head = (index + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    @property
+    def full(self) -> bool:
+        return self.size == self.capacity
+
+    @property
+    def oldest(self) -> float:
+        """أقدم طابع زمني محفوظ"""
+        return self.timestamps[self._physical(0)]
+
+    def _physical(self, logical: int) -> int:
+        return (self.head - self.size + logical) % self.capacity
+
+    def _bisect(self, timestamp: float) -> int:
+        """أول موقع منطقي طابعه الزمني >= timestamp"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[self._physical(middle)] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def points(self, metric: str, start: float, end: float) -> List[List[float]]:
+        """النقاط داخل النافذة [start, end] بترتيب زمني"""
+        first = self._bisect(start)
+        last = self._bisect(end + 1e-9)
+        avg = self.avg[metric]
+        result = []
+        for logical in range(first, last):
+            index = self._physical(logical)
+            if self.aggregated:
+                result.append([self.timestamps[index], round(avg[index], 3),
+                               round(self.min[metric][index], 3), round(self.max[metric][index], 3)])
+            else:
+                value = round(avg[index], 3)
+                result.append([self.timestamps[index], value, value, value])
+        return result
+
+
+class _Bucket:
+    """خانة تجميع مفتوحة (مجموع/أدنى/أعلى/عدد) لكل مقياس"""
+
+    __slots__ = ('start', 'sums', 'mins', 'maxs', 'count')
+
+    def __init__(self, start: float, values: Sequence[float]):
+        self.start = start
+        self.sums = list(values)
+        self.mins = list(values)
+        self.maxs = list(values)
+        self.count = 1
+
+    def add(self, values: Sequence[float]):
+        sums, mins, maxs = self.sums, self.mins, self.maxs
+        for position, value in enumerate(values):
+            sums[position] += value
+            if value < mins[position]:
+                mins[position] = value
+            if value > maxs[position]:
+                maxs[position] = value
+        self.count += 1
+
+    def averages(self) -> List[float]:
+        return [total / self.count for total in self.sums]
+
+
+class _PumpHistory:
+    """تاريخ مضخة واحدة بجميع الدقات"""
+
+    def __init__(self, resolutions: Tuple[Resolution, ...]):
+        self.rings = {res.name: _Ring(res.capacity, aggregated=(index > 0))
+                      for index, res in enumerate(resolutions)}
+        self.buckets: Dict[str, _Bucket] = {}
+
+
+class HistoryStore:
+    """
+    مخزن التاريخ لجميع المضخات
+    Bounded ring-buffer time-series store with automatic rollups
+    """
+
+    def __init__(self, resolutions: Tuple[Resolution, ...] = DEFAULT_RESOLUTIONS):
+        """تهيئة المخزن"""
+        self.resolutions = resolutions
+        self.raw = resolutions[0]
+        self.rollups = resolutions[1:]
+        self._pumps: Dict[int, _PumpHistory] = {}
+        self._lock = threading.Lock()
+        # أرشيف القرص الاختياري (TelemetryArchive) للقراءات والتجميعات المغلقة
+        self.archive = None
+
+    def resolution(self, name: str) -> Optional[Resolution]:
+        """الحصول على دقة بالاسم"""
+        for res in self.resolutions:
+            if res.name == name:
+                return res
+        return None
+
+    def record(self, pump_id: int, timestamp: float, values: Sequence[float]):
+        """تسجيل قراءة لمضخة (القيم بترتيب METRIC_NAMES)"""
+        with self._lock:
+            closed = self._record(pump_id, timestamp, values)
+        self._archive([(timestamp, pump_id, *values)], closed)
+
+    def record_batch(self, timestamp: float, pump_ids: Sequence[int],
+                     columns: Dict[str, Sequence[float]], slots: Optional[Sequence[int]] = None):
+        """تسجيل قراءات عدة مضخات من أعمدة المخزن العمودي دفعة واحدة"""
+        metric_columns = [columns[name] for name in METRIC_NAMES]
+        scope = range(len(pump_ids)) if slots is None else slots
+        raw_rows = []
+        closed = []
+        with self._lock:
+            for slot in scope:
+                values = [column[slot] for column in metric_columns]
+                closed.extend(self._record(pump_ids[slot], timestamp, values))
+                raw_rows.append((timestamp, pump_ids[slot], *values))
+        self._archive(raw_rows, closed)
+
+    def _archive(self, raw_rows: List[tuple], closed: List[Tuple[str, tuple]]):
+        """كتابة القراءات الخام والخانات المغلقة في أرشيف القرص إن وجد"""
+        if self.archive is None:
+            return
+
+        self.archive.append_raw(raw_rows)
+        by_resolution: Dict[str, List[tuple]] = {}
+        for name, row in closed:
+            by_resolution.setdefault(name, []).append(row)
+        for name, rows in by_resolution.items():
+            self.archive.append_rollups(name, rows)
+
+    def restore(self, resolution: str, pump_id: int, timestamp: float, avg: Sequence[float],
+                mins: Optional[Sequence[float]] = None, maxs: Optional[Sequence[float]] = None):
+        """إعادة خانة محفوظة إلى المخزن الحلقي مباشرة (عند بدء التشغيل)"""
+        with self._lock:
+            history = self._pumps.get(pump_id)
+            if history is None:
+                history = self._pumps[pump_id] = _PumpHistory(self.resolutions)
+            history.rings[resolution].append(timestamp, avg, mins, maxs)
+
+    def _record(self, pump_id: int, timestamp: float, values: Sequence[float]) -> List[Tuple[str, tuple]]:
+        """تسجيل قراءة وإرجاع الخانات التي أغلقت بسببها"""
+        history = self._pumps.get(pump_id)
+        if history is None:
+            history = self._pumps[pump_id] = _PumpHistory(self.resolutions)
+
+        history.rings[self.raw.name].append(timestamp, values)
+        closed = []
+
+        for res in self.rollups:
+            start = math.floor(timestamp / res.seconds) * res.seconds
+            bucket = history.buckets.get(res.name)
+            if bucket is None or bucket.start != start:
+                if bucket is not None:
+                    # إغلاق الخانة السابقة ونقلها إلى المخزن الحلقي
+                    averages = bucket.averages()
+                    history.rings[res.name].append(bucket.start, averages, bucket.mins, bucket.maxs)
+                    closed.append((res.name, (bucket.start, pump_id, *averages, *bucket.mins, *bucket.maxs)))
+                history.buckets[res.name] = _Bucket(start, values)
+            else:
+                bucket.add(values)
+
+        return closed
+
+    def _covered_from(self, pump_id: Optional[int], res: Resolution, now: float) -> float:
+        """
+        أقدم وقت تغطيه دقة في الذاكرة لمضخة
+
+        سعة الحلقة بعدد الخانات لا بالزمن: مضخة تُقرأ أسرع من فاصل الدقة (مثل
+        الغاطسة كل ثانية) تملأ حلقتها الخام قبل انقضاء مدتها المعلنة، فيُعتمد
+        أقدم طابع محفوظ متى امتلأت
+        """
+        covered = now - res.retention
+        history = self._pumps.get(pump_id) if pump_id is not None else None
+        if history is not None:
+            ring = history.rings[res.name]
+            if ring.full:
+                covered = max(covered, ring.oldest)
+        return covered
+
+    def choose_resolution(self, start: float, end: float, now: float,
+                          max_points: int = DEFAULT_MAX_POINTS,
+                          pump_id: Optional[int] = None) -> Resolution:
+        """اختيار أدق دقة تغطي النافذة دون تجاوز الحد الأقصى لعدد النقاط"""
+        span = max(end - start, 0)
+        with self._lock:
+            covering = [res for res in self.resolutions if self._covered_from(pump_id, res, now) <= start]
+        for res in covering:
+            if span / res.seconds <= max_points:
+                return res
+        return covering[-1] if covering else self.resolutions[-1]
+
+    def query(self, pump_id: int, metric: str, start: float, end: float, now: float,
+              resolution: Optional[str] = None, max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+        """
+        الاستعلام عن تاريخ مقياس لمضخة ضمن نافذة زمنية
+
+        يرجع النقاط بالشكل [الطابع الزمني، المتوسط، الأدنى، الأعلى]
+        """
+        if metric not in METRIC_NAMES:
+            raise ValueError(f"مقياس غير معروف: {metric}")
+
+        if resolution:
+            res = self.resolution(resolution)
+        else:
+            res = self.choose_resolution(start, end, now, max_points, pump_id)
+        if res is None:
+            raise ValueError(f"دقة غير معروفة: {resolution}")
+
+        with self._lock:
+            history = self._pumps.get(pump_id)
+            if history is None:
+                points = []
+            elif self.archive is not None and start < self._covered_from(pump_id, res, now):
+                # النافذة أقدم مما تحفظه الذاكرة: القراءة من أرشيف القرص
+                points = self.archive.points(pump_id, metric, res.name, start, end)
+            else:
+                points = history.rings[res.name].points(metric, start, end)
+
+                # إضافة الخانة المفتوحة حالياً كنقطة جزئية
+                bucket = history.buckets.get(res.name)
+                if bucket is not None and start <= bucket.start <= end:
+                    position = METRIC_NAMES.index(metric)
+                    points.append([bucket.start, round(bucket.sums[position] / bucket.count, 3),
+                                   round(bucket.mins[position], 3), round(bucket.maxs[position], 3)])
+
+        return {
+            'metric': metric,
+            'resolution': res.name,
+            'interval': res.seconds,
+            'from': start,
+            'to': end,
+            'points': points
+        }
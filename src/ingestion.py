@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+استقبال القياسات من مصادر متعددة
+Pluggable Telemetry Ingestion Pipeline
+
+تُجمع قياسات كل دورة مراقبة من سلسلة مصادر بالترتيب:
+- ingest: قراءات حساسات حقيقية تصل دفعات عبر HTTP أو مستمرة عبر UDP، تُتحقق منها
+  عند الاستلام وتُجمع في مخزن مؤقت (آخر قيمة لكل مقياس) ثم تُكتب في المخزن العمودي
+  دفعة واحدة في الدورة التالية
+- simulator: المسار العشوائي الحالي لمحاكاة القياسات
+
+المضخة التي وصلتها قراءات حقيقية مؤخراً يملكها مصدر الاستقبال فلا يُخلط بها مسار
+المحاكاة، وتعود للمحاكاة إن انقطعت قراءاتها لمدة INGEST_TIMEOUT.
+
+صيغة الدفعة (JSON):
+    {"readings": [{"pump_id": 1, "metrics": {"pressure": 61.2, ...},
+                   "production_today": 3120.5, "timestamp": 1760700000.0}, ...]}
+
+صيغة أسطر UDP (سطر لكل قراءة، عدة أسطر في الحزمة الواحدة):
+    <pump_id> <metric>=<value>,<metric>=<value>[,production=<value>] [timestamp]
+"""
+
+import math
+import time
+import socket
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from telemetry_store import METRIC_SPECS, TelemetryStore
+
+logger = logging.getLogger(__name__)
+
+# موقع كل حقل في قيم القراءة: المقاييس بترتيب المخطط ثم الإنتاج اليومي
+FIELD_INDEX = {name: index for index, (name, _, _, _) in enumerate(METRIC_SPECS)}
+PRODUCTION_INDEX = len(METRIC_SPECS)
+FIELD_INDEX['production'] = FIELD_INDEX['production_today'] = PRODUCTION_INDEX
+
+# حدود القيم المقبولة (القيم خارجها قراءات حساس معطوب)
+FIELD_BOUNDS = [(low, high) for _, low, high, _ in METRIC_SPECS] + [(0.0, math.inf)]
+
+# المدة (بالثواني) التي تبقى فيها المضخة لمصدر الاستقبال بعد آخر قراءة حقيقية
+INGEST_TIMEOUT = 60.0
+
+# أكبر عدد من القراءات في الدفعة الواحدة
+MAX_BATCH = 50000
+
+# أكبر حجم لحزمة UDP
+MAX_DATAGRAM = 65535
+
+# قراءة بعد التحقق: (خانة المضخة، القيم بترتيب FIELD_INDEX مع None للمفقود، الطابع الزمني)
+Reading = Tuple[int, List[Optional[float]], Optional[float]]
+
+
+def _values(fields: Dict[str, Any]) -> List[Optional[float]]:
+    """تحويل حقول قراءة إلى قائمة قيم مع التحقق من الاسم والنوع والحدود"""
+    values: List[Optional[float]] = [None] * (PRODUCTION_INDEX + 1)
+    for name, value in fields.items():
+        index = FIELD_INDEX.get(name)
+        if index is None:
+            raise ValueError(f'مقياس غير معروف: {name}')
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f'قيمة غير رقمية للمقياس {name}')
+        low, high = FIELD_BOUNDS[index]
+        if not low <= value <= high:
+            raise ValueError(f'قيمة المقياس {name} خارج الحدود المسموحة: {value}')
+        values[index] = float(value)
+    return values
+
+
+def parse_batch(payload: Any, slots: Dict[int, int]) -> Tuple[List[Reading], List[Dict]]:
+    """
+    التحقق من دفعة قراءات JSON
+
+    slots: خانة كل مضخة في المخزن العمودي
+    يرجع القراءات الصالحة وأخطاء القراءات المرفوضة (لا ترفض الدفعة كاملة بسبب قراءة واحدة)،
+    ويرفع ValueError إن كانت الدفعة نفسها غير صالحة
+    """
+    readings = payload.get('readings') if isinstance(payload, dict) else payload
+    if not isinstance(readings, list):
+        raise ValueError('الدفعة يجب أن تحتوي على قائمة readings')
+    if len(readings) > MAX_BATCH:
+        raise ValueError(f'عدد القراءات يتجاوز الحد الأقصى {MAX_BATCH}')
+
+    accepted: List[Reading] = []
+    errors: List[Dict] = []
+    for index, reading in enumerate(readings):
+        try:
+            if not isinstance(reading, dict):
+                raise ValueError('القراءة يجب أن تكون كائناً')
+            pump_id = reading.get('pump_id')
+            slot = slots.get(pump_id) if isinstance(pump_id, int) and not isinstance(pump_id, bool) else None
+            if slot is None:
+                raise ValueError(f'المضخة غير موجودة: {pump_id}')
+            fields = reading.get('metrics') or {}
+            if not isinstance(fields, dict):
+                raise ValueError('حقل metrics يجب أن يكون كائناً')
+            if 'production_today' in reading:
+                fields = {**fields, 'production_today': reading['production_today']}
+            values = _values(fields)
+            if all(value is None for value in values):
+                raise ValueError('القراءة لا تحتوي على قيم')
+            stamp = reading.get('timestamp')
+            if stamp is not None and (isinstance(stamp, bool) or not isinstance(stamp, (int, float))
+                                      or not math.isfinite(stamp)):
+                raise ValueError('الطابع الزمني يجب أن يكون رقماً (ثوان منذ 1970)')
+            accepted.append((slot, values, stamp))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return accepted, errors
+
+
+def parse_lines(text: str, slots: Dict[int, int]) -> Tuple[List[Reading], int]:
+    """
+    التحقق من أسطر قراءات UDP
+
+    يرجع القراءات الصالحة وعدد الأسطر المرفوضة
+    """
+    accepted: List[Reading] = []
+    rejected = 0
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            if len(parts) not in (2, 3):
+                raise ValueError('صيغة السطر غير صالحة')
+            slot = slots.get(int(parts[0]))
+            if slot is None:
+                raise ValueError(f'المضخة غير موجودة: {parts[0]}')
+            fields = {}
+            for pair in parts[1].split(','):
+                name, _, value = pair.partition('=')
+                fields[name] = float(value)
+            values = _values(fields)
+            stamp = float(parts[2]) if len(parts) == 3 else None
+            if stamp is not None and not math.isfinite(stamp):
+                raise ValueError('الطابع الزمني غير صالح')
+            accepted.append((slot, values, stamp))
+        except ValueError:
+            rejected += 1
+    return accepted, rejected
+
+
+class IngestSource:
+    """
+    مصدر القراءات الحقيقية: مخزن مؤقت تكتب فيه خيوط الاستقبال ويُفرغ في دورة المراقبة
+    Buffered external readings (submit from any thread, collect in the state actor)
+    """
+
+    name = 'ingest'
+
+    def __init__(self, telemetry: TelemetryStore, timeout: float = INGEST_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        """تهيئة المصدر"""
+        self.telemetry = telemetry
+        self.timeout = timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        # آخر قيمة لكل حقل لم تُكتب بعد في المخزن العمودي، لكل خانة
+        self._pending: Dict[int, List[Optional[float]]] = {}
+        # آخر طابع زمني مقبول لكل خانة (لإسقاط القراءات المتأخرة في الوصول)
+        self._stamps: Dict[int, float] = {}
+        # وقت آخر قراءة لكل خانة (المضخات التي يملكها المصدر)
+        self._last_seen: Dict[int, float] = {}
+        # عدادات تراكمية
+        self.accepted = 0
+        self.rejected = 0
+        self.stale = 0
+        self.batches = 0
+
+    def submit(self, readings: List[Reading], rejected: int = 0) -> int:
+        """إضافة قراءات تم التحقق منها إلى المخزن المؤقت (يرجع عدد المقبولة)"""
+        now = self.clock()
+        accepted = 0
+        with self._lock:
+            pending = self._pending
+            stamps = self._stamps
+            for slot, values, stamp in readings:
+                if stamp is not None:
+                    if stamp < stamps.get(slot, 0.0):
+                        self.stale += 1
+                        continue
+                    stamps[slot] = stamp
+                current = pending.get(slot)
+                if current is None:
+                    pending[slot] = values
+                else:
+                    # دمج قراءات المضخة نفسها بين دورتين: الأحدث لكل حقل
+                    for index, value in enumerate(values):
+                        if value is not None:
+                            current[index] = value
+                self._last_seen[slot] = now
+                accepted += 1
+            self.accepted += accepted
+            self.rejected += rejected
+            self.batches += 1
+        return accepted
+
+    def claimed(self) -> Set[int]:
+        """الخانات التي وصلتها قراءات حقيقية خلال مهلة المصدر"""
+        now = self.clock()
+        with self._lock:
+            expired = [slot for slot, seen in self._last_seen.items() if now - seen > self.timeout]
+            for slot in expired:
+                del self._last_seen[slot]
+            return set(self._last_seen)
+
+    def collect(self, statuses: List[str], due: Optional[List[int]], scales: Optional[List[float]],
+                skip: Set[int]) -> List[int]:
+        """كتابة القراءات المعلقة في المخزن العمودي دفعة واحدة (بغض النظر عن جدول المضخة)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        columns = [self.telemetry.columns[name] for name, _, _, _ in METRIC_SPECS]
+        digits = [spec[3] for spec in METRIC_SPECS]
+        production = self.telemetry.production
+        for slot, values in pending.items():
+            for index, column in enumerate(columns):
+                value = values[index]
+                if value is not None:
+                    column[slot] = round(value, digits[index])
+            if values[PRODUCTION_INDEX] is not None:
+                production[slot] = values[PRODUCTION_INDEX]
+        return sorted(pending)
+
+    def stats(self) -> Dict:
+        """عدادات الاستقبال"""
+        with self._lock:
+            return {
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'stale': self.stale,
+                'batches': self.batches,
+                'pending': len(self._pending),
+                'live_pumps': len(self._last_seen),
+            }
+
+
+class SimulatedSource:
+    """
+    مصدر القياسات المحاكاة (المسار العشوائي في المخزن العمودي)
+    Random-walk simulator for scheduled pumps without live readings
+    """
+
+    name = 'simulator'
+
+    def __init__(self, telemetry: TelemetryStore):
+        """تهيئة المصدر"""
+        self.telemetry = telemetry
+        # سيناريو أعطال مجدول يُطبق بعد كل خطوة (اختياري، من وضع المحاكاة)
+        self.faults = None
+
+    def claimed(self) -> Set[int]:
+        """المحاكاة لا تحجز مضخات عن المصادر التالية"""
+        return set()
+
+    def collect(self, statuses: List[str], due: Optional[List[int]], scales: Optional[List[float]],
+                skip: Set[int]) -> Optional[List[int]]:
+        """خطوة محاكاة للخانات المستحقة التي لا يملكها مصدر سابق (None = الأسطول كاملاً)"""
+        if due is None and not skip:
+            self.telemetry.step(statuses)
+            if self.faults is not None:
+                self.faults.apply(self.telemetry, statuses, None, None)
+            return None
+
+        if due is None:
+            due = list(range(len(self.telemetry)))
+        if skip:
+            kept = [index for index, slot in enumerate(due) if slot not in skip]
+            due = [due[index] for index in kept]
+            scales = [scales[index] for index in kept] if scales is not None else None
+        if due:
+            self.telemetry.step(statuses, due, scales)
+            if self.faults is not None:
+                self.faults.apply(self.telemetry, statuses, due, scales)
+        return due
+
+
+# المصادر المتاحة بالاسم (OIL_PUMP_SOURCES)
+SOURCES = {
+    IngestSource.name: IngestSource,
+    SimulatedSource.name: SimulatedSource,
+}
+
+DEFAULT_SOURCES = 'ingest,simulator'
+
+
+class TelemetryPipeline:
+    """
+    سلسلة مصادر القياس بترتيب الأولوية
+    Ordered telemetry sources; earlier sources own the pumps they claim
+    """
+
+    def __init__(self, telemetry: TelemetryStore, names: str = DEFAULT_SOURCES):
+        """تهيئة السلسلة من أسماء المصادر مفصولة بفواصل"""
+        self.telemetry = telemetry
+        self.sources = []
+        for name in (name.strip() for name in names.split(',')):
+            if name not in SOURCES:
+                raise ValueError(f'مصدر قياسات غير معروف: {name}')
+            self.sources.append(SOURCES[name](telemetry))
+
+    def source(self, name: str):
+        """مصدر بالاسم (None إن لم يكن في السلسلة)"""
+        return next((source for source in self.sources if source.name == name), None)
+
+    def collect(self, statuses: List[str], due: Optional[List[int]],
+                scales: Optional[List[float]] = None) -> Optional[List[int]]:
+        """
+        جمع قياسات الدورة من جميع المصادر
+
+        due: الخانات المستحقة حسب الجدولة (None = الأسطول كاملاً)
+        يرجع الخانات التي كُتبت قياساتها مرتبة (None = الأسطول كاملاً)
+        """
+        written: Set[int] = set()
+        everything = False
+        skip: Set[int] = set()
+        for source in self.sources:
+            slots = source.collect(statuses, due, scales, skip)
+            if slots is None:
+                # المصدر كتب الأسطول كاملاً
+                everything = True
+            else:
+                written.update(slots)
+            skip |= source.claimed()
+        return None if everything else sorted(written)
+
+
+class UdpListener:
+    """
+    مستمع UDP لأسطر القراءات
+    Datagram listener; each datagram carries one or more reading lines
+    """
+
+    def __init__(self, address: str, handle: Callable[[str], None]):
+        """
+        address: العنوان بالشكل host:port
+        handle: معالجة نص الحزمة (التحقق والإضافة إلى المخزن المؤقت)
+        """
+        host, _, port = address.rpartition(':')
+        self.address = (host or '0.0.0.0', int(port))
+        self.handle = handle
+        self.sock: Optional[socket.socket] = None
+
+    def bind(self):
+        """فتح المقبس (مخزن استقبال كبير لامتصاص الدفعات بين دورتي قراءة)"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind(self.address)
+        self.address = self.sock.getsockname()
+        logger.info(f"مستمع قراءات UDP على {self.address[0]}:{self.address[1]}")
+
+    def serve(self):
+        """استقبال الحزم إلى ما لا نهاية (في مهمة خلفية)"""
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+                self.handle(data.decode('utf-8', errors='replace'))
+            except OSError as e:
+                logger.error(f"توقف مستمع قراءات UDP: {str(e)}")
+                return
+            except Exception as e:
+                logger.error(f"خطأ في معالجة حزمة قراءات UDP: {str(e)}")
@@ -19,19 +19,64 @@ Professional system for monitoring and controlling oil pumps for oil companies
 
 import os
 import sys
+
+# وضع الخادم: threading (تطوير)، eventlet أو gevent (إنتاج)
+# يجب ترقيع المكتبات القياسية قبل استيراد أي مكتبة شبكية
+ASYNC_MODE = os.environ.get('OIL_PUMP_ASYNC_MODE', 'threading')
+ASYNC_MODE_FALLBACK = None
+try:
+    if ASYNC_MODE == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif ASYNC_MODE == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    elif ASYNC_MODE != 'threading':
+        raise ImportError(f"وضع غير معروف: {ASYNC_MODE}")
+except ImportError as e:
+    ASYNC_MODE_FALLBACK = f"{ASYNC_MODE} ({e})"
+    ASYNC_MODE = 'threading'
+
 import json
 import time
 import random
 import logging
+import itertools
 import threading
+from bisect import bisect_left
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple, Callable
 
 # Flask and extensions
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, g, render_template, request, jsonify, send_from_directory
 from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
 from flask_cors import CORS
 
+from alert_rules import AlertEngine
+from anomaly import AnomalyDetector
+from backpressure import DOWNGRADE_INTERVAL, HIGH_WATERMARK, LOW_WATERMARK, MAX_QUEUE, FlowControl
+from bulk_control import ACTION_LABELS, plan_control, select_pumps
+from cluster import BusManager, create_bus
+from delta_sync import DeltaTracker
+from emergency import EmergencyTracker
+from fleet_stats import FleetAggregates
+from history import HistoryStore
+from ingestion import DEFAULT_SOURCES, TelemetryPipeline, UdpListener, parse_batch, parse_lines
+from metrics import CONTENT_TYPE, SIZE_BUCKETS, MetricsRegistry, metered_packet
+from modbus_adapter import ModbusPoller, load_config as load_modbus_config
+from profiling import (PROFILE_INTERVAL, PROFILE_SECONDS, PROFILE_TOP, TRACE_SIZE, SamplingProfiler, TickTracer,
+                       native_threading)
+from response_cache import ResponseCache
+from scheduler import DEFAULT_PERIOD, MonitorScheduler, load_sampling, sampling_interval
+from simulation import DEFAULT_PUMPS, FAULT_EFFECTS, FaultScript, SimulationClock, load_faults, parse_fault
+from state_actor import StateActor, StateSnapshot
+from storage import EventLog, TelemetryArchive, lock_directory
+from subscriptions import (EVENT_CLASSES, FLEET_FEED_ROOM, MAX_INTERVAL, Feed, SubscriptionRegistry, event_rooms,
+                           parse_subscription)
+from telemetry_store import STEP_SECONDS, TelemetryStore
+from wire_format import ENCODINGS, FRAME_FIELDS, build_schema, encode_frame, frame_slots
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,6 +89,64 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+if ASYNC_MODE_FALLBACK:
+    logger.warning(f"تعذر استخدام وضع الخادم {ASYNC_MODE_FALLBACK}، سيتم استخدام threading")
+
+# الحد الأقصى لعدد العناصر المحفوظة في الذاكرة
+ACTIVITY_LOG_SIZE = 500
+CHAT_MESSAGES_SIZE = 100
+
+# حقول سجل المضخة التي تغيرها أوامر التحكم وتُنسخ فوراً لبقية العمليات
+CONTROL_FIELDS = ('status', 'auto_mode', 'emergency_stop', 'updated_at')
+
+# أقل فاصل بين مزامنتين للتخزين الدائم مع القرص من دورات المراقبة (بالثواني)
+STORAGE_FLUSH_INTERVAL = 5.0
+
+
+def count_arg(args, name: str, default: int, maximum: Optional[int] = None) -> int:
+    """قراءة معامل عددي موجب من الطلب (بين 1 وmaximum إن حُدد)؛ القيمة غير الصالحة ترفع ValueError"""
+    try:
+        value = int(args.get(name, default))
+    except ValueError:
+        raise ValueError(f"قيمة {name} غير صحيحة: {args.get(name)}")
+    if maximum is not None and not 1 <= value <= maximum:
+        raise ValueError(f"قيمة {name} يجب أن تكون بين 1 و{maximum}")
+    if value < 1:
+        raise ValueError(f"قيمة {name} يجب أن تكون 1 أو أكثر")
+    return value
+
+
+def page_args(args, buffer: deque, default_limit: int = 50) -> Tuple[Optional[int], int]:
+    """
+    قراءة معاملي الترقيم ?before=<id>&limit= من الطلب والتحقق منهما
+
+    limit بين 1 وسعة المخزن، وbefore معرف صحيح موجب؛ القيمة غير الصالحة ترفع ValueError
+    """
+    limit = count_arg(args, 'limit', default_limit, buffer.maxlen)
+    
+    before = args.get('before')
+    if before is None:
+        return None, limit
+    try:
+        before = int(before)
+    except ValueError:
+        before = 0
+    if before < 1:
+        raise ValueError(f"مؤشر before غير صحيح: {args.get('before')}")
+    return before, limit
+
+
+def paginate_by_id(buffer: deque, before: Optional[int], limit: int) -> Tuple[List[Dict], Optional[int]]:
+    """
+    صفحة من مخزن حلقي مرتب تصاعدياً حسب المعرف: آخر limit عنصر معرفها أقل من before
+    (بالترتيب الزمني) مع مؤشر الصفحة الأقدم التالية إن وجدت
+    """
+    items = list(buffer)
+    end = bisect_left(items, before, key=lambda item: item['id']) if before is not None else len(items)
+    start = max(0, end - limit)
+    page = items[start:end]
+    return page, (page[0]['id'] if page and start > 0 else None)
+
 class OilPumpSystem:
     """
     نظام مراقبة وتحكم مضخات النفط
@@ -63,27 +166,114 @@ class OilPumpSystem:
         # إعداد CORS
         CORS(self.app, origins="*")
         
-        # إعداد SocketIO
+        # ناقل الرسائل بين عمليات الخادم (فارغ = عملية واحدة)
+        # عملية واحدة فقط (القائدة) تتولى المراقبة والتخزين الدائم وإسناد المعرفات
+        self.bus = create_bus(os.environ.get('OIL_PUMP_MESSAGE_QUEUE', ''))
+        self.is_leader = self.bus is None or self.bus.acquire_leadership()
+        
+        # أزمنة مراحل دورات المراقبة (دائماً) والتحليل بأخذ العينات عند الطلب (خيط نظام حقيقي)
+        self.tick_trace = TickTracer(int(os.environ.get('OIL_PUMP_TICK_TRACE', TRACE_SIZE)))
+        self.profiler = SamplingProfiler(*native_threading(ASYNC_MODE))
+        
+        # مقاييس تشغيل الخادم (/metrics)؛ الأحداث المرسلة وأحجامها تُعد عند ترميز حزمها
+        self.metrics = MetricsRegistry('oil_pump_')
+        self.emitted_events = self.metrics.counter(
+            'socketio_emits_total', 'أحداث Socket.IO المرسلة من هذه العملية حسب اسم الحدث', ('event',))
+        self.emitted_sizes = self.metrics.histogram(
+            'socketio_payload_bytes', 'حجم الحدث المرمز بالبايت (مرة لكل إرسال لا لكل مستلم)', ('event',),
+            SIZE_BUCKETS)
+        
+        # إعداد SocketIO (البث عبر الناقل يصل لعملاء جميع العمليات)
+        self.async_mode = ASYNC_MODE
+        cluster_options = {'client_manager': BusManager(self.bus)} if self.bus else {}
         self.socketio = SocketIO(self.app, 
                                cors_allowed_origins="*",
-                               async_mode='threading',
+                               async_mode=self.async_mode,
+                               ping_interval=int(os.environ.get('OIL_PUMP_PING_INTERVAL', 25)),
+                               ping_timeout=int(os.environ.get('OIL_PUMP_PING_TIMEOUT', 20)),
+                               serializer=metered_packet(self.emitted_events, self.emitted_sizes,
+                                                         self.tick_trace.encoded),
                                logger=False,
-                               engineio_logger=False)
+                               engineio_logger=False,
+                               **cluster_options)
         
         # بيانات النظام
         self.pumps_data = {}
+        # المحاكاة: عدد المضخات، بذرة ثابتة لتكرار القياسات نفسها، وتسارع ساعة الدورات
+        self.fleet_size = int(os.environ.get('OIL_PUMP_SIM_PUMPS', DEFAULT_PUMPS))
+        self.seed = os.environ.get('OIL_PUMP_SIM_SEED') or None
+        self.rng = random.Random(self.seed)
+        self.clock = SimulationClock(float(os.environ.get('OIL_PUMP_SIM_SPEED', 1.0)), self.socketio.sleep)
+        # بداية ساعة المحاكاة بوقت الجدار: طوابع التاريخ = البداية + ثواني المحاكاة المنقضية
+        self.clock_origin = time.time()
+        self.faults: Optional[FaultScript] = None
+        self.telemetry = TelemetryStore(self.rng)
+        # مصادر القياس بترتيب الأولوية: القراءات الحقيقية الواردة ثم المحاكاة
+        self.pipeline = TelemetryPipeline(self.telemetry, os.environ.get('OIL_PUMP_SOURCES', DEFAULT_SOURCES))
+        self.ingest = self.pipeline.source('ingest')
+        self.ingest_listener = None
+        self.modbus: Optional[ModbusPoller] = None
+        self.modbus_scheduler: Optional[MonitorScheduler] = None
+        self.aggregates = FleetAggregates()
+        # مدة بقاء التنبيه قبل زواله (min_hold) بثواني المحاكاة كبقية الأنظمة
+        self.alert_engine = AlertEngine(clock=self.clock.now)
+        # كشف الشذوذ المتزايد (معدل التغير بثواني المحاكاة)
+        self.anomaly_detector = AnomalyDetector(clock=self.clock.now)
+        self.history = HistoryStore()
         self.users_online = {}
         self.system_alerts = []
-        self.activity_log = []
-        self.chat_messages = []
+        self.activity_log = deque(maxlen=ACTIVITY_LOG_SIZE)
+        self.chat_messages = deque(maxlen=CHAT_MESSAGES_SIZE)
+        self.activity_ids = itertools.count(1)
+        self.chat_ids = itertools.count(1)
+        self.client_versions = {}
+        self.delta_tracker = DeltaTracker()
+        # اشتراكات عملاء هذه العملية (المضخات وفئات الأحداث ومعدل التحديث)
+        self.subscriptions = SubscriptionRegistry()
+        # حدود طوابير الإرسال للعملاء البطيئين (بعدد الحزم)
+        self.flow = FlowControl(self.client_queue_depth,
+                                high=int(os.environ.get('OIL_PUMP_QUEUE_HIGH', HIGH_WATERMARK)),
+                                low=int(os.environ.get('OIL_PUMP_QUEUE_LOW', LOW_WATERMARK)),
+                                maximum=int(os.environ.get('OIL_PUMP_QUEUE_MAX', MAX_QUEUE)))
+        # دورات المراقبة بمعدل ثابت مع فاصل أخذ عينات لكل مضخة
+        self.scheduler = MonitorScheduler(float(os.environ.get('OIL_PUMP_TICK', DEFAULT_PERIOD)), self.clock.now)
+        self.sampling = load_sampling(os.environ.get('OIL_PUMP_SAMPLING'))
+        self.last_flush = time.monotonic()
+        # جميع التعديلات تمر عبر مالك الحالة، والقراءة من آخر لقطة منشورة
+        self.actor = StateActor()
+        self.snapshot: Optional[StateSnapshot] = None
+        # أزمنة أوامر الطوارئ (تُنفذ في مالك الحالة بأولوية على بقية الأوامر)
+        self.emergency = EmergencyTracker()
+        self.response_cache = ResponseCache()
         self.system_health = {
             'score': 95,
             'status': 'excellent',
             'last_update': datetime.now().isoformat()
         }
         
+        # التخزين الدائم (يمكن تعطيله بترك OIL_PUMP_DATA_DIR فارغاً)
+        self.data_dir = os.environ.get('OIL_PUMP_DATA_DIR', 'data')
+        self.storage_lock = None
+        self.telemetry_archive = None
+        self.activity_store = None
+        self.chat_store = None
+        if self.is_leader:
+            self.initialize_storage(self.data_dir)
+        
         # إعداد المضخات الافتراضية
-        self.initialize_pumps()
+        self.initialize_pumps(self.fleet_size)
+        for pump_id in self.pumps_data:
+            self.schedule_pump(pump_id)
+        self.start_fault_script(os.environ.get('OIL_PUMP_SIM_FAULTS', ''))
+        self.delta_tracker.commit(self.pumps_view())
+        self.publish_snapshot()
+        self.actor.start(self.socketio.start_background_task)
+        
+        # مزامنة الحالة مع بقية العمليات
+        self.setup_cluster()
+        
+        # مقاييس التشغيل وقياس زمن طلبات HTTP
+        self.setup_metrics()
         
         # إعداد المسارات
         self.setup_routes()
@@ -91,13 +281,96 @@ class OilPumpSystem:
         # إعداد أحداث SocketIO
         self.setup_socketio_events()
         
+        # مستمع قراءات الحساسات عبر UDP (اختياري)
+        self.start_ingest_listener(os.environ.get('OIL_PUMP_INGEST_UDP', ''))
+        
+        # استطلاع وحدات التحكم عبر Modbus/TCP (اختياري)
+        self.start_modbus_poller(os.environ.get('OIL_PUMP_MODBUS', ''))
+        
         # بدء المراقبة الخلفية
         self.start_background_monitoring()
         
         logger.info("تم تهيئة نظام مراقبة مضخات النفط بنجاح")
     
-    def initialize_pumps(self):
-        """تهيئة بيانات المضخات الافتراضية"""
+    def initialize_storage(self, data_dir: str, restore: bool = True):
+        """
+        فتح التخزين الدائم واستعادة التاريخ وسجل النشاط والدردشة بعد إعادة التشغيل
+
+        restore: تعطيل الاستعادة عند تولي القيادة لأن الذاكرة محدثة من العملية القائدة السابقة
+        """
+        if not data_dir:
+            logger.info("التخزين الدائم معطل")
+            return
+        
+        started = time.time()
+        # عملية واحدة فقط تكتب في مجلد التخزين (RuntimeError إن كانت أخرى تستخدمه)
+        self.storage_lock = lock_directory(data_dir)
+        
+        restored = 0
+        if self.clock.speed == 1.0:
+            self.telemetry_archive = TelemetryArchive(os.path.join(data_dir, 'telemetry'))
+            self.history.archive = self.telemetry_archive
+            if restore:
+                restored = self.telemetry_archive.restore(self.history, self.history_time())
+        else:
+            # طوابع التاريخ بزمن المحاكاة تسبق وقت الجدار أو تتأخر عنه، وأرشيف القرص يفترض
+            # سجلات مرتبة زمنياً عبر التشغيلات: المحاكاة المتسارعة تحفظ تاريخها في الذاكرة فقط
+            logger.warning(f"أرشيف القياسات على القرص معطل لأن سرعة المحاكاة {self.clock.speed:g}")
+        
+        self.activity_store = EventLog(os.path.join(data_dir, 'events'), 'activity')
+        self.chat_store = EventLog(os.path.join(data_dir, 'events'), 'chat')
+        if restore:
+            self.activity_log.extend(self.activity_store.tail(ACTIVITY_LOG_SIZE))
+            self.chat_messages.extend(self.chat_store.tail(CHAT_MESSAGES_SIZE))
+        
+        self.resume_ids()
+        
+        logger.info(
+            f"تمت استعادة {restored} سجل قياس و{len(self.activity_log)} نشاط "
+            f"و{len(self.chat_messages)} رسالة من {data_dir} خلال {time.time() - started:.2f} ثانية"
+        )
+    
+    def resume_ids(self):
+        """متابعة ترقيم معرفات النشاط والدردشة بعد آخر معرف في الذاكرة"""
+        if self.activity_log:
+            self.activity_ids = itertools.count(max(a['id'] for a in self.activity_log) + 1)
+        if self.chat_messages:
+            self.chat_ids = itertools.count(max(m['id'] for m in self.chat_messages) + 1)
+    
+    def flush_storage(self, force: bool = True):
+        """
+        مزامنة التخزين الدائم مع القرص
+
+        force: المزامنة فوراً بدلاً من مرة كل STORAGE_FLUSH_INTERVAL ثانية (دورات المراقبة أقصر)
+        """
+        now = time.monotonic()
+        if not force and now - self.last_flush < STORAGE_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+        for store in (self.telemetry_archive, self.activity_store, self.chat_store):
+            if store is not None:
+                store.flush()
+    
+    def close_storage(self):
+        """إغلاق التخزين الدائم (عند فقدان القيادة)"""
+        for store in (self.telemetry_archive, self.activity_store, self.chat_store):
+            if store is not None:
+                store.close()
+        self.history.archive = None
+        self.telemetry_archive = None
+        self.activity_store = None
+        self.chat_store = None
+        if self.storage_lock is not None:
+            self.storage_lock.close()
+            self.storage_lock = None
+    
+    def initialize_pumps(self, count: int = DEFAULT_PUMPS):
+        """
+        تهيئة بيانات المضخات الافتراضية
+
+        count: عدد المضخات (الأنواع والمناطق تتكرر كل ست مضخات، والقيم من مولد النظام المبذور)
+        """
+        rng = self.rng
         pump_types = [
             'مضخة طرد مركزي',
             'مضخة ترددية',
@@ -116,23 +389,15 @@ class OilPumpSystem:
             'المنطقة الساحلية'
         ]
         
-        for i in range(1, 7):
+        for i in range(1, count + 1):
             self.pumps_data[i] = {
                 'id': i,
                 'name': f'مضخة النفط {i}',
-                'type': pump_types[i-1],
-                'location': locations[i-1],
-                'status': 'running' if i <= 4 else 'stopped',
+                'type': pump_types[(i-1) % len(pump_types)],
+                'location': locations[(i-1) % len(locations)],
+                'status': 'running' if (i-1) % 6 < 4 else 'stopped',
                 'auto_mode': True,
                 'emergency_stop': False,
-                'metrics': {
-                    'pressure': round(random.uniform(45, 85), 1),
-                    'temperature': round(random.uniform(65, 95), 1),
-                    'flow_rate': round(random.uniform(150, 300), 1),
-                    'vibration': round(random.uniform(0.5, 2.5), 2),
-                    'power': round(random.uniform(75, 95), 1),
-                    'efficiency': round(random.uniform(85, 98), 1)
-                },
                 'thresholds': {
                     'pressure_min': 50,
                     'pressure_max': 80,
@@ -142,16 +407,100 @@ class OilPumpSystem:
                     'efficiency_min': 85
                 },
                 'alerts': [],
-                'last_maintenance': (datetime.now() - timedelta(days=random.randint(10, 90))).isoformat(),
-                'next_maintenance': (datetime.now() + timedelta(days=random.randint(30, 120))).isoformat(),
-                'total_runtime': random.randint(5000, 15000),
-                'production_today': round(random.uniform(1000, 5000), 1),
+                'last_maintenance': (datetime.now() - timedelta(days=rng.randint(10, 90))).isoformat(),
+                'next_maintenance': (datetime.now() + timedelta(days=rng.randint(30, 120))).isoformat(),
+                'total_runtime': rng.randint(5000, 15000),
                 'created_at': datetime.now().isoformat(),
                 'updated_at': datetime.now().isoformat()
             }
+            
+            # القياسات الحية والإنتاج تُحفظ في المخزن العمودي
+            slot = self.telemetry.add_pump(i, {
+                'pressure': round(rng.uniform(45, 85), 1),
+                'temperature': round(rng.uniform(65, 95), 1),
+                'flow_rate': round(rng.uniform(150, 300), 1),
+                'vibration': round(rng.uniform(0.5, 2.5), 2),
+                'power': round(rng.uniform(75, 95), 1),
+                'efficiency': round(rng.uniform(85, 98), 1)
+            }, production=round(rng.uniform(1000, 5000), 1))
+            self.alert_engine.add_pump(slot, self.pumps_data[i]['name'], self.pumps_data[i]['thresholds'])
+            self.anomaly_detector.add_pump(slot)
+            self.aggregates.add_pump(self.pumps_data[i]['status'], [],
+                                     self.telemetry.get(i, 'efficiency'), self.telemetry.production_of(i))
         
         logger.info(f"تم تهيئة {len(self.pumps_data)} مضخة بنجاح")
     
+    def setup_metrics(self):
+        """
+        تسجيل مقاييس التشغيل وقياس زمن كل طلب HTTP حسب المسار
+
+        المقاييس اللحظية (أحجام المخازن، العملاء، الخيوط، الطوابير) تُقرأ عند طلب /metrics
+        فقط، وفي المسارات الحرجة تحديث عداد أو مدرج واحد
+        """
+        metrics = self.metrics
+        self.tick_duration = metrics.histogram(
+            'monitoring_tick_seconds', 'زمن دورة المراقبة بالزمن الحقيقي منذ إرسالها لمالك الحالة')
+        self.stage_duration = metrics.histogram(
+            'monitoring_stage_seconds', 'زمن كل مرحلة من دورة المراقبة', ('stage',))
+        request_duration = metrics.histogram(
+            'http_request_duration_seconds', 'زمن طلبات HTTP حسب المسار', ('method', 'route'))
+        requests_total = metrics.counter(
+            'http_requests_total', 'طلبات HTTP حسب المسار ورمز الحالة', ('method', 'route', 'status'))
+        
+        @self.app.before_request
+        def start_request_timer():
+            g.request_started = time.perf_counter()
+        
+        @self.app.after_request
+        def record_request(response):
+            started = g.get('request_started')
+            if started is not None:
+                # قالب المسار لا العنوان الفعلي حتى لا تتضاعف السلاسل بمعرفات المضخات
+                route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                request_duration.observe(time.perf_counter() - started, (request.method, route))
+                requests_total.inc((request.method, route, str(response.status_code)))
+            return response
+        
+        scheduler = self.scheduler
+        metrics.collected('monitoring_overruns_total', 'دورات مراقبة تجاوزت فترتها',
+                          lambda: scheduler.overruns, kind='counter')
+        metrics.collected('monitoring_skipped_ticks_total', 'دورات مراقبة فائتة لم تُنفذ',
+                          lambda: scheduler.skipped_ticks, kind='counter')
+        metrics.collected('monitoring_errors_total', 'أخطاء دورات المراقبة',
+                          lambda: scheduler.errors, kind='counter')
+        metrics.collected('socketio_clients', 'عملاء Socket.IO المتصلون بهذه العملية',
+                          lambda: len(self.subscriptions.clients))
+        metrics.collected('socketio_lagging_clients', 'العملاء البطيئون (طابور الإرسال فوق الحد الأعلى)',
+                          lambda: sum(1 for flow in list(self.flow.clients.values()) if flow.lagging))
+        metrics.collected('socketio_queue_depth', 'مجموع حزم طوابير الإرسال للعملاء',
+                          lambda: sum(flow.depth for flow in list(self.flow.clients.values())))
+        metrics.collected('users_online', 'المستخدمون المسجلون في هذه العملية',
+                          lambda: len(self.users_online))
+        metrics.collected('buffer_items', 'عدد العناصر في مخازن الذاكرة',
+                          lambda: {('activity_log',): len(self.activity_log),
+                                   ('chat_messages',): len(self.chat_messages),
+                                   ('system_alerts',): len(self.system_alerts)}, ('buffer',))
+        metrics.collected('buffer_capacity', 'سعة مخازن الذاكرة الحلقية',
+                          lambda: {('activity_log',): ACTIVITY_LOG_SIZE,
+                                   ('chat_messages',): CHAT_MESSAGES_SIZE}, ('buffer',))
+        metrics.collected('state_actor_pending', 'الأوامر المنتظرة في مالك الحالة',
+                          lambda: {('normal',): self.actor.pending, ('urgent',): self.actor.pending_urgent},
+                          ('lane',))
+        metrics.collected('state_actor_processed_total', 'الأوامر المنفذة في مالك الحالة',
+                          lambda: self.actor.processed, kind='counter')
+        metrics.collected('threads', 'الخيوط النشطة في العملية', threading.active_count)
+        metrics.collected('pumps', 'المضخات حسب الحالة',
+                          lambda: {(status,): count for status, count in list(self.aggregates.status_counts.items())},
+                          ('status',))
+        metrics.collected('active_alerts', 'التنبيهات النشطة حسب الخطورة',
+                          lambda: {(severity,): count
+                                   for severity, count in list(self.aggregates.severity_counts.items())},
+                          ('severity',))
+        metrics.collected('emergency_commands_total', 'أوامر إيقاف الطوارئ المستلمة',
+                          lambda: self.emergency.total, kind='counter')
+        metrics.collected('leader', 'هل هذه العملية القائدة (1) أم تابعة (0)',
+                          lambda: int(self.is_leader))
+    
     def setup_routes(self):
         """إعداد مسارات التطبيق"""
         
@@ -164,11 +513,12 @@ class OilPumpSystem:
         def get_pumps():
             """الحصول على بيانات جميع المضخات"""
             try:
-                return jsonify({
+                # الجسم يُبنى ويُسلسل مرة واحدة لكل إصدار من الحالة
+                return self.cached_json('pumps', lambda snapshot: {
                     'success': True,
-                    'pumps': list(self.pumps_data.values()),
-                    'total': len(self.pumps_data),
-                    'timestamp': datetime.now().isoformat()
+                    'pumps': snapshot.pumps_list(),
+                    'total': len(snapshot.pumps),
+                    'timestamp': snapshot.timestamp
                 })
             except Exception as e:
                 logger.error(f"خطأ في جلب بيانات المضخات: {str(e)}")
@@ -181,16 +531,16 @@ class OilPumpSystem:
         def get_pump(pump_id):
             """الحصول على بيانات مضخة معينة"""
             try:
-                if pump_id not in self.pumps_data:
+                if pump_id not in self.snapshot.pumps:
                     return jsonify({
                         'success': False,
                         'error': 'المضخة غير موجودة'
                     }), 404
                 
-                return jsonify({
+                return self.cached_json(f'pump:{pump_id}', lambda snapshot: {
                     'success': True,
-                    'pump': self.pumps_data[pump_id],
-                    'timestamp': datetime.now().isoformat()
+                    'pump': snapshot.pumps[pump_id],
+                    'timestamp': snapshot.timestamp
                 })
             except Exception as e:
                 logger.error(f"خطأ في جلب بيانات المضخة {pump_id}: {str(e)}")
@@ -199,11 +549,51 @@ class OilPumpSystem:
                     'error': 'فشل في جلب بيانات المضخة'
                 }), 500
         
+        @self.app.route('/api/pumps/<int:pump_id>/history')
+        def get_pump_history(pump_id):
+            """الحصول على تاريخ مقياس لمضخة معينة"""
+            try:
+                if pump_id not in self.snapshot.pumps:
+                    return jsonify({
+                        'success': False,
+                        'error': 'المضخة غير موجودة'
+                    }), 404
+                
+                now = self.history_time()
+                try:
+                    end = self.parse_time_arg(request.args.get('to'), now)
+                    start = self.parse_time_arg(request.args.get('from'), end - 3600)
+                    history = self.history.query(
+                        pump_id,
+                        request.args.get('metric', 'pressure'),
+                        start, end, now,
+                        resolution=request.args.get('resolution'),
+                        max_points=count_arg(request.args, 'max_points', 1000)
+                    )
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
+                
+                return jsonify({
+                    'success': True,
+                    'pump_id': pump_id,
+                    'history': history,
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب تاريخ المضخة {pump_id}: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب تاريخ المضخة'
+                }), 500
+        
         @self.app.route('/api/pumps/<int:pump_id>/control', methods=['POST'])
         def control_pump(pump_id):
             """التحكم في مضخة معينة"""
             try:
-                if pump_id not in self.pumps_data:
+                if pump_id not in self.snapshot.pumps:
                     return jsonify({
                         'success': False,
                         'error': 'المضخة غير موجودة'
@@ -213,73 +603,15 @@ class OilPumpSystem:
                 action = data.get('action')
                 user_id = data.get('user_id', 'غير محدد')
                 
-                pump = self.pumps_data[pump_id]
-                old_status = pump['status']
-                
-                # تنفيذ الإجراء
-                if action == 'start':
-                    if pump['emergency_stop']:
-                        return jsonify({
-                            'success': False,
-                            'error': 'لا يمكن تشغيل المضخة في حالة إيقاف الطوارئ'
-                        }), 400
-                    pump['status'] = 'running'
-                    message = f"تم تشغيل {pump['name']}"
-                    
-                elif action == 'stop':
-                    pump['status'] = 'stopped'
-                    message = f"تم إيقاف {pump['name']}"
-                    
-                elif action == 'emergency_stop':
-                    pump['status'] = 'emergency_stop'
-                    pump['emergency_stop'] = True
-                    message = f"تم إيقاف الطوارئ لـ {pump['name']}"
-                    
-                elif action == 'standby':
-                    pump['status'] = 'standby'
-                    message = f"تم وضع {pump['name']} في وضع الاستعداد"
-                    
-                elif action == 'auto':
-                    pump['auto_mode'] = not pump['auto_mode']
-                    mode = "التلقائي" if pump['auto_mode'] else "اليدوي"
-                    message = f"تم تغيير {pump['name']} إلى الوضع {mode}"
-                    
-                elif action == 'reset_emergency':
-                    pump['emergency_stop'] = False
-                    pump['status'] = 'stopped'
-                    message = f"تم إعادة تعيين إيقاف الطوارئ لـ {pump['name']}"
-                    
-                elif action == 'maintenance':
-                    pump['status'] = 'maintenance'
-                    message = f"تم وضع {pump['name']} في وضع الصيانة"
-                    
-                else:
+                # التنفيذ في مالك الحالة الوحيد بالتسلسل مع دورة المراقبة
+                try:
+                    message, pump = self.actor.call(lambda: self.execute_control(pump_id, action, user_id))
+                except ValueError as e:
                     return jsonify({
                         'success': False,
-                        'error': 'إجراء غير صحيح'
+                        'error': str(e)
                     }), 400
                 
-                # تحديث الوقت
-                pump['updated_at'] = datetime.now().isoformat()
-                
-                # إضافة إلى سجل النشاط
-                self.add_activity_log(
-                    message=message,
-                    user=user_id,
-                    type='operation',
-                    pump_id=pump_id
-                )
-                
-                # إرسال التحديث لجميع المستخدمين
-                self.socketio.emit('pump_updated', {
-                    'pump_id': pump_id,
-                    'pump': pump,
-                    'message': message,
-                    'user': user_id
-                }, broadcast=True)
-                
-                logger.info(f"تم تنفيذ الإجراء {action} على المضخة {pump_id} بواسطة {user_id}")
-                
                 return jsonify({
                     'success': True,
                     'message': message,
@@ -294,34 +626,61 @@ class OilPumpSystem:
                     'error': 'فشل في التحكم بالمضخة'
                 }), 500
         
-        @self.app.route('/api/system/stats')
-        def get_system_stats():
-            """الحصول على إحصائيات النظام"""
+        @self.app.route('/api/pumps/control', methods=['POST'])
+        def control_pumps():
+            """التحكم في مجموعة مضخات بمحدد (المعرفات، المنطقة، النوع، الحالة) بأمر واحد"""
             try:
-                running_pumps = len([p for p in self.pumps_data.values() if p['status'] == 'running'])
-                stopped_pumps = len([p for p in self.pumps_data.values() if p['status'] == 'stopped'])
-                maintenance_pumps = len([p for p in self.pumps_data.values() if p['status'] == 'maintenance'])
+                data = request.get_json(silent=True)
+                if not isinstance(data, dict):
+                    return jsonify({
+                        'success': False,
+                        'error': 'جسم الطلب يجب أن يكون كائن JSON'
+                    }), 400
                 
-                total_production = sum(p['production_today'] for p in self.pumps_data.values())
-                avg_efficiency = sum(p['metrics']['efficiency'] for p in self.pumps_data.values()) / len(self.pumps_data)
+                selector = data.get('selector')
+                action = data.get('action')
+                user_id = data.get('user_id', 'غير محدد')
+                strict = data.get('strict') is True
                 
-                active_alerts = len([alert for pump in self.pumps_data.values() for alert in pump['alerts']])
+                # التنفيذ في مالك الحالة الوحيد بالتسلسل مع دورة المراقبة (لا تتداخل معه دورة)
+                try:
+                    result = self.actor.call(lambda: self.execute_bulk_control(selector, action, user_id, strict))
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
                 
                 return jsonify({
                     'success': True,
-                    'stats': {
-                        'total_pumps': len(self.pumps_data),
-                        'running_pumps': running_pumps,
-                        'stopped_pumps': stopped_pumps,
-                        'maintenance_pumps': maintenance_pumps,
-                        'total_production': round(total_production, 1),
-                        'avg_efficiency': round(avg_efficiency, 1),
-                        'active_alerts': active_alerts,
-                        'users_online': len(self.users_online),
-                        'system_health': self.system_health
-                    },
+                    'action': action,
+                    **result,
                     'timestamp': datetime.now().isoformat()
                 })
+                
+            except Exception as e:
+                logger.error(f"خطأ في التحكم الجماعي بالمضخات: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في التحكم الجماعي بالمضخات'
+                }), 500
+        
+        @self.app.route('/api/system/stats')
+        def get_system_stats():
+            """الحصول على إحصائيات النظام"""
+            try:
+                # المجاميع محسوبة تدريجياً ومنشورة مع اللقطة
+                # (عدد المستخدمين لا يتبع إصدار الحالة فيدخل في مفتاح الإصدار)
+                users_online = len(self.users_online)
+                return self.cached_json('stats', lambda snapshot: {
+                    'success': True,
+                    'stats': {
+                        **snapshot.stats,
+                        'users_online': users_online,
+                        'system_health': snapshot.system_health
+                    },
+                    'timestamp': snapshot.timestamp
+                }, variant=users_online)
             except Exception as e:
                 logger.error(f"خطأ في جلب إحصائيات النظام: {str(e)}")
                 return jsonify({
@@ -333,43 +692,362 @@ class OilPumpSystem:
         def get_system_alerts():
             """الحصول على تنبيهات النظام"""
             try:
-                all_alerts = []
-                for pump in self.pumps_data.values():
-                    for alert in pump['alerts']:
-                        alert['pump_name'] = pump['name']
-                        all_alerts.append(alert)
+                def build(snapshot):
+                    # نسخ التنبيهات مع اسم المضخة دون تعديل اللقطة المنشورة
+                    all_alerts = [
+                        {**alert, 'pump_name': pump['name']}
+                        for pump in snapshot.pumps.values() for alert in pump['alerts']
+                    ]
+                    
+                    # ترتيب حسب الأولوية والوقت
+                    all_alerts.sort(key=lambda x: (
+                        0 if x['severity'] == 'critical' else 1 if x['severity'] == 'warning' else 2,
+                        x['timestamp']
+                    ), reverse=True)
+                    
+                    return {
+                        'success': True,
+                        'alerts': all_alerts,
+                        'total': len(all_alerts),
+                        'timestamp': snapshot.timestamp
+                    }
                 
-                # ترتيب حسب الأولوية والوقت
-                all_alerts.sort(key=lambda x: (
-                    0 if x['severity'] == 'critical' else 1 if x['severity'] == 'warning' else 2,
-                    x['timestamp']
-                ), reverse=True)
+                return self.cached_json('alerts', build)
+            except Exception as e:
+                logger.error(f"خطأ في جلب تنبيهات النظام: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب تنبيهات النظام'
+                }), 500
+        
+        @self.app.route('/metrics')
+        def get_metrics():
+            """مقاييس تشغيل الخادم بصيغة Prometheus النصية"""
+            try:
+                return self.app.response_class(self.metrics.render(), content_type=CONTENT_TYPE)
+            except Exception as e:
+                logger.error(f"خطأ في جلب مقاييس التشغيل: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب مقاييس التشغيل'
+                }), 500
+        
+        @self.app.route('/api/system/connections')
+        def get_connections():
+            """عمق طوابير الإرسال وعدادات العملاء البطيئين في هذه العملية"""
+            try:
+                return jsonify({
+                    'success': True,
+                    **self.flow.stats(),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب حالة الاتصالات: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب حالة الاتصالات'
+                }), 500
+        
+        @self.app.route('/api/system/scheduler')
+        def get_scheduler():
+            """توقيت دورات المراقبة وتجاوزها لفترتها وفواصل أخذ العينات"""
+            try:
+                return jsonify({
+                    'success': True,
+                    'leader': self.is_leader,
+                    **self.scheduler.stats(),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب حالة الجدولة: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب حالة الجدولة'
+                }), 500
+        
+        @self.app.route('/api/system/ticks')
+        def get_ticks():
+            """أزمنة مراحل دورات المراقبة الأخيرة (slowest=1 للأبطأ أولاً، min_ms للدورات البطيئة فقط)"""
+            try:
+                limit = min(request.args.get('limit', 50, type=int), self.tick_trace.traces.maxlen)
+                slowest = request.args.get('slowest', '0') in ('1', 'true')
+                min_ms = request.args.get('min_ms', 0.0, type=float)
+                return jsonify({
+                    'success': True,
+                    'leader': self.is_leader,
+                    'summary': self.tick_trace.summary(),
+                    'ticks': self.tick_trace.query(limit, slowest, min_ms),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب أزمنة الدورات: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب أزمنة الدورات'
+                }), 500
+        
+        @self.app.route('/api/system/profile', methods=['POST'])
+        def start_profile():
+            """بدء تحليل بأخذ العينات لمدة محددة (لمدير النظام فقط)"""
+            user, denied = self.authorize_admin()
+            if denied is not None:
+                return denied
+            try:
+                data = request.get_json(silent=True) or {}
+                interval_ms = data.get('interval_ms', PROFILE_INTERVAL * 1000)
+                if isinstance(interval_ms, bool) or not isinstance(interval_ms, (int, float)):
+                    raise ValueError(f'قيمة غير صالحة للحقل interval_ms: {interval_ms}')
+                status = self.profiler.start(data.get('seconds', PROFILE_SECONDS), interval_ms / 1000,
+                                             bool(data.get('include_idle', False)), user['employee_id'])
+                logger.info(f"بدء تحليل الأداء لمدة {status['session']['seconds']:g} ثانية بواسطة {user['name']}")
+                return jsonify({
+                    'success': True,
+                    **status,
+                    'timestamp': datetime.now().isoformat()
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            except RuntimeError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 409
+            except Exception as e:
+                logger.error(f"خطأ في بدء تحليل الأداء: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في بدء تحليل الأداء'
+                }), 500
+        
+        @self.app.route('/api/system/profile')
+        def get_profile():
+            """حالة آخر تحليل وملخص أكثر الدوال استهلاكاً (لمدير النظام فقط)"""
+            user, denied = self.authorize_admin()
+            if denied is not None:
+                return denied
+            try:
+                top = request.args.get('top', PROFILE_TOP, type=int)
+                return jsonify({
+                    'success': True,
+                    **self.profiler.status(),
+                    'summary': self.profiler.summary(top),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب نتيجة التحليل: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب نتيجة التحليل'
+                }), 500
+        
+        @self.app.route('/api/system/profile/stop', methods=['POST'])
+        def stop_profile():
+            """إيقاف التحليل الجاري قبل نهاية مدته (لمدير النظام فقط)"""
+            user, denied = self.authorize_admin()
+            if denied is not None:
+                return denied
+            return jsonify({
+                'success': True,
+                'stopped': self.profiler.stop(),
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        @self.app.route('/api/system/profile/download')
+        def download_profile():
+            """تنزيل نتيجة التحليل بصيغة المكدسات المطوية (flamegraph / speedscope) لمدير النظام فقط"""
+            user, denied = self.authorize_admin()
+            if denied is not None:
+                return denied
+            try:
+                session = self.profiler.status()['session']
+                if session is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'لا توجد نتيجة تحليل'
+                    }), 404
+                return self.app.response_class(
+                    self.profiler.folded(), content_type='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename=profile-{session["id"]}.folded'}
+                )
+            except Exception as e:
+                logger.error(f"خطأ في تنزيل نتيجة التحليل: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في تنزيل نتيجة التحليل'
+                }), 500
+        
+        @self.app.route('/api/system/simulation')
+        def get_simulation():
+            """إعداد المحاكاة وساعتها وأعطالها النشطة"""
+            try:
+                return jsonify({
+                    'success': True,
+                    'leader': self.is_leader,
+                    'pumps': len(self.pumps_data),
+                    'seed': self.seed,
+                    **self.clock.stats(),
+                    'faults': self.faults.stats() if self.faults is not None else None,
+                    'fault_types': list(FAULT_EFFECTS),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب حالة المحاكاة: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب حالة المحاكاة'
+                }), 500
+        
+        @self.app.route('/api/system/simulation/faults', methods=['POST'])
+        def inject_fault():
+            """حقن عطل محاكاة في مضخة (at: بعد كم ثانية محاكاة من الآن)"""
+            try:
+                if self.faults is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'المحاكاة غير مفعلة في هذا الخادم'
+                    }), 503
                 
+                try:
+                    event = parse_fault(request.get_json(silent=True), self.snapshot.pumps)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
+                
+                event = self.actor.call(lambda: self.inject_fault(event))
+                logger.info(f"حقن عطل محاكاة {event['fault']} في المضخة {event['pump']}")
                 return jsonify({
                     'success': True,
-                    'alerts': all_alerts,
-                    'total': len(all_alerts),
+                    'fault': {key: event[key] for key in ('pump', 'fault', 'at', 'duration', 'severity')}
+                })
+            except Exception as e:
+                logger.error(f"خطأ في حقن عطل المحاكاة: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في حقن عطل المحاكاة'
+                }), 500
+        
+        @self.app.route('/api/telemetry/ingest', methods=['POST'])
+        def ingest_readings():
+            """استقبال دفعة قراءات حساسات (تُكتب في المخزن العمودي في دورة المراقبة التالية)"""
+            try:
+                if self.ingest is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'استقبال القياسات غير مفعل في هذا الخادم'
+                    }), 503
+                
+                try:
+                    readings, errors = parse_batch(request.get_json(silent=True), self.telemetry.slots)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
+                
+                accepted = self.submit_readings(readings, len(errors))
+                return jsonify({
+                    'success': True,
+                    'accepted': accepted,
+                    'rejected': len(errors),
+                    'errors': errors[:100]
+                })
+            except Exception as e:
+                logger.error(f"خطأ في استقبال القراءات: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في استقبال القراءات'
+                }), 500
+        
+        @self.app.route('/api/telemetry/modbus')
+        def get_modbus_stats():
+            """زمن استطلاع وحدات التحكم وحالتها"""
+            try:
+                if self.modbus is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'استطلاع Modbus غير مفعل في هذا الخادم'
+                    }), 404
+                return jsonify({
+                    'success': True,
+                    **self.modbus.stats(),
+                    'scheduler': self.modbus_scheduler.stats(),
                     'timestamp': datetime.now().isoformat()
                 })
             except Exception as e:
-                logger.error(f"خطأ في جلب تنبيهات النظام: {str(e)}")
+                logger.error(f"خطأ في جلب حالة Modbus: {str(e)}")
                 return jsonify({
                     'success': False,
-                    'error': 'فشل في جلب تنبيهات النظام'
+                    'error': 'فشل في جلب حالة Modbus'
+                }), 500
+        
+        @self.app.route('/api/telemetry/ingest', methods=['GET'])
+        def get_ingest_stats():
+            """مصادر القياس وعدادات القراءات المستقبلة في هذه العملية"""
+            try:
+                return jsonify({
+                    'success': True,
+                    'sources': [source.name for source in self.pipeline.sources],
+                    'udp': (f'{self.ingest_listener.address[0]}:{self.ingest_listener.address[1]}'
+                            if self.ingest_listener is not None else None),
+                    **(self.ingest.stats() if self.ingest is not None else {}),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب حالة الاستقبال: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب حالة الاستقبال'
+                }), 500
+        
+        @self.app.route('/api/alerts/<alert_id>/acknowledge', methods=['POST'])
+        def acknowledge_alert(alert_id):
+            """تأكيد استلام تنبيه"""
+            try:
+                data = request.get_json(silent=True) or {}
+                user_id = data.get('user_id', 'غير محدد')
+                
+                alert = self.actor.call(lambda: self.acknowledge_alert(alert_id, user_id))
+                if alert is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'التنبيه غير موجود أو تمت إزالته'
+                    }), 404
+                
+                return jsonify({
+                    'success': True,
+                    'alert': alert,
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في تأكيد استلام التنبيه {alert_id}: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في تأكيد استلام التنبيه'
                 }), 500
         
         @self.app.route('/api/activity')
         def get_activity_log():
-            """الحصول على سجل النشاط"""
+            """الحصول على سجل النشاط (الأحدث أولاً، مع ترقيم بالمؤشر ?before=<id>&limit=)"""
             try:
-                limit = request.args.get('limit', 50, type=int)
-                recent_activities = self.activity_log[-limit:] if limit > 0 else self.activity_log
-                recent_activities.reverse()
+                try:
+                    before, limit = page_args(request.args, self.activity_log)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
+                page, next_before = paginate_by_id(self.activity_log, before, limit)
                 
                 return jsonify({
                     'success': True,
-                    'activities': recent_activities,
+                    'activities': page[::-1],
                     'total': len(self.activity_log),
+                    'next_before': next_before,
                     'timestamp': datetime.now().isoformat()
                 })
             except Exception as e:
@@ -381,15 +1059,22 @@ class OilPumpSystem:
         
         @self.app.route('/api/chat/messages')
         def get_chat_messages():
-            """الحصول على رسائل الدردشة"""
+            """الحصول على رسائل الدردشة (بالترتيب الزمني، مع ترقيم بالمؤشر ?before=<id>&limit=)"""
             try:
-                limit = request.args.get('limit', 50, type=int)
-                recent_messages = self.chat_messages[-limit:] if limit > 0 else self.chat_messages
+                try:
+                    before, limit = page_args(request.args, self.chat_messages)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
+                page, next_before = paginate_by_id(self.chat_messages, before, limit)
                 
                 return jsonify({
                     'success': True,
-                    'messages': recent_messages,
+                    'messages': page,
                     'total': len(self.chat_messages),
+                    'next_before': next_before,
                     'timestamp': datetime.now().isoformat()
                 })
             except Exception as e:
@@ -401,42 +1086,32 @@ class OilPumpSystem:
         
         @self.app.route('/api/emergency/all', methods=['POST'])
         def emergency_stop_all():
-            """إيقاف طوارئ لجميع المضخات"""
+            """إيقاف طوارئ لجميع المضخات العاملة أو لمجموعة مختارة (أمر عاجل يتقدم على بقية الأوامر)"""
             try:
-                data = request.get_json()
-                user_id = data.get('user_id', 'غير محدد')
-                
-                stopped_pumps = []
-                for pump_id, pump in self.pumps_data.items():
-                    if pump['status'] == 'running':
-                        pump['status'] = 'emergency_stop'
-                        pump['emergency_stop'] = True
-                        pump['updated_at'] = datetime.now().isoformat()
-                        stopped_pumps.append(pump['name'])
-                
-                message = f"تم إيقاف الطوارئ لجميع المضخات ({len(stopped_pumps)} مضخة)"
-                
-                # إضافة إلى سجل النشاط
-                self.add_activity_log(
-                    message=message,
-                    user=user_id,
-                    type='emergency'
-                )
+                received = time.time()
+                data = request.get_json(silent=True) or {}
+                if not isinstance(data, dict):
+                    return jsonify({
+                        'success': False,
+                        'error': 'جسم الطلب يجب أن يكون كائن JSON'
+                    }), 400
                 
-                # إرسال التحديث لجميع المستخدمين
-                self.socketio.emit('emergency_stop_all', {
-                    'message': message,
-                    'user': user_id,
-                    'stopped_pumps': stopped_pumps,
-                    'pumps': list(self.pumps_data.values())
-                }, broadcast=True)
+                user_id = data.get('user_id', 'غير محدد')
+                command = self.emergency.begin('http', user_id, received)
                 
-                logger.warning(f"تم تنفيذ إيقاف الطوارئ لجميع المضخات بواسطة {user_id}")
+                # التنفيذ في مالك الحالة قبل جميع الأوامر المنتظرة وبين مراحل دورة المراقبة الجارية
+                try:
+                    result = self.actor.call(lambda: self.execute_emergency_stop(command, data.get('selector')),
+                                             urgent=True)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
                 
                 return jsonify({
                     'success': True,
-                    'message': message,
-                    'stopped_pumps': stopped_pumps,
+                    **result,
                     'timestamp': datetime.now().isoformat()
                 })
                 
@@ -447,6 +1122,23 @@ class OilPumpSystem:
                     'error': 'فشل في إيقاف الطوارئ لجميع المضخات'
                 }), 500
         
+        @self.app.route('/api/system/emergency')
+        def get_emergency_stats():
+            """أزمنة أوامر الطوارئ الأخيرة من الاستلام حتى آخر تأكيد من العملاء"""
+            try:
+                return jsonify({
+                    'success': True,
+                    **self.emergency.stats(),
+                    'pending_urgent': self.actor.pending_urgent,
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"خطأ في جلب أزمنة أوامر الطوارئ: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'فشل في جلب أزمنة أوامر الطوارئ'
+                }), 500
+        
         @self.app.route('/api/auto/all', methods=['POST'])
         def auto_mode_all():
             """تفعيل الوضع التلقائي لجميع المضخات"""
@@ -454,29 +1146,40 @@ class OilPumpSystem:
                 data = request.get_json()
                 user_id = data.get('user_id', 'غير محدد')
                 
-                auto_pumps = []
-                for pump_id, pump in self.pumps_data.items():
-                    if not pump['emergency_stop']:
-                        pump['auto_mode'] = True
-                        pump['updated_at'] = datetime.now().isoformat()
-                        auto_pumps.append(pump['name'])
-                
-                message = f"تم تفعيل الوضع التلقائي لجميع المضخات ({len(auto_pumps)} مضخة)"
-                
-                # إضافة إلى سجل النشاط
-                self.add_activity_log(
-                    message=message,
-                    user=user_id,
-                    type='configuration'
-                )
+                def command():
+                    auto_pumps = []
+                    auto_ids = []
+                    for pump_id, pump in self.pumps_data.items():
+                        if not pump['emergency_stop']:
+                            pump['auto_mode'] = True
+                            pump['updated_at'] = datetime.now().isoformat()
+                            auto_pumps.append(pump['name'])
+                            auto_ids.append(pump_id)
+                    self.delta_tracker.touch(auto_ids)
+                    self.replicate_pumps(auto_ids)
+                    self.publish_snapshot(auto_ids)
+                    
+                    message = f"تم تفعيل الوضع التلقائي لجميع المضخات ({len(auto_pumps)} مضخة)"
+                    
+                    # إضافة إلى سجل النشاط
+                    self.add_activity_log(
+                        message=message,
+                        user=user_id,
+                        type='configuration'
+                    )
+                    
+                    # إرسال التحديث لجميع المستخدمين
+                    self.socketio.emit('auto_mode_all', {
+                        'message': message,
+                        'user': user_id,
+                        'auto_pumps': auto_pumps,
+                        'pumps': self.snapshot.pumps_list()
+                    })
+                    
+                    return message, auto_pumps
                 
-                # إرسال التحديث لجميع المستخدمين
-                self.socketio.emit('auto_mode_all', {
-                    'message': message,
-                    'user': user_id,
-                    'auto_pumps': auto_pumps,
-                    'pumps': list(self.pumps_data.values())
-                }, broadcast=True)
+                # التنفيذ في مالك الحالة الوحيد بالتسلسل مع دورة المراقبة
+                message, auto_pumps = self.actor.call(command)
                 
                 logger.info(f"تم تفعيل الوضع التلقائي لجميع المضخات بواسطة {user_id}")
                 
@@ -498,10 +1201,18 @@ class OilPumpSystem:
         """إعداد أحداث SocketIO"""
         
         @self.socketio.on('connect')
-        def handle_connect():
-            """معالج الاتصال"""
+        def handle_connect(auth=None):
+            """معالج الاتصال (auth: {'encoding': 'binary'} لطلب إطارات القياسات الثنائية)"""
             try:
                 logger.info(f"مستخدم جديد متصل: {request.sid}")
+                
+                # الاشتراك الافتراضي: جميع المضخات وجميع فئات الأحداث بالصيغة المتفاوض عليها
+                sid = request.sid
+                encoding = (auth or {}).get('encoding') if isinstance(auth, dict) else None
+                if encoding not in ENCODINGS:
+                    encoding = 'json'
+                self.actor.call(lambda: self.apply_subscription(sid, None, frozenset(EVENT_CLASSES), 0.0, encoding))
+                
                 emit('connected', {
                     'message': 'تم الاتصال بنجاح',
                     'timestamp': datetime.now().isoformat()
@@ -513,6 +1224,10 @@ class OilPumpSystem:
         def handle_disconnect():
             """معالج قطع الاتصال"""
             try:
+                self.client_versions.pop(request.sid, None)
+                sid = request.sid
+                self.actor.submit(lambda: (self.subscriptions.remove(sid), self.flow.remove(sid)))
+                
                 if request.sid in self.users_online:
                     user = self.users_online[request.sid]
                     del self.users_online[request.sid]
@@ -585,9 +1300,8 @@ class OilPumpSystem:
                     emit('error', {'message': 'الرسالة فارغة'})
                     return
                 
-                # إنشاء رسالة جديدة
+                # إنشاء رسالة جديدة (المعرف تسنده العملية القائدة)
                 message = {
-                    'id': len(self.chat_messages) + 1,
                     'user': user['name'],
                     'user_role': user['role'],
                     'message': message_text,
@@ -595,15 +1309,10 @@ class OilPumpSystem:
                     'type': 'user'
                 }
                 
-                # إضافة الرسالة إلى القائمة
-                self.chat_messages.append(message)
-                
-                # الاحتفاظ بآخر 100 رسالة فقط
-                if len(self.chat_messages) > 100:
-                    self.chat_messages = self.chat_messages[-100:]
-                
-                # إرسال الرسالة لجميع المستخدمين
-                emit('new_message', message, broadcast=True)
+                if self.is_leader:
+                    self.actor.call(lambda: self.record_chat_message(message))
+                else:
+                    self.bus.publish('chat', message)
                 
                 logger.info(f"رسالة جديدة من {user['name']}: {message_text[:50]}...")
                 
@@ -611,18 +1320,297 @@ class OilPumpSystem:
                 logger.error(f"خطأ في معالج إرسال الرسالة: {str(e)}")
                 emit('error', {'message': 'فشل في إرسال الرسالة'})
         
+        @self.socketio.on('acknowledge_alert')
+        def handle_acknowledge_alert(data):
+            """معالج تأكيد استلام تنبيه"""
+            try:
+                if request.sid not in self.users_online:
+                    emit('error', {'message': 'يجب تسجيل الدخول أولاً'})
+                    return
+                
+                user = self.users_online[request.sid]
+                alert_id = (data or {}).get('alert_id')
+                if self.actor.call(lambda: self.acknowledge_alert(alert_id, user['name'])) is None:
+                    emit('error', {'message': 'التنبيه غير موجود أو تمت إزالته'})
+                    
+            except Exception as e:
+                logger.error(f"خطأ في معالج تأكيد التنبيه: {str(e)}")
+                emit('error', {'message': 'فشل في تأكيد استلام التنبيه'})
+        
         @self.socketio.on('request_data_update')
-        def handle_request_data_update():
-            """معالج طلب تحديث البيانات"""
+        def handle_request_data_update(data=None):
+            """معالج طلب تحديث البيانات (لقطة كاملة أو إعادة مزامنة بالفروقات)"""
             try:
-                emit('data_update', {
-                    'pumps': list(self.pumps_data.values()),
-                    'system_health': self.system_health,
-                    'users_online': len(self.users_online),
-                    'timestamp': datetime.now().isoformat()
-                })
+                since = (data or {}).get('since')
+                emit('data_update', self.build_client_update(request.sid, since))
             except Exception as e:
                 logger.error(f"خطأ في معالج طلب تحديث البيانات: {str(e)}")
+        
+        @self.socketio.on('subscribe')
+        def handle_subscribe(data=None):
+            """معالج تعديل اشتراك العميل (المضخات أو المناطق، فئات الأحداث، معدل تحديث البيانات)"""
+            try:
+                try:
+                    pump_ids, events, interval = parse_subscription(data or {}, self.snapshot.pumps)
+                except ValueError as e:
+                    emit('error', {'message': str(e)})
+                    return
+                
+                sid = request.sid
+                self.actor.call(lambda: self.apply_subscription(sid, pump_ids, events, interval, confirm=True))
+            except Exception as e:
+                logger.error(f"خطأ في معالج الاشتراك: {str(e)}")
+                emit('error', {'message': 'فشل في تعديل الاشتراك'})
+        
+        @self.socketio.on('emergency_stop')
+        def handle_emergency_stop(data=None):
+            """قناة إيقاف الطوارئ عبر Socket.IO (النتيجة ترجع للمرسل في رد التأكيد)"""
+            try:
+                received = time.time()
+                data = data if isinstance(data, dict) else {}
+                user = self.users_online.get(request.sid)
+                user_id = user['name'] if user else data.get('user_id', 'غير محدد')
+                command = self.emergency.begin('socketio', user_id, received)
+                
+                # التنفيذ في مالك الحالة قبل جميع الأوامر المنتظرة وبين مراحل دورة المراقبة الجارية
+                try:
+                    result = self.actor.call(lambda: self.execute_emergency_stop(command, data.get('selector')),
+                                             urgent=True)
+                except ValueError as e:
+                    return {'success': False, 'error': str(e)}
+                return {'success': True, **result}
+                
+            except Exception as e:
+                logger.error(f"خطأ في معالج إيقاف الطوارئ: {str(e)}")
+                return {'success': False, 'error': 'فشل في إيقاف الطوارئ'}
+        
+        @self.socketio.on('emergency_ack')
+        def handle_emergency_ack(data):
+            """معالج تأكيد استلام إشعار إيقاف الطوارئ"""
+            try:
+                command_id = (data or {}).get('command_id')
+                if not isinstance(command_id, str):
+                    return
+                if not self.emergency.ack(command_id) and self.bus is not None:
+                    # الأمر استلمته عملية أخرى: تمرير التأكيد لها بزمن وصوله إلى هنا
+                    self.bus.publish('emergency_ack', {'command_id': command_id, 'at': time.time()})
+            except Exception as e:
+                logger.error(f"خطأ في معالج تأكيد إيقاف الطوارئ: {str(e)}")
+        
+        @self.socketio.on('data_ack')
+        def handle_data_ack(data):
+            """معالج تأكيد استلام إصدار البيانات"""
+            try:
+                version = (data or {}).get('version')
+                if isinstance(version, int):
+                    self.client_versions[request.sid] = version
+            except Exception as e:
+                logger.error(f"خطأ في معالج تأكيد البيانات: {str(e)}")
+    
+    def setup_cluster(self):
+        """الاشتراك في قنوات ناقل الرسائل وطلب الحالة من العملية القائدة"""
+        self.cluster_synced = self.is_leader
+        if self.bus is None:
+            return
+        
+        # الرسائل الواردة تُنفذ في مالك الحالة دون حجب خيط الناقل
+        handlers = {
+            'state': self.on_cluster_state,
+            'sync': self.on_cluster_sync,
+            'pumps': self.on_cluster_pumps,
+            'activity': self.on_cluster_activity,
+            'chat': self.on_cluster_chat,
+            'acknowledge': self.on_cluster_acknowledge,
+            'ingest': self.on_cluster_ingest,
+            'fault': self.on_cluster_fault,
+            'emergency': self.on_cluster_pumps,
+        }
+        for channel, handler in handlers.items():
+            # إيقاف الطوارئ من عملية أخرى يتقدم على بقية الأوامر كما في العملية التي استلمته
+            urgent = channel == 'emergency'
+            self.bus.subscribe(channel, lambda message, handler=handler, urgent=urgent:
+                               self.actor.submit(lambda: handler(message), urgent))
+        # تأكيدات الطوارئ لا تمس حالة المضخات (لسجل الأزمنة قفله الخاص)
+        self.bus.subscribe('emergency_ack', lambda message: self.emergency.ack(message['command_id'], message['at']))
+        
+        if not self.is_leader:
+            self.bus.publish('sync', {'node': self.bus.node_id})
+        logger.info(f"تم الانضمام إلى عنقود الخادم ({'قائدة' if self.is_leader else 'تابعة'})")
+    
+    def replicate_pumps(self, pump_ids: List[int], channel: str = 'pumps'):
+        """نسخ حقول التحكم للمضخات المحددة إلى بقية العمليات (channel: 'emergency' للتنفيذ العاجل)"""
+        if self.bus is None or not pump_ids:
+            return
+        self.bus.publish(channel, {
+            str(pump_id): {field: self.pumps_data[pump_id][field] for field in CONTROL_FIELDS}
+            for pump_id in pump_ids
+        })
+    
+    def apply_pump_changes(self, changes: Dict):
+        """تطبيق حقول مضخات واردة من عملية أخرى على السجلات والمخزن العمودي"""
+        for pump_id, fields in changes.items():
+            pump_id = int(pump_id)
+            pump = self.pumps_data.get(pump_id)
+            if pump is None:
+                continue
+            self.delta_tracker.touch([pump_id])
+            
+            for field, value in fields.items():
+                if field == 'metrics':
+                    for name, metric in value.items():
+                        self.telemetry.set(pump_id, name, metric)
+                elif field == 'production_today':
+                    self.telemetry.production[self.telemetry.slots[pump_id]] = value
+                elif field == 'status':
+                    self.set_pump_status(pump_id, value)
+                elif field == 'alerts':
+                    self.set_pump_alerts(pump_id, value)
+                elif isinstance(value, dict) and isinstance(pump.get(field), dict):
+                    # الحقول المتداخلة تصل بالمفاتيح المتغيرة فقط
+                    pump[field] = {**pump[field], **value}
+                else:
+                    pump[field] = value
+    
+    def on_cluster_state(self, update: Dict):
+        """تطبيق حالة دورة المراقبة المنشورة من العملية القائدة"""
+        if self.is_leader or update.get('to') not in (None, self.bus.node_id):
+            return
+        
+        if update['type'] == 'delta':
+            if not self.cluster_synced or update['base_version'] != self.delta_tracker.version:
+                # فاتتنا دورة أو أكثر: طلب لقطة كاملة
+                self.cluster_synced = False
+                self.bus.publish('sync', {'node': self.bus.node_id})
+                return
+            self.apply_pump_changes(update['changes'])
+            self.history.record_batch(self.history_time(), self.telemetry.pump_ids, self.telemetry.columns)
+        else:
+            self.apply_pump_changes({pump['id']: pump for pump in update['pumps']})
+            if 'activities' in update:
+                self.activity_log.clear()
+                self.activity_log.extend(update['activities'])
+                self.chat_messages.clear()
+                self.chat_messages.extend(update['messages'])
+            self.cluster_synced = True
+        
+        statuses = [self.pumps_data[pump_id]['status'] for pump_id in self.telemetry.pump_ids]
+        self.aggregates.refresh_metrics(self.telemetry.columns['efficiency'], self.telemetry.production, statuses)
+        self.system_health = update['system_health']
+        dirty = self.delta_tracker.take_dirty()
+        view = {pump_id: self.pump_view(pump_id) for pump_id in dirty}
+        self.delta_tracker.commit(view, version=update['version'])
+        self.publish_snapshot(dirty, view=view)
+        
+        recovered = self.regulate_clients(True)
+        self.emit_feeds()
+        self.catch_up_clients(recovered)
+    
+    def on_cluster_sync(self, message: Dict):
+        """إرسال لقطة كاملة لعملية انضمت أو فاتتها تحديثات"""
+        if not self.is_leader:
+            return
+        update = self.build_data_update(None)
+        update.update(to=message['node'], activities=list(self.activity_log), messages=list(self.chat_messages))
+        self.bus.publish('state', update)
+    
+    def on_cluster_pumps(self, changes: Dict):
+        """تطبيق أمر تحكم نُفذ في عملية أخرى"""
+        self.apply_pump_changes(changes)
+        self.publish_snapshot([int(pump_id) for pump_id in changes])
+    
+    def on_cluster_activity(self, activity: Dict):
+        """نشاط من عملية أخرى: القائدة تسند له معرفاً، والتابعة تضيفه بمعرفه"""
+        if 'id' not in activity:
+            if self.is_leader:
+                self.record_activity(activity)
+        elif not self.is_leader:
+            self.activity_log.append(activity)
+    
+    def on_cluster_chat(self, message: Dict):
+        """رسالة دردشة من عملية أخرى: القائدة تسند لها معرفاً، والتابعة تضيفها بمعرفها"""
+        if 'id' not in message:
+            if self.is_leader:
+                self.record_chat_message(message)
+        elif not self.is_leader:
+            self.chat_messages.append(message)
+    
+    def on_cluster_acknowledge(self, message: Dict):
+        """تأكيد تنبيه استلمته عملية أخرى"""
+        if self.is_leader:
+            self.acknowledge_alert(message['alert_id'], message['user'])
+    
+    def on_cluster_ingest(self, message: Dict):
+        """قراءات حساسات استلمتها عملية تابعة"""
+        if not self.is_leader or self.ingest is None:
+            return
+        slots = self.telemetry.slots
+        readings = [(slots[pump_id], values, stamp) for pump_id, values, stamp in message['readings']
+                    if pump_id in slots]
+        self.ingest.submit(readings, message['rejected'])
+    
+    def on_cluster_fault(self, event: Dict):
+        """عطل محاكاة طلبته عملية تابعة"""
+        if self.is_leader:
+            self.inject_fault(event)
+    
+    def hold_leadership(self) -> bool:
+        """تجديد القيادة، وتولي المراقبة والتخزين إن توقفت العملية القائدة"""
+        if self.bus is None:
+            return True
+        
+        leader = self.bus.acquire_leadership()
+        if leader and not self.is_leader:
+            logger.warning("تولت هذه العملية المراقبة الخلفية بعد توقف العملية القائدة")
+            self.is_leader = True
+            self.cluster_synced = True
+            for pump_id, pump in self.pumps_data.items():
+                self.alert_engine.restore(self.telemetry.slots[pump_id], pump['alerts'])
+            try:
+                self.initialize_storage(self.data_dir, restore=False)
+            except RuntimeError as e:
+                logger.error(f"تعذر فتح التخزين الدائم بعد تولي القيادة: {str(e)}")
+            self.resume_ids()
+        elif not leader and self.is_leader:
+            logger.error("فقدت هذه العملية القيادة، سيتم التحول إلى عملية تابعة")
+            self.is_leader = False
+            self.close_storage()
+            self.cluster_synced = False
+            self.bus.publish('sync', {'node': self.bus.node_id})
+        return leader
+    
+    def cached_json(self, key: str, build: Callable[[StateSnapshot], Dict], variant: Any = None):
+        """
+        استجابة JSON مسلسلة مرة واحدة لكل إصدار من اللقطة المنشورة، مع ETag وردود 304
+
+        build: يبني جسم الاستجابة من اللقطة (يُستدعى فقط عند تغير الإصدار)
+        variant: جزء إضافي من الإصدار لبيانات لا تتبع إصدار الحالة
+        """
+        snapshot = self.snapshot
+        version = str(snapshot.revision) if variant is None else f'{snapshot.revision}.{variant}'
+        
+        entry = self.response_cache.get(key, version)
+        if entry is None:
+            # التسلسل بمزود JSON الخاص بالتطبيق ليطابق تنسيق jsonify بايتاً ببايت
+            body = self.app.json.response(build(snapshot)).get_data()
+            entry = self.response_cache.put(key, version, body)
+        
+        response = self.app.response_class(entry.body, mimetype=self.app.json.mimetype)
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    
+    @staticmethod
+    def parse_time_arg(value: Optional[str], default: float) -> float:
+        """تحويل معامل وقت (ثوان منذ Epoch أو تاريخ ISO) إلى ثوان"""
+        if not value:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                raise ValueError(f"صيغة وقت غير صحيحة: {value}")
     
     def authenticate_user(self, employee_id: str, password: str) -> Optional[Dict]:
         """مصادقة المستخدم"""
@@ -656,10 +1644,251 @@ class OilPumpSystem:
         
         return None
     
+    def authorize_admin(self) -> Tuple[Optional[Dict], Any]:
+        """
+        مدير النظام من بيانات HTTP Basic في الطلب الحالي
+
+        يرجع (المستخدم، None) أو (None، رد الرفض): 401 دون بيانات صحيحة، 403 لغير المدير
+        """
+        auth = request.authorization
+        user = None
+        if auth is not None and auth.username is not None:
+            user = self.authenticate_user(auth.username, auth.password or '')
+        if user is None:
+            response = jsonify({
+                'success': False,
+                'error': 'يتطلب تسجيل الدخول بحساب مدير النظام'
+            })
+            response.status_code = 401
+            response.headers['WWW-Authenticate'] = 'Basic realm="oil-pump-admin"'
+            return None, response
+        if user['role'] != 'admin':
+            return None, (jsonify({
+                'success': False,
+                'error': 'هذه العملية متاحة لمدير النظام فقط'
+            }), 403)
+        return user, None
+    
+    def set_pump_status(self, pump_id: int, status: str):
+        """تغيير حالة مضخة مع تحديث مجاميع الأسطول"""
+        pump = self.pumps_data[pump_id]
+        self.aggregates.change_status(pump['status'], status, self.telemetry.get(pump_id, 'efficiency'))
+        pump['status'] = status
+        self.delta_tracker.touch([pump_id])
+        self.schedule_pump(pump_id)
+    
+    def schedule_pump(self, pump_id: int):
+        """تحديد فاصل أخذ العينات لمضخة حسب إعدادها ونوعها وحالتها"""
+        self.scheduler.assign(pump_id, sampling_interval(self.sampling, self.pumps_data[pump_id]))
+    
+    def set_pump_alerts(self, pump_id: int, alerts: List[Dict]):
+        """استبدال قائمة تنبيهات مضخة مع تحديث مجاميع الأسطول"""
+        pump = self.pumps_data[pump_id]
+        self.aggregates.change_alerts(pump['alerts'], alerts)
+        pump['alerts'] = alerts
+        self.delta_tracker.touch([pump_id])
+    
+    def apply_control(self, pump_id: int, action: str) -> str:
+        """تطبيق إجراء تحكم على سجل مضخة دون نشر أو إشعار (في مالك الحالة) وإرجاع الرسالة"""
+        pump = self.pumps_data[pump_id]
+        self.delta_tracker.touch([pump_id])
+        
+        if action == 'start':
+            if pump['emergency_stop']:
+                raise ValueError('لا يمكن تشغيل المضخة في حالة إيقاف الطوارئ')
+            self.set_pump_status(pump_id, 'running')
+            message = f"تم تشغيل {pump['name']}"
+            
+        elif action == 'stop':
+            self.set_pump_status(pump_id, 'stopped')
+            message = f"تم إيقاف {pump['name']}"
+            
+        elif action == 'emergency_stop':
+            self.set_pump_status(pump_id, 'emergency_stop')
+            pump['emergency_stop'] = True
+            message = f"تم إيقاف الطوارئ لـ {pump['name']}"
+            
+        elif action == 'standby':
+            self.set_pump_status(pump_id, 'standby')
+            message = f"تم وضع {pump['name']} في وضع الاستعداد"
+            
+        elif action == 'auto':
+            pump['auto_mode'] = not pump['auto_mode']
+            mode = "التلقائي" if pump['auto_mode'] else "اليدوي"
+            message = f"تم تغيير {pump['name']} إلى الوضع {mode}"
+            
+        elif action == 'reset_emergency':
+            pump['emergency_stop'] = False
+            self.set_pump_status(pump_id, 'stopped')
+            message = f"تم إعادة تعيين إيقاف الطوارئ لـ {pump['name']}"
+            
+        elif action == 'maintenance':
+            self.set_pump_status(pump_id, 'maintenance')
+            message = f"تم وضع {pump['name']} في وضع الصيانة"
+            
+        else:
+            raise ValueError('إجراء غير صحيح')
+        
+        pump['updated_at'] = datetime.now().isoformat()
+        return message
+    
+    def execute_control(self, pump_id: int, action: str, user_id: str) -> Tuple[str, Dict]:
+        """تنفيذ إجراء تحكم على مضخة (في مالك الحالة) وإرجاع الرسالة وبيانات المضخة المنشورة"""
+        message = self.apply_control(pump_id, action)
+        
+        # نشر الحالة الجديدة
+        self.replicate_pumps([pump_id])
+        self.publish_snapshot([pump_id])
+        view = self.snapshot.pumps[pump_id]
+        
+        # إضافة إلى سجل النشاط
+        self.add_activity_log(
+            message=message,
+            user=user_id,
+            type='operation',
+            pump_id=pump_id
+        )
+        
+        # إرسال التحديث لمتابعي المضخة
+        self.socketio.emit('pump_updated', {
+            'pump_id': pump_id,
+            'pump': view,
+            'message': message,
+            'user': user_id
+        }, to=event_rooms('pumps', pump_id))
+        
+        logger.info(f"تم تنفيذ الإجراء {action} على المضخة {pump_id} بواسطة {user_id}")
+        return message, view
+    
+    def execute_bulk_control(self, selector: Dict, action: str, user_id: str, strict: bool = False) -> Dict:
+        """
+        تنفيذ إجراء تحكم على مجموعة مضخات دفعة واحدة (في مالك الحالة) بنشر واحد
+        وسجل نشاط واحد وإشعار مختصر واحد بحقول التحكم للمضخات المتغيرة
+
+        strict: رفض الأمر كاملاً إن تعذر تنفيذه على أي مضخة مختارة بدلاً من تخطيها
+        """
+        selected = select_pumps(selector, self.pumps_data)
+        if not selected:
+            raise ValueError('لا توجد مضخات مطابقة للمحدد')
+        pump_ids, unchanged, skipped = plan_control(selected, action, self.pumps_data)
+        if strict and skipped:
+            raise ValueError(f"تعذر تنفيذ الإجراء على {len(skipped)} مضخة من {len(selected)}")
+        
+        result = {'selected': len(selected), 'applied': pump_ids, 'unchanged': unchanged, 'skipped': skipped}
+        if not pump_ids:
+            result['message'] = 'لا توجد مضخات مختارة تحتاج لتنفيذ الإجراء'
+            return result
+        
+        # التحقق تم مسبقاً فلا يفشل التطبيق في منتصف المجموعة
+        for pump_id in pump_ids:
+            self.apply_control(pump_id, action)
+        self.replicate_pumps(pump_ids)
+        self.publish_snapshot(pump_ids)
+        
+        message = f"تم تنفيذ {ACTION_LABELS[action]} على {len(pump_ids)} مضخة"
+        if skipped:
+            message += f" (تم تخطي {len(skipped)})"
+        result['message'] = message
+        
+        self.add_activity_log(
+            message=message,
+            user=user_id,
+            type='emergency' if action == 'emergency_stop' else 'operation'
+        )
+        
+        # إشعار واحد لمتابعي أي من المضخات المتغيرة بحقول التحكم فقط
+        rooms = sorted({room for pump_id in pump_ids for room in event_rooms('pumps', pump_id)})
+        self.socketio.emit('pumps_controlled', {
+            'action': action,
+            'message': message,
+            'user': user_id,
+            'pumps': {pump_id: {field: self.pumps_data[pump_id][field] for field in CONTROL_FIELDS}
+                      for pump_id in pump_ids},
+            'skipped': len(skipped)
+        }, to=rooms)
+        
+        logger.info(f"تم تنفيذ الإجراء {action} على {len(pump_ids)} مضخة بواسطة {user_id}")
+        return result
+    
+    def execute_emergency_stop(self, command: Dict, selector: Optional[Dict] = None) -> Dict:
+        """
+        إيقاف الطوارئ للمضخات العاملة (جميعها أو المطابقة للمحدد) كأمر عاجل في مالك الحالة
+
+        الإيقاف يُطبق ثم يُرسل لجميع العملاء إشعار مختصر بمعرفات المضخات المتوقفة قبل
+        أي عمل آخر، وبعده فقط النسخ لبقية العمليات ونشر اللقطة وسجل النشاط
+        """
+        selected = select_pumps(selector if selector is not None else {'all': True}, self.pumps_data)
+        updated_at = datetime.now().isoformat()
+        stopped_ids = []
+        for pump_id in selected:
+            pump = self.pumps_data[pump_id]
+            if pump['status'] == 'running':
+                self.set_pump_status(pump_id, 'emergency_stop')
+                pump['emergency_stop'] = True
+                pump['updated_at'] = updated_at
+                stopped_ids.append(pump_id)
+        self.emergency.mark(command, 'applied', pumps=len(stopped_ids), clients=len(self.subscriptions.clients))
+        
+        if selector is None:
+            message = f"تم إيقاف الطوارئ لجميع المضخات ({len(stopped_ids)} مضخة)"
+        else:
+            message = f"تم إيقاف الطوارئ لـ {len(stopped_ids)} مضخة"
+        
+        # إشعار مختصر لجميع العملاء (بغض النظر عن اشتراكاتهم) يؤكده كل عميل باستلامه
+        self.socketio.emit('emergency_stop', {
+            'command_id': command['id'],
+            'message': message,
+            'user': command['user'],
+            'pump_ids': stopped_ids,
+            'updated_at': updated_at
+        })
+        self.emergency.mark(command, 'emitted')
+        
+        self.replicate_pumps(stopped_ids, channel='emergency')
+        self.publish_snapshot(stopped_ids)
+        
+        # إضافة إلى سجل النشاط
+        self.add_activity_log(
+            message=message,
+            user=command['user'],
+            type='emergency'
+        )
+        
+        logger.warning(f"تم تنفيذ إيقاف الطوارئ لـ {len(stopped_ids)} مضخة بواسطة {command['user']} "
+                       f"(الأمر {command['id']} عبر {command['source']})")
+        return {
+            'command_id': command['id'],
+            'message': message,
+            'selected': len(selected),
+            'stopped_pumps': [self.pumps_data[pump_id]['name'] for pump_id in stopped_ids],
+            'latency_ms': {stage: self.emergency.describe(command)[f'{stage}_ms'] for stage in ('applied', 'emitted')}
+        }
+    
+    def publish_snapshot(self, pump_ids: Optional[List[int]] = None, view: Optional[Dict[int, Dict]] = None):
+        """
+        نشر لقطة ثابتة جديدة للقراءة بلا أقفال (من مالك الحالة فقط)
+
+        pump_ids: إعادة بناء مضخات محددة فقط (الافتراضي: الأسطول كاملاً)
+        view: بيانات المضخات المبنية مسبقاً (pump_ids أو الأسطول كاملاً) لتجنب بنائها مرتين
+        """
+        previous = self.snapshot
+        if pump_ids is None and view is not None:
+            pumps = view
+        elif previous is None or pump_ids is None:
+            pumps = self.pumps_view()
+        else:
+            pumps = dict(previous.pumps)
+            for pump_id in pump_ids:
+                pumps[pump_id] = view[pump_id] if view is not None else self.pump_view(pump_id)
+        
+        revision = previous.revision + 1 if previous is not None else 1
+        # استبدال المرجع دفعة واحدة: القارئ يرى اللقطة القديمة أو الجديدة كاملة
+        self.snapshot = StateSnapshot(revision, pumps, self.system_health, self.aggregates.summary(),
+                                      datetime.now().isoformat())
+    
     def add_activity_log(self, message: str, user: str, type: str = 'info', pump_id: Optional[int] = None):
         """إضافة نشاط إلى السجل"""
         activity = {
-            'id': len(self.activity_log) + 1,
             'message': message,
             'user': user,
             'type': type,  # info, success, warning, error, operation, emergency, configuration
@@ -667,200 +1896,365 @@ class OilPumpSystem:
             'timestamp': datetime.now().isoformat()
         }
         
+        # المعرفات تسندها العملية القائدة وحدها ليبقى السجل مرتباً بلا تكرار بين العمليات
+        if self.is_leader:
+            self.actor.call(lambda: self.record_activity(activity))
+        else:
+            self.bus.publish('activity', activity)
+    
+    def record_activity(self, activity: Dict):
+        """إسناد معرف للنشاط وحفظه وبثه (في العملية القائدة)"""
+        activity = {'id': next(self.activity_ids), **activity}
+        
+        # المخزن الحلقي يحتفظ بآخر 500 نشاط فقط
         self.activity_log.append(activity)
+        if self.activity_store is not None:
+            self.activity_store.append(activity)
+        
+        # إرسال النشاط لمتابعي سجل النشاط (ولمتابعي المضخة إن كان يخصها)
+        self.socketio.emit('new_activity', activity, to=event_rooms('activity', activity['pump_id']))
+        if self.bus is not None:
+            self.bus.publish('activity', activity)
+    
+    def record_chat_message(self, message: Dict):
+        """إسناد معرف لرسالة الدردشة وحفظها وبثها (في العملية القائدة)"""
+        message = {'id': next(self.chat_ids), **message}
+        
+        # إضافة الرسالة إلى المخزن الحلقي (يحتفظ بآخر 100 رسالة فقط)
+        self.chat_messages.append(message)
+        if self.chat_store is not None:
+            self.chat_store.append(message)
+        
+        # إرسال الرسالة لمتابعي الدردشة
+        self.socketio.emit('new_message', message, to=event_rooms('chat'))
+        if self.bus is not None:
+            self.bus.publish('chat', message)
+    
+    def build_data_update(self, since: Optional[int] = None, pump_ids: Optional[FrozenSet[int]] = None) -> Dict:
+        """
+        بناء رسالة تحديث البيانات: فروقات منذ الإصدار المحدد أو لقطة كاملة
+
+        pump_ids: قصر الرسالة على مضخات محددة (الافتراضي: الأسطول كاملاً)
+        """
+        snapshot = self.snapshot
+        payload = {
+            'version': self.delta_tracker.version,
+            'system_health': snapshot.system_health,
+            'users_online': len(self.users_online),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        if self.delta_tracker.can_serve(since):
+            payload['type'] = 'delta'
+            payload['base_version'] = since
+            changes = self.delta_tracker.changes_since(since)
+            if pump_ids is not None:
+                changes = {pump_id: fields for pump_id, fields in changes.items() if pump_id in pump_ids}
+            payload['changes'] = changes
+        else:
+            payload['type'] = 'snapshot'
+            if pump_ids is None:
+                payload['pumps'] = snapshot.pumps_list()
+            else:
+                payload['pumps'] = [pump for pump_id, pump in snapshot.pumps.items() if pump_id in pump_ids]
         
-        # الاحتفاظ بآخر 500 نشاط فقط
-        if len(self.activity_log) > 500:
-            self.activity_log = self.activity_log[-500:]
+        return payload
+    
+    def build_client_update(self, sid: str, since: Optional[int] = None) -> Dict:
+        """
+        رسالة تحديث بيانات لعميل محدد حسب اشتراكه
+
+        أعضاء التدفقات المصفاة يستلمون إصدار تدفقهم (لا يتجاوز محتوى الرسالة) لتبدأ
+        فروقات التدفق التالية من الإصدار الذي يحمله العميل
+        """
+        subscription = self.subscriptions.clients.get(sid)
+        if subscription is None:
+            return self.build_data_update(since)
+        
+        update = self.build_data_update(since, subscription.pump_ids)
+        if subscription.feed is not None:
+            update['version'] = subscription.feed.version
+        return update
+    
+    def build_frame_update(self, feed: Feed) -> Dict:
+        """
+        تحديث بيانات بالصيغة الثنائية: إطار القياسات الحالية لمضخات التدفق مع فروقات
+        الحقول الأخرى (الحالة، التنبيهات...) بصيغة JSON لأنها نادرة التغير
+        """
+        if not self.delta_tracker.can_serve(feed.version):
+            return self.build_data_update(None, feed.pump_ids)
+        
+        changes = self.delta_tracker.changes_since(feed.version, exclude=('metrics', 'production_today'))
+        updated = {}
+        for pump_id in list(changes):
+            if feed.pump_ids is not None and pump_id not in feed.pump_ids:
+                del changes[pump_id]
+                continue
+            fields = changes[pump_id]
+            stamp = fields.pop('updated_at', None)
+            if stamp is not None:
+                updated[pump_id] = stamp
+            if not fields:
+                del changes[pump_id]
+        
+        if feed.slots is None:
+            feed.slots = frame_slots(self.telemetry, feed.pump_ids)
+        # المضخات ذات فواصل أخذ العينات الأطول لم تتغير قياساتها: إطار متفرق بالمتغيرة فقط
+        changed = self.delta_tracker.pumps_changed_since(feed.version, FRAME_FIELDS)
+        frame, stamps, count = encode_frame(self.telemetry, feed.slots, updated, changed)
+        
+        return {
+            'type': 'frame',
+            'version': self.delta_tracker.version,
+            'base_version': feed.version,
+            'system_health': self.snapshot.system_health,
+            'users_online': len(self.users_online),
+            'timestamp': datetime.now().isoformat(),
+            'changes': changes,
+            'stamps': stamps,
+            'count': count,
+            'frame': frame
+        }
+    
+    def apply_subscription(self, sid: str, pump_ids: Optional[FrozenSet[int]], events: FrozenSet[str],
+                           interval: float, encoding: Optional[str] = None, confirm: bool = False):
+        """
+        استبدال اشتراك عميل ونقله بين الغرف (في مالك الحالة)
+
+        encoding: صيغة تحديثات البيانات (الافتراضي: الصيغة المتفاوض عليها عند الاتصال)
+        confirm: إرسال تأكيد الاشتراك ولقطة بيانات مطابقة له
+        """
+        subscription, leave, join = self.subscriptions.subscribe(
+            sid, pump_ids, events, interval, self.delta_tracker.version, encoding
+        )
+        server = self.socketio.server
+        for room in leave:
+            server.leave_room(sid, room, namespace='/')
+        for room in join:
+            server.enter_room(sid, room, namespace='/')
+        self.flow.resume(sid)
+        
+        feed = subscription.feed
+        if feed is not None and feed.encoding == 'binary':
+            # المخطط يُرسل مرة واحدة لكل اشتراك، والإطارات بعده أرقام فقط
+            if feed.slots is None:
+                feed.slots = frame_slots(self.telemetry, feed.pump_ids)
+            self.socketio.emit('telemetry_schema', build_schema(self.telemetry, feed.slots),
+                               to=sid, ignore_queue=True)
+        
+        if confirm:
+            # الإرسال من مالك الحالة يضمن وصول اللقطة قبل أي فروقات لاحقة من التدفق
+            self.socketio.emit('subscribed', subscription.to_dict(), to=sid, ignore_queue=True)
+            if 'pumps' in events:
+                self.socketio.emit('data_update', self.build_client_update(sid), to=sid, ignore_queue=True)
+        
+        logger.info(
+            f"اشتراك العميل {sid}: المضخات {subscription.to_dict()['pumps'] or 'الكل'}، "
+            f"الأحداث {sorted(events)}، المعدل {interval:g} ثانية، الصيغة {subscription.encoding}"
+        )
+    
+    def client_queue_depth(self, sid: str) -> Optional[int]:
+        """عمق طابور إرسال Engine.IO لعميل (None إن انقطع اتصاله)"""
+        server = self.socketio.server
+        eio_sid = server.manager.eio_sid_from_sid(sid, '/')
+        socket = server.eio.sockets.get(eio_sid) if eio_sid is not None else None
+        return socket.queue.qsize() if socket is not None else None
+    
+    def regulate_clients(self, advanced: bool) -> List[str]:
+        """
+        فحص طوابير الإرسال قبل بث تحديثات الدورة (في مالك الحالة)
+
+        العميل المتأخر يخرج من غرفة البيانات، والمتأخر مراراً يُخفض معدله، ومن تجاوز
+        الحد الأقصى يُقطع اتصاله. يرجع العملاء الذين لحقوا لإرسال رسالة اللحاق بعد البث.
+        """
+        lagging, recovered, downgrade, overflow = self.flow.scan(list(self.subscriptions.clients), advanced)
+        server = self.socketio.server
         
-        # إرسال النشاط لجميع المستخدمين المتصلين
-        self.socketio.emit('new_activity', activity, broadcast=True)
+        for sid in lagging:
+            room = self.subscriptions.clients[sid].data_room()
+            if room is not None:
+                server.leave_room(sid, room, namespace='/')
+            logger.warning(f"تأخر العميل {sid} في الاستلام، سيتم دمج تحديثات البيانات حتى يلحق")
+        
+        for sid in downgrade:
+            subscription = self.subscriptions.clients[sid]
+            interval = min(MAX_INTERVAL, max(subscription.interval * 2, DOWNGRADE_INTERVAL))
+            logger.warning(f"تكرر تأخر العميل {sid}، سيتم خفض معدل التحديث إلى {interval:g} ثانية")
+            self.apply_subscription(sid, subscription.pump_ids, subscription.events, interval, confirm=True)
+        
+        for sid in overflow:
+            logger.warning(f"تجاوز طابور العميل {sid} الحد الأقصى، سيتم قطع الاتصال لإعادة المزامنة")
+            self.subscriptions.remove(sid)
+            self.flow.remove(sid)
+            server.disconnect(sid, namespace='/')
+        
+        return recovered
+    
+    def catch_up_clients(self, sids: List[str]):
+        """رسالة واحدة تدمج كل ما فات كل عميل لحق (منذ آخر إصدار أكده) ثم إعادته لغرفة البيانات"""
+        for sid in sids:
+            subscription = self.subscriptions.clients.get(sid)
+            if subscription is None:
+                continue
+            room = subscription.data_room()
+            if room is not None:
+                update = self.build_client_update(sid, self.client_versions.get(sid))
+                self.socketio.emit('data_update', update, to=sid, ignore_queue=True)
+                self.socketio.server.enter_room(sid, room, namespace='/')
+            self.flow.resume(sid)
+    
+    def emit_feeds(self):
+        """إرسال فروقات التدفقات المصفاة أو محدودة المعدل المستحقة لعملاء هذه العملية"""
+        version = self.delta_tracker.version
+        now = time.monotonic()
+        for feed in self.subscriptions.due_feeds(version, now):
+            # رسالة واحدة لكل تدفق تصل جميع أعضائه (الفروقات منذ آخر إرسال مدمجة)
+            if feed.encoding == 'binary':
+                update = self.build_frame_update(feed)
+            else:
+                update = self.build_data_update(feed.version, feed.pump_ids)
+            self.socketio.emit('data_update', update, to=feed.room, ignore_queue=True)
+            feed.version = update['version']
+            feed.last_sent = now
+    
+    def history_time(self) -> float:
+        """
+        الطابع الزمني لمخزن التاريخ بزمن المحاكاة
+
+        كشف الشذوذ والمجدول يعملان بساعة المحاكاة، فيُشتق طابع التاريخ منها أيضاً (مثبتاً
+        على وقت الجدار عند البدء) لتبقى الأنظمة جميعها على أساس زمني واحد مع تسريع المحاكاة
+        """
+        return self.clock_origin + self.clock.elapsed()
     
-    def update_pump_metrics(self, pump_id: int):
-        """تحديث مقاييس المضخة"""
-        if pump_id not in self.pumps_data:
+    def pump_view(self, pump_id: int) -> Dict:
+        """بناء بيانات المضخة بالشكل الكامل (السجل + القياسات من المخزن العمودي)"""
+        pump = dict(self.pumps_data[pump_id])
+        pump['metrics'] = self.telemetry.metrics_dict(pump_id)
+        pump['production_today'] = self.telemetry.production_of(pump_id)
+        return pump
+    
+    def pumps_view(self) -> Dict[int, Dict]:
+        """بيانات جميع المضخات بالشكل الكامل مفهرسة بالمعرف"""
+        return {pump_id: self.pump_view(pump_id) for pump_id in self.pumps_data}
+    
+    def pumps_list(self) -> List[Dict]:
+        """قائمة بيانات جميع المضخات بالشكل الكامل"""
+        return [self.pump_view(pump_id) for pump_id in self.pumps_data]
+    
+    def update_pump_metrics(self, pump_ids: Optional[List[int]] = None):
+        """
+        جمع قياسات الدورة من مصادر القياس دفعة واحدة في المخزن العمودي
+
+        pump_ids: المضخات المستحقة للمحاكاة (الافتراضي: الأسطول كاملاً)، والقراءات الحقيقية
+        الواردة تُكتب في كل دورة مهما كان جدول المضخة
+        """
+        statuses = [self.pumps_data[pump_id]['status'] for pump_id in self.telemetry.pump_ids]
+        
+        if pump_ids is None:
+            due = scales = None
+        else:
+            pump_ids = [pump_id for pump_id in pump_ids if pump_id in self.telemetry.slots]
+            due = [self.telemetry.slots[pump_id] for pump_id in pump_ids]
+            # الإنتاج يتزايد بحسب الزمن المنقضي منذ العينة السابقة لا بعدد العينات
+            scales = [(self.scheduler.interval_of(pump_id) or STEP_SECONDS) / STEP_SECONDS for pump_id in pump_ids]
+        
+        slots = self.pipeline.collect(statuses, due, scales)
+        if slots is None:
+            pump_ids = self.telemetry.pump_ids
+        elif not slots:
             return
+        else:
+            pump_ids = [self.telemetry.pump_ids[slot] for slot in slots]
         
-        pump = self.pumps_data[pump_id]
+        self.aggregates.refresh_metrics(self.telemetry.columns['efficiency'], self.telemetry.production, statuses)
         
-        # تحديث المقاييس حسب حالة المضخة
-        if pump['status'] == 'running':
-            # تحديث طبيعي مع تغييرات طفيفة
-            pump['metrics']['pressure'] += random.uniform(-2, 2)
-            pump['metrics']['temperature'] += random.uniform(-1, 3)
-            pump['metrics']['flow_rate'] += random.uniform(-10, 10)
-            pump['metrics']['vibration'] += random.uniform(-0.1, 0.2)
-            pump['metrics']['power'] += random.uniform(-2, 2)
-            pump['metrics']['efficiency'] += random.uniform(-1, 1)
-            
-            # زيادة الإنتاج
-            pump['production_today'] += random.uniform(1, 5)
-            
-        elif pump['status'] in ['stopped', 'emergency_stop']:
-            # قيم منخفضة للمضخات المتوقفة
-            pump['metrics']['pressure'] = max(0, pump['metrics']['pressure'] - random.uniform(5, 10))
-            pump['metrics']['temperature'] = max(20, pump['metrics']['temperature'] - random.uniform(2, 5))
-            pump['metrics']['flow_rate'] = 0
-            pump['metrics']['vibration'] = 0
-            pump['metrics']['power'] = 0
-            pump['metrics']['efficiency'] = 0
-            
-        elif pump['status'] == 'maintenance':
-            # قيم ثابتة للصيانة
-            pump['metrics']['pressure'] = 0
-            pump['metrics']['temperature'] = random.uniform(20, 30)
-            pump['metrics']['flow_rate'] = 0
-            pump['metrics']['vibration'] = 0
-            pump['metrics']['power'] = 0
-            pump['metrics']['efficiency'] = 0
-        
-        # تطبيق الحدود
-        pump['metrics']['pressure'] = max(0, min(100, pump['metrics']['pressure']))
-        pump['metrics']['temperature'] = max(20, min(120, pump['metrics']['temperature']))
-        pump['metrics']['flow_rate'] = max(0, min(500, pump['metrics']['flow_rate']))
-        pump['metrics']['vibration'] = max(0, min(5, pump['metrics']['vibration']))
-        pump['metrics']['power'] = max(0, min(100, pump['metrics']['power']))
-        pump['metrics']['efficiency'] = max(0, min(100, pump['metrics']['efficiency']))
-        
-        # تقريب القيم
-        for key in pump['metrics']:
-            if key in ['pressure', 'temperature', 'flow_rate', 'power', 'efficiency']:
-                pump['metrics'][key] = round(pump['metrics'][key], 1)
-            elif key == 'vibration':
-                pump['metrics'][key] = round(pump['metrics'][key], 2)
-        
-        # فحص التنبيهات
-        self.check_pump_alerts(pump_id)
+        # تسجيل القراءات في مخزن التاريخ
+        self.history.record_batch(self.history_time(), self.telemetry.pump_ids, self.telemetry.columns, slots)
+        
+        # فحص التنبيهات (مرحلة مستقلة في تتبع الدورة)
+        self.tick_trace.mark('update_pump_metrics')
+        self.check_pump_alerts(statuses, slots)
+        self.tick_trace.mark('check_pump_alerts')
         
         # تحديث الوقت
-        pump['updated_at'] = datetime.now().isoformat()
+        now = datetime.now().isoformat()
+        for pump_id in pump_ids:
+            self.pumps_data[pump_id]['updated_at'] = now
+        self.delta_tracker.touch(pump_ids)
     
-    def check_pump_alerts(self, pump_id: int):
-        """فحص تنبيهات المضخة"""
-        if pump_id not in self.pumps_data:
-            return
+    def check_pump_alerts(self, statuses: List[str], slots: Optional[List[int]] = None):
+        """فحص تنبيهات المضخات (الحدود الثابتة وكشف الشذوذ) دفعة واحدة وتحديث قوائم التنبيهات عند تغيرها فقط"""
+        pump_ids = self.telemetry.pump_ids
+        raised, cleared = self.alert_engine.evaluate(self.telemetry.columns, pump_ids, statuses, slots)
         
-        pump = self.pumps_data[pump_id]
-        metrics = pump['metrics']
-        thresholds = pump['thresholds']
-        
-        # مسح التنبيهات القديمة
-        pump['alerts'] = []
-        
-        # فحص الضغط
-        if metrics['pressure'] < thresholds['pressure_min']:
-            pump['alerts'].append({
-                'id': f"pressure_low_{pump_id}",
-                'type': 'pressure_low',
-                'severity': 'warning',
-                'message': f"انخفاض الضغط في {pump['name']}",
-                'description': f"الضغط الحالي {metrics['pressure']} بار أقل من الحد الأدنى {thresholds['pressure_min']} بار",
-                'cause': 'نقص في السائل أو انسداد في الأنابيب',
-                'image': '/static/images/pressure_low.png',
-                'recommendations': [
-                    'فحص مستوى السائل في الخزان',
-                    'التأكد من عدم وجود انسداد في الأنابيب',
-                    'فحص صمامات النظام'
-                ],
-                'timestamp': datetime.now().isoformat()
-            })
-        elif metrics['pressure'] > thresholds['pressure_max']:
-            pump['alerts'].append({
-                'id': f"pressure_high_{pump_id}",
-                'type': 'pressure_high',
-                'severity': 'critical',
-                'message': f"ارتفاع الضغط في {pump['name']}",
-                'description': f"الضغط الحالي {metrics['pressure']} بار أعلى من الحد الأقصى {thresholds['pressure_max']} بار",
-                'cause': 'انسداد في خط التصريف أو عطل في صمام الأمان',
-                'image': '/static/images/pressure_high.png',
-                'recommendations': [
-                    'إيقاف المضخة فوراً',
-                    'فحص صمام الأمان',
-                    'التأكد من عدم انسداد خط التصريف'
-                ],
-                'timestamp': datetime.now().isoformat()
-            })
+        # الشذوذ في عينات هذه الدورة (تحديث ثابت التكلفة لكل عينة)
+        findings = self.anomaly_detector.update(self.telemetry.columns, statuses, slots)
+        anomalies_raised, anomalies_cleared = self.alert_engine.evaluate_anomalies(findings, pump_ids, slots)
+        raised += anomalies_raised
+        cleared += anomalies_cleared
         
-        # فحص درجة الحرارة
-        if metrics['temperature'] > thresholds['temperature_max']:
-            pump['alerts'].append({
-                'id': f"temperature_high_{pump_id}",
-                'type': 'temperature_high',
-                'severity': 'critical',
-                'message': f"ارتفاع درجة الحرارة في {pump['name']}",
-                'description': f"درجة الحرارة الحالية {metrics['temperature']}°م أعلى من الحد الأقصى {thresholds['temperature_max']}°م",
-                'cause': 'نقص في سائل التبريد أو عطل في المروحة',
-                'image': '/static/images/temperature_high.png',
-                'recommendations': [
-                    'فحص نظام التبريد',
-                    'التأكد من عمل المروحة',
-                    'فحص مستوى سائل التبريد'
-                ],
-                'timestamp': datetime.now().isoformat()
-            })
+        # إعادة بناء قائمة التنبيهات للمضخات التي تغيرت تنبيهاتها فقط
+        for pump_id in {pump_id for pump_id, _ in raised} | {pump_id for pump_id, _ in cleared}:
+            self.set_pump_alerts(pump_id, self.alert_engine.alerts_for(self.telemetry.slots[pump_id]))
         
-        # فحص معدل التدفق
-        if pump['status'] == 'running' and metrics['flow_rate'] < thresholds['flow_rate_min']:
-            pump['alerts'].append({
-                'id': f"flow_low_{pump_id}",
-                'type': 'flow_low',
-                'severity': 'warning',
-                'message': f"انخفاض معدل التدفق في {pump['name']}",
-                'description': f"معدل التدفق الحالي {metrics['flow_rate']} ل/د أقل من الحد الأدنى {thresholds['flow_rate_min']} ل/د",
-                'cause': 'انسداد في المرشحات أو تآكل في الأجزاء الداخلية',
-                'image': '/static/images/flow_low.png',
-                'recommendations': [
-                    'تنظيف أو استبدال المرشحات',
-                    'فحص الأجزاء الداخلية للمضخة',
-                    'التأكد من عدم وجود تسريبات'
-                ],
-                'timestamp': datetime.now().isoformat()
-            })
+        # إرسال التنبيهات عند الانتقال فقط (ظهور أو زوال)
+        for pump_id, alert in raised:
+            self.socketio.emit('new_alert', {
+                'pump_id': pump_id,
+                'pump_name': self.pumps_data[pump_id]['name'],
+                'alert': alert
+            }, to=event_rooms('alerts', pump_id))
         
-        # فحص الاهتزاز
-        if metrics['vibration'] > thresholds['vibration_max']:
-            pump['alerts'].append({
-                'id': f"vibration_high_{pump_id}",
-                'type': 'vibration_high',
-                'severity': 'warning',
-                'message': f"ارتفاع الاهتزاز في {pump['name']}",
-                'description': f"مستوى الاهتزاز الحالي {metrics['vibration']} مم/ث أعلى من الحد الأقصى {thresholds['vibration_max']} مم/ث",
-                'cause': 'عدم توازن في الدوار أو تآكل في المحامل',
-                'image': '/static/images/vibration_high.png',
-                'recommendations': [
-                    'فحص توازن الدوار',
-                    'فحص حالة المحامل',
-                    'التأكد من ثبات قاعدة المضخة'
-                ],
-                'timestamp': datetime.now().isoformat()
-            })
+        for pump_id, alert in cleared:
+            self.socketio.emit('alert_cleared', {
+                'pump_id': pump_id,
+                'pump_name': self.pumps_data[pump_id]['name'],
+                'alert_id': alert['id'],
+                'alert': alert
+            }, to=event_rooms('alerts', pump_id))
+    
+    def acknowledge_alert(self, alert_id: str, user: str) -> Optional[Dict]:
+        """تأكيد استلام تنبيه نشط وإشعار جميع المستخدمين"""
+        if not self.is_leader:
+            # محرك التنبيهات في العملية القائدة: تحديث النسخة المحلية وتمرير التأكيد إليها
+            for pump_id, pump in self.pumps_data.items():
+                for index, alert in enumerate(pump['alerts']):
+                    if alert['id'] != alert_id:
+                        continue
+                    if alert['state'] != 'acknowledged':
+                        alert = {**alert, 'state': 'acknowledged', 'acknowledged_by': user,
+                                 'acknowledged_at': datetime.now().isoformat()}
+                        pump['alerts'] = pump['alerts'][:index] + [alert] + pump['alerts'][index + 1:]
+                        self.delta_tracker.touch([pump_id])
+                        self.publish_snapshot([pump_id])
+                    self.bus.publish('acknowledge', {'alert_id': alert_id, 'user': user})
+                    return alert
+            return None
         
-        # فحص الكفاءة
-        if pump['status'] == 'running' and metrics['efficiency'] < thresholds['efficiency_min']:
-            pump['alerts'].append({
-                'id': f"efficiency_low_{pump_id}",
-                'type': 'efficiency_low',
-                'severity': 'info',
-                'message': f"انخفاض الكفاءة في {pump['name']}",
-                'description': f"الكفاءة الحالية {metrics['efficiency']}% أقل من الحد الأدنى {thresholds['efficiency_min']}%",
-                'cause': 'تآكل في الأجزاء الداخلية أو الحاجة للصيانة',
-                'image': '/static/images/efficiency_low.png',
-                'recommendations': [
-                    'جدولة صيانة دورية',
-                    'فحص الأجزاء الداخلية',
-                    'تحسين ظروف التشغيل'
-                ],
-                'timestamp': datetime.now().isoformat()
-            })
+        result = self.alert_engine.acknowledge(alert_id, user)
+        if result is None:
+            return None
         
-        # إرسال التنبيهات الجديدة
-        if pump['alerts']:
-            for alert in pump['alerts']:
-                self.socketio.emit('new_alert', {
-                    'pump_id': pump_id,
-                    'pump_name': pump['name'],
-                    'alert': alert
-                }, broadcast=True)
+        slot, alert = result
+        pump_id = self.telemetry.pump_ids[slot]
+        self.set_pump_alerts(pump_id, self.alert_engine.alerts_for(slot))
+        self.publish_snapshot([pump_id])
+        
+        self.add_activity_log(
+            message=f"تم تأكيد استلام التنبيه: {alert['message']}",
+            user=user,
+            type='operation',
+            pump_id=pump_id
+        )
+        
+        self.socketio.emit('alert_acknowledged', {
+            'pump_id': pump_id,
+            'alert_id': alert_id,
+            'alert': alert,
+            'user': user
+        }, to=event_rooms('alerts', pump_id))
+        
+        return alert
     
     def update_system_health(self):
         """تحديث صحة النظام"""
@@ -869,25 +2263,27 @@ class OilPumpSystem:
             total_score = 0
             factors = 0
             
+            # المجاميع التراكمية بدلاً من المرور على جميع المضخات
+            aggregates = self.aggregates
+            
             # عدد المضخات العاملة
-            running_pumps = len([p for p in self.pumps_data.values() if p['status'] == 'running'])
-            total_pumps = len(self.pumps_data)
+            running_pumps = aggregates.count('running')
+            total_pumps = aggregates.total_pumps
             if total_pumps > 0:
                 pump_score = (running_pumps / total_pumps) * 30
                 total_score += pump_score
                 factors += 30
             
-            # متوسط الكفاءة
-            running_efficiencies = [p['metrics']['efficiency'] for p in self.pumps_data.values() if p['status'] == 'running']
-            if running_efficiencies:
-                avg_efficiency = sum(running_efficiencies) / len(running_efficiencies)
+            # متوسط كفاءة المضخات العاملة
+            avg_efficiency = aggregates.running_efficiency_sum / running_pumps if running_pumps > 0 else 0
+            if running_pumps > 0:
                 efficiency_score = (avg_efficiency / 100) * 25
                 total_score += efficiency_score
                 factors += 25
             
             # عدد التنبيهات النشطة
-            active_alerts = len([alert for pump in self.pumps_data.values() for alert in pump['alerts']])
-            critical_alerts = len([alert for pump in self.pumps_data.values() for alert in pump['alerts'] if alert['severity'] == 'critical'])
+            active_alerts = aggregates.active_alerts
+            critical_alerts = aggregates.severity_counts.get('critical', 0)
             
             alert_penalty = min(active_alerts * 2 + critical_alerts * 5, 20)
             alert_score = max(0, 20 - alert_penalty)
@@ -895,7 +2291,7 @@ class OilPumpSystem:
             factors += 20
             
             # استقرار النظام (عدد المضخات في حالة طوارئ)
-            emergency_pumps = len([p for p in self.pumps_data.values() if p['status'] == 'emergency_stop'])
+            emergency_pumps = aggregates.count('emergency_stop')
             emergency_penalty = emergency_pumps * 10
             stability_score = max(0, 25 - emergency_penalty)
             total_score += stability_score
@@ -930,7 +2326,7 @@ class OilPumpSystem:
                 'status_ar': status_ar,
                 'factors': {
                     'pump_availability': round((running_pumps / total_pumps) * 100, 1) if total_pumps > 0 else 0,
-                    'avg_efficiency': round(sum(running_efficiencies) / len(running_efficiencies), 1) if running_efficiencies else 0,
+                    'avg_efficiency': round(avg_efficiency, 1),
                     'active_alerts': active_alerts,
                     'critical_alerts': critical_alerts,
                     'emergency_pumps': emergency_pumps
@@ -941,42 +2337,187 @@ class OilPumpSystem:
         except Exception as e:
             logger.error(f"خطأ في تحديث صحة النظام: {str(e)}")
     
+    def monitoring_cycle(self, pump_ids: Optional[List[int]] = None) -> bool:
+        """
+        دورة مراقبة واحدة تُنفذ في مالك الحالة (ترجع False في العملية التابعة)
+
+        pump_ids: المضخات المستحقة لأخذ عينة في هذه الدورة (الافتراضي: الأسطول كاملاً)
+        """
+        # العمليات التابعة تستلم الحالة من العملية القائدة
+        if not self.hold_leadership():
+            return False
+        
+        # زمن كل مرحلة يُسجل عند نهايتها في تتبع الدورة
+        trace = self.tick_trace
+        
+        # تحديث مقاييس المضخات المستحقة والقراءات الواردة (تغييرات التحكم تُرسل في كل دورة)
+        self.update_pump_metrics(pump_ids)
+        trace.mark('update_pump_metrics')
+        
+        # أوامر الطوارئ المنتظرة تُنفذ بين المراحل (قبل بناء العرض فيتضمن أثرها) ولا تنتظر نهاية الدورة
+        self.actor.run_urgent()
+        trace.mark('urgent')
+        
+        # تحديث صحة النظام
+        self.update_system_health()
+        trace.mark('update_system_health')
+        
+        # مزامنة التخزين الدائم مع القرص
+        self.flush_storage(force=False)
+        trace.mark('flush_storage')
+        self.actor.run_urgent()
+        trace.mark('urgent')
+        
+        # تسجيل حقول المضخات التي كُتبت في هذه الدورة فقط ونشر لقطة القراءة الجديدة
+        previous_version = self.delta_tracker.version
+        dirty = self.delta_tracker.take_dirty()
+        view = {pump_id: self.pump_view(pump_id) for pump_id in dirty}
+        current_version = self.delta_tracker.commit(view)
+        self.publish_snapshot(dirty, view=view)
+        trace.mark('publish_snapshot')
+        
+        # العملاء البطيئون لا تُضاف لطوابيرهم تحديثات ستصبح قديمة
+        advanced = current_version > previous_version
+        recovered = self.regulate_clients(advanced)
+        trace.mark('regulate_clients')
+        
+        # إرسال الفروقات فقط لمتابعي الأسطول كاملاً (في جميع العمليات عبر الناقل)
+        if advanced:
+            update = self.build_data_update(previous_version)
+            self.socketio.emit('data_update', update, to=FLEET_FEED_ROOM)
+            if self.bus is not None:
+                self.bus.publish('state', update)
+        trace.mark('emit_fleet')
+        
+        # التدفقات المصفاة أو محدودة المعدل لعملاء هذه العملية
+        self.emit_feeds()
+        self.catch_up_clients(recovered)
+        trace.mark('emit_feeds')
+        return True
+    
     def background_monitoring(self):
-        """مراقبة خلفية للنظام"""
-        while True:
+        """مراقبة خلفية للنظام بدورات ثابتة المعدل (لا تنزاح الفترة مع زمن العمل)"""
+        def cycle(first: int, last: int, queued: float):
+            # تتبع مراحل الدورة في مالك الحالة (دورات العملية التابعة لا تُحفظ)
+            self.tick_trace.begin(last, queued)
+            ran = True
             try:
-                # تحديث مقاييس جميع المضخات
-                for pump_id in self.pumps_data.keys():
-                    self.update_pump_metrics(pump_id)
-                
-                # تحديث صحة النظام
-                self.update_system_health()
-                
-                # إرسال تحديث البيانات لجميع المستخدمين
-                self.socketio.emit('data_update', {
-                    'pumps': list(self.pumps_data.values()),
-                    'system_health': self.system_health,
-                    'users_online': len(self.users_online),
-                    'timestamp': datetime.now().isoformat()
-                }, broadcast=True)
-                
-                # انتظار 5 ثوان قبل التحديث التالي
-                time.sleep(5)
-                
-            except Exception as e:
-                logger.error(f"خطأ في المراقبة الخلفية: {str(e)}")
-                time.sleep(10)  # انتظار أطول في حالة الخطأ
+                pump_ids = self.scheduler.due(first, last)
+                self.tick_trace.mark('schedule')
+                ran = self.monitoring_cycle(pump_ids)
+            finally:
+                trace = self.tick_trace.end(keep=ran, pumps=self.scheduler.last_due)
+            if trace is not None:
+                for stage, seconds in trace['stages'].items():
+                    self.stage_duration.observe(seconds, (stage,))
+        
+        def tick(first: int, last: int):
+            started = time.perf_counter()
+            self.actor.call(lambda: cycle(first, last, started))
+            self.tick_duration.observe(time.perf_counter() - started)
+        
+        self.scheduler.run(tick, self.clock.sleep)
+    
+    def submit_readings(self, readings: List[Tuple[int, List[Optional[float]], Optional[float]]],
+                        rejected: int = 0) -> int:
+        """
+        إضافة قراءات تم التحقق منها لمصدر الاستقبال (من أي خيط)
+
+        العملية التابعة تمرر القراءات للعملية القائدة لأنها مالكة المخزن العمودي
+        """
+        if self.ingest is None:
+            return 0
+        if self.bus is not None and not self.is_leader:
+            pump_ids = self.telemetry.pump_ids
+            self.bus.publish('ingest', {
+                'readings': [[pump_ids[slot], values, stamp] for slot, values, stamp in readings],
+                'rejected': rejected,
+            })
+            return len(readings)
+        return self.ingest.submit(readings, rejected)
+    
+    def start_ingest_listener(self, address: str):
+        """بدء مستمع قراءات UDP على العنوان host:port (فارغ = معطل)"""
+        if not address or self.ingest is None:
+            return
+        listener = UdpListener(address, lambda text: self.submit_readings(*parse_lines(text, self.telemetry.slots)))
+        try:
+            listener.bind()
+        except OSError as e:
+            logger.error(f"تعذر فتح مستمع قراءات UDP على {address}: {str(e)}")
+            return
+        self.ingest_listener = listener
+        self.socketio.start_background_task(listener.serve)
+    
+    def start_modbus_poller(self, path: str):
+        """بدء استطلاع وحدات التحكم حسب ملف إعداد Modbus (فارغ = معطل)"""
+        if not path or self.ingest is None:
+            return
+        try:
+            config, devices, pool = load_modbus_config(path, list(self.pumps_data))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"تعذر تحميل إعداد Modbus من {path}: {str(e)}")
+            return
+        
+        slots = self.telemetry.slots
+        self.modbus = ModbusPoller(
+            devices, pool,
+            lambda readings: self.submit_readings([(slots[pump_id], values, stamp)
+                                                   for pump_id, values, stamp in readings]),
+            workers=int(config.get('workers', 32))
+        )
+        self.modbus_scheduler = MonitorScheduler(float(config.get('interval', DEFAULT_PERIOD)))
+        
+        def poll(first: int, last: int):
+            # العملية القائدة وحدها تستطلع الوحدات حتى لا تتضاعف الطلبات على وحدات التحكم
+            if self.is_leader:
+                self.modbus.poll_once()
+        
+        self.socketio.start_background_task(self.modbus_scheduler.run, poll, self.socketio.sleep)
+        logger.info(f"تم بدء استطلاع {len(devices)} وحدة تحكم عبر Modbus/TCP")
+    
+    def start_fault_script(self, raw: str):
+        """تفعيل سيناريو الأعطال في مصدر المحاكاة (نص JSON أو مسار ملف، فارغ = بلا أعطال مجدولة)"""
+        simulator = self.pipeline.source('simulator')
+        if simulator is None:
+            return
+        events = []
+        if raw:
+            try:
+                events = load_faults(raw, self.pumps_data)
+            except (OSError, ValueError) as e:
+                logger.error(f"تعذر تحميل سيناريو الأعطال: {str(e)}")
+        self.faults = simulator.faults = FaultScript(events, self.clock.now)
+        if events:
+            logger.info(f"تمت جدولة {len(events)} عطل محاكاة")
+    
+    def inject_fault(self, event: Dict) -> Dict:
+        """
+        إضافة عطل للسيناريو، زمن بدايته at بالثواني بعد الآن
+
+        العملية التابعة تمرر العطل للعملية القائدة لأنها من يشغل المحاكاة
+        """
+        if self.bus is not None and not self.is_leader:
+            self.bus.publish('fault', event)
+            return event
+        return self.faults.add(dict(event, at=self.faults.elapsed() + event['at']))
     
     def start_background_monitoring(self):
         """بدء المراقبة الخلفية"""
-        monitoring_thread = threading.Thread(target=self.background_monitoring, daemon=True)
-        monitoring_thread.start()
+        # مهمة خلفية متوافقة مع وضع الخادم (خيط عادي أو خيط أخضر)
+        self.socketio.start_background_task(self.background_monitoring)
         logger.info("تم بدء المراقبة الخلفية للنظام")
     
     def run(self, host='0.0.0.0', port=5000, debug=False):
         """تشغيل النظام"""
-        logger.info(f"بدء تشغيل نظام مراقبة مضخات النفط على {host}:{port}")
-        self.socketio.run(self.app, host=host, port=port, debug=debug, allow_unsafe_werkzeug=True)
+        logger.info(f"بدء تشغيل نظام مراقبة مضخات النفط على {host}:{port} (وضع {self.async_mode})")
+        
+        if self.async_mode == 'threading':
+            logger.warning("وضع threading يستخدم خادم التطوير Werkzeug؛ استخدم eventlet أو gevent في الإنتاج")
+            self.socketio.run(self.app, host=host, port=port, debug=debug, allow_unsafe_werkzeug=True)
+        else:
+            # خادم WSGI غير متزامن مدمج (eventlet.wsgi أو gevent pywsgi)
+            self.socketio.run(self.app, host=host, port=port, debug=debug, log_output=debug)
 
 # إنشاء مجلدات الملفات الثابتة والقوالب
 def create_directories():
@@ -992,7 +2533,9 @@ if __name__ == '__main__':
         
         # إنشاء وتشغيل النظام
         system = OilPumpSystem()
-        system.run(host='0.0.0.0', port=5000, debug=False)
+        system.run(host=os.environ.get('OIL_PUMP_HOST', '0.0.0.0'),
+                   port=int(os.environ.get('OIL_PUMP_PORT', 5000)),
+                   debug=False)
         
     except KeyboardInterrupt:
         logger.info("تم إيقاف النظام بواسطة المستخدم")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+مقاييس تشغيل الخادم بصيغة Prometheus
+Prometheus Metrics for Server Internals
+
+عدادات ومدرجات تكرارية مفهرسة بقيم التسميات تُحدث في المسارات الحرجة بعملية ثابتة
+التكلفة (قفل غير متنازع عليه وبحث ثنائي في حدود الفئات)، ومقاييس لحظية تُقرأ من
+مصادرها عند الطلب فقط. الصفحة النصية تُبنى عند كل قراءة بصيغة العرض النصية
+(text/plain 0.0.4) التي يقرؤها Prometheus وبقية أدوات OpenMetrics دون مكتبة إضافية.
+"""
+
+import math
+import time
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from socketio import packet
+
+# نوع محتوى صفحة المقاييس
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# حدود فئات الأزمنة بالثواني
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# حدود فئات أحجام الرسائل بالبايت
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    """قيمة رقمية بصيغة العرض النصية"""
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels, extra: str = '') -> str:
+    """التسميات بصيغة {name="value",...} مع تهريب القيم"""
+    pairs = ['{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric(ABC):
+    """
+    مقياس مسمى بتسميات ثابتة الأسماء
+    Base class holding name, help text and label names
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        """سطرا الوصف والنوع"""
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """أسطر القيم"""
+
+    def render(self) -> List[str]:
+        """أسطر المقياس كاملة بصيغة العرض النصية"""
+        return self.header() + self.samples()
+
+
+class Counter(Metric):
+    """
+    عداد تراكمي
+    Monotonic counter per label values
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        """زيادة العداد لقيم التسميات"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        """القيمة الحالية لقيم التسميات"""
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in sorted(values)]
+
+
+class Histogram(Metric):
+    """
+    مدرج تكراري بفئات ثابتة الحدود
+    Fixed-bucket histogram per label values (cumulated only when rendered)
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # لكل قيم تسميات: عدد القيم في كل فئة (غير تراكمي، الأخيرة +Inf) ومجموعها
+        self._series: Dict[Labels, List] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        """إضافة قيمة لفئتها"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = []
+        names = self.labelnames
+        for labels, counts, total in sorted(series, key=lambda item: item[0]):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="{}"'.format(_format_value(bound))
+                lines.append(f'{self.name}_bucket{_format_labels(names, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(names, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(names, labels)} {cumulative}')
+        return lines
+
+
+class Collected(Metric):
+    """
+    مقياس يُقرأ من مصدره عند الطلب (أحجام المخازن، عدد الخيوط، عدادات الوحدات الأخرى)
+    Gauge or counter whose values come from a callback at scrape time
+    """
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Union[float, Dict[Labels, float]]],
+                 labelnames: Tuple[str, ...] = (), kind: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in values.items()]
+
+
+class MetricsRegistry:
+    """
+    سجل مقاييس العملية
+    Registry rendering every metric in the Prometheus text format
+    """
+
+    def __init__(self, prefix: str = ''):
+        self.prefix = prefix
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """تسجيل مقياس (الأسماء فريدة)"""
+        if metric.name in self._metrics:
+            raise ValueError(f"مقياس مسجل مسبقاً: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def collected(self, name: str, documentation: str, collect: Callable, labelnames: Tuple[str, ...] = (),
+                  kind: str = 'gauge') -> Collected:
+        return self.register(Collected(self.prefix + name, documentation, collect, labelnames, kind))
+
+    def render(self) -> str:
+        """صفحة المقاييس (مقياس لا يمكن قراءته لا يمنع عرض البقية)"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f'# {metric.name} غير متاح: {str(e)}')
+        return '\n'.join(lines) + '\n'
+
+
+def metered_packet(emits: Counter, sizes: Optional[Histogram] = None,
+                   timer: Optional[Callable[[float], None]] = None) -> type:
+    """
+    صنف حزم Socket.IO يعد الأحداث المرسلة وأحجامها باسم الحدث (serializer للخادم)
+
+    يُحسب الحجم من ترميز الحزمة نفسه الذي يتم مرة واحدة لكل إرسال (لا لكل مستلم)،
+    فلا يضيف القياس ترميزاً ثانياً؛ المرفقات الثنائية تُضاف للحجم
+    timer: يستلم زمن ترميز كل حزمة بالثواني (تتبع مراحل الدورات)
+    """
+    clock = time.perf_counter
+
+    class MeteredPacket(packet.Packet):
+        def encode(self):
+            if timer is None:
+                encoded = super().encode()
+            else:
+                started = clock()
+                encoded = super().encode()
+                timer(clock() - started)
+            if self.packet_type in (packet.EVENT, packet.BINARY_EVENT) and self.data \
+                    and isinstance(self.data[0], str):
+                labels = (self.data[0],)
+                emits.inc(labels)
+                if sizes is not None:
+                    size = sum(len(part) for part in encoded) if isinstance(encoded, list) else len(encoded)
+                    sizes.observe(size, labels)
+            return encoded
+
+    return MeteredPacket
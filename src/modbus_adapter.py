@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+قراءة المضخات من وحدات التحكم عبر Modbus/TCP
+Modbus/TCP Polling Adapter
+
+تُربط كل مضخة بوحدة تحكم (المضيف والمنفذ ورقم الوحدة) وإزاحة في خريطة سجلات
+القياسات. في كل دورة استطلاع:
+- تُجمع سجلات جميع مضخات الوحدة الواحدة وتُدمج المتجاورة (أو ذات الفجوات الصغيرة)
+  في طلبات قراءة واحدة بحد أقصى 125 سجلاً للطلب
+- تُستطلع الوحدات بالتوازي عبر مجموعة عمال ثابتة، والاتصالات دائمة تُعاد استخدامها
+  بين الدورات (مجموعة اتصالات محدودة لكل مضيف تتشاركها الوحدات خلف البوابة نفسها)
+  فلا يُدفع ثمن فتح اتصال TCP في كل دورة
+- لكل طلب مهلة، ويُعاد الطلب الفاشل على اتصال جديد، والوحدة التي تتكرر أخطاؤها
+  تُؤجل بتراجع أسي فلا تؤخر الوحدات السليمة
+- القراءات الناتجة تُرسل لمصدر الاستقبال كأي قراءات حساسات أخرى
+
+ملف الإعداد (OIL_PUMP_MODBUS):
+    {
+      "interval": 1.0, "timeout": 0.5, "retries": 1, "workers": 32, "connections_per_host": 2,
+      "devices": [
+        {"host": "10.0.0.5", "port": 502, "unit": 1, "pumps": {"1": 0, "2": 20}}
+      ]
+    }
+حيث pumps تربط معرف المضخة بإزاحة سجلاتها في الوحدة، ويمكن تغيير خريطة السجلات
+الافتراضية بالحقل registers في الملف أو في الوحدة.
+"""
+
+import json
+import time
+import socket
+import struct
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ingestion import FIELD_BOUNDS, FIELD_INDEX, PRODUCTION_INDEX
+
+logger = logging.getLogger(__name__)
+
+# خريطة السجلات الافتراضية لكل مضخة (العنوان نسبة لإزاحة المضخة)
+DEFAULT_REGISTERS = {
+    'pressure': {'address': 0, 'type': 'uint16', 'scale': 0.1},
+    'temperature': {'address': 1, 'type': 'uint16', 'scale': 0.1},
+    'flow_rate': {'address': 2, 'type': 'uint16', 'scale': 0.1},
+    'vibration': {'address': 3, 'type': 'uint16', 'scale': 0.01},
+    'power': {'address': 4, 'type': 'uint16', 'scale': 0.1},
+    'efficiency': {'address': 5, 'type': 'uint16', 'scale': 0.1},
+    'production': {'address': 6, 'type': 'uint32', 'scale': 0.1},
+}
+
+# أنواع القيم: (عدد السجلات، صيغة struct بترتيب big-endian)
+REGISTER_TYPES = {
+    'uint16': (1, '>H'),
+    'int16': (1, '>h'),
+    'uint32': (2, '>I'),
+    'int32': (2, '>i'),
+    'float32': (2, '>f'),
+}
+
+# وظائف Modbus المدعومة
+READ_HOLDING_REGISTERS = 3
+READ_INPUT_REGISTERS = 4
+
+# أكبر عدد سجلات في طلب قراءة واحد (حد البروتوكول)
+MAX_REGISTERS = 125
+
+# أكبر فجوة (بعدد السجلات) تُقرأ ضمن طلب واحد بدلاً من طلبين
+MAX_GAP = 8
+
+# التراجع عند تكرار أخطاء الوحدة (بالثواني)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+_MBAP = struct.Struct('>HHHB')
+_REQUEST = struct.Struct('>HHHBBHH')
+
+
+class ModbusError(Exception):
+    """خطأ في الاتصال بوحدة التحكم أو رد استثناء من الوحدة"""
+
+
+def plan_reads(fields: List[Tuple[int, int]], max_gap: int = MAX_GAP,
+               max_registers: int = MAX_REGISTERS) -> List[Tuple[int, int]]:
+    """
+    دمج السجلات المطلوبة في أقل عدد من طلبات القراءة
+
+    fields: (العنوان، عدد السجلات) لكل قيمة مطلوبة
+    يرجع (عنوان البداية، العدد) لكل طلب
+    """
+    reads: List[List[int]] = []
+    for address, count in sorted(fields):
+        end = address + count
+        if reads:
+            start, current_end = reads[-1][0], reads[-1][0] + reads[-1][1]
+            if address - current_end <= max_gap and max(end, current_end) - start <= max_registers:
+                reads[-1][1] = max(end, current_end) - start
+                continue
+        reads.append([address, count])
+    return [(start, count) for start, count in reads]
+
+
+class ModbusConnection:
+    """
+    اتصال Modbus/TCP دائم بوحدة تحكم
+    Persistent Modbus/TCP connection (one request in flight at a time)
+    """
+
+    def __init__(self, host: str, port: int, timeout: float):
+        """تهيئة الاتصال (يُفتح عند أول طلب)"""
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock: Optional[socket.socket] = None
+        self.transaction = 0
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ModbusError('أغلقت وحدة التحكم الاتصال')
+            data += chunk
+        return data
+
+    def read_registers(self, unit: int, address: int, count: int,
+                       function: int = READ_HOLDING_REGISTERS) -> bytes:
+        """قراءة سجلات متتالية (يرجع بايتات السجلات كما وصلت بترتيب big-endian)"""
+        if self.sock is None:
+            self._connect()
+        self.transaction = (self.transaction + 1) & 0xFFFF
+        self.sock.sendall(_REQUEST.pack(self.transaction, 0, 6, unit, function, address, count))
+
+        transaction, _, length, _ = _MBAP.unpack(self._recv_exact(_MBAP.size))
+        body = self._recv_exact(length - 1)
+        if transaction != self.transaction:
+            raise ModbusError(f'رقم معاملة غير متوقع: {transaction}')
+        if body[0] & 0x80:
+            raise ModbusError(f'رد استثناء من الوحدة: رمز {body[1]}')
+        if body[1] != 2 * count:
+            raise ModbusError(f'طول رد غير متوقع: {body[1]} بايت')
+        return body[2:]
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+
+class ConnectionPool:
+    """
+    اتصالات دائمة محدودة العدد لكل مضيف
+    Bounded per-host pool of persistent connections shared by the units behind one gateway
+    """
+
+    def __init__(self, timeout: float, size: int = 2):
+        """size: أكبر عدد اتصالات متزامنة بالمضيف الواحد (البوابات تحد عدد الاتصالات)"""
+        self.timeout = timeout
+        self.size = max(1, size)
+        self._idle: Dict[Tuple[str, int], List[ModbusConnection]] = {}
+        self._slots: Dict[Tuple[str, int], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self, host: str, port: int) -> ModbusConnection:
+        """اتصال متاح بالمضيف (ينتظر إن كانت جميع اتصالاته مشغولة)"""
+        key = (host, port)
+        with self._lock:
+            slots = self._slots.get(key)
+            if slots is None:
+                slots = self._slots[key] = threading.BoundedSemaphore(self.size)
+        slots.acquire()
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if idle:
+                return idle.pop()
+            self.opened += 1
+        return ModbusConnection(host, port, self.timeout)
+
+    def release(self, connection: ModbusConnection):
+        """إعادة اتصال للمجموعة"""
+        key = (connection.host, connection.port)
+        with self._lock:
+            self._idle[key].append(connection)
+        self._slots[key].release()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for connection in idle:
+                    connection.close()
+
+
+class ModbusDevice:
+    """
+    وحدة تحكم واحدة ومضخاتها وخطة قراءتها
+    One PLC unit (host, port, unit id) with its pumps and planned reads
+    """
+
+    def __init__(self, host: str, port: int, unit: int, pumps: Dict[int, int], registers: Dict[str, Dict],
+                 retries: int = 1, function: int = READ_HOLDING_REGISTERS):
+        """
+        pumps: معرف المضخة ← إزاحة سجلاتها
+        registers: خريطة السجلات (الحقل ← العنوان والنوع والمعامل)
+        """
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.function = function
+        self.retries = retries
+        self.name = f'{host}:{port}/{unit}'
+        self.pump_ids = sorted(pumps)
+
+        wanted = []
+        for offset in pumps.values():
+            for spec in registers.values():
+                wanted.append((offset + spec['address'], REGISTER_TYPES[spec.get('type', 'uint16')][0]))
+        self.reads = plan_reads(wanted)
+
+        # فك كل حقل: (معرف المضخة، موقع الحقل في القراءة، رقم الطلب، إزاحة البايت في الرد، الصيغة، المعامل)
+        self.fields: List[Tuple[int, int, int, int, str, float]] = []
+        for pump_id, offset in pumps.items():
+            for name, spec in registers.items():
+                address = offset + spec['address']
+                read = next(index for index, (start, count) in enumerate(self.reads)
+                            if start <= address < start + count)
+                self.fields.append((pump_id, FIELD_INDEX[name], read, 2 * (address - self.reads[read][0]),
+                                    REGISTER_TYPES[spec.get('type', 'uint16')][1], spec.get('scale', 1.0)))
+
+        # حالة الوحدة
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.last_error: Optional[str] = None
+        self.last_latency = 0.0
+        self.polls = 0
+        self.errors = 0
+        self.retried = 0
+        self.out_of_range = 0
+
+    def poll(self, pool: ConnectionPool, stamp: float) -> List[Tuple[int, List[Optional[float]], float]]:
+        """
+        قراءة جميع مضخات الوحدة (يرفع ModbusError بعد استنفاد المحاولات)
+
+        يرجع (معرف المضخة، القيم بترتيب FIELD_INDEX، الطابع الزمني) لكل مضخة
+        """
+        connection = pool.acquire(self.host, self.port)
+        try:
+            responses = []
+            for start, count in self.reads:
+                for attempt in range(self.retries + 1):
+                    try:
+                        responses.append(connection.read_registers(self.unit, start, count, self.function))
+                        break
+                    except (OSError, ModbusError) as e:
+                        # اتصال جديد للمحاولة التالية (الاتصال الحالي قد يحمل رداً متأخراً)
+                        connection.close()
+                        if attempt == self.retries:
+                            raise ModbusError(str(e)) from e
+                        self.retried += 1
+        finally:
+            pool.release(connection)
+
+        values: Dict[int, List[Optional[float]]] = {
+            pump_id: [None] * (PRODUCTION_INDEX + 1) for pump_id in self.pump_ids
+        }
+        for pump_id, index, read, offset, fmt, scale in self.fields:
+            value = struct.unpack_from(fmt, responses[read], offset)[0] * scale
+            low, high = FIELD_BOUNDS[index]
+            if low <= value <= high:
+                values[pump_id][index] = value
+            else:
+                # قناة حساس معطوبة لا تُسقط بقية قراءات المضخة
+                self.out_of_range += 1
+        return [(pump_id, pump_values, stamp) for pump_id, pump_values in values.items()]
+
+
+class ModbusPoller:
+    """
+    استطلاع جميع وحدات التحكم بالتوازي
+    Concurrent poller over a fixed worker pool with per-device backoff
+    """
+
+    def __init__(self, devices: List[ModbusDevice], pool: ConnectionPool, submit: Callable[[List[Tuple]], Any],
+                 workers: int = 32, clock: Callable[[], float] = time.monotonic):
+        """
+        submit: استلام قراءات الدورة (معرف المضخة، القيم، الطابع الزمني)
+        """
+        self.devices = devices
+        self.pool = pool
+        self.submit = submit
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(devices))),
+                                           thread_name_prefix='modbus')
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.cycles = 0
+
+    def _poll_device(self, device: ModbusDevice, stamp: float) -> List[Tuple]:
+        started = self.clock()
+        try:
+            readings = device.poll(self.pool, stamp)
+        except ModbusError as e:
+            device.errors += 1
+            device.failures += 1
+            device.last_error = str(e)
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (device.failures - 1))
+            device.next_attempt = self.clock() + delay
+            if device.failures == 1 or device.failures % 10 == 0:
+                logger.warning(f"تعذرت قراءة وحدة التحكم {device.name} (محاولة بعد {delay:.1f} ثانية): {str(e)}")
+            return []
+        device.failures = 0
+        device.last_error = None
+        device.polls += 1
+        device.last_latency = self.clock() - started
+        return readings
+
+    def poll_once(self) -> int:
+        """دورة استطلاع واحدة لجميع الوحدات المتاحة (يرجع عدد المضخات المقروءة)"""
+        started = self.clock()
+        stamp = time.time()
+        due = [device for device in self.devices if device.next_attempt <= started]
+        readings = []
+        for result in self.executor.map(lambda device: self._poll_device(device, stamp), due):
+            readings.extend(result)
+        if readings:
+            self.submit(readings)
+        self.cycles += 1
+        self.last_duration = self.clock() - started
+        self.max_duration = max(self.max_duration, self.last_duration)
+        return len(readings)
+
+    def stats(self) -> Dict:
+        """زمن الاستطلاع وحالة الوحدات"""
+        return {
+            'devices': len(self.devices),
+            'pumps': sum(len(device.pump_ids) for device in self.devices),
+            'requests_per_cycle': sum(len(device.reads) for device in self.devices),
+            'cycles': self.cycles,
+            'last_duration_ms': round(self.last_duration * 1000, 2),
+            'max_duration_ms': round(self.max_duration * 1000, 2),
+            'down': [
+                {'device': device.name, 'failures': device.failures, 'error': device.last_error}
+                for device in self.devices if device.failures
+            ],
+            'counters': {
+                'polls': sum(device.polls for device in self.devices),
+                'errors': sum(device.errors for device in self.devices),
+                'retries': sum(device.retried for device in self.devices),
+                'out_of_range': sum(device.out_of_range for device in self.devices),
+                'connections': self.pool.opened,
+            },
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+
+def load_config(path: str, pump_ids: List[int]) -> Tuple[Dict[str, Any], List[ModbusDevice], ConnectionPool]:
+    """
+    قراءة ملف إعداد Modbus وبناء الوحدات ومجموعة الاتصالات
+
+    يرفع ValueError عند وجود مضخة غير معروفة أو حقل أو نوع سجل غير معروف
+    """
+    with open(path, 'r', encoding='utf-8') as handle:
+        config = json.load(handle)
+
+    retries = int(config.get('retries', 1))
+    pool = ConnectionPool(float(config.get('timeout', 0.5)), int(config.get('connections_per_host', 2)))
+    registers = config.get('registers', DEFAULT_REGISTERS)
+    known = set(pump_ids)
+    devices = []
+    for entry in config.get('devices', []):
+        device_registers = entry.get('registers', registers)
+        for name, spec in device_registers.items():
+            if name not in FIELD_INDEX:
+                raise ValueError(f'حقل غير معروف في خريطة السجلات: {name}')
+            if spec.get('type', 'uint16') not in REGISTER_TYPES:
+                raise ValueError(f"نوع سجل غير معروف: {spec.get('type')}")
+        pumps = {int(pump_id): int(offset) for pump_id, offset in entry['pumps'].items()}
+        unknown = set(pumps) - known
+        if unknown:
+            raise ValueError(f'مضخات غير موجودة في إعداد Modbus: {sorted(unknown)}')
+        function = READ_INPUT_REGISTERS if entry.get('input_registers') else READ_HOLDING_REGISTERS
+        devices.append(ModbusDevice(entry['host'], int(entry.get('port', 502)), int(entry.get('unit', 1)), pumps,
+                                    device_registers, retries, function))
+    return config, devices, pool
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+تتبع مراحل دورات المراقبة والتحليل بأخذ العينات عند الطلب
+Per-Stage Tick Tracing and On-Demand Sampling Profiler
+
+تتبع دائم منخفض التكلفة: كل دورة مراقبة تُقسم لمراحل (جمع القياسات، فحص التنبيهات،
+صحة النظام، نشر اللقطة، الإرسال...) يُسجل زمن كل منها بقراءة ساعة واحدة عند نهايتها،
+مع زمن ترميز الأحداث المرسلة داخل الدورة، وتُحفظ آخر الدورات في مخزن حلقي للاستعلام.
+
+تحليل عند الطلب: خيط نظام حقيقي يقرأ مكدسات جميع الخيوط بفاصل ثابت لمدة محددة ثم
+يتوقف، والنتيجة مكدسات مطوية (سطر لكل مكدس مع عدد عيناته) تقرؤها أدوات flamegraph
+وspeedscope، مع ملخص لأكثر الدوال استهلاكاً. لا يحتاج إعادة تشغيل ولا مكتبة إضافية.
+"""
+
+import os
+import sys
+import time
+import uuid
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# عدد الدورات الأخيرة المحفوظة بأزمنة مراحلها
+TRACE_SIZE = 600
+
+# حدود التحليل: المدة بالثواني وفاصل أخذ العينات بالثواني
+PROFILE_SECONDS = 10.0
+PROFILE_MAX_SECONDS = 300.0
+PROFILE_INTERVAL = 0.005
+PROFILE_MIN_INTERVAL = 0.001
+
+# عدد الدوال في ملخص التحليل
+PROFILE_TOP = 25
+
+# وحدات الانتظار: عينة قمتها فيها خيط ينتظر (قفل، طابور، مقبس، حلقة eventlet) لا يستهلك المعالج
+IDLE_MODULES = ('threading.py', 'queue.py', 'selectors.py', 'socketserver.py', 'epolls.py', 'kqueue.py', 'poll.py')
+
+# دوال الانتظار (الملف، الدالة) التي تستدعي time.sleep مباشرة فتكون قمة المكدس أثناء النوم:
+# sleep في Socket.IO/Engine.IO (انتظار المجدول والمهام الخلفية)، ونوم ساعة المحاكاة، وحلقة محور gevent/eventlet
+IDLE_FUNCTIONS = frozenset({('server.py', 'sleep'), ('simulation.py', 'sleep'), ('hub.py', 'run')})
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def native_threading(async_mode: str) -> Tuple[Callable[..., threading.Thread], Callable[[float], None]]:
+    """
+    صنف خيط النظام الحقيقي ودالة الانتظار الحقيقية حتى بعد ترقيع المكتبات
+
+    في وضع eventlet أو gevent الخيوط المرقعة خيوط خضراء لا تعمل أثناء انشغال الخيط
+    الرئيسي، فلا ترى الأكواد البطيئة التي يراد تحليلها
+    """
+    if async_mode == 'eventlet':
+        from eventlet import patcher
+        return patcher.original('threading').Thread, patcher.original('time').sleep
+    if async_mode == 'gevent':
+        from gevent import monkey
+        return monkey.get_original('threading', 'Thread'), monkey.get_original('time', 'sleep')
+    return threading.Thread, time.sleep
+
+
+class TickTracer:
+    """
+    أزمنة مراحل دورات المراقبة الأخيرة
+    Ring buffer of per-stage timings for recent monitoring ticks
+    """
+
+    def __init__(self, size: int = TRACE_SIZE, clock: Callable[[], float] = time.perf_counter):
+        """تهيئة المتتبع"""
+        self.clock = clock
+        self.traces: deque = deque(maxlen=size)
+        self.total = 0
+        # الدورة الجارية (في مالك الحالة) وخيطها ووقت آخر علامة
+        self._current: Optional[Dict] = None
+        self._thread: Optional[int] = None
+        self._started = 0.0
+        self._last = 0.0
+
+    def begin(self, tick: int, queued: Optional[float] = None):
+        """بداية دورة (queued: وقت إرسالها لمالك الحالة بساعة المتتبع لقياس الانتظار)"""
+        now = self.clock()
+        self._current = {
+            'tick': tick,
+            'timestamp': time.time(),
+            'wait': now - queued if queued is not None else 0.0,
+            'stages': {},
+            'serialize': 0.0,
+            'encodes': 0,
+        }
+        self._thread = threading.get_ident()
+        self._started = self._last = now
+
+    def mark(self, stage: str):
+        """نهاية مرحلة: الزمن منذ العلامة السابقة يُضاف لها (لا شيء خارج الدورات)"""
+        current = self._current
+        if current is None:
+            return
+        now = self.clock()
+        stages = current['stages']
+        stages[stage] = stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def encoded(self, seconds: float):
+        """زمن ترميز حدث مرسل؛ يُحتسب للدورة الجارية إن كان من خيطها"""
+        current = self._current
+        if current is not None and threading.get_ident() == self._thread:
+            current['serialize'] += seconds
+            current['encodes'] += 1
+
+    def end(self, keep: bool = True, **fields) -> Optional[Dict]:
+        """نهاية الدورة وحفظها في المخزن الحلقي (keep=False لتجاهلها)"""
+        current = self._current
+        if current is None:
+            return None
+        self._current = None
+        if not keep:
+            return None
+        current['duration'] = self.clock() - self._started
+        current.update(fields)
+        self.traces.append(current)
+        self.total += 1
+        return current
+
+    @staticmethod
+    def describe(trace: Dict) -> Dict:
+        """الدورة بأزمنتها بالمللي ثانية"""
+        result = {key: value for key, value in trace.items()
+                  if key not in ('wait', 'stages', 'serialize', 'duration')}
+        result['duration_ms'] = round(trace['duration'] * 1000, 3)
+        result['wait_ms'] = round(trace['wait'] * 1000, 3)
+        result['stages_ms'] = {stage: round(seconds * 1000, 3) for stage, seconds in trace['stages'].items()}
+        # الترميز جزء من مراحل الإرسال وليس مرحلة مستقلة
+        result['serialize_ms'] = round(trace['serialize'] * 1000, 3)
+        return result
+
+    def query(self, limit: int = 50, slowest: bool = False, min_ms: float = 0.0) -> List[Dict]:
+        """آخر الدورات (أو أبطؤها) التي استغرقت min_ms على الأقل، الأحدث أولاً"""
+        traces = [trace for trace in list(self.traces) if trace['duration'] * 1000 >= min_ms]
+        if slowest:
+            traces.sort(key=lambda trace: trace['duration'], reverse=True)
+        else:
+            traces.reverse()
+        return [self.describe(trace) for trace in traces[:max(0, limit)]]
+
+    def summary(self) -> Dict:
+        """متوسط ونسب أزمنة كل مرحلة على الدورات المحفوظة"""
+        traces = list(self.traces)
+        series: Dict[str, List[float]] = {'duration': [], 'wait': [], 'serialize': []}
+        for trace in traces:
+            for key in ('duration', 'wait', 'serialize'):
+                series[key].append(trace[key])
+            for stage, seconds in trace['stages'].items():
+                series.setdefault(stage, []).append(seconds)
+
+        def describe(values: List[float]) -> Dict:
+            return {
+                'count': len(values),
+                'avg_ms': round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+                'p95_ms': round(_percentile(values, 0.95) * 1000, 3) if values else 0.0,
+                'max_ms': round(max(values) * 1000, 3) if values else 0.0,
+            }
+
+        return {
+            'ticks': self.total,
+            'retained': len(traces),
+            'capacity': self.traces.maxlen,
+            'duration': describe(series.pop('duration')),
+            'wait': describe(series.pop('wait')),
+            'serialize': describe(series.pop('serialize')),
+            'stages': {stage: describe(values) for stage, values in series.items()},
+        }
+
+
+class SamplingProfiler:
+    """
+    محلل بأخذ العينات لجميع خيوط العملية لمدة محددة
+    Samples every thread's Python stack from a native thread for N seconds
+    """
+
+    def __init__(self, thread_class: Callable[..., threading.Thread] = threading.Thread,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic):
+        """
+        تهيئة المحلل
+
+        thread_class, sleep: خيط النظام ودالة الانتظار الحقيقيان (انظر native_threading)
+        """
+        self.thread_class = thread_class
+        self.sleep = sleep
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.session: Optional[Dict] = None
+        # عدد العينات لكل (اسم الخيط، مكدس كائنات الكود من الجذر للقمة)
+        self._stacks: Dict[Tuple[str, Tuple[Any, ...]], int] = {}
+        self._stop = False
+
+    @property
+    def running(self) -> bool:
+        """هل التحليل جارٍ"""
+        session = self.session
+        return session is not None and session['finished'] is None
+
+    def start(self, seconds: float = PROFILE_SECONDS, interval: float = PROFILE_INTERVAL,
+              include_idle: bool = False, user: str = '') -> Dict:
+        """
+        بدء تحليل جديد (تحليل واحد في كل مرة)
+
+        يرفع ValueError برسالة عربية عند قيمة غير صالحة، وRuntimeError إن كان تحليل جارياً
+        """
+        for name, value, valid in (('seconds', seconds, lambda v: 0 < v <= PROFILE_MAX_SECONDS),
+                                   ('interval', interval, lambda v: PROFILE_MIN_INTERVAL <= v <= 1.0)):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not valid(value):
+                raise ValueError(f'قيمة غير صالحة للحقل {name}: {value}')
+
+        with self._lock:
+            if self.running:
+                raise RuntimeError('يوجد تحليل جارٍ')
+            self._stacks = {}
+            self._stop = False
+            self.session = {
+                'id': uuid.uuid4().hex[:12],
+                'user': user,
+                'seconds': float(seconds),
+                'interval': float(interval),
+                'include_idle': bool(include_idle),
+                'started': time.time(),
+                'finished': None,
+                'samples': 0,
+                'idle_samples': 0,
+                'error': None,
+            }
+            session = self.session
+
+        sampler = self.thread_class(target=self._run, args=(session,), name='oil-pump-profiler', daemon=True)
+        sampler.start()
+        return self.status()
+
+    def stop(self) -> bool:
+        """إيقاف التحليل الجاري قبل نهاية مدته"""
+        if not self.running:
+            return False
+        self._stop = True
+        return True
+
+    def _run(self, session: Dict):
+        """حلقة أخذ العينات (في خيط النظام الحقيقي)"""
+        # خيط المحلل نفسه (قمة مكدسه هذه الدالة؛ معرفات الخيوط المرقعة لا تطابق خيوط النظام)
+        own = SamplingProfiler._run.__code__
+        names: Dict[int, str] = {}
+        stacks = self._stacks
+        include_idle = session['include_idle']
+        interval = session['interval']
+        deadline = self.clock() + session['seconds']
+        try:
+            while not self._stop and self.clock() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if frame.f_code is own:
+                        continue
+                    if not include_idle and self._idle(frame.f_code):
+                        session['idle_samples'] += 1
+                        continue
+                    name = names.get(ident)
+                    if name is None:
+                        # أسماء الخيوط تُقرأ مرة لكل خيط جديد فقط
+                        names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                        name = names.setdefault(ident, f'thread-{ident}')
+                    codes = []
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    key = (name, tuple(reversed(codes)))
+                    stacks[key] = stacks.get(key, 0) + 1
+                    session['samples'] += 1
+                self.sleep(interval)
+        except Exception as e:
+            session['error'] = str(e)
+        finally:
+            session['finished'] = time.time()
+
+    @staticmethod
+    def _idle(code) -> bool:
+        """هل قمة المكدس انتظار لا يستهلك المعالج (وحدة انتظار أو دالة نوم معروفة)"""
+        filename = os.path.basename(code.co_filename)
+        return filename in IDLE_MODULES or (filename, code.co_name) in IDLE_FUNCTIONS
+
+    @staticmethod
+    def _label(code) -> str:
+        """اسم إطار في المكدس المطوي: الدالة (الملف:السطر)"""
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+    def folded(self) -> str:
+        """نتيجة التحليل بصيغة المكدسات المطوية (الخيط;الجذر;...;القمة عدد)"""
+        label = self._label
+        lines = [
+            ';'.join([thread] + [label(code).replace(';', ',') for code in codes]) + f' {count}'
+            for (thread, codes), count in sorted(list(self._stacks.items()), key=lambda item: -item[1])
+        ]
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def summary(self, top: int = PROFILE_TOP) -> Dict:
+        """أكثر الدوال ظهوراً في قمة المكدس (ذاتي) وفي أي موضع منه (شامل)، وعينات كل خيط"""
+        own: Dict[Any, int] = {}
+        inclusive: Dict[Any, int] = {}
+        threads: Dict[str, int] = {}
+        for (thread, codes), count in list(self._stacks.items()):
+            threads[thread] = threads.get(thread, 0) + count
+            if codes:
+                own[codes[-1]] = own.get(codes[-1], 0) + count
+            for code in set(codes):
+                inclusive[code] = inclusive.get(code, 0) + count
+
+        total = sum(threads.values()) or 1
+
+        def ranked(counts: Dict[Any, int]) -> List[Dict]:
+            return [{'function': self._label(code), 'samples': count, 'percent': round(count * 100 / total, 1)}
+                    for code, count in sorted(counts.items(), key=lambda item: -item[1])[:top]]
+
+        return {
+            'threads': dict(sorted(threads.items(), key=lambda item: -item[1])),
+            'self': ranked(own),
+            'inclusive': ranked(inclusive),
+        }
+
+    def status(self) -> Dict:
+        """حالة آخر تحليل (أو لا شيء)"""
+        session = self.session
+        if session is None:
+            return {'running': False, 'session': None}
+        return {'running': session['finished'] is None, 'session': dict(session)}
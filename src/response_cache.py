@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+ذاكرة الاستجابات المسلسلة مسبقاً
+Pre-Serialized Response Cache
+
+تحفظ نص JSON لكل نقطة قراءة مرة واحدة لكل إصدار من الحالة، فيخدم جميع القراء
+البايتات نفسها دون إعادة البناء والتسلسل، مع وسم ETag يسمح للعملاء بالتحقق
+بطلب شرطي (If-None-Match) والحصول على 304 دون جسم إن لم تتغير البيانات.
+"""
+
+import uuid
+from typing import Dict, Optional
+
+
+class CachedResponse:
+    """جسم استجابة مسلسل لإصدار معين مع وسمه"""
+
+    __slots__ = ('version', 'body', 'etag')
+
+    def __init__(self, version: str, body: bytes, etag: str):
+        self.version = version
+        self.body = body
+        self.etag = etag
+
+
+class ResponseCache:
+    """
+    ذاكرة الاستجابات حسب المفتاح (نقطة القراءة) والإصدار
+    One serialized body per endpoint key, replaced when the version changes
+    """
+
+    def __init__(self):
+        """تهيئة الذاكرة"""
+        # معرف تشغيل يمنع تطابق الوسوم بين عمليتين أو بعد إعادة التشغيل
+        self.epoch = uuid.uuid4().hex[:8]
+        self._entries: Dict[str, CachedResponse] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: str) -> Optional[CachedResponse]:
+        """الاستجابة المحفوظة إن كانت للإصدار نفسه"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key: str, version: str, body: bytes) -> CachedResponse:
+        """حفظ جسم مسلسل لإصدار (يستبدل الإصدار السابق للمفتاح نفسه)"""
+        entry = CachedResponse(version, body, f'{self.epoch}-{version}')
+        self._entries[key] = entry
+        return entry
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+جدولة دورات المراقبة بمعدل ثابت
+Fixed-Rate Monitoring Scheduler
+
+تُنفذ الدورات على ساعة ثابتة (بداية كل دورة = البداية + رقمها × الفترة) فلا تنزاح
+الفترة مع زمن العمل، ولكل مضخة فاصل أخذ عينات خاص بها (سريع للمضخات الحرجة، بطيء
+للمتوقفة). توزع المضخات ذات الفاصل الواحد على دورات الفاصل بالتساوي فيتوزع العمل
+على الفترة بدلاً من دفعة واحدة كل بضع ثوان. الدورة التي تتجاوز فترتها تُسجل،
+والدورات الفائتة لا تُنفذ متتابعة بل تُدمج مضخاتها المستحقة في الدورة التالية.
+"""
+
+import json
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# فترة الدورة الأساسية بالثواني
+DEFAULT_PERIOD = 1.0
+
+# فواصل أخذ العينات الافتراضية بالثواني:
+# default: المضخات العاملة، idle: المتوقفة أو في الصيانة أو الطوارئ
+# types: حسب نوع المضخة، pumps: حسب معرف المضخة (الأعلى أولوية)
+DEFAULT_SAMPLING = {
+    'default': 5.0,
+    'idle': 15.0,
+    'types': {
+        'مضخة غاطسة': 1.0,
+    },
+    'pumps': {},
+}
+
+
+def load_sampling(raw: Optional[str]) -> Dict[str, Any]:
+    """
+    دمج إعدادات فواصل أخذ العينات (نص JSON من OIL_PUMP_SAMPLING) مع الإعدادات الافتراضية
+
+    مثال: {"default": 5, "types": {"مضخة ترددية": 2}, "pumps": {"3": 1}}
+    """
+    sampling = {
+        'default': DEFAULT_SAMPLING['default'],
+        'idle': DEFAULT_SAMPLING['idle'],
+        'types': dict(DEFAULT_SAMPLING['types']),
+        'pumps': dict(DEFAULT_SAMPLING['pumps']),
+    }
+    if not raw:
+        return sampling
+    try:
+        config = json.loads(raw)
+        for key in ('default', 'idle'):
+            if key in config:
+                sampling[key] = float(config[key])
+        sampling['types'].update({name: float(value) for name, value in config.get('types', {}).items()})
+        sampling['pumps'].update({int(pump_id): float(value) for pump_id, value in config.get('pumps', {}).items()})
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.error(f"إعدادات فواصل أخذ العينات غير صالحة، سيتم استخدام الافتراضية: {str(e)}")
+    return sampling
+
+
+def sampling_interval(sampling: Dict[str, Any], pump: Dict) -> float:
+    """
+    فاصل أخذ العينات لمضخة: إعداد المضخة ثم المضخات المتوقفة ثم نوع المضخة ثم الافتراضي
+    """
+    interval = sampling['pumps'].get(pump['id'])
+    if interval is not None:
+        return interval
+    if pump['status'] != 'running':
+        return sampling['idle']
+    return sampling['types'].get(pump.get('type'), sampling['default'])
+
+
+class MonitorScheduler:
+    """
+    جدولة المضخات على دورات بمعدل ثابت
+    Fixed-rate ticks with per-pump sampling intervals spread across phases
+    """
+
+    def __init__(self, period: float = DEFAULT_PERIOD, clock: Callable[[], float] = time.monotonic):
+        """تهيئة الجدولة"""
+        self.period = period
+        self.clock = clock
+        # لكل مضخة: عدد الدورات بين عينتين وطور الدورة التي تُؤخذ فيها
+        self._plan: Dict[int, tuple] = {}
+        # خانات الأطوار لكل فاصل: {الفاصل بالدورات: [مجموعة المضخات لكل طور]}
+        self._buckets: Dict[int, List[set]] = {}
+        self.tick = 0
+        # إحصائيات التنفيذ
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.errors = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.avg_duration = 0.0
+        self.last_due = 0
+        self.last_lateness = 0.0
+
+    def assign(self, pump_id: int, interval: float):
+        """تحديد فاصل أخذ العينات لمضخة (يوضع في الطور الأقل ازدحاماً لهذا الفاصل)"""
+        ticks = max(1, round(interval / self.period))
+        current = self._plan.get(pump_id)
+        if current is not None:
+            if current[0] == ticks:
+                return
+            self.remove(pump_id)
+
+        buckets = self._buckets.setdefault(ticks, [set() for _ in range(ticks)])
+        phase = min(range(ticks), key=lambda index: len(buckets[index]))
+        buckets[phase].add(pump_id)
+        self._plan[pump_id] = (ticks, phase)
+
+    def remove(self, pump_id: int):
+        """حذف مضخة من الجدولة"""
+        current = self._plan.pop(pump_id, None)
+        if current is not None:
+            ticks, phase = current
+            self._buckets[ticks][phase].discard(pump_id)
+
+    def interval_of(self, pump_id: int) -> Optional[float]:
+        """فاصل أخذ العينات الفعلي لمضخة بالثواني"""
+        current = self._plan.get(pump_id)
+        return current[0] * self.period if current is not None else None
+
+    def due(self, first: int, last: int) -> List[int]:
+        """المضخات المستحقة في الدورات من first إلى last (الدورات الفائتة تُدمج)"""
+        pumps = set()
+        for ticks, buckets in self._buckets.items():
+            # تكفي دورة فاصل كاملة مهما كثرت الدورات الفائتة
+            for tick in range(max(first, last - ticks + 1), last + 1):
+                pumps |= buckets[tick % ticks]
+        self.last_due = len(pumps)
+        return sorted(pumps)
+
+    def run(self, work: Callable[[int, int], None], sleep: Callable[[float], None]):
+        """
+        تنفيذ الدورات بمعدل ثابت إلى ما لا نهاية
+
+        work: تنفيذ الدورات من الأولى إلى الأخيرة (أكثر من دورة عند دمج الدورات الفائتة)
+        sleep: دالة الانتظار المتوافقة مع وضع الخادم (مثل socketio.sleep)
+        """
+        start = self.clock()
+        first = 0
+        while True:
+            deadline = start + self.tick * self.period
+            now = self.clock()
+            if now < deadline:
+                sleep(deadline - now)
+                now = self.clock()
+            self.last_lateness = now - deadline
+
+            began = self.clock()
+            try:
+                work(first, self.tick)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"خطأ في دورة المراقبة {self.tick}: {str(e)}")
+            self.record(self.clock() - began)
+
+            # الدورات التي فات موعدها أثناء التنفيذ لا تُنفذ متتابعة
+            self.tick += 1
+            behind = int((self.clock() - start) / self.period) - self.tick
+            first = self.tick
+            if behind > 0:
+                self.skipped_ticks += behind
+                self.tick += behind
+
+    def record(self, duration: float):
+        """تسجيل زمن دورة وتجاوزها للفترة"""
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.avg_duration = duration if self.avg_duration == 0 else self.avg_duration * 0.9 + duration * 0.1
+        if duration > self.period:
+            self.overruns += 1
+            logger.warning(
+                f"تجاوزت دورة المراقبة {self.tick} فترتها: {duration * 1000:.0f} مللي ثانية "
+                f"من {self.period * 1000:.0f}"
+            )
+
+    def stats(self) -> Dict:
+        """إحصائيات الجدولة"""
+        intervals: Dict[str, int] = {}
+        for ticks, _ in list(self._plan.values()):
+            key = f'{ticks * self.period:g}'
+            intervals[key] = intervals.get(key, 0) + 1
+        return {
+            'period': self.period,
+            'tick': self.tick,
+            'overruns': self.overruns,
+            'skipped_ticks': self.skipped_ticks,
+            'errors': self.errors,
+            'last_duration_ms': round(self.last_duration * 1000, 2),
+            'avg_duration_ms': round(self.avg_duration * 1000, 2),
+            'max_duration_ms': round(self.max_duration * 1000, 2),
+            'last_lateness_ms': round(self.last_lateness * 1000, 2),
+            'last_due': self.last_due,
+            'pumps_by_interval': intervals,
+        }
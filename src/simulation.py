@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+وضع المحاكاة الحتمية المتسارعة
+Deterministic Accelerated Simulation
+
+ساعة محاكاة تتقدم أسرع من الزمن الحقيقي بمعامل ثابت (أو افتراضية تماماً تتقدم
+فقط عند الانتظار فتُنفذ الدورات متتابعة بأقصى سرعة دون دورات فائتة)، وسيناريو
+أعطال مجدول يضيف انحرافاً تدريجياً لقياسات مضخات محددة (فقدان التبريد، تآكل
+المحامل...) فوق المسار العشوائي. مع بذرة ثابتة للأرقام العشوائية تتكرر القياسات
+نفسها في كل تشغيل، فتصلح المحاكاة لقياس أداء الخادم وتخطيط سعته.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from telemetry_store import METRIC_SPECS, STEP_SECONDS, TelemetryStore
+
+logger = logging.getLogger(__name__)
+
+# عدد المضخات الافتراضي
+DEFAULT_PUMPS = 6
+
+# أثر كل عطل على القياسات (التغير لكل ثانية محاكاة بشدة 1)
+FAULT_EFFECTS = {
+    'cooling_loss': {'temperature': 0.4},
+    'bearing_wear': {'vibration': 0.01, 'temperature': 0.05, 'efficiency': -0.02},
+    'cavitation': {'pressure': -0.2, 'flow_rate': -1.0, 'vibration': 0.02},
+    'seal_leak': {'pressure': -0.1, 'flow_rate': -0.5, 'efficiency': -0.05},
+    'blockage': {'pressure': 0.2, 'flow_rate': -2.0, 'power': 0.1},
+}
+
+# الحد الأقصى للأعطال النشطة المعروضة في الإحصائيات
+ACTIVE_LIMIT = 100
+
+_BOUNDS = {name: (low, high, digits) for name, low, high, digits in METRIC_SPECS}
+
+
+class SimulationClock:
+    """
+    ساعة المحاكاة
+    Scaled (speed > 0) or fully virtual (speed = 0) monotonic clock
+    """
+
+    def __init__(self, speed: float = 1.0, sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        تهيئة الساعة
+
+        speed: عدد ثواني المحاكاة في كل ثانية حقيقية (0 = بأقصى سرعة ممكنة)
+        sleep: دالة الانتظار الحقيقية المتوافقة مع وضع الخادم (مثل socketio.sleep)
+        """
+        if speed < 0:
+            raise ValueError(f"معامل تسارع المحاكاة غير صالح: {speed}")
+        self.speed = speed
+        self._sleep = sleep
+        self._clock = clock
+        self._origin = clock()
+        self._virtual = self._origin
+
+    def now(self) -> float:
+        """زمن المحاكاة الحالي بالثواني"""
+        if self.speed == 0:
+            return self._virtual
+        return self._origin + (self._clock() - self._origin) * self.speed
+
+    def sleep(self, seconds: float):
+        """الانتظار بزمن المحاكاة (الساعة الافتراضية تتقدم فوراً مع إفساح المجال للمهام الأخرى)"""
+        if self.speed == 0:
+            self._virtual += max(0.0, seconds)
+            self._sleep(0)
+        else:
+            self._sleep(seconds / self.speed)
+
+    def elapsed(self) -> float:
+        """ثواني المحاكاة منذ البداية"""
+        return self.now() - self._origin
+
+    def stats(self) -> Dict:
+        """إحصائيات الساعة"""
+        real = self._clock() - self._origin
+        simulated = self.elapsed()
+        return {
+            'speed': self.speed,
+            'simulated_seconds': round(simulated, 3),
+            'real_seconds': round(real, 3),
+            'achieved_speed': round(simulated / real, 2) if real > 0 else 0.0,
+        }
+
+
+def parse_fault(entry: Any, pump_ids: Iterable[int]) -> Dict:
+    """
+    التحقق من عطل مجدول
+
+    مثال: {"pump": 3, "fault": "cooling_loss", "at": 60, "duration": 300, "severity": 1.5}
+    at: بداية العطل بثواني المحاكاة، duration: فارغ = حتى نهاية التشغيل
+
+    يرفع ValueError برسالة عربية عند وجود قيمة غير صالحة
+    """
+    if not isinstance(entry, dict):
+        raise ValueError('العطل يجب أن يكون كائناً')
+
+    pump_id = entry.get('pump')
+    if isinstance(pump_id, bool) or not isinstance(pump_id, int) or pump_id not in pump_ids:
+        raise ValueError(f'المضخة غير موجودة: {pump_id}')
+
+    fault = entry.get('fault')
+    if fault not in FAULT_EFFECTS:
+        raise ValueError(f'نوع عطل غير معروف: {fault}')
+
+    values = {}
+    for key, default in (('at', 0.0), ('duration', None), ('severity', 1.0)):
+        value = entry.get(key, default)
+        if value is None:
+            values[key] = None
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f'قيمة غير صالحة للحقل {key}: {value}')
+        values[key] = float(value)
+
+    return {
+        'pump': pump_id,
+        'fault': fault,
+        'at': values['at'],
+        'duration': values['duration'],
+        'severity': values['severity'],
+    }
+
+
+def load_faults(raw: str, pump_ids: Iterable[int]) -> List[Dict]:
+    """
+    تحميل سيناريو الأعطال من نص JSON أو من مسار ملف JSON (OIL_PUMP_SIM_FAULTS)
+
+    يرفع ValueError أو OSError عند تعذر التحميل
+    """
+    pump_ids = set(pump_ids)
+    if raw.lstrip().startswith('['):
+        entries = json.loads(raw)
+    else:
+        with open(os.path.expanduser(raw), encoding='utf-8') as handle:
+            entries = json.load(handle)
+    if not isinstance(entries, list):
+        raise ValueError('سيناريو الأعطال يجب أن يكون قائمة')
+    return [parse_fault(entry, pump_ids) for entry in entries]
+
+
+class FaultScript:
+    """
+    سيناريو الأعطال المجدولة
+    Time-scripted metric drift applied on top of the random walk
+    """
+
+    def __init__(self, events: List[Dict], clock: Callable[[], float]):
+        """تهيئة السيناريو (الأزمنة نسبية لبداية ساعة المحاكاة)"""
+        self.clock = clock
+        self.origin = clock()
+        self.events: List[Dict] = []
+        self.started = 0
+        self.samples = 0
+        for event in events:
+            self.add(event)
+
+    def elapsed(self) -> float:
+        """ثواني المحاكاة منذ بداية السيناريو"""
+        return self.clock() - self.origin
+
+    def add(self, event: Dict) -> Dict:
+        """إضافة عطل تم التحقق منه بـ parse_fault"""
+        event = dict(event, started=False)
+        self.events.append(event)
+        self.events.sort(key=lambda item: item['at'])
+        return event
+
+    def active(self, now: Optional[float] = None) -> List[Dict]:
+        """الأعطال النشطة في زمن المحاكاة المحدد (الافتراضي: الآن)"""
+        now = self.elapsed() if now is None else now
+        return [
+            event for event in self.events
+            if event['at'] <= now and (event['duration'] is None or now < event['at'] + event['duration'])
+        ]
+
+    def apply(self, telemetry: TelemetryStore, statuses: List[str], slots: Optional[List[int]],
+              scales: Optional[List[float]]):
+        """
+        إضافة انحراف الأعطال النشطة لقياسات المضخات العاملة في خانات هذه الدورة
+
+        الانحراف يتناسب مع الزمن الممثل بالعينة (فاصل أخذ عينات المضخة) لا مع عدد العينات
+        """
+        if not self.events:
+            return
+        active = self.active()
+        if not active:
+            return
+
+        if slots is None:
+            positions = None
+        else:
+            positions = {slot: index for index, slot in enumerate(slots)}
+
+        for event in active:
+            slot = telemetry.slots.get(event['pump'])
+            if slot is None or statuses[slot] != 'running':
+                continue
+            if positions is None:
+                scale = 1.0
+            elif slot in positions:
+                scale = scales[positions[slot]] if scales is not None else 1.0
+            else:
+                continue
+
+            if not event['started']:
+                event['started'] = True
+                self.started += 1
+                logger.info(f"بدء عطل محاكاة {event['fault']} في المضخة {event['pump']}")
+
+            seconds = scale * STEP_SECONDS * event['severity']
+            for name, rate in FAULT_EFFECTS[event['fault']].items():
+                low, high, digits = _BOUNDS[name]
+                column = telemetry.columns[name]
+                column[slot] = round(min(high, max(low, column[slot] + rate * seconds)), digits)
+            self.samples += 1
+
+    def stats(self) -> Dict:
+        """حالة السيناريو"""
+        now = self.elapsed()
+        active = self.active(now)
+        return {
+            'elapsed': round(now, 3),
+            'scheduled': len(self.events),
+            'started': self.started,
+            'samples': self.samples,
+            'active': len(active),
+            'active_faults': [{key: event[key] for key in ('pump', 'fault', 'at', 'duration', 'severity')}
+                              for event in active[:ACTIVE_LIMIT]],
+        }
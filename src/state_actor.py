@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+مالك حالة النظام الوحيد
+Single-Writer State Actor
+
+جميع تعديلات حالة المضخات (أوامر التحكم، دورة المراقبة، التنبيهات، المزامنة
+بين العمليات) تُرسل كأوامر إلى طابور واحد ينفذها خيط واحد بالتسلسل، وبعد كل
+تعديل تُنشر لقطة ثابتة جديدة يقرؤها معالجو الطلبات دون أي قفل. الأوامر العاجلة
+(إيقاف الطوارئ) تتقدم على كل ما ينتظر في الطابور، وتُنفذ أيضاً بين مراحل الأوامر
+الطويلة مثل دورة المراقبة.
+"""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StateSnapshot:
+    """
+    لقطة ثابتة لحالة المضخات (لا تُعدل بعد نشرها، وتُستبدل كاملة بلقطة جديدة)
+    Immutable published view of the fleet for lock-free readers
+    """
+
+    __slots__ = ('revision', 'pumps', 'system_health', 'stats', 'timestamp')
+
+    def __init__(self, revision: int, pumps: Dict[int, Dict], system_health: Dict, stats: Dict, timestamp: str):
+        self.revision = revision
+        self.pumps = pumps
+        self.system_health = system_health
+        self.stats = stats
+        self.timestamp = timestamp
+
+    def pumps_list(self) -> List[Dict]:
+        """قائمة المضخات بترتيب المعرفات"""
+        return list(self.pumps.values())
+
+
+class StateActor:
+    """
+    حلقة أوامر بكاتب وحيد
+    Serializes every state mutation through one owner thread
+    """
+
+    def __init__(self):
+        """تهيئة الطابور"""
+        self._commands: queue.Queue = queue.Queue()
+        # الأوامر العاجلة في طابور مستقل يُفرغ قبل كل أمر عادي
+        self._urgent: deque = deque()
+        self._owner: Optional[int] = None
+        self._started = False
+        self.processed = 0
+
+    def start(self, spawn: Callable[[Callable], Any]):
+        """بدء خيط التنفيذ (spawn متوافق مع وضع الخادم مثل socketio.start_background_task)"""
+        self._started = True
+        spawn(self._run)
+
+    def _run(self):
+        self._owner = threading.get_ident()
+        while True:
+            command, future = self._commands.get()
+            self.run_urgent()
+            if command is not None:
+                self._execute(command, future)
+
+    def _execute(self, command: Callable[[], Any], future: Future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(command())
+        except BaseException as e:
+            future.set_exception(e)
+        self.processed += 1
+
+    def run_urgent(self) -> int:
+        """
+        تنفيذ الأوامر العاجلة المنتظرة فوراً (من مالك الحالة فقط)
+
+        تستدعيها الأوامر الطويلة بين مراحلها حين تكون الحالة متسقة، فلا ينتظر الأمر
+        العاجل أكثر من مرحلة واحدة. يرجع عدد الأوامر المنفذة.
+        """
+        executed = 0
+        while self._urgent:
+            try:
+                command, future = self._urgent.popleft()
+            except IndexError:
+                break
+            self._execute(command, future)
+            executed += 1
+        return executed
+
+    def owns_state(self) -> bool:
+        """هل الخيط الحالي هو مالك الحالة (أو لم يبدأ التنفيذ بعد أثناء التهيئة)"""
+        return not self._started or self._owner == threading.get_ident()
+
+    def submit(self, command: Callable[[], Any], urgent: bool = False) -> Future:
+        """إرسال أمر دون انتظار نتيجته (urgent: قبل جميع الأوامر العادية المنتظرة)"""
+        future: Future = Future()
+        if self.owns_state():
+            # أمر من داخل أمر آخر أو أثناء التهيئة: التنفيذ مباشرة لتجنب الانتظار المتبادل
+            try:
+                future.set_result(command())
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+        if urgent:
+            self._urgent.append((command, future))
+            # إيقاظ الحلقة إن كانت تنتظر (الطابور العاجل يُفرغ قبل تنفيذ أي أمر)
+            self._commands.put((None, None))
+        else:
+            self._commands.put((command, future))
+        return future
+
+    def call(self, command: Callable[[], Any], timeout: Optional[float] = None, urgent: bool = False) -> Any:
+        """تنفيذ أمر وانتظار نتيجته (تُرفع استثناءات الأمر في الخيط المستدعي)"""
+        return self.submit(command, urgent).result(timeout)
+
+    @property
+    def pending(self) -> int:
+        """عدد الأوامر المنتظرة في الطابور"""
+        return self._commands.qsize()
+
+    @property
+    def pending_urgent(self) -> int:
+        """عدد الأوامر العاجلة المنتظرة"""
+        return len(self._urgent)
@@ -25,6 +25,11 @@ class OilPumpMonitoringSystem {
         this.socket = null;
         this.currentUser = null;
         this.pumpsData = {};
+        this.dataVersion = null;
+        this.subscription = null;
+        // مخطط إطارات القياسات الثنائية (يُرسل مرة واحدة عند الاتصال أو الاشتراك)
+        this.wireEncoding = 'binary';
+        this.telemetrySchema = null;
         this.systemHealth = {};
         this.isConnected = false;
         this.reconnectAttempts = 0;
@@ -188,7 +193,8 @@ class OilPumpMonitoringSystem {
             this.socket = io({
                 transports: ['websocket', 'polling'],
                 upgrade: true,
-                rememberUpgrade: true
+                rememberUpgrade: true,
+                auth: { encoding: this.wireEncoding }
             });
             
             // أحداث الاتصال
@@ -202,10 +208,15 @@ class OilPumpMonitoringSystem {
             
             // أحداث البيانات
             this.socket.on('data_update', (data) => this.onDataUpdate(data));
+            this.socket.on('subscribed', (data) => this.onSubscribed(data));
+            this.socket.on('telemetry_schema', (schema) => this.onTelemetrySchema(schema));
             this.socket.on('pump_updated', (data) => this.onPumpUpdated(data));
+            this.socket.on('pumps_controlled', (data) => this.onPumpsControlled(data));
             
             // أحداث التنبيهات
             this.socket.on('new_alert', (data) => this.onNewAlert(data));
+            this.socket.on('alert_acknowledged', (data) => this.onAlertAcknowledged(data));
+            this.socket.on('alert_cleared', (data) => this.onAlertCleared(data));
             
             // أحداث النشاط
             this.socket.on('new_activity', (data) => this.onNewActivity(data));
@@ -218,7 +229,7 @@ class OilPumpMonitoringSystem {
             this.socket.on('user_disconnected', (data) => this.onUserDisconnected(data));
             
             // أحداث العمليات الشاملة
-            this.socket.on('emergency_stop_all', (data) => this.onEmergencyStopAll(data));
+            this.socket.on('emergency_stop', (data) => this.onEmergencyStop(data));
             this.socket.on('auto_mode_all', (data) => this.onAutoModeAll(data));
             
         } catch (error) {
@@ -235,6 +246,30 @@ class OilPumpMonitoringSystem {
         this.isConnected = true;
         this.reconnectAttempts = 0;
         this.showToast('تم الاتصال بالخادم', 'success');
+        
+        // الاشتراك يُفقد مع الاتصال: إعادة طلبه بعد إعادة الاتصال
+        if (this.subscription) {
+            this.socket.emit('subscribe', this.subscription);
+        }
+    }
+    
+    /**
+     * قصر التحديثات على مضخات أو مناطق أو فئات أحداث معينة وبمعدل محدد
+     * مثال: subscribe({ locations: ['المنطقة الشمالية'], events: ['pumps', 'alerts'], interval: 30 })
+     * بدون معاملات: العودة لمتابعة الأسطول كاملاً
+     */
+    subscribe(options = {}) {
+        this.subscription = options;
+        if (this.socket && this.isConnected) {
+            this.socket.emit('subscribe', options);
+        }
+    }
+    
+    /**
+     * معالج تأكيد الاشتراك
+     */
+    onSubscribed(data) {
+        console.log('📡 تم تحديث الاشتراك:', data);
     }
     
     /**
@@ -372,7 +407,28 @@ class OilPumpMonitoringSystem {
         console.log('📊 تحديث البيانات:', data);
         
         // تحديث بيانات المضخات
-        if (data.pumps) {
+        if (data.type === 'delta' || data.type === 'frame') {
+            if (!this.currentUser) return;
+            
+            // فروقات لا تبدأ من الإصدار الحالي تعني فقدان تحديث: طلب إعادة المزامنة
+            if (this.dataVersion === null || data.base_version !== this.dataVersion) {
+                this.socket.emit('request_data_update', { since: this.dataVersion });
+                return;
+            }
+            
+            let changes = data.changes;
+            if (data.type === 'frame') {
+                changes = this.decodeTelemetryFrame(data);
+                if (!changes) {
+                    // إطار لا يطابق المخطط: طلب مخطط جديد ولقطة كاملة
+                    this.dataVersion = null;
+                    this.socket.emit('subscribe', this.subscription || {});
+                    return;
+                }
+            }
+            this.applyDataDelta(changes);
+            this.updatePumpsDisplay();
+        } else if (data.pumps) {
             this.pumpsData = {};
             data.pumps.forEach(pump => {
                 this.pumpsData[pump.id] = pump;
@@ -380,6 +436,12 @@ class OilPumpMonitoringSystem {
             this.updatePumpsDisplay();
         }
         
+        // تأكيد استلام الإصدار
+        if (data.version !== undefined) {
+            this.dataVersion = data.version;
+            this.socket.emit('data_ack', { version: data.version });
+        }
+        
         // تحديث صحة النظام
         if (data.system_health) {
             this.systemHealth = data.system_health;
@@ -395,6 +457,92 @@ class OilPumpMonitoringSystem {
         this.updateLastUpdateTime();
     }
     
+    /**
+     * معالج مخطط إطارات القياسات الثنائية
+     */
+    onTelemetrySchema(schema) {
+        console.log('📐 مخطط إطارات القياسات:', schema);
+        this.telemetrySchema = schema;
+    }
+    
+    /**
+     * فك إطار القياسات الثنائي إلى فروقات بنفس شكل فروقات JSON
+     * الإطار: float32 لكل مقياس ثم float64 للإنتاج ثم uint16 لفهرس وقت التحديث (little-endian)
+     * الإطار المتفرق (count أقل من مضخات المخطط) يسبقه uint32 لموقع كل مضخة في المخطط
+     */
+    decodeTelemetryFrame(data) {
+        const schema = this.telemetrySchema;
+        if (!schema || !data.frame) return null;
+        
+        const bytes = data.frame instanceof ArrayBuffer ? new Uint8Array(data.frame) : data.frame;
+        const count = data.count === undefined ? schema.pumps.length : data.count;
+        // الإطار المتفرق يبدأ بمواقع مضخاته في قائمة مضخات المخطط
+        const sparse = count !== schema.pumps.length;
+        if (bytes.byteLength !== count * (schema.bytes_per_pump + (sparse ? 4 : 0))) return null;
+        
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        let offset = 0;
+        let pumps = schema.pumps;
+        if (sparse) {
+            pumps = [];
+            for (let i = 0; i < count; i++) {
+                const pumpId = schema.pumps[view.getUint32(offset, true)];
+                if (pumpId === undefined) return null;
+                pumps.push(pumpId);
+                offset += 4;
+            }
+        }
+        
+        const changes = {};
+        pumps.forEach(pumpId => {
+            changes[pumpId] = { metrics: {} };
+        });
+        
+        // أعمدة المقاييس مقربة لمنازل المخطط لتطابق قيم JSON
+        schema.metrics.forEach(({ name, decimals }) => {
+            const scale = Math.pow(10, decimals);
+            pumps.forEach(pumpId => {
+                changes[pumpId].metrics[name] = Math.round(view.getFloat32(offset, true) * scale) / scale;
+                offset += 4;
+            });
+        });
+        
+        pumps.forEach(pumpId => {
+            changes[pumpId].production_today = view.getFloat64(offset, true);
+            offset += 8;
+        });
+        
+        pumps.forEach(pumpId => {
+            const index = view.getUint16(offset, true);
+            if (index !== 0xFFFF) {
+                changes[pumpId].updated_at = data.stamps[index];
+            }
+            offset += 2;
+        });
+        
+        // فروقات الحقول الأخرى (الحالة، التنبيهات...) تصل بصيغة JSON
+        Object.entries(data.changes || {}).forEach(([pumpId, fields]) => {
+            changes[pumpId] = Object.assign(changes[pumpId] || {}, fields);
+        });
+        return changes;
+    }
+    
+    /**
+     * دمج فروقات البيانات مع بيانات المضخات الحالية
+     */
+    applyDataDelta(changes) {
+        Object.entries(changes || {}).forEach(([pumpId, fields]) => {
+            const pump = this.pumpsData[pumpId] || (this.pumpsData[pumpId] = {});
+            Object.entries(fields).forEach(([field, value]) => {
+                if (value !== null && typeof value === 'object' && !Array.isArray(value)) {
+                    pump[field] = Object.assign(pump[field] || {}, value);
+                } else {
+                    pump[field] = value;
+                }
+            });
+        });
+    }
+    
     /**
      * تحديث عرض المضخات
      */
@@ -641,6 +789,28 @@ class OilPumpMonitoringSystem {
         }
     }
     
+    /**
+     * معالج أمر التحكم الجماعي (حقول التحكم للمضخات المتغيرة فقط)
+     */
+    onPumpsControlled(data) {
+        console.log('🔄 تحكم جماعي:', data);
+        
+        // دمج حقول التحكم في بيانات المضخات المعروفة لهذا العميل
+        Object.entries(data.pumps).forEach(([pumpId, fields]) => {
+            if (this.pumpsData[pumpId]) {
+                this.pumpsData[pumpId] = { ...this.pumpsData[pumpId], ...fields };
+            }
+        });
+        
+        // تحديث العرض
+        this.updatePumpsDisplay();
+        
+        // إظهار رسالة
+        if (data.user !== this.currentUser.name) {
+            this.showToast(`${data.message} بواسطة ${data.user}`, data.action === 'emergency_stop' ? 'warning' : 'info');
+        }
+    }
+    
     /**
      * معالج إيقاف الطوارئ الشامل
      */
@@ -656,6 +826,20 @@ class OilPumpMonitoringSystem {
      * تنفيذ إيقاف الطوارئ الشامل
      */
     executeEmergencyStopAll() {
+        const done = (data) => {
+            if (data.success) {
+                this.showToast(data.message, 'warning');
+            } else {
+                this.showToast(data.error, 'error');
+            }
+        };
+        
+        // قناة الطوارئ عبر الاتصال المفتوح (بدون اتصال HTTP جديد)، وHTTP عند انقطاعه
+        if (this.socket && this.socket.connected) {
+            this.socket.emit('emergency_stop', { user_id: this.currentUser.name }, done);
+            return;
+        }
+        
         fetch('/api/emergency/all', {
             method: 'POST',
             headers: {
@@ -666,13 +850,7 @@ class OilPumpMonitoringSystem {
             })
         })
         .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                this.showToast(data.message, 'warning');
-            } else {
-                this.showToast(data.error, 'error');
-            }
-        })
+        .then(done)
         .catch(error => {
             console.error('خطأ في إيقاف الطوارئ الشامل:', error);
             this.showToast('خطأ في إيقاف الطوارئ الشامل', 'error');
@@ -718,14 +896,23 @@ class OilPumpMonitoringSystem {
     }
     
     /**
-     * معالج إيقاف الطوارئ الشامل من الخادم
+     * معالج إيقاف الطوارئ من الخادم (معرفات المضخات المتوقفة فقط)
      */
-    onEmergencyStopAll(data) {
-        console.log('🚨 إيقاف طوارئ شامل:', data);
+    onEmergencyStop(data) {
+        // تأكيد الاستلام أولاً (يقيس به الخادم زمن وصول الأمر لآخر عميل)
+        this.socket.emit('emergency_ack', { command_id: data.command_id });
+        console.log('🚨 إيقاف طوارئ:', data);
         
         // تحديث بيانات المضخات
-        data.pumps.forEach(pump => {
-            this.pumpsData[pump.id] = pump;
+        data.pump_ids.forEach(pumpId => {
+            if (this.pumpsData[pumpId]) {
+                this.pumpsData[pumpId] = {
+                    ...this.pumpsData[pumpId],
+                    status: 'emergency_stop',
+                    emergency_stop: true,
+                    updated_at: data.updated_at
+                };
+            }
         });
         
         // تحديث العرض
@@ -893,7 +1080,9 @@ class OilPumpMonitoringSystem {
             if (!this.pumpsData[data.pump_id].alerts) {
                 this.pumpsData[data.pump_id].alerts = [];
             }
-            this.pumpsData[data.pump_id].alerts.push(data.alert);
+            const alerts = this.pumpsData[data.pump_id].alerts.filter(alert => alert.id !== data.alert.id);
+            alerts.push(data.alert);
+            this.pumpsData[data.pump_id].alerts = alerts;
         }
         
         // تحديث العرض
@@ -906,6 +1095,46 @@ class OilPumpMonitoringSystem {
         this.playAlertSound(data.alert.severity);
     }
     
+    /**
+     * معالج تأكيد استلام تنبيه
+     */
+    onAlertAcknowledged(data) {
+        console.log('✔️ تأكيد استلام تنبيه:', data);
+        
+        const pump = this.pumpsData[data.pump_id];
+        if (pump && pump.alerts) {
+            pump.alerts = pump.alerts.map(alert => alert.id === data.alert_id ? data.alert : alert);
+            this.updatePumpsDisplay();
+        }
+        
+        if (this.currentUser && data.user !== this.currentUser.name) {
+            this.showToast(`تم تأكيد استلام التنبيه بواسطة ${data.user}`, 'info');
+        }
+    }
+    
+    /**
+     * معالج زوال تنبيه
+     */
+    onAlertCleared(data) {
+        console.log('✅ زوال تنبيه:', data);
+        
+        const pump = this.pumpsData[data.pump_id];
+        if (pump && pump.alerts) {
+            pump.alerts = pump.alerts.filter(alert => alert.id !== data.alert_id);
+            this.updatePumpsDisplay();
+        }
+    }
+    
+    /**
+     * تأكيد استلام تنبيه
+     */
+    acknowledgeAlert(alertId) {
+        if (this.socket && this.isConnected) {
+            this.socket.emit('acknowledge_alert', { alert_id: alertId });
+        }
+        this.elements.alertModal.style.display = 'none';
+    }
+    
     /**
      * تشغيل صوت تنبيه
      */
@@ -973,6 +1202,16 @@ class OilPumpMonitoringSystem {
                 <div class="alert-timestamp">
                     <strong>وقت التنبيه:</strong> ${this.formatDateTime(alert.timestamp)}
                 </div>
+                
+                ${alert.state === 'acknowledged' ? `
+                <div class="alert-timestamp">
+                    <strong>تم تأكيد الاستلام بواسطة:</strong> ${alert.acknowledged_by} - ${this.formatDateTime(alert.acknowledged_at)}
+                </div>
+                ` : `
+                <button class="btn btn-secondary" onclick="pumpSystem.acknowledgeAlert('${alert.id}')">
+                    تأكيد الاستلام
+                </button>
+                `}
             </div>
         `;
         
@@ -1319,6 +1558,7 @@ class OilPumpMonitoringSystem {
         // مسح البيانات
         this.currentUser = null;
         this.pumpsData = {};
+        this.dataVersion = null;
         this.systemHealth = {};
         
         // إعادة تعيين النموذج
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+التخزين الدائم المعتمد على الملفات المقطعية المعينة في الذاكرة
+Memory-Mapped Segment Storage
+
+سجلات إلحاق فقط (append-only) مقسمة إلى مقاطع ثابتة الحجم معينة في الذاكرة
+(mmap) لقراءات القياسات وسجل النشاط:
+
+- RecordLog: سجلات ثابتة الحجم مرتبة زمنياً، مع CRC لكل سجل واستعادة سريعة
+  بعد الانهيار بالبحث الثنائي عن نهاية البيانات في آخر مقطع.
+- EventLog: سجلات متغيرة الطول (JSON) لسجل النشاط والدردشة.
+- TelemetryArchive: أرشيف القراءات الخام والتجميعات لكل دقة، يُقرأ مباشرة من
+  الذاكرة المعينة دون نسخ عند الاستعلام عن نوافذ خارج الذاكرة.
+"""
+
+import os
+import json
+import mmap
+import fcntl
+import time
+import zlib
+import struct
+import logging
+import threading
+from typing import Dict, List, Optional, Iterator, Tuple, Sequence
+
+from telemetry_store import METRIC_NAMES
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.seg'
+
+# ملف القفل الحصري في جذر مجلد التخزين
+LOCK_FILE = '.lock'
+
+
+def lock_directory(directory: str):
+    """
+    قفل حصري على مجلد التخزين لعملية واحدة وإرجاع ملف القفل (يُغلق لتحريره)
+
+    المقاطع المعينة في الذاكرة تُلحق بمواقع تحددها كل عملية لنفسها، فكتابة عمليتين في
+    المجلد نفسه تتلف السجلات؛ القفل يتحرر تلقائياً عند توقف العملية
+    """
+    os.makedirs(directory, exist_ok=True)
+    handle = open(os.path.join(directory, LOCK_FILE), 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        raise RuntimeError(f"مجلد التخزين {directory} مستخدم من عملية أخرى")
+    return handle
+
+
+class _Segment:
+    """مقطع واحد ثابت الحجم معين في الذاكرة"""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        exists = os.path.exists(path)
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists or os.path.getsize(path) < size:
+            self.file.truncate(size)
+        self.size = os.path.getsize(path)
+        self.map = mmap.mmap(self.file.fileno(), self.size)
+        self.end = 0
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class RecordLog:
+    """
+    سجل إلحاق فقط بسجلات ثابتة الحجم مرتبة حسب الطابع الزمني
+    Append-only fixed-size record log over memory-mapped segments
+
+    كل سجل يبدأ بطابع زمني (double) وينتهي بـ CRC32 لبقية السجل.
+    """
+
+    def __init__(self, directory: str, name: str, fields: str,
+                 records_per_segment: int = 65536, retention: Optional[float] = None):
+        self.directory = directory
+        self.name = name
+        self.body = struct.Struct('<d' + fields)
+        self.record = struct.Struct('<d' + fields + 'I')
+        self.records_per_segment = records_per_segment
+        self.retention = retention
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        # المقاطع المغلقة: (أول طابع زمني، المسار) والمقطع النشط
+        self._sealed: List[Tuple[float, str]] = []
+        self._active: Optional[_Segment] = None
+        self._active_start = 0.0
+        self._recover()
+
+    # ------------------------------------------------------------------ المقاطع
+
+    def _segment_paths(self) -> List[Tuple[float, str]]:
+        prefix = self.name + '-'
+        segments = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(prefix) and filename.endswith(SEGMENT_SUFFIX):
+                start_ms = int(filename[len(prefix):-len(SEGMENT_SUFFIX)])
+                segments.append((start_ms / 1000.0, os.path.join(self.directory, filename)))
+        segments.sort()
+        return segments
+
+    def _open(self, path: str) -> _Segment:
+        return _Segment(path, self.records_per_segment * self.record.size)
+
+    def _timestamp_at(self, segment: _Segment, index: int) -> float:
+        return struct.unpack_from('<d', segment.map, index * self.record.size)[0]
+
+    def _valid_at(self, segment: _Segment, index: int) -> bool:
+        offset = index * self.record.size
+        body = segment.map[offset:offset + self.body.size]
+        crc = struct.unpack_from('<I', segment.map, offset + self.body.size)[0]
+        return zlib.crc32(body) == crc
+
+    def _count(self, segment: _Segment) -> int:
+        """عدد السجلات المكتوبة في مقطع (بحث ثنائي عن أول سجل فارغ)"""
+        low, high = 0, segment.size // self.record.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp_at(segment, middle) != 0.0:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _recover(self):
+        """استعادة الحالة بعد إعادة التشغيل: تحديد نهاية آخر مقطع وإزالة السجلات الممزقة"""
+        segments = self._segment_paths()
+        if not segments:
+            return
+
+        self._sealed = segments[:-1]
+        self._active_start, path = segments[-1]
+        active = self._open(path)
+        count = self._count(active)
+
+        # السجلات الأخيرة قد تكون مكتوبة جزئياً عند الانهيار
+        while count > 0 and not self._valid_at(active, count - 1):
+            count -= 1
+            offset = count * self.record.size
+            active.map[offset:offset + self.record.size] = bytes(self.record.size)
+            logger.warning(f"تمت إزالة سجل تالف من نهاية {path}")
+
+        active.end = count * self.record.size
+        self._active = active
+
+    def _roll(self, timestamp: float):
+        """إغلاق المقطع النشط وفتح مقطع جديد يبدأ بالطابع الزمني المحدد"""
+        if self._active is not None:
+            self._active.close()
+            self._sealed.append((self._active_start, self._active.path))
+
+        path = os.path.join(self.directory, f"{self.name}-{int(timestamp * 1000):016d}{SEGMENT_SUFFIX}")
+        self._active = self._open(path)
+        self._active_start = timestamp
+        self._expire(timestamp)
+
+    def _expire(self, now: float):
+        """حذف المقاطع التي تقع بالكامل خارج مدة الاحتفاظ"""
+        if self.retention is None:
+            return
+
+        while len(self._sealed) > 1 and self._sealed[1][0] < now - self.retention:
+            _, path = self._sealed.pop(0)
+            os.remove(path)
+
+    # ------------------------------------------------------------------ الكتابة والقراءة
+
+    def append_many(self, rows: Sequence[tuple]):
+        """إلحاق عدة سجلات (كل سجل يبدأ بطابع زمني غير صفري)"""
+        body, size = self.body, self.record.size
+        with self._lock:
+            for row in rows:
+                if self._active is None or self._active.end + size > self._active.size:
+                    self._roll(row[0])
+                packed = body.pack(*row)
+                active = self._active
+                active.map[active.end:active.end + size] = packed + struct.pack('<I', zlib.crc32(packed))
+                active.end += size
+
+    def flush(self):
+        """مزامنة المقطع النشط مع القرص"""
+        with self._lock:
+            if self._active is not None:
+                self._active.flush()
+
+    def scan(self, start: float, end: float) -> Iterator[tuple]:
+        """
+        قراءة السجلات ضمن النافذة الزمنية مباشرة من الذاكرة المعينة دون نسخ
+
+        يرجع السجلات بدون حقل CRC.
+        """
+        with self._lock:
+            segments = [(seg_start, path) for seg_start, path in self._sealed]
+            if self._active is not None:
+                segments.append((self._active_start, self._active.path))
+
+            rows = []
+            for position, (seg_start, path) in enumerate(segments):
+                next_start = segments[position + 1][0] if position + 1 < len(segments) else float('inf')
+                if next_start < start or seg_start > end:
+                    continue
+
+                active = self._active is not None and path == self._active.path
+                segment = self._active if active else self._open(path)
+                try:
+                    count = segment.end // self.record.size if active else self._count(segment)
+                    first = self._bisect(segment, count, start)
+                    last = self._bisect(segment, count, end + 1e-9)
+                    view = memoryview(segment.map)[first * self.record.size:last * self.record.size]
+                    try:
+                        rows.extend(row[:-1] for row in self.record.iter_unpack(view))
+                    finally:
+                        view.release()
+                finally:
+                    if not active:
+                        segment.close()
+            return iter(rows)
+
+    def _bisect(self, segment: _Segment, count: int, timestamp: float) -> int:
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp_at(segment, middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def close(self):
+        """إغلاق المقطع النشط"""
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+
+
+class EventLog:
+    """
+    سجل أحداث إلحاق فقط بسجلات JSON متغيرة الطول
+    Append-only variable-length JSON event log over memory-mapped segments
+    """
+
+    HEADER = struct.Struct('<II')  # الطول، CRC32
+
+    def __init__(self, directory: str, name: str, segment_size: int = 4 * 1024 * 1024):
+        self.directory = directory
+        self.name = name
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._active: Optional[_Segment] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _segment_paths(self) -> List[str]:
+        prefix = self.name + '-'
+        return sorted(
+            os.path.join(self.directory, filename)
+            for filename in os.listdir(self.directory)
+            if filename.startswith(prefix) and filename.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _read(self, segment: _Segment, truncate: bool = False) -> List[Dict]:
+        """قراءة أحداث مقطع حتى أول سجل فارغ أو تالف"""
+        events = []
+        offset = 0
+        header = self.HEADER
+        while offset + header.size <= segment.size:
+            length, crc = header.unpack_from(segment.map, offset)
+            if length == 0:
+                break
+            payload = segment.map[offset + header.size:offset + header.size + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                if truncate:
+                    segment.map[offset:] = bytes(segment.size - offset)
+                    logger.warning(f"تمت إزالة سجلات تالفة من نهاية {segment.path}")
+                break
+            events.append(json.loads(payload))
+            offset += header.size + length
+        segment.end = offset
+        return events
+
+    def _recover(self):
+        paths = self._segment_paths()
+        if paths:
+            self._sequence = int(os.path.basename(paths[-1])[len(self.name) + 1:-len(SEGMENT_SUFFIX)])
+            self._active = _Segment(paths[-1], self.segment_size)
+            self._read(self._active, truncate=True)
+
+    def _roll(self):
+        if self._active is not None:
+            self._active.close()
+        self._sequence += 1
+        path = os.path.join(self.directory, f"{self.name}-{self._sequence:08d}{SEGMENT_SUFFIX}")
+        self._active = _Segment(path, self.segment_size)
+
+    def append(self, event: Dict):
+        """إلحاق حدث"""
+        payload = json.dumps(event, ensure_ascii=False).encode('utf-8')
+        record = self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._active is None or self._active.end + len(record) > self._active.size:
+                self._roll()
+            active = self._active
+            active.map[active.end:active.end + len(record)] = record
+            active.end += len(record)
+
+    def flush(self):
+        with self._lock:
+            if self._active is not None:
+                self._active.flush()
+
+    def tail(self, limit: int) -> List[Dict]:
+        """آخر الأحداث المسجلة (بحد أقصى limit) بترتيبها الزمني"""
+        with self._lock:
+            events: List[Dict] = []
+            for path in reversed(self._segment_paths()):
+                if self._active is not None and path == self._active.path:
+                    chunk = self._read(self._active)
+                else:
+                    segment = _Segment(path, self.segment_size)
+                    try:
+                        chunk = self._read(segment)
+                    finally:
+                        segment.close()
+                events = chunk + events
+                if len(events) >= limit:
+                    break
+            return events[-limit:] if limit > 0 else events
+
+    def close(self):
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+
+
+# مدة الاحتفاظ الافتراضية على القرص لكل دقة بالثواني
+DEFAULT_DISK_RETENTION = {
+    'raw': 2 * 86400,
+    '1m': 30 * 86400,
+    '15m': 365 * 86400,
+    '1h': 5 * 365 * 86400,
+}
+
+_METRIC_COUNT = len(METRIC_NAMES)
+
+
+class TelemetryArchive:
+    """
+    أرشيف القراءات على القرص لكل دقة من دقات مخزن التاريخ
+    Persistent raw samples and closed rollup buckets
+    """
+
+    def __init__(self, directory: str, retention: Optional[Dict[str, float]] = None):
+        retention = retention or DEFAULT_DISK_RETENTION
+        self.logs = {
+            'raw': RecordLog(directory, 'telemetry-raw', 'I' + 'f' * _METRIC_COUNT,
+                             records_per_segment=262144, retention=retention.get('raw'))
+        }
+        for name in ('1m', '15m', '1h'):
+            self.logs[name] = RecordLog(directory, f'telemetry-{name}', 'I' + 'f' * (3 * _METRIC_COUNT),
+                                        records_per_segment=65536, retention=retention.get(name))
+
+    def append_raw(self, rows: Sequence[tuple]):
+        """rows: (الطابع الزمني، المضخة، قيم المقاييس...)"""
+        self.logs['raw'].append_many(rows)
+
+    def append_rollups(self, resolution: str, rows: Sequence[tuple]):
+        """rows: (الطابع الزمني، المضخة، المتوسطات...، القيم الدنيا...، القيم العليا...)"""
+        self.logs[resolution].append_many(rows)
+
+    def flush(self):
+        for log in self.logs.values():
+            log.flush()
+
+    def points(self, pump_id: int, metric: str, resolution: str, start: float, end: float) -> List[List[float]]:
+        """نقاط مقياس لمضخة من الأرشيف بالشكل [الطابع الزمني، المتوسط، الأدنى، الأعلى]"""
+        position = METRIC_NAMES.index(metric)
+        points = []
+        if resolution == 'raw':
+            for row in self.logs['raw'].scan(start, end):
+                if row[1] == pump_id:
+                    value = round(row[2 + position], 3)
+                    points.append([row[0], value, value, value])
+        else:
+            for row in self.logs[resolution].scan(start, end):
+                if row[1] == pump_id:
+                    points.append([row[0],
+                                   round(row[2 + position], 3),
+                                   round(row[2 + _METRIC_COUNT + position], 3),
+                                   round(row[2 + 2 * _METRIC_COUNT + position], 3)])
+        return points
+
+    def restore(self, history, now: Optional[float] = None) -> int:
+        """إعادة تعبئة المخازن الحلقية لمخزن التاريخ من الأرشيف (نافذة كل دقة فقط)"""
+        now = now or time.time()
+        restored = 0
+        for res in history.resolutions:
+            rows = self.logs[res.name].scan(now - res.retention, now)
+            for row in rows:
+                if res.name == 'raw':
+                    history.restore(res.name, row[1], row[0], row[2:])
+                else:
+                    history.restore(res.name, row[1], row[0],
+                                    row[2:2 + _METRIC_COUNT],
+                                    row[2 + _METRIC_COUNT:2 + 2 * _METRIC_COUNT],
+                                    row[2 + 2 * _METRIC_COUNT:])
+                restored += 1
+        return restored
+
+    def close(self):
+        for log in self.logs.values():
+            log.close()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+اشتراكات العملاء وغرف البث
+Client Subscriptions and Broadcast Rooms
+
+يختار كل عميل المضخات (بالمعرف أو بالمنطقة) وفئات الأحداث التي يتابعها ومعدل
+تحديث البيانات، ويُترجم الاشتراك إلى غرف Socket.IO فيُرسل كل حدث مرة واحدة
+للغرف المعنية فقط. العملاء بنفس المضخات ونفس المعدل ونفس صيغة النقل يتشاركون
+تدفق بيانات واحداً فتُبنى رسالة تحديث البيانات وتُسلسل مرة لكل تدفق لا لكل عميل.
+"""
+
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+# فئات الأحداث القابلة للاشتراك
+# pumps: data_update و pump_updated و pumps_controlled
+# alerts: new_alert و alert_cleared و alert_acknowledged
+# activity: new_activity
+# chat: new_message
+# (إشعار إيقاف الطوارئ emergency_stop يصل لجميع العملاء دون اشتراك)
+EVENT_CLASSES = ('pumps', 'alerts', 'activity', 'chat')
+
+# غرفة تحديثات البيانات المشتركة لمن يتابع الأسطول كاملاً دون حد للمعدل
+FLEET_FEED_ROOM = 'data:*'
+
+# أطول فاصل مسموح بين تحديثين للبيانات (بالثواني)
+MAX_INTERVAL = 300
+
+
+def event_rooms(event_class: str, pump_id: Optional[int] = None) -> Union[str, List[str]]:
+    """
+    غرف حدث من فئة معينة: غرفة الفئة للأحداث العامة، أو غرفة متابعي الأسطول
+    كاملاً مع غرفة المضخة للأحداث الخاصة بمضخة
+    """
+    if pump_id is None:
+        return event_class
+    return [f'{event_class}:*', f'{event_class}:{pump_id}']
+
+
+def parse_subscription(data: Dict, pumps: Dict[int, Dict]) -> Tuple[Optional[FrozenSet[int]], FrozenSet[str], float]:
+    """
+    التحقق من طلب الاشتراك وتحويل المناطق إلى معرفات مضخات
+
+    يرفع ValueError برسالة عربية عند وجود قيمة غير صالحة
+    """
+    pump_ids: Set[int] = set()
+
+    requested = data.get('pumps') or []
+    if not isinstance(requested, list):
+        raise ValueError('قائمة المضخات غير صالحة')
+    for pump_id in requested:
+        if isinstance(pump_id, bool) or not isinstance(pump_id, int) or pump_id not in pumps:
+            raise ValueError(f'المضخة غير موجودة: {pump_id}')
+        pump_ids.add(pump_id)
+
+    locations = data.get('locations') or []
+    if not isinstance(locations, list):
+        raise ValueError('قائمة المناطق غير صالحة')
+    for location in locations:
+        matched = {pump_id for pump_id, pump in pumps.items() if pump['location'] == location}
+        if not matched:
+            raise ValueError(f'المنطقة غير معروفة: {location}')
+        pump_ids |= matched
+
+    events = data.get('events') or list(EVENT_CLASSES)
+    if not isinstance(events, list):
+        raise ValueError('قائمة فئات الأحداث غير صالحة')
+    unknown = [event for event in events if event not in EVENT_CLASSES]
+    if unknown:
+        raise ValueError(f'فئة أحداث غير معروفة: {unknown[0]}')
+
+    interval = data.get('interval', 0)
+    if isinstance(interval, bool) or not isinstance(interval, (int, float)) or not 0 <= interval <= MAX_INTERVAL:
+        raise ValueError(f'معدل التحديث يجب أن يكون بين 0 و{MAX_INTERVAL} ثانية')
+
+    # عدم تحديد مضخات أو مناطق يعني الأسطول كاملاً
+    return (frozenset(pump_ids) if pump_ids else None), frozenset(events), float(interval)
+
+
+class Feed:
+    """
+    تدفق تحديثات بيانات مشترك بين العملاء بنفس المضخات ونفس المعدل
+    Shared data_update stream for one (pumps, interval, encoding) combination
+    """
+
+    __slots__ = ('key', 'room', 'pump_ids', 'interval', 'encoding', 'slots', 'version', 'last_sent', 'members')
+
+    def __init__(self, key: str, pump_ids: Optional[FrozenSet[int]], interval: float, encoding: str, version: int):
+        self.key = key
+        self.room = f'data:{key}'
+        self.pump_ids = pump_ids
+        self.interval = interval
+        self.encoding = encoding
+        # خانات المضخات في إطارات الصيغة الثنائية (تُحسب عند أول إطار)
+        self.slots: Optional[List[int]] = None
+        # آخر إصدار أُرسل لأعضاء التدفق (أساس الفروقات التالية)
+        self.version = version
+        self.last_sent = time.monotonic()
+        self.members = 0
+
+
+class Subscription:
+    """اشتراك عميل واحد"""
+
+    __slots__ = ('pump_ids', 'events', 'interval', 'encoding', 'feed')
+
+    def __init__(self, pump_ids: Optional[FrozenSet[int]], events: FrozenSet[str], interval: float,
+                 encoding: str, feed: Optional[Feed]):
+        self.pump_ids = pump_ids
+        self.events = events
+        self.interval = interval
+        self.encoding = encoding
+        self.feed = feed
+
+    def rooms(self) -> Set[str]:
+        """غرف Socket.IO التي يجب أن يكون العميل عضواً فيها"""
+        rooms = set()
+        for event_class in self.events:
+            rooms.add(event_class)
+            if self.pump_ids is None:
+                rooms.add(f'{event_class}:*')
+            else:
+                rooms.update(f'{event_class}:{pump_id}' for pump_id in self.pump_ids)
+        data_room = self.data_room()
+        if data_room is not None:
+            rooms.add(data_room)
+        return rooms
+
+    def data_room(self) -> Optional[str]:
+        """غرفة تحديثات البيانات للعميل (None إن لم يشترك في فئة المضخات)"""
+        if 'pumps' not in self.events:
+            return None
+        return self.feed.room if self.feed is not None else FLEET_FEED_ROOM
+
+    def to_dict(self) -> Dict[str, Any]:
+        """وصف الاشتراك لإرساله للعميل"""
+        return {
+            'pumps': sorted(self.pump_ids) if self.pump_ids is not None else None,
+            'events': sorted(self.events),
+            'interval': self.interval,
+            'encoding': self.encoding,
+        }
+
+
+class SubscriptionRegistry:
+    """
+    سجل اشتراكات عملاء هذه العملية والتدفقات المشتركة
+    Per-process subscriptions (mutated only by the state actor)
+    """
+
+    def __init__(self):
+        """تهيئة السجل"""
+        self.clients: Dict[str, Subscription] = {}
+        self.feeds: Dict[str, Feed] = {}
+
+    def subscribe(self, sid: str, pump_ids: Optional[FrozenSet[int]], events: FrozenSet[str], interval: float,
+                  version: int, encoding: Optional[str] = None) -> Tuple[Subscription, Set[str], Set[str]]:
+        """
+        استبدال اشتراك عميل
+
+        version: الإصدار الحالي للبيانات (إصدار البداية لتدفق جديد)
+        encoding: صيغة تحديثات البيانات (الافتراضي: الصيغة المتفاوض عليها سابقاً أو json)
+        يرجع الاشتراك الجديد والغرف التي يجب مغادرتها والغرف التي يجب الانضمام إليها
+        """
+        previous = self.remove(sid)
+        old_rooms = previous.rooms() if previous is not None else set()
+        if encoding is None:
+            encoding = previous.encoding if previous is not None else 'json'
+
+        # متابعو الأسطول كاملاً بصيغة JSON دون حد للمعدل يستلمون البث المشترك من العملية القائدة
+        feed = None
+        if 'pumps' in events and (pump_ids is not None or interval > 0 or encoding != 'json'):
+            pumps_key = ','.join(str(pump_id) for pump_id in sorted(pump_ids)) if pump_ids is not None else '*'
+            key = f'{pumps_key}@{interval:g}' + ('' if encoding == 'json' else f'#{encoding}')
+            feed = self.feeds.get(key)
+            if feed is None:
+                feed = self.feeds[key] = Feed(key, pump_ids, interval, encoding, version)
+            feed.members += 1
+
+        subscription = Subscription(pump_ids, events, interval, encoding, feed)
+        self.clients[sid] = subscription
+        new_rooms = subscription.rooms()
+        return subscription, old_rooms - new_rooms, new_rooms - old_rooms
+
+    def remove(self, sid: str) -> Optional[Subscription]:
+        """حذف اشتراك عميل (وحذف تدفقه إن لم يبق فيه أحد)"""
+        subscription = self.clients.pop(sid, None)
+        if subscription is not None and subscription.feed is not None:
+            feed = subscription.feed
+            feed.members -= 1
+            if feed.members <= 0:
+                self.feeds.pop(feed.key, None)
+        return subscription
+
+    def due_feeds(self, version: int, now: float) -> List[Feed]:
+        """التدفقات التي تغيرت بياناتها منذ آخر إرسال وانقضى فاصلها"""
+        return [
+            feed for feed in self.feeds.values()
+            if feed.version != version and now - feed.last_sent >= feed.interval
+        ]
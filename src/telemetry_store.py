@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+مخزن القياسات العمودي
+Columnar Telemetry Store
+
+يحفظ قيم القياسات الحية لجميع المضخات في مصفوفات رقمية متجاورة (مصفوفة لكل
+مقياس مفهرسة بخانة المضخة)، ويطبق خطوة التحديث والتقييد والتقريب على الأسطول
+كاملاً عموداً بعمود بدلاً من المرور على قاموس كل مضخة حقلاً حقلاً.
+"""
+
+import random
+from array import array
+from typing import Dict, List, Optional, Iterable
+
+# (الاسم، الحد الأدنى، الحد الأقصى، عدد المنازل العشرية)
+METRIC_SPECS = (
+    ('pressure', 0, 100, 1),
+    ('temperature', 20, 120, 1),
+    ('flow_rate', 0, 500, 1),
+    ('vibration', 0, 5, 2),
+    ('power', 0, 100, 1),
+    ('efficiency', 0, 100, 1),
+)
+
+METRIC_NAMES = tuple(spec[0] for spec in METRIC_SPECS)
+
+# معاملات الخطوة لكل حالة ومقياس: القيمة الجديدة = القيمة × k + a + span × عشوائي
+# (k, a, span)
+_HOLD = (1.0, 0.0, 0.0)
+_ZERO = (0.0, 0.0, 0.0)
+
+STEP_COEFFICIENTS = {
+    'running': {
+        'pressure': (1.0, -2.0, 4.0),
+        'temperature': (1.0, -1.0, 4.0),
+        'flow_rate': (1.0, -10.0, 20.0),
+        'vibration': (1.0, -0.1, 0.3),
+        'power': (1.0, -2.0, 4.0),
+        'efficiency': (1.0, -1.0, 2.0),
+    },
+    'stopped': {
+        'pressure': (1.0, -10.0, 5.0),
+        'temperature': (1.0, -5.0, 3.0),
+        'flow_rate': _ZERO,
+        'vibration': _ZERO,
+        'power': _ZERO,
+        'efficiency': _ZERO,
+    },
+    'maintenance': {
+        'pressure': _ZERO,
+        'temperature': (0.0, 20.0, 10.0),
+        'flow_rate': _ZERO,
+        'vibration': _ZERO,
+        'power': _ZERO,
+        'efficiency': _ZERO,
+    },
+}
+STEP_COEFFICIENTS['emergency_stop'] = STEP_COEFFICIENTS['stopped']
+
+# معدل زيادة الإنتاج للمضخات العاملة (a, span) في كل خطوة
+PRODUCTION_STEP = (1.0, 4.0)
+
+# المدة التي تمثلها خطوة واحدة بالثواني (فاصل أخذ العينات الافتراضي)
+STEP_SECONDS = 5.0
+
+
+class TelemetryStore:
+    """
+    مخزن عمودي لقياسات الأسطول
+    Array-backed, per-metric telemetry columns indexed by pump slot
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        """تهيئة المخزن"""
+        self.rng = rng or random.Random()
+        self.columns: Dict[str, array] = {name: array('d') for name in METRIC_NAMES}
+        self.production = array('d')
+        self.slots: Dict[int, int] = {}
+        self.pump_ids: List[int] = []
+        self._coefficients_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.pump_ids)
+
+    def add_pump(self, pump_id: int, metrics: Dict[str, float], production: float = 0.0) -> int:
+        """إضافة مضخة وحجز خانة لها في جميع الأعمدة"""
+        if pump_id in self.slots:
+            raise ValueError(f"المضخة {pump_id} موجودة مسبقاً في المخزن")
+
+        slot = len(self.pump_ids)
+        self.slots[pump_id] = slot
+        self.pump_ids.append(pump_id)
+        for name in METRIC_NAMES:
+            self.columns[name].append(float(metrics.get(name, 0.0)))
+        self.production.append(float(production))
+        return slot
+
+    def get(self, pump_id: int, name: str) -> float:
+        """قراءة قيمة مقياس لمضخة"""
+        return self.columns[name][self.slots[pump_id]]
+
+    def set(self, pump_id: int, name: str, value: float):
+        """كتابة قيمة مقياس لمضخة"""
+        self.columns[name][self.slots[pump_id]] = value
+
+    def metrics_dict(self, pump_id: int) -> Dict[str, float]:
+        """بناء قاموس المقاييس بالشكل الذي تعرضه الواجهة البرمجية"""
+        slot = self.slots[pump_id]
+        return {name: column[slot] for name, column in self.columns.items()}
+
+    def production_of(self, pump_id: int) -> float:
+        """إنتاج المضخة اليوم"""
+        return self.production[self.slots[pump_id]]
+
+    def _coefficients(self, statuses: tuple) -> Dict[str, tuple]:
+        """أعمدة المعاملات لكل مقياس حسب حالات المضخات (مخزنة مؤقتاً حتى تتغير الحالات)"""
+        cached = self._coefficients_cache.get(statuses)
+        if cached is not None:
+            return cached
+
+        coefficients = {}
+        for name in METRIC_NAMES:
+            rules = [STEP_COEFFICIENTS.get(status, {}).get(name, _HOLD) for status in statuses]
+            coefficients[name] = (
+                array('d', (rule[0] for rule in rules)),
+                array('d', (rule[1] for rule in rules)),
+                array('d', (rule[2] for rule in rules)),
+            )
+        running = array('d', (1.0 if status == 'running' else 0.0 for status in statuses))
+        coefficients['production'] = running
+
+        # الاحتفاظ بآخر مجموعة معاملات فقط لأن الحالات نادراً ما تتغير بين الدورات
+        self._coefficients_cache = {statuses: coefficients}
+        return coefficients
+
+    def step(self, statuses: Iterable[str], slots: Optional[List[int]] = None,
+             scales: Optional[List[float]] = None):
+        """
+        تحديث جميع المقاييس دفعة واحدة حسب حالة كل مضخة ثم تقييدها وتقريبها
+
+        statuses: حالة كل مضخة مرتبة حسب الخانة
+        slots: تحديث خانات محددة فقط (الافتراضي: الأسطول كاملاً)
+        scales: زيادة الإنتاج لكل خانة من slots بمضاعفات الخطوة (فاصل أخذ عيناتها / STEP_SECONDS)
+        """
+        coefficients = self._coefficients(tuple(statuses))
+        rand = self.rng.random
+
+        if slots is None:
+            for name, low, high, digits in METRIC_SPECS:
+                ks, offsets, spans = coefficients[name]
+                self.columns[name][:] = array('d', [
+                    round(min(high, max(low, value * k + a + span * rand())), digits)
+                    for value, k, a, span in zip(self.columns[name], ks, offsets, spans)
+                ])
+
+            running = coefficients['production']
+            base, span = PRODUCTION_STEP
+            self.production[:] = array('d', [
+                value + base + span * rand() if flag else value
+                for value, flag in zip(self.production, running)
+            ])
+            return
+
+        for name, low, high, digits in METRIC_SPECS:
+            column = self.columns[name]
+            ks, offsets, spans = coefficients[name]
+            for slot in slots:
+                column[slot] = round(
+                    min(high, max(low, column[slot] * ks[slot] + offsets[slot] + spans[slot] * rand())),
+                    digits
+                )
+
+        running = coefficients['production']
+        base, span = PRODUCTION_STEP
+        for index, slot in enumerate(slots):
+            if running[slot]:
+                self.production[slot] += (base + span * rand()) * (scales[index] if scales is not None else 1.0)
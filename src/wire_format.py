@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+صيغة النقل الثنائية المضغوطة للقياسات
+Compact Binary Wire Format for Telemetry
+
+بدلاً من تكرار أسماء المقاييس لكل مضخة في كل رسالة JSON، يستلم العميل الذي
+يطلب الصيغة الثنائية عند الاتصال مخططاً مرة واحدة (ترتيب المضخات والمقاييس
+ومنازلها العشرية)، ثم إطارات رقمية متجاورة مأخوذة مباشرة من أعمدة المخزن العمودي:
+
+    float32[عدد المضخات] لكل مقياس بترتيب المخطط
+    float64[عدد المضخات] للإنتاج اليومي (دقة كاملة لأنه غير مقرب)
+    uint16[عدد المضخات]  فهرس وقت التحديث في جدول stamps (0xFFFF = لم يتغير)
+
+عندما تتغير قياسات جزء من مضخات المخطط فقط (فواصل أخذ عينات مختلفة لكل مضخة)
+يكون الإطار متفرقاً: يحمل المضخات المتغيرة فقط ويسبقه uint32[عددها] بمواقعها في
+قائمة مضخات المخطط. عدد مضخات الإطار يُرسل في الحقل count، ويساوي عدد مضخات
+المخطط في الإطار الكامل الذي لا يسبقه جدول مواقع.
+
+جميع القيم بترتيب little-endian. تعيد الواجهة تقريب القيم للمنازل العشرية في
+المخطط فتحصل على القيم نفسها المرسلة بصيغة JSON.
+"""
+
+import sys
+from array import array
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from telemetry_store import METRIC_SPECS, TelemetryStore
+
+# رقم إصدار الصيغة (يتغير عند تغير ترتيب الإطار)
+WIRE_VERSION = 2
+
+# الصيغ المدعومة للتفاوض عند الاتصال
+ENCODINGS = ('json', 'binary')
+
+# حقول المضخة التي ينقلها الإطار بدلاً من فروقات JSON
+FRAME_FIELDS = ('metrics', 'production_today', 'updated_at')
+
+NO_STAMP = 0xFFFF
+
+# حجم بيانات المضخة الواحدة في الإطار بالبايت
+BYTES_PER_PUMP = 4 * len(METRIC_SPECS) + 8 + 2
+
+_SWAP = sys.byteorder != 'little'
+
+
+def frame_slots(telemetry: TelemetryStore, pump_ids: Optional[FrozenSet[int]]) -> Optional[List[int]]:
+    """خانات مضخات الإطار بترتيب المخزن (None = الأسطول كاملاً)"""
+    if pump_ids is None:
+        return None
+    return sorted(telemetry.slots[pump_id] for pump_id in pump_ids if pump_id in telemetry.slots)
+
+
+def build_schema(telemetry: TelemetryStore, slots: Optional[List[int]]) -> Dict:
+    """مخطط الإطارات الذي يُرسل للعميل مرة واحدة"""
+    return {
+        'wire_version': WIRE_VERSION,
+        'pumps': list(telemetry.pump_ids) if slots is None else [telemetry.pump_ids[slot] for slot in slots],
+        'metrics': [{'name': name, 'decimals': digits} for name, _, _, digits in METRIC_SPECS],
+        'bytes_per_pump': BYTES_PER_PUMP,
+    }
+
+
+def _pack(typecode: str, column: array, slots: Sequence[int]) -> bytes:
+    """تحويل خانات من عمود إلى بايتات بالنوع المطلوب"""
+    packed = array(typecode, column if isinstance(slots, range) and len(slots) == len(column)
+                   else [column[slot] for slot in slots])
+    if _SWAP:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def encode_frame(telemetry: TelemetryStore, slots: Optional[List[int]], updated: Dict[int, str],
+                 changed: Optional[Set[int]] = None) -> Tuple[bytes, List[str], int]:
+    """
+    بناء إطار القياسات الحالية لمضخات الإطار
+
+    updated: وقت التحديث الجديد لكل مضخة تغير وقت تحديثها
+    changed: المضخات التي تغيرت قياساتها (الافتراضي: جميع مضخات الإطار)
+    يرجع بايتات الإطار وجدول أوقات التحديث المشار إليه من الإطار وعدد مضخات الإطار
+    """
+    if slots is None:
+        slots = range(len(telemetry.pump_ids))
+    pump_ids = [telemetry.pump_ids[slot] for slot in slots]
+
+    parts = []
+    if changed is not None and len(changed) < len(pump_ids):
+        # إطار متفرق: مواقع المضخات المتغيرة في قائمة مضخات المخطط ثم قياساتها فقط
+        selected = [position for position, pump_id in enumerate(pump_ids) if pump_id in changed]
+        if len(selected) < len(pump_ids):
+            offsets = array('I', selected)
+            if _SWAP:
+                offsets.byteswap()
+            parts.append(offsets.tobytes())
+            slots = [slots[position] for position in selected]
+            pump_ids = [pump_ids[position] for position in selected]
+
+    parts.extend(_pack('f', telemetry.columns[name], slots) for name, _, _, _ in METRIC_SPECS)
+    parts.append(_pack('d', telemetry.production, slots))
+
+    # أوقات التحديث متطابقة غالباً في الدورة الواحدة: جدول صغير وفهرس لكل مضخة
+    stamps: List[str] = []
+    positions: Dict[str, int] = {}
+    indexes = array('H', [NO_STAMP]) * len(pump_ids)
+    if updated:
+        for position, pump_id in enumerate(pump_ids):
+            stamp = updated.get(pump_id)
+            if stamp is None:
+                continue
+            index = positions.get(stamp)
+            if index is None:
+                index = positions[stamp] = len(stamps)
+                stamps.append(stamp)
+            indexes[position] = index
+    if _SWAP:
+        indexes.byteswap()
+    parts.append(indexes.tobytes())
+
+    return b''.join(parts), stamps, len(pump_ids)
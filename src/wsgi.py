@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+نقطة دخول WSGI للإنتاج
+Production WSGI Entry Point
+
+الاستخدام مع gunicorn (انظر gunicorn.conf.py في جذر المشروع):
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+وضع الخادم يُحدد بالمتغير OIL_PUMP_ASYNC_MODE (gevent افتراضياً هنا)
+ويجب أن يطابق نوع عامل gunicorn.
+"""
+
+import os
+
+os.environ.setdefault('OIL_PUMP_ASYNC_MODE', 'gevent')
+
+from main import OilPumpSystem  # noqa: E402  (يجب ضبط وضع الخادم قبل الاستيراد)
+
+system = OilPumpSystem()
+app = system.app
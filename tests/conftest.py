@@ -0,0 +1,8 @@
+"""
+إعداد الاختبارات: وحدات src تستورد بعضها بأسمائها المباشرة كما عند تشغيل src/main.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
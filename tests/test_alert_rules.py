@@ -0,0 +1,149 @@
+"""
+اختبارات دورة حياة التنبيهات: الظهور ثم البقاء ثم الزوال بعد النطاق الخامد ومدة البقاء الدنيا
+Alert lifecycle tests (deadband and min_hold) with a fake clock
+"""
+
+from array import array
+
+from alert_rules import ALERT_RULES, ANOMALY_RULE, AlertEngine
+from telemetry_store import METRIC_NAMES
+
+THRESHOLDS = {
+    'pressure_min': 20.0,
+    'pressure_max': 80.0,
+    'temperature_max': 90.0,
+    'flow_rate_min': 100.0,
+    'vibration_max': 3.0,
+    'efficiency_min': 60.0,
+}
+
+NORMAL = {
+    'pressure': 50.0,
+    'temperature': 60.0,
+    'flow_rate': 250.0,
+    'vibration': 1.0,
+    'power': 50.0,
+    'efficiency': 85.0,
+}
+
+PRESSURE_HIGH = next(rule for rule in ALERT_RULES if rule.type == 'pressure_high')
+FLOW_LOW = next(rule for rule in ALERT_RULES if rule.type == 'flow_low')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def make_engine(pumps=1):
+    clock = FakeClock()
+    engine = AlertEngine(clock=clock)
+    for slot in range(pumps):
+        engine.add_pump(slot, f'مضخة {slot + 1}', THRESHOLDS)
+    columns = {name: array('d', [NORMAL[name]] * pumps) for name in METRIC_NAMES}
+    pump_ids = [slot + 1 for slot in range(pumps)]
+    return engine, clock, columns, pump_ids
+
+
+def evaluate(engine, columns, pump_ids, statuses, slots=None):
+    raised, cleared = engine.evaluate(columns, pump_ids, statuses, slots)
+    return [(pump_id, alert['type']) for pump_id, alert in raised], \
+        [(pump_id, alert['type']) for pump_id, alert in cleared]
+
+
+def test_alert_raises_once_and_holds_while_breached():
+    engine, clock, columns, pump_ids = make_engine()
+    columns['pressure'][0] = 85.0
+
+    assert evaluate(engine, columns, pump_ids, ['running']) == ([(1, 'pressure_high')], [])
+    clock.advance(60)
+    assert evaluate(engine, columns, pump_ids, ['running']) == ([], [])
+    assert [alert['type'] for alert in engine.alerts_for(0)] == ['pressure_high']
+
+
+def test_alert_stays_inside_deadband():
+    engine, clock, columns, pump_ids = make_engine()
+    columns['pressure'][0] = 85.0
+    evaluate(engine, columns, pump_ids, ['running'])
+
+    # تحت الحد لكن داخل النطاق الخامد: يبقى التنبيه مهما طال الزمن
+    columns['pressure'][0] = THRESHOLDS['pressure_max'] - PRESSURE_HIGH.deadband / 2
+    clock.advance(PRESSURE_HIGH.min_hold * 10)
+    assert evaluate(engine, columns, pump_ids, ['running']) == ([], [])
+    assert engine.alerts_for(0)
+
+
+def test_alert_clears_only_after_min_hold():
+    engine, clock, columns, pump_ids = make_engine()
+    columns['pressure'][0] = 85.0
+    evaluate(engine, columns, pump_ids, ['running'])
+
+    columns['pressure'][0] = THRESHOLDS['pressure_max'] - PRESSURE_HIGH.deadband
+    clock.advance(PRESSURE_HIGH.min_hold - 1)
+    assert evaluate(engine, columns, pump_ids, ['running']) == ([], [])
+
+    clock.advance(1)
+    raised, cleared = engine.evaluate(columns, pump_ids, ['running'])
+    assert raised == []
+    assert [(pump_id, alert['type'], alert['state']) for pump_id, alert in cleared] == \
+        [(1, 'pressure_high', 'cleared')]
+    assert engine.alerts_for(0) == []
+    assert engine.index == {}
+
+
+def test_alert_raises_again_after_clearing():
+    engine, clock, columns, pump_ids = make_engine()
+    columns['pressure'][0] = 85.0
+    evaluate(engine, columns, pump_ids, ['running'])
+
+    columns['pressure'][0] = NORMAL['pressure']
+    clock.advance(PRESSURE_HIGH.min_hold)
+    evaluate(engine, columns, pump_ids, ['running'])
+
+    columns['pressure'][0] = 85.0
+    assert evaluate(engine, columns, pump_ids, ['running']) == ([(1, 'pressure_high')], [])
+    assert [alert['state'] for alert in engine.alerts_for(0)] == ['raised']
+
+
+def test_running_only_rule_clears_when_pump_stops():
+    engine, clock, columns, pump_ids = make_engine()
+    columns['flow_rate'][0] = 50.0
+
+    assert evaluate(engine, columns, pump_ids, ['stopped']) == ([], [])
+    assert evaluate(engine, columns, pump_ids, ['running']) == ([(1, 'flow_low')], [])
+
+    # التوقف يزيل التنبيه بعد مدة البقاء رغم بقاء القيمة منخفضة
+    assert evaluate(engine, columns, pump_ids, ['stopped']) == ([], [])
+    clock.advance(FLOW_LOW.min_hold)
+    assert evaluate(engine, columns, pump_ids, ['stopped']) == ([], [(1, 'flow_low')])
+
+
+def test_evaluating_other_slots_leaves_alerts_untouched():
+    engine, clock, columns, pump_ids = make_engine(pumps=2)
+    columns['pressure'][0] = 85.0
+    evaluate(engine, columns, pump_ids, ['running', 'running'])
+
+    columns['pressure'][0] = NORMAL['pressure']
+    clock.advance(PRESSURE_HIGH.min_hold)
+    assert evaluate(engine, columns, pump_ids, ['running', 'running'], slots=[1]) == ([], [])
+    assert evaluate(engine, columns, pump_ids, ['running', 'running'], slots=[0]) == ([], [(1, 'pressure_high')])
+
+
+def test_anomaly_alert_holds_for_its_own_min_hold():
+    engine, clock, columns, pump_ids = make_engine()
+    finding = {'kind': 'spike', 'metric': 'vibration', 'score': 9.0, 'description': 'قفزة في الاهتزاز'}
+
+    raised, _ = engine.evaluate_anomalies({0: finding}, pump_ids)
+    assert [alert['anomaly']['kind'] for _, alert in raised] == ['spike']
+
+    clock.advance(ANOMALY_RULE.min_hold - 1)
+    assert engine.evaluate_anomalies({}, pump_ids) == ([], [])
+    clock.advance(1)
+    _, cleared = engine.evaluate_anomalies({}, pump_ids)
+    assert [(pump_id, alert['type']) for pump_id, alert in cleared] == [(1, ANOMALY_RULE.type)]
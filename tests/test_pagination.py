@@ -0,0 +1,123 @@
+"""
+اختبارات ترقيم سجل النشاط والدردشة بالمؤشر ?before=<id>&limit=
+Cursor pagination tests over bounded ring buffers
+"""
+
+import os
+from collections import deque
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+
+@pytest.fixture(scope='module')
+def main(tmp_path_factory):
+    # main ينشئ ملف السجل في المجلد الحالي عند استيراده
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('logs'))
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+    return main
+
+
+@pytest.fixture(scope='module')
+def client(main):
+    previous = os.environ.get('OIL_PUMP_DATA_DIR')
+    os.environ['OIL_PUMP_DATA_DIR'] = ''
+    try:
+        system = main.OilPumpSystem()
+    finally:
+        if previous is None:
+            del os.environ['OIL_PUMP_DATA_DIR']
+        else:
+            os.environ['OIL_PUMP_DATA_DIR'] = previous
+    return system.app.test_client()
+
+
+def ring(maxlen, last_id):
+    """مخزن حلقي أُلحق به المعرفات 1..last_id (الأقدم خرج منه عند الامتلاء)"""
+    buffer = deque(maxlen=maxlen)
+    buffer.extend({'id': item_id} for item_id in range(1, last_id + 1))
+    return buffer
+
+
+def ids(page):
+    return [item['id'] for item in page]
+
+
+def test_pages_walk_back_across_eviction_boundary(main):
+    buffer = ring(5, 8)  # المعرفات 1..3 خرجت من المخزن
+
+    page, next_before = main.paginate_by_id(buffer, None, 2)
+    assert (ids(page), next_before) == ([7, 8], 7)
+
+    page, next_before = main.paginate_by_id(buffer, next_before, 2)
+    assert (ids(page), next_before) == ([5, 6], 5)
+
+    # الصفحة الأخيرة أقصر ولا مؤشر بعدها
+    page, next_before = main.paginate_by_id(buffer, next_before, 2)
+    assert (ids(page), next_before) == ([4], None)
+
+
+def test_cursor_older_than_buffer_returns_empty_page(main):
+    buffer = ring(5, 8)
+
+    assert main.paginate_by_id(buffer, 4, 2) == ([], None)
+    assert main.paginate_by_id(buffer, 2, 2) == ([], None)
+
+
+def test_cursor_newer_than_buffer_returns_latest(main):
+    buffer = ring(5, 8)
+
+    page, next_before = main.paginate_by_id(buffer, 100, 3)
+    assert (ids(page), next_before) == ([6, 7, 8], 6)
+
+
+def test_limit_covering_buffer_has_no_next_cursor(main):
+    buffer = ring(5, 8)
+
+    page, next_before = main.paginate_by_id(buffer, None, 5)
+    assert (ids(page), next_before) == ([4, 5, 6, 7, 8], None)
+
+
+def test_page_args_defaults_and_valid_values(main):
+    buffer = deque(maxlen=100)
+
+    assert main.page_args(MultiDict(), buffer) == (None, 50)
+    assert main.page_args(MultiDict({'limit': '100', 'before': '7'}), buffer) == (7, 100)
+    assert main.page_args(MultiDict({'limit': '1'}), buffer) == (None, 1)
+
+
+@pytest.mark.parametrize('args', [
+    {'limit': '0'},
+    {'limit': '-3'},
+    {'limit': '101'},
+    {'limit': 'abc'},
+    {'before': 'abc'},
+    {'before': '0'},
+    {'before': '-1'},
+])
+def test_page_args_rejects_invalid_values(main, args):
+    with pytest.raises(ValueError):
+        main.page_args(MultiDict(args), deque(maxlen=100))
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=-3', 'limit=501', 'limit=x', 'before=abc', 'before=0'])
+def test_activity_route_rejects_invalid_arguments(client, query):
+    response = client.get(f'/api/activity?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=101', 'before=abc'])
+def test_chat_route_rejects_invalid_arguments(client, query):
+    response = client.get(f'/api/chat/messages?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_routes_accept_valid_arguments(client):
+    assert client.get('/api/activity?limit=500&before=3').status_code == 200
+    assert client.get('/api/chat/messages?limit=100').status_code == 200
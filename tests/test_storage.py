@@ -0,0 +1,161 @@
+"""
+اختبارات استعادة التخزين الدائم بعد الانهيار
+Crash-recovery tests for the segment storage
+"""
+
+import os
+import json
+
+from storage import EventLog, RecordLog
+
+FIELDS = 'if'
+
+
+def _rows(count, start=1000.0):
+    return [(start + index, index, float(index) / 2) for index in range(count)]
+
+
+def _segment(directory, name):
+    (filename,) = [f for f in os.listdir(directory) if f.startswith(name + '-')]
+    return os.path.join(directory, filename)
+
+
+def _scan(log):
+    return [tuple(row) for row in log.scan(0, float('inf'))]
+
+
+def _corrupt(path, offset):
+    with open(path, 'r+b') as handle:
+        handle.seek(offset)
+        byte = handle.read(1)
+        handle.seek(offset)
+        handle.write(bytes([byte[0] ^ 0xFF]))
+
+
+def _events(count):
+    return [{'id': index, 'message': f'نشاط {index}'} for index in range(1, count + 1)]
+
+
+def _event_offsets(events):
+    """موقع بداية كل حدث في المقطع (الترويسة ثم JSON)"""
+    offsets, offset = [], 0
+    for event in events:
+        offsets.append(offset)
+        offset += EventLog.HEADER.size + len(json.dumps(event, ensure_ascii=False).encode('utf-8'))
+    return offsets + [offset]
+
+
+class TestRecordLog:
+    def test_truncated_tail_record_is_dropped(self, tmp_path):
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=16)
+        log.append_many(_rows(5))
+        log.close()
+
+        # انهيار أثناء كتابة السجل الخامس: الملف ينتهي في منتصفه
+        size = log.record.size
+        os.truncate(_segment(str(tmp_path), 'raw'), 4 * size + size // 2)
+
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=16)
+        assert _scan(log) == _rows(4)
+
+        # الإلحاق يستأنف مكان السجل المزال
+        log.append_many([(2000.0, 9, 4.5)])
+        assert _scan(log) == _rows(4) + [(2000.0, 9, 4.5)]
+        log.close()
+
+    def test_corrupt_crc_tail_record_is_dropped(self, tmp_path):
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=16)
+        log.append_many(_rows(5))
+        log.close()
+
+        size = log.record.size
+        _corrupt(_segment(str(tmp_path), 'raw'), 5 * size - 1)
+
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=16)
+        assert _scan(log) == _rows(4)
+        log.close()
+
+    def test_recovery_is_idempotent(self, tmp_path):
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=16)
+        log.append_many(_rows(5))
+        log.close()
+        path = _segment(str(tmp_path), 'raw')
+        os.truncate(path, 4 * log.record.size + 3)
+
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=16)
+        log.close()
+        with open(path, 'rb') as handle:
+            recovered = handle.read()
+
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=16)
+        assert _scan(log) == _rows(4)
+        log.close()
+        with open(path, 'rb') as handle:
+            assert handle.read() == recovered
+
+    def test_recovery_keeps_sealed_segments(self, tmp_path):
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=4)
+        log.append_many(_rows(6))
+        log.close()
+
+        paths = sorted(os.listdir(str(tmp_path)))
+        assert len(paths) == 2
+        _corrupt(os.path.join(str(tmp_path), paths[-1]), 2 * log.record.size - 1)
+
+        log = RecordLog(str(tmp_path), 'raw', FIELDS, records_per_segment=4)
+        assert _scan(log) == _rows(5)
+        log.close()
+
+
+class TestEventLog:
+    def test_truncated_tail_event_is_dropped(self, tmp_path):
+        events = _events(3)
+        log = EventLog(str(tmp_path), 'activity', segment_size=4096)
+        for event in events:
+            log.append(event)
+        log.close()
+
+        # انهيار أثناء كتابة الحدث الثالث: الملف ينتهي في منتصف نصه
+        offsets = _event_offsets(events)
+        os.truncate(_segment(str(tmp_path), 'activity'), offsets[2] + EventLog.HEADER.size + 5)
+
+        log = EventLog(str(tmp_path), 'activity', segment_size=4096)
+        assert log.tail(10) == events[:2]
+
+        log.append({'id': 4, 'message': 'بعد الاستعادة'})
+        assert log.tail(10) == events[:2] + [{'id': 4, 'message': 'بعد الاستعادة'}]
+        log.close()
+
+    def test_corrupt_crc_drops_event_and_everything_after(self, tmp_path):
+        events = _events(3)
+        log = EventLog(str(tmp_path), 'activity', segment_size=4096)
+        for event in events:
+            log.append(event)
+        log.close()
+
+        offsets = _event_offsets(events)
+        _corrupt(_segment(str(tmp_path), 'activity'), offsets[1] + EventLog.HEADER.size + 1)
+
+        log = EventLog(str(tmp_path), 'activity', segment_size=4096)
+        assert log.tail(10) == events[:1]
+        log.close()
+
+    def test_recovery_is_idempotent(self, tmp_path):
+        events = _events(3)
+        log = EventLog(str(tmp_path), 'activity', segment_size=4096)
+        for event in events:
+            log.append(event)
+        log.close()
+        path = _segment(str(tmp_path), 'activity')
+        os.truncate(path, _event_offsets(events)[3] - 2)
+
+        log = EventLog(str(tmp_path), 'activity', segment_size=4096)
+        log.close()
+        with open(path, 'rb') as handle:
+            recovered = handle.read()
+
+        log = EventLog(str(tmp_path), 'activity', segment_size=4096)
+        assert log.tail(10) == events[:2]
+        log.close()
+        with open(path, 'rb') as handle:
+            assert handle.read() == recovered
@@ -0,0 +1,143 @@
+"""
+اختبارات صيغة النقل الثنائية: ترميز الإطارات وفكها بمفكك مرجعي للتخطيط الموثق
+Round-trip tests for telemetry frames against a reference decoder
+
+المفكك المرجعي يتبع التخطيط في توثيق wire_format ويطابق decodeTelemetryFrame في
+src/static/script.js خطوة بخطوة.
+"""
+
+import math
+import random
+import struct
+
+from telemetry_store import METRIC_SPECS, TelemetryStore
+from wire_format import BYTES_PER_PUMP, NO_STAMP, build_schema, encode_frame, frame_slots
+
+
+def decode_frame(schema, frame, stamps, count):
+    """فك إطار إلى فروقات المضخات كما تفعل الواجهة (None للإطار غير المطابق للمخطط)"""
+    sparse = count != len(schema['pumps'])
+    if len(frame) != count * (schema['bytes_per_pump'] + (4 if sparse else 0)):
+        return None
+
+    offset = 0
+    pumps = schema['pumps']
+    if sparse:
+        positions = struct.unpack_from(f'<{count}I', frame, offset)
+        offset += 4 * count
+        if any(position >= len(schema['pumps']) for position in positions):
+            return None
+        pumps = [schema['pumps'][position] for position in positions]
+
+    changes = {pump_id: {'metrics': {}} for pump_id in pumps}
+    for metric in schema['metrics']:
+        scale = 10 ** metric['decimals']
+        for pump_id, value in zip(pumps, struct.unpack_from(f'<{count}f', frame, offset)):
+            # Math.round في JavaScript: تقريب النصف للأعلى
+            changes[pump_id]['metrics'][metric['name']] = math.floor(value * scale + 0.5) / scale
+        offset += 4 * count
+
+    for pump_id, value in zip(pumps, struct.unpack_from(f'<{count}d', frame, offset)):
+        changes[pump_id]['production_today'] = value
+    offset += 8 * count
+
+    for pump_id, index in zip(pumps, struct.unpack_from(f'<{count}H', frame, offset)):
+        if index != NO_STAMP:
+            changes[pump_id]['updated_at'] = stamps[index]
+    offset += 2 * count
+
+    assert offset == len(frame)
+    return changes
+
+
+def make_store(size, seed=7):
+    rng = random.Random(seed)
+    telemetry = TelemetryStore(rng)
+    for pump_id in range(1, size + 1):
+        metrics = {name: round(rng.uniform(low, high), digits) for name, low, high, digits in METRIC_SPECS}
+        telemetry.add_pump(pump_id, metrics, production=rng.uniform(0, 5000))
+    return telemetry
+
+
+def expected(telemetry, pump_ids, updated):
+    result = {}
+    for pump_id in pump_ids:
+        result[pump_id] = {
+            'metrics': telemetry.metrics_dict(pump_id),
+            'production_today': telemetry.production_of(pump_id),
+        }
+        if pump_id in updated:
+            result[pump_id]['updated_at'] = updated[pump_id]
+    return result
+
+
+def test_dense_frame_round_trip():
+    telemetry = make_store(50)
+    updated = {pump_id: '2026-01-01T00:00:05' if pump_id % 2 else '2026-01-01T00:00:06'
+               for pump_id in range(1, 41)}
+
+    schema = build_schema(telemetry, None)
+    frame, stamps, count = encode_frame(telemetry, None, updated)
+
+    assert count == 50
+    assert len(frame) == count * BYTES_PER_PUMP
+    assert sorted(stamps) == ['2026-01-01T00:00:05', '2026-01-01T00:00:06']
+    assert decode_frame(schema, frame, stamps, count) == expected(telemetry, telemetry.pump_ids, updated)
+
+
+def test_dense_frame_for_filtered_feed():
+    telemetry = make_store(30)
+    slots = frame_slots(telemetry, frozenset({4, 9, 17, 30}))
+
+    schema = build_schema(telemetry, slots)
+    frame, stamps, count = encode_frame(telemetry, slots, {})
+
+    assert schema['pumps'] == [4, 9, 17, 30]
+    assert stamps == []
+    assert decode_frame(schema, frame, stamps, count) == expected(telemetry, [4, 9, 17, 30], {})
+
+
+def test_sparse_frame_round_trip():
+    telemetry = make_store(40)
+    changed = {3, 11, 12, 38}
+    updated = {pump_id: '2026-01-01T00:00:05' for pump_id in changed}
+
+    schema = build_schema(telemetry, None)
+    frame, stamps, count = encode_frame(telemetry, None, updated, changed)
+
+    assert count == len(changed)
+    assert len(frame) == count * (BYTES_PER_PUMP + 4)
+    assert decode_frame(schema, frame, stamps, count) == expected(telemetry, sorted(changed), updated)
+
+
+def test_sparse_frame_with_every_pump_changed_is_dense():
+    telemetry = make_store(10)
+    changed = set(telemetry.pump_ids)
+
+    frame, stamps, count = encode_frame(telemetry, None, {}, changed)
+
+    assert count == 10
+    assert len(frame) == count * BYTES_PER_PUMP
+
+
+def test_sparse_offsets_beyond_uint16():
+    # المواقع uint32: مضخات بعد الموقع 65535 في المخطط تبقى قابلة للعنونة
+    size = 70000
+    telemetry = make_store(size)
+    changed = {2, 65536, 65537, size}
+
+    schema = build_schema(telemetry, None)
+    frame, stamps, count = encode_frame(telemetry, None, {}, changed)
+
+    assert struct.unpack_from('<4I', frame) == (1, 65535, 65536, size - 1)
+    assert decode_frame(schema, frame, stamps, count) == expected(telemetry, sorted(changed), {})
+
+
+def test_frame_not_matching_schema_is_rejected():
+    telemetry = make_store(10)
+    schema = build_schema(telemetry, None)
+    frame, stamps, count = encode_frame(telemetry, None, {}, {1, 2})
+
+    assert decode_frame(schema, frame[:-1], stamps, count) is None
+    out_of_range = struct.pack('<I', 10) + frame[4:]
+    assert decode_frame(schema, out_of_range, stamps, count) is None